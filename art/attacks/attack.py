@@ -22,11 +22,12 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 import abc
 import logging
-from typing import Any, List, Optional, Tuple, Union, TYPE_CHECKING
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union, TYPE_CHECKING
 
 import numpy as np
 
 from art.exceptions import EstimatorError
+from art.utils import EstimatorProfiler
 
 if TYPE_CHECKING:
     from art.utils import CLASSIFIER_TYPE
@@ -71,6 +72,10 @@ class input_filter(abc.ABCMeta):
 
                 if len(args) > 0:
                     args = tuple(lst)
+
+                if func_name == "generate" and getattr(self, "_profiling", False):
+                    return self._generate_profiled(fdict[func_name], *args, **kwargs)
+
                 return fdict[func_name](self, *args, **kwargs)
 
             replacement_function.__doc__ = fdict[func_name].__doc__
@@ -134,6 +139,8 @@ class EvasionAttack(Attack):
 
     def __init__(self, **kwargs) -> None:
         self._targeted = False
+        self._profiling = False
+        self._profiling_report: Optional[Dict[str, Dict[str, Union[int, float]]]] = None
         super().__init__(**kwargs)
 
     @abc.abstractmethod
@@ -151,6 +158,44 @@ class EvasionAttack(Attack):
         """
         raise NotImplementedError
 
+    def set_profiling(self, profiling: bool) -> None:
+        """
+        Enable or disable profiling of the estimator calls made by `generate`.
+
+        :param profiling: If true, each call of `generate` records the number of calls, the number of samples and the
+                          wall time of the methods and preprocessing defences of the estimator in
+                          `profiling_report`.
+        """
+        self._profiling = profiling
+
+    @property
+    def profiling_report(self) -> Optional[Dict[str, Dict[str, Union[int, float]]]]:
+        """
+        Return the profiling report of the last call of `generate`, see `art.utils.EstimatorProfiler.report`.
+
+        :return: The report or `None` if profiling was disabled.
+        """
+        return self._profiling_report
+
+    def _generate_profiled(self, generate: Callable, *args, **kwargs) -> np.ndarray:
+        """
+        Run `generate` with a profiler attached to the estimator and store its report.
+        """
+        x = kwargs["x"] if "x" in kwargs else args[0]
+
+        # Nested profilers, e.g. of an attack running this attack, receive all records as well
+        previous_profiler = self.estimator.profiler
+        profiler = EstimatorProfiler(parent=previous_profiler)
+        self.estimator.set_profiler(profiler)
+        try:
+            with profiler.span("generate:" + self.__class__.__name__, len(x)):
+                x_adv = generate(self, *args, **kwargs)
+        finally:
+            self.estimator.set_profiler(previous_profiler)
+
+        self._profiling_report = profiler.report()
+        return x_adv
+
     @property
     def targeted(self) -> bool:
         """
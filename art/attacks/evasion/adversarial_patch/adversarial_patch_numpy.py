@@ -173,7 +173,9 @@ class AdversarialPatchNumpy(EvasionAttack):
                 i_batch_end = (i_batch + 1) * self.batch_size
 
                 gradients = self.estimator.loss_gradient(
-                    patched_images[i_batch_start:i_batch_end], y_target[i_batch_start:i_batch_end],
+                    patched_images[i_batch_start:i_batch_end],
+                    y_target[i_batch_start:i_batch_end],
+                    batch_size=self.batch_size,
                 )
 
                 for i_image in range(gradients.shape[0]):
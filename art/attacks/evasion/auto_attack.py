@@ -21,7 +21,8 @@ This module implements the `AutoAttack` attack.
 | Paper link: https://arxiv.org/abs/2003.01690
 """
 import logging
-from typing import List, Optional, Union, Tuple, TYPE_CHECKING
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Union, Tuple, TYPE_CHECKING
 
 import numpy as np
 
@@ -39,6 +40,30 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+# Replica of the AutoAttack instance, with its attacks and estimators, held by each worker process of the scheduler
+_AUTO_ATTACK_REPLICA: Optional["AutoAttack"] = None
+
+
+def _init_auto_attack_replica(auto_attack: "AutoAttack") -> None:
+    """
+    Store the replica of the AutoAttack instance in a worker process of the scheduler.
+
+    :param auto_attack: The AutoAttack instance, copied once per worker process.
+    """
+    global _AUTO_ATTACK_REPLICA  # pylint: disable=W0603
+    _AUTO_ATTACK_REPLICA = auto_attack
+
+
+def _attack_shard_replica(
+    attack_index: int, targeted: bool, x: np.ndarray, y: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Run an attack of the replica of the AutoAttack instance on a shard of samples in a worker process.
+
+    :return: A tuple of the adversarial examples and of the mask of the samples which are not robust anymore.
+    """
+    return _AUTO_ATTACK_REPLICA._attack_shard(attack_index, targeted, x, y)  # type: ignore
+
 
 class AutoAttack(EvasionAttack):
     """
@@ -55,6 +80,8 @@ class AutoAttack(EvasionAttack):
         "batch_size",
         "estimator_orig",
         "targeted",
+        "nb_parallel_jobs",
+        "nb_shards",
     ]
 
     _estimator_requirements = (BaseEstimator, ClassifierMixin)
@@ -69,6 +96,8 @@ class AutoAttack(EvasionAttack):
         batch_size: int = 32,
         estimator_orig: Optional["CLASSIFIER_TYPE"] = None,
         targeted: bool = False,
+        nb_parallel_jobs: int = 1,
+        nb_shards: Optional[int] = None,
     ):
         """
         Create a :class:`.AutoAttack` instance.
@@ -83,6 +112,13 @@ class AutoAttack(EvasionAttack):
         :param estimator_orig: Original estimator to be attacked by adversarial examples.
         :param targeted: If False run only untargeted attacks, if True also run targeted attacks against each possible
                          target.
+        :param nb_parallel_jobs: Number of worker processes running attacks concurrently. If larger than 1, the samples
+                                 are split into shards and each shard runs the sequence of attacks in its own jobs,
+                                 which are dispatched to a process pool. Each worker holds a copy of the attacks and
+                                 estimators, inherited with the `fork` start method or otherwise pickled, so the
+                                 attacks have to be picklable on platforms without `fork`.
+        :param nb_shards: Number of shards of samples, `nb_parallel_jobs` if `None`. More shards than workers balance
+                          the load better at the cost of smaller batches.
         """
         super().__init__(estimator=estimator)
 
@@ -140,6 +176,8 @@ class AutoAttack(EvasionAttack):
             self.estimator_orig = estimator
 
         self._targeted = targeted
+        self.nb_parallel_jobs = nb_parallel_jobs
+        self.nb_shards = nb_shards
         self._check_params()
 
     def generate(self, x: np.ndarray, y: Optional[np.ndarray] = None, **kwargs) -> np.ndarray:
@@ -163,19 +201,9 @@ class AutoAttack(EvasionAttack):
         y_pred = self.estimator_orig.predict(x.astype(ART_NUMPY_DTYPE))
         sample_is_robust = np.argmax(y_pred, axis=1) == np.argmax(y, axis=1)
 
-        # Untargeted attacks
-        for attack in self.attacks:
-
-            # Stop if all samples are misclassified
-            if np.sum(sample_is_robust) == 0:
-                break
-
-            if attack.targeted:
-                attack.set_params(targeted=False)
-
-            x_adv, sample_is_robust = self._run_attack(x=x_adv, y=y, sample_is_robust=sample_is_robust, attack=attack)
-
-        # Targeted attacks
+        # Jobs of untargeted attacks, then of targeted attacks against each possible target
+        jobs: List[Tuple[int, Optional[int]]] = [(i_attack, None) for i_attack in range(len(self.attacks))]
+        targeted_labels = None
         if self.targeted:
             # Labels for targeted attacks
             y_t = np.array([range(y.shape[1])] * y.shape[0])
@@ -184,40 +212,129 @@ class AutoAttack(EvasionAttack):
             y_t = y_t[y_t != y_idx]
             targeted_labels = np.reshape(y_t, (y.shape[0], -1))
 
-            for attack in self.attacks:
-
+            for i_attack, attack in enumerate(self.attacks):
                 if attack.targeted is not None:
+                    jobs += [(i_attack, i) for i in range(self.estimator.nb_classes - 1)]
 
-                    if not attack.targeted:
-                        attack.set_params(targeted=True)
+        def get_labels(i_target: Optional[int], indices: np.ndarray) -> np.ndarray:
+            if i_target is None:
+                return y[indices]  # type: ignore
+            return check_and_transform_label_format(
+                targeted_labels[indices, i_target], self.estimator.nb_classes  # type: ignore
+            )
 
-                    for i in range(self.estimator.nb_classes - 1):
-                        # Stop if all samples are misclassified
-                        if np.sum(sample_is_robust) == 0:
-                            break
+        if self.nb_parallel_jobs == 1:
+            for i_attack, i_target in jobs:
+                # Stop if all samples are misclassified
+                if np.sum(sample_is_robust) == 0:
+                    break
+
+                x_adv, sample_is_robust = self._run_attack(
+                    x=x_adv,
+                    y=get_labels(i_target, np.arange(x.shape[0])),
+                    sample_is_robust=sample_is_robust,
+                    attack_index=i_attack,
+                    targeted=i_target is not None,
+                )
+        else:
+            self._run_jobs(x_adv, sample_is_robust, jobs, get_labels)
 
-                        target = check_and_transform_label_format(targeted_labels[:, i], self.estimator.nb_classes)
+        return x_adv
 
-                        x_adv, sample_is_robust = self._run_attack(
-                            x=x_adv, y=target, sample_is_robust=sample_is_robust, attack=attack
-                        )
+    def _run_jobs(
+        self,
+        x: np.ndarray,
+        sample_is_robust: np.ndarray,
+        jobs: List[Tuple[int, Optional[int]]],
+        get_labels: Callable[[Optional[int], np.ndarray], np.ndarray],
+    ) -> None:
+        """
+        Run the jobs of all shards of samples in a process pool and update `x` and `sample_is_robust` in place. The
+        jobs of each shard run in the order of `jobs`, the jobs of different shards run concurrently. The result of
+        each job is merged as soon as it finishes and the next job of its shard only attacks the samples of the shard
+        which are still robust.
+
+        :param x: An array with the adversarial examples so far.
+        :param sample_is_robust: Boolean array showing which samples are still robust.
+        :param jobs: The sequence of jobs, each defined by the index of the attack and the index of the target of a
+                     targeted attack, or `None` for an untargeted attack.
+        :param get_labels: Function returning the labels of the samples at the given indices for a target index.
+        """
+        nb_shards = self.nb_shards if self.nb_shards is not None else self.nb_parallel_jobs
+        shards = np.array_split(np.arange(x.shape[0]), nb_shards)
+        next_jobs = [0] * len(shards)
+        futures: Dict[Future, Tuple[int, np.ndarray]] = dict()
+
+        with ProcessPoolExecutor(
+            max_workers=self.nb_parallel_jobs, initializer=_init_auto_attack_replica, initargs=(self,)
+        ) as executor:
+
+            def submit(i_shard: int) -> None:
+                # Submit the next job of the shard unless all of its samples are misclassified
+                indices = shards[i_shard][sample_is_robust[shards[i_shard]]]
+                if next_jobs[i_shard] < len(jobs) and indices.size > 0:
+                    i_attack, i_target = jobs[next_jobs[i_shard]]
+                    next_jobs[i_shard] += 1
+                    future = executor.submit(
+                        _attack_shard_replica, i_attack, i_target is not None, x[indices], get_labels(i_target, indices)
+                    )
+                    futures[future] = (i_shard, indices)
 
-        return x_adv
+            for i_shard in range(len(shards)):
+                submit(i_shard)
+
+            while futures:
+                done, _ = wait(list(futures.keys()), return_when=FIRST_COMPLETED)
+                for future in done:
+                    i_shard, indices = futures.pop(future)
+                    x_shard_adv, sample_is_not_robust = future.result()
+
+                    x[indices[sample_is_not_robust]] = x_shard_adv[sample_is_not_robust]
+                    sample_is_robust[indices[sample_is_not_robust]] = False
+
+                    submit(i_shard)
 
     def _run_attack(
-        self, x: np.ndarray, y: np.ndarray, sample_is_robust: np.ndarray, attack: EvasionAttack,
+        self, x: np.ndarray, y: np.ndarray, sample_is_robust: np.ndarray, attack_index: int, targeted: bool
     ) -> Tuple[np.ndarray, np.ndarray]:
         """
         Run attack.
 
         :param x: An array with the original inputs.
         :param sample_is_robust: Store the initial robustness of examples.
+        :param attack_index: Index of the attack in `attacks`.
+        :param targeted: Whether to run the attack as targeted attack.
         :return: An array holding the adversarial examples.
         """
         # Attack only correctly classified samples
         x_robust = x[sample_is_robust]
         y_robust = y[sample_is_robust]
 
+        x_robust_adv, sample_is_not_robust = self._attack_shard(attack_index, targeted, x_robust, y_robust)
+
+        x_robust[sample_is_not_robust] = x_robust_adv[sample_is_not_robust]
+        x[sample_is_robust] = x_robust
+
+        sample_is_robust[sample_is_robust] = np.invert(sample_is_not_robust)
+
+        return x, sample_is_robust
+
+    def _attack_shard(
+        self, attack_index: int, targeted: bool, x_robust: np.ndarray, y_robust: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Generate adversarial examples for robust samples with one attack and check which of them are successful.
+
+        :param attack_index: Index of the attack in `attacks`.
+        :param targeted: Whether to run the attack as targeted attack.
+        :param x_robust: An array with the robust samples.
+        :param y_robust: The labels of the robust samples, or the target labels if `targeted`.
+        :return: A tuple of the adversarial examples and of the mask of the samples which are not robust anymore.
+        """
+        attack = self.attacks[attack_index]
+        if bool(attack.targeted) != targeted:
+            attack.set_params(targeted=targeted)
+
         # Generate adversarial examples
         x_robust_adv = attack.generate(x=x_robust, y=y_robust)
         y_pred_robust_adv = self.estimator_orig.predict(x_robust_adv)
@@ -238,12 +355,7 @@ class AutoAttack(EvasionAttack):
 
         sample_is_not_robust = np.logical_and(samples_misclassified, norm_is_smaller_eps)
 
-        x_robust[sample_is_not_robust] = x_robust_adv[sample_is_not_robust]
-        x[sample_is_robust] = x_robust
-
-        sample_is_robust[sample_is_robust] = np.invert(sample_is_not_robust)
-
-        return x, sample_is_robust
+        return x_robust_adv, sample_is_not_robust
 
     def _check_params(self) -> None:
         if self.norm not in [1, 2, np.inf, "inf"]:
@@ -257,3 +369,9 @@ class AutoAttack(EvasionAttack):
 
         if not isinstance(self.batch_size, int) or self.batch_size <= 0:
             raise ValueError("The argument batch_size has to be of type int and larger than zero.")
+
+        if not isinstance(self.nb_parallel_jobs, int) or self.nb_parallel_jobs <= 0:
+            raise ValueError("The argument nb_parallel_jobs has to be of type int and larger than zero.")
+
+        if self.nb_shards is not None and (not isinstance(self.nb_shards, int) or self.nb_shards <= 0):
+            raise ValueError("The argument nb_shards has to be None or of type int and larger than zero.")
@@ -22,7 +22,7 @@ This module implements the `Auto Projected Gradient Descent` attack.
 """
 import logging
 import math
-from typing import Optional, Union, TYPE_CHECKING
+from typing import Optional, Tuple, Union, TYPE_CHECKING
 
 import numpy as np
 from tqdm.auto import trange
@@ -93,20 +93,10 @@ class AutoProjectedGradientDescent(EvasionAttack):
                 if is_probability(estimator.predict(x=np.ones(shape=(1, *estimator.input_shape)))):
                     raise NotImplementedError("Cross-entropy loss is not implemented for probability output.")
                 else:
-                    self._loss_object = tf.reduce_mean(
-                        tf.keras.losses.categorical_crossentropy(
-                            y_pred=estimator._output, y_true=estimator._labels_ph, from_logits=True
-                        )
+                    # The loss of each sample is kept for the step size control
+                    self._loss_object = tf.keras.losses.categorical_crossentropy(
+                        y_pred=estimator._output, y_true=estimator._labels_ph, from_logits=True
                     )
-
-                    def loss_fn(y_true, y_pred):
-                        y_pred_norm = y_pred - np.amax(y_pred, axis=1, keepdims=True)
-                        loss_value = -(
-                            y_true * y_pred_norm - np.log(np.sum(np.exp(y_pred_norm), axis=1, keepdims=True))
-                        )
-                        return np.mean(loss_value)
-
-                    self._loss_fn = loss_fn
             elif loss_type == "difference_logits_ratio":
                 if is_probability(estimator.predict(x=np.ones(shape=(1, *estimator.input_shape)))):
                     raise ValueError(
@@ -132,28 +122,9 @@ class AutoProjectedGradientDescent(EvasionAttack):
 
                         dlr = -(z_y - z_i) / (z_1 - z_3)
 
-                        return tf.reduce_mean(dlr)
-
-                    def loss_fn(y_true, y_pred):
-                        i_y_true = np.argmax(y_true, axis=1)
-                        i_y_pred_arg = np.argsort(y_pred, axis=1)
-                        i_z_i = np.where(i_y_pred_arg[:, -1] != i_y_true[:], i_y_pred_arg[:, -1], i_y_pred_arg[:, -2])
-
-                        z_1 = y_pred[:, i_y_pred_arg[:, -1]]
-                        z_3 = y_pred[:, i_y_pred_arg[:, -3]]
-                        z_i = y_pred[:, i_z_i]
-                        z_y = y_pred[:, i_y_true]
+                        return dlr
 
-                        z_1 = np.diag(z_1)
-                        z_3 = np.diag(z_3)
-                        z_i = np.diag(z_i)
-                        z_y = np.diag(z_y)
-
-                        dlr = -(z_y - z_i) / (z_1 - z_3)
-
-                        return np.mean(dlr)
-
-                    self._loss_fn = loss_fn
+                    # The loss of each sample is kept for the step size control
                     self._loss_object = difference_logits_ratio(y_true=estimator._labels_ph, y_pred=estimator._output)
             elif loss_type is None:
                 self._loss_object = estimator._loss_object
@@ -185,10 +156,8 @@ class AutoProjectedGradientDescent(EvasionAttack):
             if loss_type == "cross_entropy":
                 if is_probability(estimator.predict(x=np.ones(shape=(1, *estimator.input_shape)))):
                     self._loss_object = tf.keras.losses.CategoricalCrossentropy(from_logits=False)
-                    self._loss_fn = self._loss_object
                 else:
                     self._loss_object = tf.keras.losses.CategoricalCrossentropy(from_logits=True)
-                    self._loss_fn = self._loss_object
             elif loss_type == "difference_logits_ratio":
                 if is_probability(estimator.predict(x=np.ones(shape=(1, *estimator.input_shape)))):
                     raise ValueError(
@@ -197,6 +166,14 @@ class AutoProjectedGradientDescent(EvasionAttack):
                     )
                 else:
 
+                    class DifferenceLogitsRatioTensorFlowV2(tf.keras.losses.Loss):
+                        """
+                        Difference of logits ratio loss supporting the reductions of `tf.keras.losses.Loss`.
+                        """
+
+                        def call(self, y_true, y_pred):
+                            return difference_logits_ratio(y_true, y_pred)
+
                     def difference_logits_ratio(y_true, y_pred):
                         i_y_true = tf.cast(tf.math.argmax(tf.cast(y_true, tf.int32), axis=1), tf.int32)
                         i_y_pred_arg = tf.argsort(y_pred, axis=1)
@@ -222,10 +199,9 @@ class AutoProjectedGradientDescent(EvasionAttack):
 
                         dlr = -(z_y - z_i) / (z_1 - z_3)
 
-                        return tf.reduce_mean(dlr)
+                        return dlr
 
-                    self._loss_fn = difference_logits_ratio
-                    self._loss_object = difference_logits_ratio
+                    self._loss_object = DifferenceLogitsRatioTensorFlowV2()
             elif loss_type is None:
                 self._loss_object = estimator._loss_object
             else:
@@ -256,13 +232,6 @@ class AutoProjectedGradientDescent(EvasionAttack):
                         "the estimator has to to predict logits."
                     )
                 else:
-
-                    def loss_fn(y_true, y_pred):
-                        return torch.nn.CrossEntropyLoss()(
-                            torch.from_numpy(y_pred), torch.from_numpy(np.argmax(y_true, axis=1))
-                        )
-
-                    self._loss_fn = loss_fn
                     self._loss_object = torch.nn.CrossEntropyLoss()
             elif loss_type == "difference_logits_ratio":
                 if is_probability(
@@ -274,7 +243,23 @@ class AutoProjectedGradientDescent(EvasionAttack):
                     )
                 else:
 
-                    # def difference_logits_ratio(y_true, y_pred):
+                    class DifferenceLogitsRatioPyTorch(torch.nn.Module):
+                        """
+                        Difference of logits ratio loss supporting the reductions "mean", "sum" and "none".
+                        """
+
+                        def __init__(self):
+                            super().__init__()
+                            self.reduction = "mean"
+
+                        def forward(self, y_pred, y_true):
+                            dlr = difference_logits_ratio(y_pred, y_true)
+                            if self.reduction == "mean":
+                                return torch.mean(dlr)
+                            if self.reduction == "sum":
+                                return torch.sum(dlr)
+                            return dlr
+
                     def difference_logits_ratio(y_pred, y_true):  # type: ignore
                         if isinstance(y_true, np.ndarray):
                             y_true = torch.from_numpy(y_true)
@@ -310,10 +295,9 @@ class AutoProjectedGradientDescent(EvasionAttack):
 
                         dlr = -(z_y - z_i) / (z_1 - z_3)
 
-                        return torch.mean(dlr.float())
+                        return dlr.float()
 
-                    self._loss_fn = difference_logits_ratio
-                    self._loss_object = difference_logits_ratio
+                    self._loss_object = DifferenceLogitsRatioPyTorch()
             elif loss_type is None:
                 self._loss_object = estimator._loss_object
             else:
@@ -374,20 +358,25 @@ class AutoProjectedGradientDescent(EvasionAttack):
 
         x_adv = x.astype(ART_NUMPY_DTYPE)
 
+        sample_is_robust = np.ones(x_adv.shape[0], dtype=bool)
+
         for _ in trange(max(1, self.nb_random_init), desc="AutoPGD - restart"):
-            # Determine correctly predicted samples
-            y_pred = self.estimator.predict(x_adv)
+            # Determine correctly predicted samples, the samples found adversarial by a previous restart are not
+            # predicted again
+            robust_indices = np.where(sample_is_robust)[0]
+            y_pred = self.estimator.predict(x_adv[robust_indices], batch_size=self.batch_size)
             if self.targeted:
-                sample_is_robust = np.argmax(y_pred, axis=1) != np.argmax(y, axis=1)
-            elif not self.targeted:
-                sample_is_robust = np.argmax(y_pred, axis=1) == np.argmax(y, axis=1)
+                sample_is_robust[robust_indices] = np.argmax(y_pred, axis=1) != np.argmax(y[robust_indices], axis=1)
+            else:
+                sample_is_robust[robust_indices] = np.argmax(y_pred, axis=1) == np.argmax(y[robust_indices], axis=1)
 
             if np.sum(sample_is_robust) == 0:
                 break
 
-            x_robust = x_adv[sample_is_robust]
-            y_robust = y[sample_is_robust]
-            x_init = x[sample_is_robust]
+            robust_indices = np.where(sample_is_robust)[0]
+            x_robust = x_adv[robust_indices]
+            y_robust = y[robust_indices]
+            x_init = x[robust_indices].astype(ART_NUMPY_DTYPE)
 
             n = x_robust.shape[0]
             m = np.prod(x_robust.shape[1:]).item()
@@ -408,137 +397,143 @@ class AutoProjectedGradientDescent(EvasionAttack):
             for batch_id in trange(
                 int(np.ceil(x_robust.shape[0] / float(self.batch_size))), desc="AutoPGD - batch", leave=False
             ):
-                self.eta = 2 * self.eps_step
                 batch_index_1, batch_index_2 = batch_id * self.batch_size, (batch_id + 1) * self.batch_size
-                x_k = x_robust[batch_index_1:batch_index_2].astype(ART_NUMPY_DTYPE)
-                x_init_batch = x_init[batch_index_1:batch_index_2].astype(ART_NUMPY_DTYPE)
                 y_batch = y_robust[batch_index_1:batch_index_2]
+                x_k = self._attack_batch(
+                    x_robust[batch_index_1:batch_index_2], x_init[batch_index_1:batch_index_2], y_batch
+                )
 
-                p_0 = 0
-                p_1 = 0.22
-                W = [p_0, p_1]
-
-                while True:
-                    p_j_p_1 = W[-1] + max(W[-1] - W[-2] - 0.03, 0.06)
-                    if p_j_p_1 > 1:
-                        break
-                    W.append(p_j_p_1)
-
-                W = [math.ceil(p * self.max_iter) for p in W]
-
-                eta = self.eps_step
-                self.count_condition_1 = 0
-
-                for k_iter in trange(self.max_iter, desc="AutoPGD - iteration", leave=False):
-
-                    # Get perturbation, use small scalar to avoid division by 0
-                    tol = 10e-8
-
-                    # Get gradient wrt loss; invert it if attack is targeted
-                    grad = self.estimator.loss_gradient(x_k, y_batch) * (1 - 2 * int(self.targeted))
-
-                    # Apply norm bound
-                    if self.norm in [np.inf, "inf"]:
-                        grad = np.sign(grad)
-                    elif self.norm == 1:
-                        ind = tuple(range(1, len(x_k.shape)))
-                        grad = grad / (np.sum(np.abs(grad), axis=ind, keepdims=True) + tol)
-                    elif self.norm == 2:
-                        ind = tuple(range(1, len(x_k.shape)))
-                        grad = grad / (np.sqrt(np.sum(np.square(grad), axis=ind, keepdims=True)) + tol)
-                    assert x_k.shape == grad.shape
-
-                    perturbation = grad
-
-                    # Apply perturbation and clip
-                    z_k_p_1 = x_k + eta * perturbation
-
-                    if self.estimator.clip_values is not None:
-                        clip_min, clip_max = self.estimator.clip_values
-                        z_k_p_1 = np.clip(z_k_p_1, clip_min, clip_max)
-
-                    if k_iter == 0:
-                        x_1 = z_k_p_1
-                        perturbation = projection(x_1 - x_init_batch, self.eps, self.norm)
-                        x_1 = x_init_batch + perturbation
-
-                        f_0 = float(self._loss_fn(y_true=y_batch, y_pred=self.estimator.predict(x_k)))
-                        f_1 = float(self._loss_fn(y_true=y_batch, y_pred=self.estimator.predict(x_1)))
-
-                        self.eta_w_j_m_1 = eta
-                        self.f_max_w_j_m_1 = f_0
-
-                        if f_1 >= f_0:
-                            self.f_max = f_1
-                            self.x_max = x_1
-                            self.x_max_m_1 = x_init_batch
-                            self.count_condition_1 += 1
-                        else:
-                            self.f_max = f_0
-                            self.x_max = x_k.copy()
-                            self.x_max_m_1 = x_init_batch
-
-                        # Settings for next iteration k
-                        x_k_m_1 = x_k.copy()
-                        x_k = x_1
-
-                    else:
-                        perturbation = projection(z_k_p_1 - x_init_batch, self.eps, self.norm)
-                        z_k_p_1 = x_init_batch + perturbation
-
-                        alpha = 0.75
-
-                        x_k_p_1 = x_k + alpha * (z_k_p_1 - x_k) + (1 - alpha) * (x_k - x_k_m_1)
-
-                        if self.estimator.clip_values is not None:
-                            clip_min, clip_max = self.estimator.clip_values
-                            x_k_p_1 = np.clip(x_k_p_1, clip_min, clip_max)
-
-                        perturbation = projection(x_k_p_1 - x_init_batch, self.eps, self.norm)
-                        x_k_p_1 = x_init_batch + perturbation
-
-                        f_k_p_1 = float(self._loss_fn(y_true=y_batch, y_pred=self.estimator.predict(x_k_p_1)))
+                y_pred_adv_k = self.estimator.predict(x_k, batch_size=self.batch_size)
+                if self.targeted:
+                    sample_is_not_robust_k = np.argmax(y_pred_adv_k, axis=1) == np.argmax(y_batch, axis=1)
+                else:
+                    sample_is_not_robust_k = np.argmax(y_pred_adv_k, axis=1) != np.argmax(y_batch, axis=1)
 
-                        if f_k_p_1 > self.f_max:
-                            self.count_condition_1 += 1
-                            self.x_max = x_k_p_1
-                            self.x_max_m_1 = x_k
-                            self.f_max = f_k_p_1
+                x_robust[batch_index_1:batch_index_2][sample_is_not_robust_k] = x_k[sample_is_not_robust_k]
+                sample_is_robust[robust_indices[batch_index_1:batch_index_2][sample_is_not_robust_k]] = False
 
-                        if k_iter in W:
+            x_adv[robust_indices] = x_robust
 
-                            rho = 0.75
+        return x_adv
 
-                            condition_1 = self.count_condition_1 < rho * (k_iter - W[W.index(k_iter) - 1])
-                            condition_2 = self.eta_w_j_m_1 == eta and self.f_max_w_j_m_1 == self.f_max
+    def _attack_batch(self, x_k: np.ndarray, x_init_batch: np.ndarray, y_batch: np.ndarray) -> np.ndarray:
+        """
+        Run the iterations of one restart on a batch of samples. The loss of each sample and its gradient are obtained
+        from the same forward pass with `loss_and_gradient`, and the step size of each sample is controlled with its
+        own loss.
+
+        :param x_k: The randomly initialised samples.
+        :param x_init_batch: The original samples.
+        :param y_batch: The labels one-hot-encoded of shape `(nb_samples, nb_classes)`.
+        :return: The adversarial examples of the last iteration.
+        """
+        # Get perturbation, use small scalar to avoid division by 0
+        tol = 10e-8
+        alpha = 0.75
+        rho = 0.75
+
+        p_0 = 0
+        p_1 = 0.22
+        W = [p_0, p_1]
+
+        while True:
+            p_j_p_1 = W[-1] + max(W[-1] - W[-2] - 0.03, 0.06)
+            if p_j_p_1 > 1:
+                break
+            W.append(p_j_p_1)
+
+        W = [math.ceil(p * self.max_iter) for p in W]
+
+        def objective_and_gradient(x_eval: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            # Maximise the loss, or its negative if attack is targeted
+            loss, grad = self.estimator.loss_and_gradient(x_eval, y_batch, batch_size=self.batch_size)
+            return loss * (1 - 2 * int(self.targeted)), grad * (1 - 2 * int(self.targeted))
+
+        x_k = x_k.astype(ART_NUMPY_DTYPE)
+        nb_samples = x_k.shape[0]
+        shape = (-1,) + (1,) * (len(x_k.shape) - 1)
+
+        # The loss and step size control state of each sample
+        f_k, grad = objective_and_gradient(x_k)
+        eta = np.full(nb_samples, self.eps_step, dtype=ART_NUMPY_DTYPE)
+        count_condition_1 = np.zeros(nb_samples, dtype=int)
+        f_max = f_k.copy()
+        x_max = x_k.copy()
+        x_max_m_1 = x_init_batch.copy()
+        grad_max = grad.copy()
+        eta_w_j_m_1 = eta.copy()
+        f_max_w_j_m_1 = f_max.copy()
+        x_k_m_1 = x_k
+
+        for k_iter in trange(self.max_iter, desc="AutoPGD - iteration", leave=False):
+
+            # Apply norm bound
+            if self.norm in [np.inf, "inf"]:
+                grad = np.sign(grad)
+            elif self.norm == 1:
+                ind = tuple(range(1, len(x_k.shape)))
+                grad = grad / (np.sum(np.abs(grad), axis=ind, keepdims=True) + tol)
+            elif self.norm == 2:
+                ind = tuple(range(1, len(x_k.shape)))
+                grad = grad / (np.sqrt(np.sum(np.square(grad), axis=ind, keepdims=True)) + tol)
+            assert x_k.shape == grad.shape
+
+            # Apply perturbation and clip
+            z_k_p_1 = x_k + eta.reshape(shape) * grad
 
-                            if condition_1 or condition_2:
-                                eta = eta / 2
-                                x_k_m_1 = self.x_max_m_1
-                                x_k = self.x_max
-                            else:
-                                x_k_m_1 = x_k
-                                x_k = x_k_p_1.copy()
+            if self.estimator.clip_values is not None:
+                clip_min, clip_max = self.estimator.clip_values
+                z_k_p_1 = np.clip(z_k_p_1, clip_min, clip_max)
 
-                            self.count_condition_1 = 0
-                            self.eta_w_j_m_1 = eta
-                            self.f_max_w_j_m_1 = self.f_max
+            perturbation = projection(z_k_p_1 - x_init_batch, self.eps, self.norm)
+            z_k_p_1 = x_init_batch + perturbation
 
-                        else:
-                            x_k_m_1 = x_k
-                            x_k = x_k_p_1.copy()
+            if k_iter == 0:
+                x_k_p_1 = z_k_p_1
+            else:
+                x_k_p_1 = x_k + alpha * (z_k_p_1 - x_k) + (1 - alpha) * (x_k - x_k_m_1)
 
-                y_pred_adv_k = self.estimator.predict(x_k)
-                if self.targeted:
-                    sample_is_not_robust_k = np.invert(np.argmax(y_pred_adv_k, axis=1) != np.argmax(y_batch, axis=1))
-                elif not self.targeted:
-                    sample_is_not_robust_k = np.invert(np.argmax(y_pred_adv_k, axis=1) == np.argmax(y_batch, axis=1))
+                if self.estimator.clip_values is not None:
+                    clip_min, clip_max = self.estimator.clip_values
+                    x_k_p_1 = np.clip(x_k_p_1, clip_min, clip_max)
 
-                x_robust[batch_index_1:batch_index_2][sample_is_not_robust_k] = x_k[sample_is_not_robust_k]
+                perturbation = projection(x_k_p_1 - x_init_batch, self.eps, self.norm)
+                x_k_p_1 = x_init_batch + perturbation
 
-            x_adv[sample_is_robust] = x_robust
+            f_k_p_1, grad_k_p_1 = objective_and_gradient(x_k_p_1)
 
-        return x_adv
+            if k_iter == 0:
+                improved = f_k_p_1 >= f_max
+            else:
+                improved = f_k_p_1 > f_max
+                x_max_m_1[improved] = x_k[improved]
+
+            count_condition_1 += improved
+            x_max[improved] = x_k_p_1[improved]
+            f_max[improved] = f_k_p_1[improved]
+            grad_max[improved] = grad_k_p_1[improved]
+
+            # Settings for next iteration k
+            x_k_m_1 = x_k
+            x_k = x_k_p_1
+            grad = grad_k_p_1
+
+            if k_iter in W and k_iter > 0:
+                condition_1 = count_condition_1 < rho * (k_iter - W[W.index(k_iter) - 1])
+                condition_2 = (eta_w_j_m_1 == eta) & (f_max_w_j_m_1 == f_max)
+
+                # Halve the step size of the samples without sufficient progress and restart them from their best point
+                reduce = condition_1 | condition_2
+                eta[reduce] = eta[reduce] / 2
+                x_k_m_1[reduce] = x_max_m_1[reduce]
+                x_k[reduce] = x_max[reduce]
+                grad[reduce] = grad_max[reduce]
+
+                count_condition_1[:] = 0
+                eta_w_j_m_1 = eta.copy()
+                f_max_w_j_m_1 = f_max.copy()
+
+        return x_k
 
     def _check_params(self) -> None:
         if self.norm not in [1, 2, np.inf, "inf"]:
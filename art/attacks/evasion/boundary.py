@@ -24,7 +24,7 @@ predictions.
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import logging
-from typing import Optional, Tuple, TYPE_CHECKING
+from typing import Dict, Optional, Tuple, TYPE_CHECKING
 
 import numpy as np
 from tqdm import tqdm
@@ -33,7 +33,13 @@ from art.attacks.attack import EvasionAttack
 from art.config import ART_NUMPY_DTYPE
 from art.estimators.estimator import BaseEstimator
 from art.estimators.classification.classifier import ClassifierMixin
-from art.utils import compute_success, to_categorical, check_and_transform_label_format
+from art.utils import (
+    compute_success,
+    to_categorical,
+    check_and_transform_label_format,
+    correctly_classified_by_class,
+    find_initial_adversarial,
+)
 
 if TYPE_CHECKING:
     from art.utils import CLASSIFIER_TYPE
@@ -59,6 +65,8 @@ class BoundaryAttack(EvasionAttack):
         "sample_size",
         "init_size",
         "batch_size",
+        "nb_parallel_samples",
+        "init_block_size",
     ]
 
     _estimator_requirements = (BaseEstimator, ClassifierMixin)
@@ -74,6 +82,9 @@ class BoundaryAttack(EvasionAttack):
         num_trial: int = 25,
         sample_size: int = 20,
         init_size: int = 100,
+        batch_size: int = 64,
+        nb_parallel_samples: int = 1,
+        init_block_size: int = 10,
     ) -> None:
         """
         Create a boundary attack instance.
@@ -87,6 +98,12 @@ class BoundaryAttack(EvasionAttack):
         :param num_trial: Maximum number of trials per iteration.
         :param sample_size: Number of samples per trial.
         :param init_size: Maximum number of trials for initial generation of adversarial examples.
+        :param batch_size: Batch size for predictions of the classifier.
+        :param nb_parallel_samples: Number of samples attacked together. The samples of a group perform their trials
+               together: the candidate steps of all samples of a trial round are passed to the classifier together, and
+               each sample adapts its own step sizes `delta` and `epsilon`.
+        :param init_block_size: Number of candidates per sample that are classified together in each round of the
+               search for initial adversarial examples.
         """
         super().__init__(estimator=estimator)
 
@@ -98,7 +115,9 @@ class BoundaryAttack(EvasionAttack):
         self.num_trial = num_trial
         self.sample_size = sample_size
         self.init_size = init_size
-        self.batch_size = 1
+        self.batch_size = batch_size
+        self.nb_parallel_samples = nb_parallel_samples
+        self.init_block_size = init_block_size
         self._check_params()
 
     def generate(self, x: np.ndarray, y: Optional[np.ndarray] = None, **kwargs) -> np.ndarray:
@@ -110,6 +129,12 @@ class BoundaryAttack(EvasionAttack):
                   (nb_samples,). If `self.targeted` is true, then `y` represents the target labels.
         :param x_adv_init: Initial array to act as initial adversarial examples. Same shape as `x`.
         :type x_adv_init: `np.ndarray`
+        :param x_init_pool: Images from which initial adversarial examples are taken before drawing random images. Only
+                            the images correctly classified as their label in `y_init_pool` are used.
+        :type x_init_pool: `np.ndarray`
+        :param y_init_pool: Labels of `x_init_pool`, one-hot-encoded of shape (nb_pool, nb_classes) or indices of shape
+                            (nb_pool,).
+        :type y_init_pool: `np.ndarray`
         :return: An array holding the adversarial examples.
         """
         y = check_and_transform_label_format(y, self.estimator.nb_classes, return_one_hot=False)
@@ -129,8 +154,16 @@ class BoundaryAttack(EvasionAttack):
         if x_adv_init is not None:
             init_preds = np.argmax(self.estimator.predict(x_adv_init, batch_size=self.batch_size), axis=1)
         else:
-            init_preds = [None] * len(x)
-            x_adv_init = [None] * len(x)
+            init_preds = None
+
+        # Correctly classified images of the pool, by class
+        x_init_pool = kwargs.get("x_init_pool")
+        y_init_pool = kwargs.get("y_init_pool")
+
+        if x_init_pool is not None and y_init_pool is not None:
+            pool = correctly_classified_by_class(self.estimator, x_init_pool, y_init_pool, batch_size=self.batch_size)
+        else:
+            pool = None
 
         # Assert that, if attack is targeted, y is provided
         if self.targeted and y is None:
@@ -139,28 +172,28 @@ class BoundaryAttack(EvasionAttack):
         # Some initial setups
         x_adv = x.astype(ART_NUMPY_DTYPE)
 
+        # First, create the initial adversarial samples
+        initial_samples, targets, found = self._init_samples(
+            x=x_adv,
+            y=y,
+            y_p=preds,
+            init_pred=init_preds,
+            adv_init=x_adv_init,
+            clip_min=clip_min,
+            clip_max=clip_max,
+            pool=pool,
+        )
+
+        # Samples without an initial adversarial example keep the original image
+        indices = np.where(found)[0]
+
         # Generate the adversarial samples
-        for ind, val in enumerate(tqdm(x_adv, desc="Boundary attack")):
-            if self.targeted:
-                x_adv[ind] = self._perturb(
-                    x=val,
-                    y=y[ind],
-                    y_p=preds[ind],
-                    init_pred=init_preds[ind],
-                    adv_init=x_adv_init[ind],
-                    clip_min=clip_min,
-                    clip_max=clip_max,
-                )
-            else:
-                x_adv[ind] = self._perturb(
-                    x=val,
-                    y=-1,
-                    y_p=preds[ind],
-                    init_pred=init_preds[ind],
-                    adv_init=x_adv_init[ind],
-                    clip_min=clip_min,
-                    clip_max=clip_max,
-                )
+        nb_batches = int(np.ceil(indices.shape[0] / float(self.nb_parallel_samples)))
+        for batch_id in tqdm(range(nb_batches), desc="Boundary attack"):
+            batch_indices = indices[batch_id * self.nb_parallel_samples : (batch_id + 1) * self.nb_parallel_samples]
+            x_adv[batch_indices] = self._attack_batch(
+                initial_samples[batch_indices], x_adv[batch_indices], targets[batch_indices], clip_min, clip_max,
+            )
 
         if y is not None:
             y = to_categorical(y, self.estimator.nb_classes)
@@ -172,210 +205,227 @@ class BoundaryAttack(EvasionAttack):
 
         return x_adv
 
-    def _perturb(
-        self, x: np.ndarray, y: int, y_p: int, init_pred: int, adv_init: np.ndarray, clip_min: float, clip_max: float,
-    ) -> np.ndarray:
-        """
-        Internal attack function for one example.
-
-        :param x: An array with one original input to be attacked.
-        :param y: If `self.targeted` is true, then `y` represents the target label.
-        :param y_p: The predicted label of x.
-        :param init_pred: The predicted label of the initial image.
-        :param adv_init: Initial array to act as an initial adversarial example.
-        :param clip_min: Minimum value of an example.
-        :param clip_max: Maximum value of an example.
-        :return: An adversarial example.
-        """
-        # First, create an initial adversarial sample
-        initial_sample = self._init_sample(x, y, y_p, init_pred, adv_init, clip_min, clip_max)
-
-        # If an initial adversarial example is not found, then return the original image
-        if initial_sample is None:
-            return x
-
-        # If an initial adversarial example found, then go with boundary attack
-        x_adv = self._attack(initial_sample[0], x, initial_sample[1], self.delta, self.epsilon, clip_min, clip_max,)
-
-        return x_adv
-
-    def _attack(
+    def _attack_batch(
         self,
         initial_sample: np.ndarray,
         original_sample: np.ndarray,
-        target: int,
-        initial_delta: float,
-        initial_epsilon: float,
+        target: np.ndarray,
         clip_min: float,
         clip_max: float,
     ) -> np.ndarray:
         """
-        Main function for the boundary attack.
+        Main function for the boundary attack on a group of examples, which perform their trials together.
 
-        :param initial_sample: An initial adversarial example.
-        :param original_sample: The original input.
-        :param target: The target label.
-        :param initial_delta: Initial step size for the orthogonal step.
-        :param initial_epsilon: Initial step size for the step towards the target.
+        :param initial_sample: Initial adversarial examples.
+        :param original_sample: The original inputs.
+        :param target: The target labels.
         :param clip_min: Minimum value of an example.
         :param clip_max: Maximum value of an example.
-        :return: an adversarial example.
+        :return: The adversarial examples.
         """
         # Get initialization for some variables
-        x_adv = initial_sample
-        self.curr_delta = initial_delta
-        self.curr_epsilon = initial_epsilon
+        x_adv = initial_sample.astype(ART_NUMPY_DTYPE)
+        nb_samples = x_adv.shape[0]
+        delta = np.full(nb_samples, self.delta)
+        epsilon = np.full(nb_samples, self.epsilon)
+        running = np.ones(nb_samples, dtype=bool)
+
+        # Candidates of the orthogonal steps and which of them are adversarial, per sample
+        x_advs = np.zeros((nb_samples, self.sample_size) + x_adv.shape[1:], dtype=ART_NUMPY_DTYPE)
+        satisfied_advs = np.zeros((nb_samples, self.sample_size), dtype=bool)
 
         # Main loop to wander around the boundary
         for _ in range(self.max_iter):
+            if not np.any(running):
+                break
+
             # Trust region method to adjust delta
+            searching = running.copy()
             for _ in range(self.num_trial):
-                potential_advs = []
-                for _ in range(self.sample_size):
-                    potential_adv = x_adv + self._orthogonal_perturb(self.curr_delta, x_adv, original_sample)
-                    potential_adv = np.clip(potential_adv, clip_min, clip_max)
-                    potential_advs.append(potential_adv)
-
-                preds = np.argmax(self.estimator.predict(np.array(potential_advs), batch_size=self.batch_size), axis=1,)
-                satisfied = preds == target
-                delta_ratio = np.mean(satisfied)
-
-                if delta_ratio < 0.2:
-                    self.curr_delta *= self.step_adapt
-                elif delta_ratio > 0.5:
-                    self.curr_delta /= self.step_adapt
-
-                if delta_ratio > 0:
-                    x_advs = np.array(potential_advs)[np.where(satisfied)[0]]
+                active = np.where(searching)[0]
+                if active.size == 0:
                     break
-            else:
+
+                potential_advs = x_adv[active, np.newaxis] + self._orthogonal_perturb(
+                    delta[active], x_adv[active], original_sample[active]
+                )
+                potential_advs = np.clip(potential_advs, clip_min, clip_max)
+
+                preds = np.argmax(
+                    self.estimator.predict(
+                        potential_advs.reshape((-1,) + x_adv.shape[1:]), batch_size=self.batch_size
+                    ),
+                    axis=1,
+                ).reshape(active.size, self.sample_size)
+                satisfied = preds == target[active, np.newaxis]
+                delta_ratio = np.mean(satisfied, axis=1)
+
+                delta[active[delta_ratio < 0.2]] *= self.step_adapt
+                delta[active[delta_ratio > 0.5]] /= self.step_adapt
+
+                success = delta_ratio > 0
+                x_advs[active[success]] = potential_advs[success]
+                satisfied_advs[active[success]] = satisfied[success]
+                searching[active[success]] = False
+
+            if np.any(searching):
                 logger.warning("Adversarial example found but not optimal.")
-                return x_adv
+                running &= ~searching
 
             # Trust region method to adjust epsilon
+            searching = running.copy()
             for _ in range(self.num_trial):
-                perturb = np.repeat(np.array([original_sample]), len(x_advs), axis=0) - x_advs
-                perturb *= self.curr_epsilon
-                potential_advs = x_advs + perturb
+                active = np.where(searching)[0]
+                if active.size == 0:
+                    break
+
+                # Step all adversarial candidates of the active samples towards their original inputs
+                rows, cols = np.nonzero(satisfied_advs[active])
+                samples = active[rows]
+                perturb = original_sample[samples] - x_advs[samples, cols]
+                perturb *= epsilon[samples].reshape((-1,) + (1,) * (x_adv.ndim - 1)).astype(ART_NUMPY_DTYPE)
+                potential_advs = x_advs[samples, cols] + perturb
                 potential_advs = np.clip(potential_advs, clip_min, clip_max)
+
                 preds = np.argmax(self.estimator.predict(potential_advs, batch_size=self.batch_size), axis=1,)
-                satisfied = preds == target
-                epsilon_ratio = np.mean(satisfied)
+                satisfied = preds == target[samples]
+                epsilon_ratio = np.bincount(rows, weights=satisfied, minlength=active.size) / np.bincount(
+                    rows, minlength=active.size
+                )
 
-                if epsilon_ratio < 0.2:
-                    self.curr_epsilon *= self.step_adapt
-                elif epsilon_ratio > 0.5:
-                    self.curr_epsilon /= self.step_adapt
+                epsilon[active[epsilon_ratio < 0.2]] *= self.step_adapt
+                epsilon[active[epsilon_ratio > 0.5]] /= self.step_adapt
 
-                if epsilon_ratio > 0:
-                    x_adv = potential_advs[np.where(satisfied)[0][0]]
-                    break
-            else:
+                # Keep the first adversarial step of each successful sample
+                satisfied_index = np.where(satisfied)[0]
+                _, first_index = np.unique(rows[satisfied_index], return_index=True)
+                first_index = satisfied_index[first_index]
+                x_adv[samples[first_index]] = potential_advs[first_index]
+                searching[samples[first_index]] = False
+
+            if np.any(searching):
                 logger.warning("Adversarial example found but not optimal.")
-                return x_advs[0]
+                failed = np.where(searching)[0]
+                x_adv[failed] = x_advs[failed, np.argmax(satisfied_advs[failed], axis=1)]
+                running &= ~searching
 
         return x_adv
 
-    def _orthogonal_perturb(self, delta: float, current_sample: np.ndarray, original_sample: np.ndarray) -> np.ndarray:
+    def _orthogonal_perturb(
+        self, delta: np.ndarray, current_sample: np.ndarray, original_sample: np.ndarray
+    ) -> np.ndarray:
         """
-        Create an orthogonal perturbation.
+        Create orthogonal perturbations, `sample_size` of them for each example.
 
-        :param delta: Initial step size for the orthogonal step.
-        :param current_sample: Current adversarial example.
-        :param original_sample: The original input.
-        :return: a possible perturbation.
+        :param delta: Step sizes for the orthogonal step, one per example.
+        :param current_sample: Current adversarial examples.
+        :param original_sample: The original inputs.
+        :return: Possible perturbations of shape `(nb_samples, sample_size) + input_shape`.
         """
-        # Generate perturbation randomly
-        perturb = np.random.randn(*self.estimator.input_shape).astype(ART_NUMPY_DTYPE)
+        nb_samples = current_sample.shape[0]
+        axis = tuple(range(2, current_sample.ndim + 1))
+        delta = delta.reshape((nb_samples, 1) + (1,) * len(axis))
 
-        # Rescale the perturbation
-        perturb /= np.linalg.norm(perturb)
-        perturb *= delta * np.linalg.norm(original_sample - current_sample)
+        # Generate perturbations randomly
+        perturb = np.random.randn(nb_samples, self.sample_size, *self.estimator.input_shape).astype(ART_NUMPY_DTYPE)
 
-        # Project the perturbation onto sphere
-        direction = original_sample - current_sample
+        # Rescale the perturbations
+        direction = (original_sample - current_sample)[:, np.newaxis]
+        perturb /= np.sqrt(np.sum(perturb ** 2, axis=axis, keepdims=True))
+        perturb *= (delta * np.sqrt(np.sum(direction ** 2, axis=axis, keepdims=True))).astype(ART_NUMPY_DTYPE)
 
+        # Project the perturbations onto sphere
         if len(self.estimator.input_shape) == 3:
-            channel_index = 1 if self.estimator.channels_first else 3
-            perturb = np.swapaxes(perturb, 0, channel_index - 1)
-            direction = np.swapaxes(direction, 0, channel_index - 1)
-            for i in range(direction.shape[0]):
-                direction[i] /= np.linalg.norm(direction[i])
-                perturb[i] -= np.dot(np.dot(perturb[i], direction[i].T), direction[i])
-
-            perturb = np.swapaxes(perturb, 0, channel_index - 1)
+            if not self.estimator.channels_first:
+                perturb = np.swapaxes(perturb, -3, -1)
+                direction = np.swapaxes(direction, -3, -1)
+            direction = direction / np.sqrt(np.sum(direction ** 2, axis=(-2, -1), keepdims=True))
+            perturb = perturb - np.matmul(np.matmul(perturb, np.swapaxes(direction, -2, -1)), direction)
+
+            if not self.estimator.channels_first:
+                perturb = np.swapaxes(perturb, -3, -1)
         elif len(self.estimator.input_shape) == 1:
-            direction /= np.linalg.norm(direction)
-            perturb -= np.dot(perturb, direction.T) * direction
+            direction = direction / np.sqrt(np.sum(direction ** 2, axis=-1, keepdims=True))
+            perturb -= np.sum(perturb * direction, axis=-1, keepdims=True) * direction
         else:
             raise ValueError("Input shape not recognised.")
         hypotenuse = np.sqrt(1 + delta ** 2)
-        perturb = ((1 - hypotenuse) * (current_sample - original_sample) + perturb) / hypotenuse
-        return perturb
+        perturb = ((1 - hypotenuse) * (current_sample - original_sample)[:, np.newaxis] + perturb) / hypotenuse
+        return perturb.astype(ART_NUMPY_DTYPE)
 
-    def _init_sample(
-        self, x: np.ndarray, y: int, y_p: int, init_pred: int, adv_init: np.ndarray, clip_min: float, clip_max: float,
-    ) -> Optional[Tuple[np.ndarray, int]]:
+    def _init_samples(
+        self,
+        x: np.ndarray,
+        y: Optional[np.ndarray],
+        y_p: np.ndarray,
+        init_pred: Optional[np.ndarray],
+        adv_init: Optional[np.ndarray],
+        clip_min: float,
+        clip_max: float,
+        pool: Optional[Dict[int, np.ndarray]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
-        Find initial adversarial example for the attack.
+        Find initial adversarial examples for the attack.
 
-        :param x: An array with one original input to be attacked.
-        :param y: If `self.targeted` is true, then `y` represents the target label.
-        :param y_p: The predicted label of x.
-        :param init_pred: The predicted label of the initial image.
-        :param adv_init: Initial array to act as an initial adversarial example.
+        :param x: An array with the original inputs to be attacked.
+        :param y: If `self.targeted` is true, then `y` represents the target labels.
+        :param y_p: The predicted labels of x.
+        :param init_pred: The predicted labels of the initial images.
+        :param adv_init: Initial array to act as initial adversarial examples.
         :param clip_min: Minimum value of an example.
         :param clip_max: Maximum value of an example.
-        :return: an adversarial example.
+        :param pool: Correctly classified images by class to try before random images.
+        :return: A tuple of the initial adversarial examples, their predicted labels and a boolean array showing for
+                 which samples one has been found.
         """
-        nprd = np.random.RandomState()
-        initial_sample = None
+        initial_samples = x.copy()
+        targets = np.array(y_p, dtype=int)
 
         if self.targeted:
-            # Attack satisfied
-            if y == y_p:
-                return None
+            # Attack unsatisfied yet
+            pending = y != y_p
 
             # Attack unsatisfied yet and the initial image satisfied
-            if adv_init is not None and init_pred == y:
-                return adv_init.astype(ART_NUMPY_DTYPE), init_pred
-
-            # Attack unsatisfied yet and the initial image unsatisfied
-            for _ in range(self.init_size):
-                random_img = nprd.uniform(clip_min, clip_max, size=x.shape).astype(x.dtype)
-                random_class = np.argmax(
-                    self.estimator.predict(np.array([random_img]), batch_size=self.batch_size), axis=1,
-                )[0]
-
-                if random_class == y:
-                    initial_sample = random_img, random_class
-
-                    logger.info("Found initial adversarial image for targeted attack.")
-                    break
-            else:
-                logger.warning("Failed to draw a random image that is adversarial, attack failed.")
-
+            satisfied = pending & (init_pred == y) if adv_init is not None else np.zeros_like(pending)
         else:
-            # The initial image satisfied
-            if adv_init is not None and init_pred != y_p:
-                return adv_init.astype(ART_NUMPY_DTYPE), init_pred
-
-            # The initial image unsatisfied
-            for _ in range(self.init_size):
-                random_img = nprd.uniform(clip_min, clip_max, size=x.shape).astype(x.dtype)
-                random_class = np.argmax(
-                    self.estimator.predict(np.array([random_img]), batch_size=self.batch_size), axis=1,
-                )[0]
-
-                if random_class != y_p:
-                    initial_sample = random_img, random_class
+            pending = np.ones(x.shape[0], dtype=bool)
 
-                    logger.info("Found initial adversarial image for untargeted attack.")
-                    break
-            else:
-                logger.warning("Failed to draw a random image that is adversarial, attack failed.")
+            # The initial image satisfied
+            satisfied = init_pred != y_p if adv_init is not None else np.zeros_like(pending)
+
+        if np.any(satisfied):
+            initial_samples[satisfied] = adv_init[satisfied]
+            targets[satisfied] = init_pred[satisfied]
+        found = satisfied.copy()
+
+        # The initial image unsatisfied
+        search = np.where(pending & ~satisfied)[0]
+        if search.size > 0:
+            random_samples, random_classes, random_found = find_initial_adversarial(
+                classifier=self.estimator,
+                x=x[search],
+                y=y[search] if self.targeted else None,
+                y_p=y_p[search],
+                targeted=self.targeted,
+                clip_min=clip_min,
+                clip_max=clip_max,
+                max_trials=self.init_size,
+                block_size=self.init_block_size,
+                batch_size=self.batch_size,
+                pool=pool,
+            )
+            initial_samples[search[random_found]] = random_samples[random_found]
+            targets[search[random_found]] = random_classes[random_found]
+            found[search[random_found]] = True
+
+            logger.info("Found %d initial adversarial images.", np.sum(random_found))
+            if not np.all(random_found):
+                logger.warning(
+                    "Failed to draw a random image that is adversarial for %d samples, attack failed.",
+                    np.sum(~random_found),
+                )
 
-        return initial_sample
+        return initial_samples, targets, found
 
     def _check_params(self) -> None:
         if not isinstance(self.max_iter, (int, np.int)) or self.max_iter < 0:
@@ -390,6 +440,9 @@ class BoundaryAttack(EvasionAttack):
         if not isinstance(self.init_size, (int, np.int)) or self.init_size <= 0:
             raise ValueError("The number of initial trials must be a positive integer.")
 
+        if not isinstance(self.init_block_size, (int, np.int)) or self.init_block_size <= 0:
+            raise ValueError("The block size `init_block_size` has to be a positive integer.")
+
         if self.epsilon <= 0:
             raise ValueError("The initial step size for the step towards the target must be positive.")
 
@@ -398,3 +451,9 @@ class BoundaryAttack(EvasionAttack):
 
         if self.step_adapt <= 0 or self.step_adapt >= 1:
             raise ValueError("The adaptation factor must be in the range (0, 1).")
+
+        if not isinstance(self.batch_size, (int, np.int)) or self.batch_size <= 0:
+            raise ValueError("The batch size `batch_size` has to be a positive integer.")
+
+        if not isinstance(self.nb_parallel_samples, (int, np.int)) or self.nb_parallel_samples <= 0:
+            raise ValueError("The number of parallel samples `nb_parallel_samples` has to be a positive integer.")
@@ -30,13 +30,14 @@ import logging
 from typing import Optional, Tuple, TYPE_CHECKING
 
 import numpy as np
-from tqdm import trange
+from tqdm import tqdm, trange
 
 from art.config import ART_NUMPY_DTYPE
 from art.estimators.estimator import BaseEstimator
 from art.estimators.classification.classifier import ClassGradientsMixin
 from art.attacks.attack import EvasionAttack
 from art.utils import (
+    ActiveSet,
     compute_success,
     get_labels_np_array,
     tanh_to_original,
@@ -145,10 +146,27 @@ class CarliniL2Method(EvasionAttack):
         :param c_weight: Weight of the loss term aiming for classification as target.
         :return: A tuple holding the current logits, l2 distance and overall loss.
         """
-        l2dist = np.sum(np.square(x - x_adv).reshape(x.shape[0], -1), axis=1)
         z_predicted = self.estimator.predict(
             np.array(x_adv, dtype=ART_NUMPY_DTYPE), logits=True, batch_size=self.batch_size,
         )
+        l2dist, loss = self._loss_from_logits(x, x_adv, z_predicted, target, c_weight)
+
+        return z_predicted, l2dist, loss
+
+    def _loss_from_logits(
+        self, x: np.ndarray, x_adv: np.ndarray, z_predicted: np.ndarray, target: np.ndarray, c_weight: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the objective function value from the logits of the adversarial input.
+
+        :param x: An array with the original input.
+        :param x_adv: An array with the adversarial input.
+        :param z_predicted: An array with the logits of the adversarial input.
+        :param target: An array with the target class (one-hot encoded).
+        :param c_weight: Weight of the loss term aiming for classification as target.
+        :return: A tuple holding the l2 distance and overall loss.
+        """
+        l2dist = np.sum(np.square(x - x_adv).reshape(x.shape[0], -1), axis=1)
         z_target = np.sum(z_predicted * target, axis=1)
         z_other = np.max(
             z_predicted * (1 - target) + (np.min(z_predicted, axis=1) - 1)[:, np.newaxis] * target, axis=1,
@@ -167,11 +185,10 @@ class CarliniL2Method(EvasionAttack):
             # if untargeted, optimize for making any other class most likely
             loss = np.maximum(z_target - z_other + self.confidence, np.zeros(x.shape[0]))
 
-        return z_predicted, l2dist, c_weight * loss + l2dist
+        return l2dist, c_weight * loss + l2dist
 
     def _loss_gradient(
         self,
-        z_logits: np.ndarray,
         target: np.ndarray,
         x: np.ndarray,
         x_adv: np.ndarray,
@@ -179,11 +196,10 @@ class CarliniL2Method(EvasionAttack):
         c_weight: np.ndarray,
         clip_min: float,
         clip_max: float,
-    ) -> np.ndarray:
+    ) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Compute the gradient of the loss function.
+        Compute the gradient of the loss function and the logits of the adversarial input in the same forward pass.
 
-        :param z_logits: An array with the current logits.
         :param target: An array with the target class (one-hot encoded).
         :param x: An array with the original input.
         :param x_adv: An array with the adversarial input.
@@ -191,17 +207,29 @@ class CarliniL2Method(EvasionAttack):
         :param c_weight: Weight of the loss term aiming for classification as target.
         :param clip_min: Minimum clipping value.
         :param clip_max: Maximum clipping value.
-        :return: An array with the gradient of the loss function.
+        :return: A tuple holding the logits of `x_adv` and an array with the gradient of the loss function.
         """
-        if self.targeted:
-            i_sub = np.argmax(target, axis=1)
-            i_add = np.argmax(z_logits * (1 - target) + (np.min(z_logits, axis=1) - 1)[:, np.newaxis] * target, axis=1,)
-        else:
-            i_add = np.argmax(target, axis=1)
-            i_sub = np.argmax(z_logits * (1 - target) + (np.min(z_logits, axis=1) - 1)[:, np.newaxis] * target, axis=1,)
 
-        loss_gradient = self.estimator.class_gradient(x_adv, label=i_add)
-        loss_gradient -= self.estimator.class_gradient(x_adv, label=i_sub)
+        def weights_fn(z_predicted: np.ndarray, indices: np.ndarray) -> np.ndarray:
+            # Back-propagate z[i_add] - z[i_sub], with the classes given by the logits of the same forward pass
+            z_logits = z_predicted.astype(ART_NUMPY_DTYPE)
+            target_batch = target[indices]
+            i_other = np.argmax(
+                z_logits * (1 - target_batch) + (np.min(z_logits, axis=1) - 1)[:, np.newaxis] * target_batch, axis=1
+            )
+            if self.targeted:
+                i_add, i_sub = i_other, np.argmax(target_batch, axis=1)
+            else:
+                i_add, i_sub = np.argmax(target_batch, axis=1), i_other
+
+            weights = np.zeros(z_logits.shape, dtype=ART_NUMPY_DTYPE)
+            weights[np.arange(len(weights)), i_add] = 1.0
+            weights[np.arange(len(weights)), i_sub] = -1.0
+            return weights
+
+        z_predicted, loss_gradient = self.estimator.predict_and_weighted_class_gradient(
+            x_adv, weights_fn, batch_size=self.batch_size
+        )
         loss_gradient = loss_gradient.reshape(x.shape)
 
         c_mult = c_weight
@@ -213,7 +241,115 @@ class CarliniL2Method(EvasionAttack):
         loss_gradient *= clip_max - clip_min
         loss_gradient *= (1 - np.square(np.tanh(x_adv_tanh))) / (2 * self._tanh_smoother)
 
-        return loss_gradient
+        return z_predicted, loss_gradient
+
+    def _iterate(
+        self,
+        x: np.ndarray,
+        target: np.ndarray,
+        x_adv: np.ndarray,
+        x_adv_tanh: np.ndarray,
+        loss_gradient: np.ndarray,
+        l2dist: np.ndarray,
+        loss: np.ndarray,
+        c_weight: np.ndarray,
+        learning_rate: np.ndarray,
+        clip_min: float,
+        clip_max: float,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Perform one gradient step with line search on the learning rate. The updated adversarial inputs are not
+        evaluated, their logits, l2 distances and overall loss are computed by the forward pass of the next gradient.
+
+        :param x: An array with the original input.
+        :param target: An array with the target class (one-hot encoded).
+        :param x_adv: An array with the adversarial input.
+        :param x_adv_tanh: An array with the adversarial input in tanh space.
+        :param loss_gradient: An array with the gradient of the loss function at `x_adv`.
+        :param l2dist: An array with the current l2 distances.
+        :param loss: An array with the current overall loss.
+        :param c_weight: Weight of the loss term aiming for classification as target.
+        :param learning_rate: An array with the current learning rates.
+        :param clip_min: Minimum clipping value.
+        :param clip_max: Maximum clipping value.
+        :return: A tuple holding the updated adversarial input, adversarial input in tanh space, l2 distances, overall
+                 loss and learning rates, and a boolean array showing which adversarial inputs have been updated.
+        """
+        perturbation_tanh = -loss_gradient
+
+        # perform line search to optimize perturbation
+        # first, halve the learning rate until perturbation actually decreases the loss:
+        prev_loss = loss.copy()
+        best_loss = loss.copy()
+        best_lr = np.zeros(x.shape[0])
+        halving = np.zeros(x.shape[0])
+
+        for i_halve in range(self.max_halving):
+            logger.debug("Perform halving iteration %i out of %i", i_halve, self.max_halving)
+            do_halving = loss >= prev_loss
+            logger.debug("Halving to be performed on %i samples", int(np.sum(do_halving)))
+            if np.sum(do_halving) == 0:
+                break
+
+            lr_mult = learning_rate[do_halving]
+            for _ in range(len(x.shape) - 1):
+                lr_mult = lr_mult[:, np.newaxis]
+
+            new_x_adv_tanh = x_adv_tanh[do_halving] + lr_mult * perturbation_tanh[do_halving]
+            new_x_adv = tanh_to_original(new_x_adv_tanh, clip_min, clip_max)
+            _, l2dist[do_halving], loss[do_halving] = self._loss(
+                x[do_halving], new_x_adv, target[do_halving], c_weight[do_halving]
+            )
+
+            logger.debug("New Average Loss: %f", np.mean(loss))
+            logger.debug("New Average L2Dist: %f", np.mean(l2dist))
+            logger.debug("New Average Margin Loss: %f", np.mean(loss - l2dist))
+
+            best_lr[loss < best_loss] = learning_rate[loss < best_loss]
+            best_loss[loss < best_loss] = loss[loss < best_loss]
+            learning_rate[do_halving] /= 2
+            halving[do_halving] += 1
+        learning_rate *= 2
+
+        # if no halving was actually required, double the learning rate as long as this
+        # decreases the loss:
+        for i_double in range(self.max_doubling):
+            logger.debug("Perform doubling iteration %i out of %i", i_double, self.max_doubling)
+            do_doubling = (halving == 1) & (loss <= best_loss)
+            logger.debug("Doubling to be performed on %i samples", int(np.sum(do_doubling)))
+            if np.sum(do_doubling) == 0:
+                break
+            learning_rate[do_doubling] *= 2
+
+            lr_mult = learning_rate[do_doubling]
+            for _ in range(len(x.shape) - 1):
+                lr_mult = lr_mult[:, np.newaxis]
+
+            new_x_adv_tanh = x_adv_tanh[do_doubling] + lr_mult * perturbation_tanh[do_doubling]
+            new_x_adv = tanh_to_original(new_x_adv_tanh, clip_min, clip_max)
+            _, l2dist[do_doubling], loss[do_doubling] = self._loss(
+                x[do_doubling], new_x_adv, target[do_doubling], c_weight[do_doubling]
+            )
+            logger.debug("New Average Loss: %f", np.mean(loss))
+            logger.debug("New Average L2Dist: %f", np.mean(l2dist))
+            logger.debug("New Average Margin Loss: %f", np.mean(loss - l2dist))
+            best_lr[loss < best_loss] = learning_rate[loss < best_loss]
+            best_loss[loss < best_loss] = loss[loss < best_loss]
+
+        learning_rate[halving == 1] /= 2
+
+        update_adv = best_lr > 0
+        logger.debug("Number of adversarial samples to be finally updated: %i", int(np.sum(update_adv)))
+
+        if np.sum(update_adv) > 0:
+            best_lr_mult = best_lr[update_adv]
+            for _ in range(len(x.shape) - 1):
+                best_lr_mult = best_lr_mult[:, np.newaxis]
+
+            x_adv_tanh[update_adv] = x_adv_tanh[update_adv] + best_lr_mult * perturbation_tanh[update_adv]
+            x_adv[update_adv] = tanh_to_original(x_adv_tanh[update_adv], clip_min, clip_max)
+
+        return x_adv, x_adv_tanh, l2dist, loss, learning_rate, update_adv
 
     def generate(self, x: np.ndarray, y: Optional[np.ndarray] = None, **kwargs) -> np.ndarray:
         """
@@ -242,216 +378,174 @@ class CarliniL2Method(EvasionAttack):
         if y is None:
             y = get_labels_np_array(self.estimator.predict(x, batch_size=self.batch_size))
 
-        # Compute perturbation with implicit batching
-        nb_batches = int(np.ceil(x_adv.shape[0] / float(self.batch_size)))
-        for batch_id in trange(nb_batches, desc="C&W L_2", disable=not self.verbose):
-            batch_index_1, batch_index_2 = batch_id * self.batch_size, (batch_id + 1) * self.batch_size
-            x_batch = x_adv[batch_index_1:batch_index_2]
-            y_batch = y[batch_index_1:batch_index_2]
-
-            # The optimization is performed in tanh space to keep the adversarial images bounded in correct range
-            x_batch_tanh = original_to_tanh(x_batch, clip_min, clip_max, self._tanh_smoother)
+        # The optimization is performed in tanh space to keep the adversarial images bounded in correct range
+        x_tanh = original_to_tanh(x_adv, clip_min, clip_max, self._tanh_smoother)
+        nb_samples = x_adv.shape[0]
+
+        # Initialize binary search:
+        c_current = self.initial_const * np.ones(nb_samples)
+        c_lower_bound = np.zeros(nb_samples)
+        c_double = np.ones(nb_samples) > 0
+        nb_bss = np.zeros(nb_samples, dtype=int)
+
+        # Initialize placeholders for best l2 distance and attack found so far
+        best_l2dist = np.inf * np.ones(nb_samples)
+        best_x_adv = x_adv.copy()
+
+        # Initialize placeholders for the current binary search step of each sample
+        learning_rate = np.zeros(nb_samples)
+        nb_iter = np.zeros(nb_samples, dtype=int)
+        x_adv_current = x_adv.copy()
+        x_adv_current_tanh = x_tanh.copy()
+        z_logits = np.zeros((nb_samples, self.estimator.nb_classes), dtype=ART_NUMPY_DTYPE)
+        l2dist = np.zeros(nb_samples)
+        loss = np.zeros(nb_samples)
+        attack_success = np.zeros(nb_samples, dtype=bool)
+        overall_attack_success = np.zeros(nb_samples, dtype=bool)
+
+        # Samples whose adversarial input has been updated by the last iteration and has not been evaluated yet
+        pending_eval = np.zeros(nb_samples, dtype=bool)
+
+        # Each iteration works on an active set of `batch_size` samples whose binary search steps are at different
+        # iterations. Samples leave it after their last binary search step or once `c_current` exceeds `_c_upper_bound`
+        # and the active set is refilled with pending samples.
+        if self.binary_search_steps > 0 and self.initial_const < self._c_upper_bound:
+            active_set = ActiveSet(nb_samples, self.batch_size)
+        else:
+            active_set = ActiveSet(0, self.batch_size)
+        start_indices = active_set.indices
+
+        pbar = tqdm(total=nb_samples, desc="C&W L_2", disable=not self.verbose)
+        while len(active_set) > 0:
+            # Initialize perturbation in tanh space for the samples starting a binary search step:
+            if start_indices.size > 0:
+                learning_rate[start_indices] = self.learning_rate
+                nb_iter[start_indices] = 0
+                x_adv_current[start_indices] = x_adv[start_indices]
+                x_adv_current_tanh[start_indices] = x_tanh[start_indices]
+                z_logits[start_indices], l2dist[start_indices], loss[start_indices] = self._loss(
+                    x_adv[start_indices], x_adv_current[start_indices], y[start_indices], c_current[start_indices]
+                )
+                attack_success[start_indices] = loss[start_indices] - l2dist[start_indices] <= 0
+                overall_attack_success[start_indices] = attack_success[start_indices]
+                pending_eval[start_indices] = False
 
-            # Initialize binary search:
-            c_current = self.initial_const * np.ones(x_batch.shape[0])
-            c_lower_bound = np.zeros(x_batch.shape[0])
-            c_double = np.ones(x_batch.shape[0]) > 0
+            active_indices = active_set.indices
+            active = (nb_iter[active_indices] < self.max_iter) & (learning_rate[active_indices] > 0)
+            iter_indices = active_indices[active]
 
-            # Initialize placeholders for best l2 distance and attack found so far
-            best_l2dist = np.inf * np.ones(x_batch.shape[0])
-            best_x_adv_batch = x_batch.copy()
+            # Compute the gradients of the samples which continue their binary search step. Its forward pass evaluates
+            # the adversarial inputs updated by the last iteration, the other ones are evaluated separately
+            if iter_indices.size > 0:
+                logger.debug("Compute loss gradient")
+                z_predicted, loss_gradient = self._loss_gradient(
+                    y[iter_indices],
+                    x_adv[iter_indices],
+                    x_adv_current[iter_indices],
+                    x_adv_current_tanh[iter_indices],
+                    c_current[iter_indices],
+                    clip_min,
+                    clip_max,
+                )
+                eval_rows = pending_eval[iter_indices]
+                eval_indices = iter_indices[eval_rows]
+                if eval_indices.size > 0:
+                    z_logits[eval_indices] = z_predicted[eval_rows]
+                    l2dist[eval_indices], loss[eval_indices] = self._loss_from_logits(
+                        x_adv[eval_indices], x_adv_current[eval_indices], z_predicted[eval_rows], y[eval_indices],
+                        c_current[eval_indices],
+                    )
 
-            for bss in range(self.binary_search_steps):
-                logger.debug(
-                    "Binary search step %i out of %i (c_mean==%f)", bss, self.binary_search_steps, np.mean(c_current),
+            eval_indices = active_indices[~active & pending_eval[active_indices]]
+            if eval_indices.size > 0:
+                z_logits[eval_indices], l2dist[eval_indices], loss[eval_indices] = self._loss(
+                    x_adv[eval_indices], x_adv_current[eval_indices], y[eval_indices], c_current[eval_indices]
                 )
-                nb_active = int(np.sum(c_current < self._c_upper_bound))
-                logger.debug(
-                    "Number of samples with c_current < _c_upper_bound: %i out of %i", nb_active, x_batch.shape[0],
+
+            eval_indices = active_indices[pending_eval[active_indices]]
+            attack_success[eval_indices] = loss[eval_indices] - l2dist[eval_indices] <= 0
+            overall_attack_success[eval_indices] |= attack_success[eval_indices]
+            pending_eval[eval_indices] = False
+
+            logger.debug("Average Loss: %f", np.mean(loss[active_indices]))
+            logger.debug("Average L2Dist: %f", np.mean(l2dist[active_indices]))
+            logger.debug("Average Margin Loss: %f", np.mean(loss[active_indices] - l2dist[active_indices]))
+            logger.debug(
+                "Current number of succeeded attacks: %i out of %i",
+                int(np.sum(attack_success[active_indices])),
+                len(active_indices),
+            )
+
+            improved_adv = attack_success[active_indices] & (l2dist[active_indices] < best_l2dist[active_indices])
+            improved_indices = active_indices[improved_adv]
+            logger.debug("Number of improved L2 distances: %i", improved_indices.size)
+            best_l2dist[improved_indices] = l2dist[improved_indices]
+            best_x_adv[improved_indices] = x_adv_current[improved_indices]
+
+            logger.debug(
+                "Number of samples with iterations left and learning_rate > 0: %i out of %i",
+                int(np.sum(active)),
+                len(active_indices),
+            )
+
+            # Perform one iteration of the samples which continue their binary search step
+            if iter_indices.size > 0:
+                (
+                    x_adv_current[iter_indices],
+                    x_adv_current_tanh[iter_indices],
+                    l2dist[iter_indices],
+                    loss[iter_indices],
+                    learning_rate[iter_indices],
+                    update_adv,
+                ) = self._iterate(
+                    x_adv[iter_indices],
+                    y[iter_indices],
+                    x_adv_current[iter_indices],
+                    x_adv_current_tanh[iter_indices],
+                    loss_gradient,
+                    l2dist[iter_indices],
+                    loss[iter_indices],
+                    c_current[iter_indices],
+                    learning_rate[iter_indices],
+                    clip_min,
+                    clip_max,
                 )
-                if nb_active == 0:
-                    break
-                learning_rate = self.learning_rate * np.ones(x_batch.shape[0])
+                nb_iter[iter_indices] += 1
 
-                # Initialize perturbation in tanh space:
-                x_adv_batch = x_batch.copy()
-                x_adv_batch_tanh = x_batch_tanh.copy()
+                # Only the samples whose adversarial input has been updated have a new attack success, the losses and
+                # l2 distances of the others are those of their last line search step
+                pending_eval[iter_indices[update_adv]] = True
 
-                z_logits, l2dist, loss = self._loss(x_batch, x_adv_batch, y_batch, c_current)
-                attack_success = loss - l2dist <= 0
-                overall_attack_success = attack_success
+            # Update depending on attack success for the samples which finished their binary search step:
+            end_indices = active_indices[~active]
+            if end_indices.size > 0:
+                success = overall_attack_success[end_indices]
+                c_batch = c_current[end_indices]
+                c_lower_bound_batch = c_lower_bound[end_indices]
+                c_double_batch = c_double[end_indices]
 
-                for i_iter in range(self.max_iter):
-                    logger.debug("Iteration step %i out of %i", i_iter, self.max_iter)
-                    logger.debug("Average Loss: %f", np.mean(loss))
-                    logger.debug("Average L2Dist: %f", np.mean(l2dist))
-                    logger.debug("Average Margin Loss: %f", np.mean(loss - l2dist))
-                    logger.debug(
-                        "Current number of succeeded attacks: %i out of %i",
-                        int(np.sum(attack_success)),
-                        len(attack_success),
-                    )
+                c_double_batch[success] = False
+                c_batch[success] = (c_lower_bound_batch + c_batch)[success] / 2
 
-                    improved_adv = attack_success & (l2dist < best_l2dist)
-                    logger.debug("Number of improved L2 distances: %i", int(np.sum(improved_adv)))
-                    if np.sum(improved_adv) > 0:
-                        best_l2dist[improved_adv] = l2dist[improved_adv]
-                        best_x_adv_batch[improved_adv] = x_adv_batch[improved_adv]
+                c_old = c_batch
+                c_batch[~success & c_double_batch] *= 2
 
-                    active = (c_current < self._c_upper_bound) & (learning_rate > 0)
-                    nb_active = int(np.sum(active))
-                    logger.debug(
-                        "Number of samples with c_current < _c_upper_bound and learning_rate > 0: %i out of %i",
-                        nb_active,
-                        x_batch.shape[0],
-                    )
-                    if nb_active == 0:
-                        break
+                c_batch1 = (c_batch - c_lower_bound_batch)[~success & ~c_double_batch]
+                c_batch[~success & ~c_double_batch] += c_batch1 / 2
+                c_lower_bound_batch[~success] = c_old[~success]
 
-                    # compute gradient:
-                    logger.debug("Compute loss gradient")
-                    perturbation_tanh = -self._loss_gradient(
-                        z_logits[active],
-                        y_batch[active],
-                        x_batch[active],
-                        x_adv_batch[active],
-                        x_adv_batch_tanh[active],
-                        c_current[active],
-                        clip_min,
-                        clip_max,
-                    )
+                c_current[end_indices] = c_batch
+                c_lower_bound[end_indices] = c_lower_bound_batch
+                c_double[end_indices] = c_double_batch
+                nb_bss[end_indices] += 1
 
-                    # perform line search to optimize perturbation
-                    # first, halve the learning rate until perturbation actually decreases the loss:
-                    prev_loss = loss.copy()
-                    best_loss = loss.copy()
-                    best_lr = np.zeros(x_batch.shape[0])
-                    halving = np.zeros(x_batch.shape[0])
-
-                    for i_halve in range(self.max_halving):
-                        logger.debug(
-                            "Perform halving iteration %i out of %i", i_halve, self.max_halving,
-                        )
-                        do_halving = loss[active] >= prev_loss[active]
-                        logger.debug(
-                            "Halving to be performed on %i samples", int(np.sum(do_halving)),
-                        )
-                        if np.sum(do_halving) == 0:
-                            break
-                        active_and_do_halving = active.copy()
-                        active_and_do_halving[active] = do_halving
-
-                        lr_mult = learning_rate[active_and_do_halving]
-                        for _ in range(len(x.shape) - 1):
-                            lr_mult = lr_mult[:, np.newaxis]
-
-                        x_adv1 = x_adv_batch_tanh[active_and_do_halving]
-                        new_x_adv_batch_tanh = x_adv1 + lr_mult * perturbation_tanh[do_halving]
-                        new_x_adv_batch = tanh_to_original(new_x_adv_batch_tanh, clip_min, clip_max)
-                        _, l2dist[active_and_do_halving], loss[active_and_do_halving] = self._loss(
-                            x_batch[active_and_do_halving],
-                            new_x_adv_batch,
-                            y_batch[active_and_do_halving],
-                            c_current[active_and_do_halving],
-                        )
-
-                        logger.debug("New Average Loss: %f", np.mean(loss))
-                        logger.debug("New Average L2Dist: %f", np.mean(l2dist))
-                        logger.debug("New Average Margin Loss: %f", np.mean(loss - l2dist))
-
-                        best_lr[loss < best_loss] = learning_rate[loss < best_loss]
-                        best_loss[loss < best_loss] = loss[loss < best_loss]
-                        learning_rate[active_and_do_halving] /= 2
-                        halving[active_and_do_halving] += 1
-                    learning_rate[active] *= 2
-
-                    # if no halving was actually required, double the learning rate as long as this
-                    # decreases the loss:
-                    for i_double in range(self.max_doubling):
-                        logger.debug(
-                            "Perform doubling iteration %i out of %i", i_double, self.max_doubling,
-                        )
-                        do_doubling = (halving[active] == 1) & (loss[active] <= best_loss[active])
-                        logger.debug(
-                            "Doubling to be performed on %i samples", int(np.sum(do_doubling)),
-                        )
-                        if np.sum(do_doubling) == 0:
-                            break
-                        active_and_do_doubling = active.copy()
-                        active_and_do_doubling[active] = do_doubling
-                        learning_rate[active_and_do_doubling] *= 2
-
-                        lr_mult = learning_rate[active_and_do_doubling]
-                        for _ in range(len(x.shape) - 1):
-                            lr_mult = lr_mult[:, np.newaxis]
-
-                        x_adv2 = x_adv_batch_tanh[active_and_do_doubling]
-                        new_x_adv_batch_tanh = x_adv2 + lr_mult * perturbation_tanh[do_doubling]
-                        new_x_adv_batch = tanh_to_original(new_x_adv_batch_tanh, clip_min, clip_max)
-                        _, l2dist[active_and_do_doubling], loss[active_and_do_doubling] = self._loss(
-                            x_batch[active_and_do_doubling],
-                            new_x_adv_batch,
-                            y_batch[active_and_do_doubling],
-                            c_current[active_and_do_doubling],
-                        )
-                        logger.debug("New Average Loss: %f", np.mean(loss))
-                        logger.debug("New Average L2Dist: %f", np.mean(l2dist))
-                        logger.debug("New Average Margin Loss: %f", np.mean(loss - l2dist))
-                        best_lr[loss < best_loss] = learning_rate[loss < best_loss]
-                        best_loss[loss < best_loss] = loss[loss < best_loss]
-
-                    learning_rate[halving == 1] /= 2
-
-                    update_adv = best_lr[active] > 0
-                    logger.debug(
-                        "Number of adversarial samples to be finally updated: %i", int(np.sum(update_adv)),
-                    )
+            nb_bss_done = nb_bss[active_indices] >= self.binary_search_steps
+            finished = ~active & (nb_bss_done | (c_current[active_indices] >= self._c_upper_bound))
+            start_indices = np.concatenate([active_indices[~active & ~finished], active_set.update(finished)])
+            pbar.update(int(np.sum(finished)))
 
-                    if np.sum(update_adv) > 0:
-                        active_and_update_adv = active.copy()
-                        active_and_update_adv[active] = update_adv
-                        best_lr_mult = best_lr[active_and_update_adv]
-                        for _ in range(len(x.shape) - 1):
-                            best_lr_mult = best_lr_mult[:, np.newaxis]
-
-                        x_adv4 = x_adv_batch_tanh[active_and_update_adv]
-                        best_lr1 = best_lr_mult * perturbation_tanh[update_adv]
-                        x_adv_batch_tanh[active_and_update_adv] = x_adv4 + best_lr1
-
-                        x_adv6 = x_adv_batch_tanh[active_and_update_adv]
-                        x_adv_batch[active_and_update_adv] = tanh_to_original(x_adv6, clip_min, clip_max)
-                        (
-                            z_logits[active_and_update_adv],
-                            l2dist[active_and_update_adv],
-                            loss[active_and_update_adv],
-                        ) = self._loss(
-                            x_batch[active_and_update_adv],
-                            x_adv_batch[active_and_update_adv],
-                            y_batch[active_and_update_adv],
-                            c_current[active_and_update_adv],
-                        )
-                        attack_success = loss - l2dist <= 0
-                        overall_attack_success = overall_attack_success | attack_success
-
-                # Update depending on attack success:
-                improved_adv = attack_success & (l2dist < best_l2dist)
-                logger.debug("Number of improved L2 distances: %i", int(np.sum(improved_adv)))
-
-                if np.sum(improved_adv) > 0:
-                    best_l2dist[improved_adv] = l2dist[improved_adv]
-                    best_x_adv_batch[improved_adv] = x_adv_batch[improved_adv]
-
-                c_double[overall_attack_success] = False
-                c_current[overall_attack_success] = (c_lower_bound + c_current)[overall_attack_success] / 2
-
-                c_old = c_current
-                c_current[~overall_attack_success & c_double] *= 2
-
-                c_current1 = (c_current - c_lower_bound)[~overall_attack_success & ~c_double]
-                c_current[~overall_attack_success & ~c_double] += c_current1 / 2
-                c_lower_bound[~overall_attack_success] = c_old[~overall_attack_success]
-
-            x_adv[batch_index_1:batch_index_2] = best_x_adv_batch
+        pbar.close()
+        x_adv = best_x_adv
 
         logger.info(
             "Success rate of C&W L_2 attack: %.2f%%",
@@ -551,6 +645,17 @@ class CarliniLInfMethod(EvasionAttack):
         :return: A tuple holding the current predictions and overall loss.
         """
         z_predicted = self.estimator.predict(np.array(x_adv, dtype=ART_NUMPY_DTYPE), batch_size=self.batch_size)
+
+        return z_predicted, self._loss_from_predictions(z_predicted, target)
+
+    def _loss_from_predictions(self, z_predicted: np.ndarray, target: np.ndarray) -> np.ndarray:
+        """
+        Compute the objective function value from the predictions of the adversarial input.
+
+        :param z_predicted: An array with the predictions of the adversarial input.
+        :param target: An array with the target class (one-hot encoded).
+        :return: An array with the overall loss.
+        """
         z_target = np.sum(z_predicted * target, axis=1)
         z_other = np.max(
             z_predicted * (1 - target) + (np.min(z_predicted, axis=1) - 1)[:, np.newaxis] * target, axis=1,
@@ -558,48 +663,59 @@ class CarliniLInfMethod(EvasionAttack):
 
         if self.targeted:
             # if targeted, optimize for making the target class most likely
-            loss = np.maximum(z_other - z_target + self.confidence, np.zeros(x_adv.shape[0]))
+            loss = np.maximum(z_other - z_target + self.confidence, np.zeros(z_predicted.shape[0]))
         else:
             # if untargeted, optimize for making any other class most likely
-            loss = np.maximum(z_target - z_other + self.confidence, np.zeros(x_adv.shape[0]))
+            loss = np.maximum(z_target - z_other + self.confidence, np.zeros(z_predicted.shape[0]))
 
-        return z_predicted, loss
+        return loss
 
     def _loss_gradient(
         self,
-        z_logits: np.ndarray,
         target: np.ndarray,
         x_adv: np.ndarray,
         x_adv_tanh: np.ndarray,
         clip_min: np.ndarray,
         clip_max: np.ndarray,
-    ) -> np.ndarray:  # lgtm [py/similar-function]
+    ) -> Tuple[np.ndarray, np.ndarray]:  # lgtm [py/similar-function]
         """
-        Compute the gradient of the loss function.
+        Compute the gradient of the loss function and the predictions of the adversarial input in the same forward
+        pass.
 
-        :param z_logits: An array with the current predictions.
         :param target: An array with the target class (one-hot encoded).
         :param x_adv: An array with the adversarial input.
         :param x_adv_tanh: An array with the adversarial input in tanh space.
         :param clip_min: Minimum clipping values.
         :param clip_max: Maximum clipping values.
-        :return: An array with the gradient of the loss function.
+        :return: A tuple holding the predictions of `x_adv` and an array with the gradient of the loss function.
         """
-        if self.targeted:
-            i_sub = np.argmax(target, axis=1)
-            i_add = np.argmax(z_logits * (1 - target) + (np.min(z_logits, axis=1) - 1)[:, np.newaxis] * target, axis=1,)
-        else:
-            i_add = np.argmax(target, axis=1)
-            i_sub = np.argmax(z_logits * (1 - target) + (np.min(z_logits, axis=1) - 1)[:, np.newaxis] * target, axis=1,)
 
-        loss_gradient = self.estimator.class_gradient(x_adv, label=i_add)
-        loss_gradient -= self.estimator.class_gradient(x_adv, label=i_sub)
+        def weights_fn(z_predicted: np.ndarray, indices: np.ndarray) -> np.ndarray:
+            # Back-propagate z[i_add] - z[i_sub], with the classes given by the predictions of the same forward pass
+            target_batch = target[indices]
+            i_other = np.argmax(
+                z_predicted * (1 - target_batch) + (np.min(z_predicted, axis=1) - 1)[:, np.newaxis] * target_batch,
+                axis=1,
+            )
+            if self.targeted:
+                i_add, i_sub = i_other, np.argmax(target_batch, axis=1)
+            else:
+                i_add, i_sub = np.argmax(target_batch, axis=1), i_other
+
+            weights = np.zeros(z_predicted.shape, dtype=ART_NUMPY_DTYPE)
+            weights[np.arange(len(weights)), i_add] = 1.0
+            weights[np.arange(len(weights)), i_sub] = -1.0
+            return weights
+
+        z_predicted, loss_gradient = self.estimator.predict_and_weighted_class_gradient(
+            x_adv, weights_fn, batch_size=self.batch_size
+        )
         loss_gradient = loss_gradient.reshape(x_adv.shape)
 
         loss_gradient *= clip_max - clip_min
         loss_gradient *= (1 - np.square(np.tanh(x_adv_tanh))) / (2 * self._tanh_smoother)
 
-        return loss_gradient
+        return z_predicted, loss_gradient
 
     def generate(self, x: np.ndarray, y: Optional[np.ndarray] = None, **kwargs) -> np.ndarray:
         """
@@ -647,10 +763,13 @@ class CarliniLInfMethod(EvasionAttack):
             x_adv_batch_tanh = x_batch_tanh.copy()
 
             # Initialize optimization:
-            z_logits, loss = self._loss(x_adv_batch, y_batch)
+            _, loss = self._loss(x_adv_batch, y_batch)
             attack_success = loss <= 0
             learning_rate = self.learning_rate * np.ones(x_batch.shape[0])
 
+            # Samples whose adversarial input has been updated by the last iteration and has not been evaluated yet
+            pending_eval = np.zeros(x_batch.shape[0], dtype=bool)
+
             for i_iter in range(self.max_iter):
                 logger.debug("Iteration step %i out of %i", i_iter, self.max_iter)
                 logger.debug("Average Loss: %f", np.mean(loss))
@@ -659,21 +778,31 @@ class CarliniLInfMethod(EvasionAttack):
                     "Successful attack samples: %i out of %i", int(np.sum(attack_success)), x_batch.shape[0],
                 )
 
-                # only continue optimization for those samples where attack hasn't succeeded yet:
-                active = ~attack_success
-                if np.sum(active) == 0:
+                # compute gradient of the samples where attack hasn't succeeded yet, its forward pass evaluates the
+                # adversarial inputs updated by the last iteration:
+                candidates = ~attack_success
+                if np.sum(candidates) == 0:
                     break
 
-                # compute gradient:
                 logger.debug("Compute loss gradient")
-                perturbation_tanh = -self._loss_gradient(
-                    z_logits[active],
-                    y_batch[active],
-                    x_adv_batch[active],
-                    x_adv_batch_tanh[active],
-                    clip_min[active],
-                    clip_max[active],
+                z_predicted, loss_gradient = self._loss_gradient(
+                    y_batch[candidates],
+                    x_adv_batch[candidates],
+                    x_adv_batch_tanh[candidates],
+                    clip_min[candidates],
+                    clip_max[candidates],
                 )
+                eval_rows = pending_eval[candidates]
+                if np.sum(eval_rows) > 0:
+                    loss[pending_eval] = self._loss_from_predictions(z_predicted[eval_rows], y_batch[pending_eval])
+                    attack_success[pending_eval] = loss[pending_eval] <= 0
+                    pending_eval[:] = False
+
+                # only continue optimization for those samples where attack hasn't succeeded yet:
+                active = ~attack_success
+                if np.sum(active) == 0:
+                    break
+                perturbation_tanh = -loss_gradient[active[candidates]]
 
                 # perform line search to optimize perturbation
                 # first, halve the learning rate until perturbation actually decreases the loss:
@@ -766,10 +895,14 @@ class CarliniLInfMethod(EvasionAttack):
                         clip_min[active_and_update_adv],
                         clip_max[active_and_update_adv],
                     )
-                    (z_logits[active_and_update_adv], loss[active_and_update_adv],) = self._loss(
-                        x_adv_batch[active_and_update_adv], y_batch[active_and_update_adv],
-                    )
                     attack_success = loss <= 0
+                    attack_success[active_and_update_adv] = False
+                    pending_eval = active_and_update_adv
+
+            # Evaluate the adversarial inputs updated by the last iteration
+            if np.sum(pending_eval) > 0:
+                _, loss[pending_eval] = self._loss(x_adv_batch[pending_eval], y_batch[pending_eval])
+                attack_success[pending_eval] = loss[pending_eval] <= 0
 
             # Update depending on attack success:
             x_adv_batch[~attack_success] = x_batch[~attack_success]
@@ -99,22 +99,18 @@ class DeepFool(EvasionAttack):
         :return: An array holding the adversarial examples.
         """
         x_adv = x.astype(ART_NUMPY_DTYPE)
-        preds = self.estimator.predict(x, batch_size=self.batch_size)
-
-        if is_probability(preds[0]):
-            logger.warning(
-                "It seems that the attacked model is predicting probabilities. DeepFool expects logits as model output "
-                "to achieve its full attack strength."
-            )
 
         # Determine the class labels for which to compute the gradients
         use_grads_subset = self.nb_grads < self.estimator.nb_classes
         if use_grads_subset:
             # TODO compute set of unique labels per batch
+            preds = self.estimator.predict(x, batch_size=self.batch_size)
             grad_labels = np.argsort(-preds, axis=1)[:, : self.nb_grads]
             labels_set = np.unique(grad_labels)
+            grad_labels_set = labels_set
         else:
             labels_set = np.arange(self.estimator.nb_classes)
+            grad_labels_set = None
         sorter = np.arange(len(labels_set))
 
         # Pick a small scalar to avoid division by 0
@@ -128,22 +124,27 @@ class DeepFool(EvasionAttack):
             batch = x_adv[batch_index_1:batch_index_2].copy()
 
             # Get predictions and gradients for batch
-            f_batch = preds[batch_index_1:batch_index_2]
+            f_batch, grd = self.estimator.predict_and_class_gradient(
+                batch, labels=grad_labels_set, batch_size=self.batch_size
+            )
             fk_hat = np.argmax(f_batch, axis=1)
-            if use_grads_subset:
-                # Compute gradients only for top predicted classes
-                grd = np.array([self.estimator.class_gradient(batch, label=_) for _ in labels_set])
-                grd = np.squeeze(np.swapaxes(grd, 0, 2), axis=0)
-            else:
-                # Compute gradients for all classes
-                grd = self.estimator.class_gradient(batch)
+
+            if batch_id == 0 and is_probability(f_batch[0]):
+                logger.warning(
+                    "It seems that the attacked model is predicting probabilities. DeepFool expects logits as model "
+                    "output to achieve its full attack strength."
+                )
 
             # Get current predictions
             active_indices = np.arange(len(batch))
             current_step = 0
             while active_indices.size > 0 and current_step < self.max_iter:
+                # Only the samples which are still active are perturbed
+                f_batch = f_batch[active_indices]
+                grd = grd[active_indices]
+
                 # Compute difference in predictions and gradients only for selected top predictions
-                labels_indices = sorter[np.searchsorted(labels_set, fk_hat, sorter=sorter)]
+                labels_indices = sorter[np.searchsorted(labels_set, fk_hat[active_indices], sorter=sorter)]
                 grad_diff = grd - grd[np.arange(len(grd)), labels_indices][:, None]
                 f_diff = f_batch[:, labels_set] - f_batch[np.arange(len(f_batch)), labels_indices][:, None]
 
@@ -162,27 +163,19 @@ class DeepFool(EvasionAttack):
                 # Add perturbation and clip result
                 if self.estimator.clip_values is not None:
                     batch[active_indices] = np.clip(
-                        batch[active_indices]
-                        + r_var[active_indices] * (self.estimator.clip_values[1] - self.estimator.clip_values[0]),
+                        batch[active_indices] + r_var * (self.estimator.clip_values[1] - self.estimator.clip_values[0]),
                         self.estimator.clip_values[0],
                         self.estimator.clip_values[1],
                     )
                 else:
-                    batch[active_indices] += r_var[active_indices]
+                    batch[active_indices] += r_var
 
-                # Recompute prediction for new x
-                f_batch = self.estimator.predict(batch)
+                # Recompute prediction and gradients for new x with a single estimator call
+                f_batch, grd = self.estimator.predict_and_class_gradient(
+                    batch, labels=grad_labels_set, batch_size=self.batch_size
+                )
                 fk_i_hat = np.argmax(f_batch, axis=1)
 
-                # Recompute gradients for new x
-                if use_grads_subset:
-                    # Compute gradients only for (originally) top predicted classes
-                    grd = np.array([self.estimator.class_gradient(batch, label=_) for _ in labels_set])
-                    grd = np.squeeze(np.swapaxes(grd, 0, 2), axis=0)
-                else:
-                    # Compute gradients for all classes
-                    grd = self.estimator.class_gradient(batch)
-
                 # Stop if misclassification has been achieved
                 active_indices = np.where(fk_i_hat == fk_hat)[0]
 
@@ -163,7 +163,9 @@ class DPatch(EvasionAttack):
                 i_batch_end = min((i_batch + 1) * self.batch_size, patched_images.shape[0])
 
                 gradients = self.estimator.loss_gradient(
-                    x=patched_images[i_batch_start:i_batch_end], y=patch_target[i_batch_start:i_batch_end],
+                    x=patched_images[i_batch_start:i_batch_end],
+                    y=patch_target[i_batch_start:i_batch_end],
+                    batch_size=self.batch_size,
                 )
 
                 for i_image in range(patched_images.shape[0]):
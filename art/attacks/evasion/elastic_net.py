@@ -137,22 +137,32 @@ class ElasticNet(EvasionAttack):
         :param c_weight: Weight of the loss term aiming for classification as target.
         :return: An array with the gradient of the loss function.
         """
-        # Compute the current predictions
-        predictions = self.estimator.predict(np.array(x_adv, dtype=ART_NUMPY_DTYPE), batch_size=self.batch_size)
-
-        if self.targeted:
-            i_sub = np.argmax(target, axis=1)
-            i_add = np.argmax(
-                predictions * (1 - target) + (np.min(predictions, axis=1) - 1)[:, np.newaxis] * target, axis=1,
-            )
-        else:
-            i_add = np.argmax(target, axis=1)
-            i_sub = np.argmax(
-                predictions * (1 - target) + (np.min(predictions, axis=1) - 1)[:, np.newaxis] * target, axis=1,
-            )
 
-        loss_gradient = self.estimator.class_gradient(x_adv, label=i_add)
-        loss_gradient -= self.estimator.class_gradient(x_adv, label=i_sub)
+        def margin_weights(predictions: np.ndarray, indices: np.ndarray) -> np.ndarray:
+            # Select the classes of z[i_add] - z[i_sub] from the current predictions
+            target_batch = target[indices]
+            if self.targeted:
+                i_sub = np.argmax(target_batch, axis=1)
+                i_add = np.argmax(
+                    predictions * (1 - target_batch) + (np.min(predictions, axis=1) - 1)[:, np.newaxis] * target_batch,
+                    axis=1,
+                )
+            else:
+                i_add = np.argmax(target_batch, axis=1)
+                i_sub = np.argmax(
+                    predictions * (1 - target_batch) + (np.min(predictions, axis=1) - 1)[:, np.newaxis] * target_batch,
+                    axis=1,
+                )
+
+            weights = np.zeros(predictions.shape, dtype=ART_NUMPY_DTYPE)
+            weights[np.arange(len(weights)), i_add] = 1.0
+            weights[np.arange(len(weights)), i_sub] = -1.0
+            return weights
+
+        # Compute the current predictions and back-propagate z[i_add] - z[i_sub] from the same forward pass
+        _, loss_gradient = self.estimator.predict_and_weighted_class_gradient(
+            np.array(x_adv, dtype=ART_NUMPY_DTYPE), margin_weights, batch_size=self.batch_size
+        )
         loss_gradient = loss_gradient.reshape(x.shape)
 
         c_mult = c_weight
@@ -33,6 +33,7 @@ from art.attacks.attack import EvasionAttack
 from art.estimators.estimator import BaseEstimator, LossGradientsMixin
 from art.estimators.classification.classifier import ClassifierMixin
 from art.utils import (
+    ActiveSet,
     compute_success,
     get_labels_np_array,
     random_sphere,
@@ -114,6 +115,7 @@ class FastGradientMethod(EvasionAttack):
         adv_x = x.copy()
 
         # Compute perturbation with implicit batching
+        perturbation = np.zeros(x.shape, dtype=ART_NUMPY_DTYPE)
         for batch_id in range(int(np.ceil(adv_x.shape[0] / float(self.batch_size)))):
             batch_index_1, batch_index_2 = (
                 batch_id * self.batch_size,
@@ -130,26 +132,30 @@ class FastGradientMethod(EvasionAttack):
                     mask_batch = mask[batch_index_1:batch_index_2]
 
             # Get perturbation
-            perturbation = self._compute_perturbation(batch, batch_labels, mask_batch)
-
-            # Get current predictions
-            active_indices = np.arange(len(batch))
-            current_eps = self.eps_step
-            while active_indices.size > 0 and current_eps <= self.eps:
-                # Adversarial crafting
-                current_x = self._apply_perturbation(x[batch_index_1:batch_index_2], perturbation, current_eps)
-                # Update
-                batch[active_indices] = current_x[active_indices]
-                adv_preds = self.estimator.predict(batch)
-                # If targeted active check to see whether we have hit the target, otherwise head to anything but
-                if self.targeted:
-                    active_indices = np.where(np.argmax(batch_labels, axis=1) != np.argmax(adv_preds, axis=1))[0]
-                else:
-                    active_indices = np.where(np.argmax(batch_labels, axis=1) == np.argmax(adv_preds, axis=1))[0]
+            perturbation[batch_index_1:batch_index_2] = self._compute_perturbation(batch, batch_labels, mask_batch)
+
+        # Increase the step size of each sample until its prediction changes, refilling the batch with pending samples
+        # as soon as others are adversarial or reached the maximum step size
+        current_eps = np.full(x.shape[0], self.eps_step)
+        active_set = ActiveSet(x.shape[0], self.batch_size)
+        while self.eps_step <= self.eps and len(active_set) > 0:
+            active_indices = active_set.indices
+            eps_active = current_eps[active_indices].reshape((-1,) + (1,) * (len(x.shape) - 1))
+
+            # Adversarial crafting
+            adv_x[active_indices] = self._apply_perturbation(
+                x[active_indices], perturbation[active_indices], eps_active
+            )
+            adv_preds = self.estimator.predict(adv_x[active_indices], batch_size=self.batch_size)
 
-                current_eps += self.eps_step
+            # If targeted active check to see whether we have hit the target, otherwise head to anything but
+            if self.targeted:
+                finished = np.argmax(y[active_indices], axis=1) == np.argmax(adv_preds, axis=1)
+            else:
+                finished = np.argmax(y[active_indices], axis=1) != np.argmax(adv_preds, axis=1)
 
-            adv_x[batch_index_1:batch_index_2] = batch
+            current_eps[active_indices] += self.eps_step
+            active_set.update(finished | (current_eps[active_indices] > self.eps))
 
         return adv_x
 
@@ -278,8 +284,11 @@ class FastGradientMethod(EvasionAttack):
         # Pick a small scalar to avoid division by 0
         tol = 10e-8
 
-        # Get gradient wrt loss; invert it if attack is targeted
-        grad = self.estimator.loss_gradient(batch, batch_labels) * (1 - 2 * int(self.targeted))
+        # Get gradient wrt loss; invert it if attack is targeted. The samples are already split into the batches of the
+        # attack, which may hold several stacked random initialisations
+        grad = self.estimator.loss_gradient(batch, batch_labels, batch_size=batch.shape[0]) * (
+            1 - 2 * int(self.targeted)
+        )
 
         # Apply norm bound
         if self.norm in [np.inf, "inf"]:
@@ -297,7 +306,9 @@ class FastGradientMethod(EvasionAttack):
         else:
             return grad * (mask.astype(ART_NUMPY_DTYPE))
 
-    def _apply_perturbation(self, batch: np.ndarray, perturbation: np.ndarray, eps_step: float) -> np.ndarray:
+    def _apply_perturbation(
+        self, batch: np.ndarray, perturbation: np.ndarray, eps_step: Union[float, np.ndarray]
+    ) -> np.ndarray:
         batch = batch + eps_step * perturbation
 
         if self.estimator.clip_values is not None:
@@ -306,6 +317,20 @@ class FastGradientMethod(EvasionAttack):
 
         return batch
 
+    def _random_init(self, x: np.ndarray, mask: Optional[np.ndarray], eps: float) -> np.ndarray:
+        n = x.shape[0]
+        m = np.prod(x.shape[1:]).item()
+        random_perturbation = random_sphere(n, m, eps, self.norm).reshape(x.shape).astype(ART_NUMPY_DTYPE)
+        if mask is not None:
+            random_perturbation = random_perturbation * (mask.astype(ART_NUMPY_DTYPE))
+        x_adv = x.astype(ART_NUMPY_DTYPE) + random_perturbation
+
+        if self.estimator.clip_values is not None:
+            clip_min, clip_max = self.estimator.clip_values
+            x_adv = np.clip(x_adv, clip_min, clip_max)
+
+        return x_adv
+
     def _compute(
         self,
         x: np.ndarray,
@@ -316,24 +341,19 @@ class FastGradientMethod(EvasionAttack):
         eps_step: float,
         project: bool,
         random_init: bool,
+        batch_size: Optional[int] = None,
     ) -> np.ndarray:
-        if random_init:
-            n = x.shape[0]
-            m = np.prod(x.shape[1:]).item()
-            random_perturbation = random_sphere(n, m, eps, self.norm).reshape(x.shape).astype(ART_NUMPY_DTYPE)
-            if mask is not None:
-                random_perturbation = random_perturbation * (mask.astype(ART_NUMPY_DTYPE))
-            x_adv = x.astype(ART_NUMPY_DTYPE) + random_perturbation
+        if batch_size is None:
+            batch_size = self.batch_size
 
-            if self.estimator.clip_values is not None:
-                clip_min, clip_max = self.estimator.clip_values
-                x_adv = np.clip(x_adv, clip_min, clip_max)
+        if random_init:
+            x_adv = self._random_init(x, mask, eps)
         else:
             x_adv = x.astype(ART_NUMPY_DTYPE)
 
             # Compute perturbation with implicit batching
-        for batch_id in range(int(np.ceil(x.shape[0] / float(self.batch_size)))):
-            batch_index_1, batch_index_2 = batch_id * self.batch_size, (batch_id + 1) * self.batch_size
+        for batch_id in range(int(np.ceil(x.shape[0] / float(batch_size)))):
+            batch_index_1, batch_index_2 = batch_id * batch_size, (batch_id + 1) * batch_size
             batch = x_adv[batch_index_1:batch_index_2]
             batch_labels = y[batch_index_1:batch_index_2]
 
@@ -185,7 +185,7 @@ class FrameSaliencyAttack(EvasionAttack):
     def _compute_frames_to_perturb(
         self, x_adv: np.ndarray, targets: np.ndarray, disregard: Optional[np.ndarray] = None
     ) -> np.ndarray:
-        saliency_score = self.estimator.loss_gradient(x_adv, targets)
+        saliency_score = self.estimator.loss_gradient(x_adv, targets, batch_size=self.batch_size)
         saliency_score = np.swapaxes(saliency_score, 1, self.frame_index)
         saliency_score = saliency_score.reshape((saliency_score.shape[:2] + (np.prod(saliency_score.shape[2:]),)))
         saliency_score = np.mean(np.abs(saliency_score), axis=2)
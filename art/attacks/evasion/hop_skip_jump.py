@@ -24,7 +24,7 @@ predictions. It is an advanced version of the Boundary attack.
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import logging
-from typing import Optional, Tuple, Union, TYPE_CHECKING
+from typing import Dict, Optional, Tuple, Union, TYPE_CHECKING
 
 import numpy as np
 from tqdm import tqdm
@@ -33,7 +33,13 @@ from art.config import ART_NUMPY_DTYPE
 from art.attacks.attack import EvasionAttack
 from art.estimators.estimator import BaseEstimator
 from art.estimators.classification import ClassifierMixin
-from art.utils import compute_success, to_categorical, check_and_transform_label_format
+from art.utils import (
+    compute_success,
+    to_categorical,
+    check_and_transform_label_format,
+    correctly_classified_by_class,
+    find_initial_adversarial,
+)
 
 if TYPE_CHECKING:
     from art.utils import CLASSIFIER_TYPE
@@ -58,6 +64,8 @@ class HopSkipJump(EvasionAttack):
         "init_size",
         "curr_iter",
         "batch_size",
+        "nb_parallel_samples",
+        "init_block_size",
     ]
     _estimator_requirements = (BaseEstimator, ClassifierMixin)
 
@@ -70,6 +78,9 @@ class HopSkipJump(EvasionAttack):
         max_eval: int = 10000,
         init_eval: int = 100,
         init_size: int = 100,
+        batch_size: int = 64,
+        nb_parallel_samples: int = 1,
+        init_block_size: int = 10,
     ) -> None:
         """
         Create a HopSkipJump attack instance.
@@ -81,6 +92,13 @@ class HopSkipJump(EvasionAttack):
         :param max_eval: Maximum number of evaluations for estimating gradient.
         :param init_eval: Initial number of evaluations for estimating gradient.
         :param init_size: Maximum number of trials for initial generation of adversarial examples.
+        :param batch_size: Batch size for predictions of the classifier.
+        :param nb_parallel_samples: Number of samples attacked together. The samples of a group advance their
+               iterations together: the random probes of all samples for estimating the gradients are passed to the
+               classifier together, and the binary and step size searches are vectorized bisections from which samples
+               are removed once they have converged.
+        :param init_block_size: Number of candidates per sample that are classified together in each round of the
+               search for initial adversarial examples.
         """
         super().__init__(estimator=classifier)
         self._targeted = targeted
@@ -90,7 +108,9 @@ class HopSkipJump(EvasionAttack):
         self.init_eval = init_eval
         self.init_size = init_size
         self.curr_iter = 0
-        self.batch_size = 1
+        self.batch_size = batch_size
+        self.nb_parallel_samples = nb_parallel_samples
+        self.init_block_size = init_block_size
         self._check_params()
         self.curr_iter = 0
 
@@ -109,6 +129,12 @@ class HopSkipJump(EvasionAttack):
                   (nb_samples,).
         :param x_adv_init: Initial array to act as initial adversarial examples. Same shape as `x`.
         :type x_adv_init: `np.ndarray`
+        :param x_init_pool: Images from which initial adversarial examples are taken before drawing random images. Only
+                            the images correctly classified as their label in `y_init_pool` are used.
+        :type x_init_pool: `np.ndarray`
+        :param y_init_pool: Labels of `x_init_pool`, one-hot-encoded of shape (nb_pool, nb_classes) or indices of shape
+                            (nb_pool,).
+        :type y_init_pool: `np.ndarray`
         :param resume: Allow users to continue their previous attack.
         :type resume: `bool`
         :return: An array holding the adversarial examples.
@@ -138,8 +164,16 @@ class HopSkipJump(EvasionAttack):
         if x_adv_init is not None:
             init_preds = np.argmax(self.estimator.predict(x_adv_init, batch_size=self.batch_size), axis=1)
         else:
-            init_preds = [None] * len(x)
-            x_adv_init = [None] * len(x)
+            init_preds = None
+
+        # Correctly classified images of the pool, by class
+        x_init_pool = kwargs.get("x_init_pool")
+        y_init_pool = kwargs.get("y_init_pool")
+
+        if x_init_pool is not None and y_init_pool is not None:
+            pool = correctly_classified_by_class(self.estimator, x_init_pool, y_init_pool, batch_size=self.batch_size)
+        else:
+            pool = None
 
         # Assert that, if attack is targeted, y is provided
         if self.targeted and y is None:
@@ -150,29 +184,29 @@ class HopSkipJump(EvasionAttack):
         if y is not None:
             y = np.argmax(y, axis=1)
 
+        # First, create the initial adversarial samples
+        initial_samples, targets, found = self._init_samples(
+            x=x_adv,
+            y=y,
+            y_p=preds,
+            init_pred=init_preds,
+            adv_init=x_adv_init,
+            clip_min=clip_min,
+            clip_max=clip_max,
+            pool=pool,
+        )
+
+        # Samples without an initial adversarial example keep the original image
+        indices = np.where(found)[0]
+
         # Generate the adversarial samples
-        for ind, val in enumerate(tqdm(x_adv, desc="HopSkipJump")):
+        nb_batches = int(np.ceil(indices.shape[0] / float(self.nb_parallel_samples)))
+        for batch_id in tqdm(range(nb_batches), desc="HopSkipJump"):
             self.curr_iter = start
-            if self.targeted:
-                x_adv[ind] = self._perturb(
-                    x=val,
-                    y=y[ind],
-                    y_p=preds[ind],
-                    init_pred=init_preds[ind],
-                    adv_init=x_adv_init[ind],
-                    clip_min=clip_min,
-                    clip_max=clip_max,
-                )
-            else:
-                x_adv[ind] = self._perturb(
-                    x=val,
-                    y=-1,
-                    y_p=preds[ind],
-                    init_pred=init_preds[ind],
-                    adv_init=x_adv_init[ind],
-                    clip_min=clip_min,
-                    clip_max=clip_max,
-                )
+            batch_indices = indices[batch_id * self.nb_parallel_samples : (batch_id + 1) * self.nb_parallel_samples]
+            x_adv[batch_indices] = self._attack_batch(
+                initial_samples[batch_indices], x_adv[batch_indices], targets[batch_indices], clip_min, clip_max,
+            )
 
         if y is not None:
             y = to_categorical(y, self.estimator.nb_classes)
@@ -184,142 +218,123 @@ class HopSkipJump(EvasionAttack):
 
         return x_adv
 
-    def _perturb(
-        self, x: np.ndarray, y: int, y_p: int, init_pred: int, adv_init: np.ndarray, clip_min: float, clip_max: float,
-    ) -> np.ndarray:
-        """
-        Internal attack function for one example.
-
-        :param x: An array with one original input to be attacked.
-        :param y: If `self.targeted` is true, then `y` represents the target label.
-        :param y_p: The predicted label of x.
-        :param init_pred: The predicted label of the initial image.
-        :param adv_init: Initial array to act as an initial adversarial example.
-        :param clip_min: Minimum value of an example.
-        :param clip_max: Maximum value of an example.
-        :return: An adversarial example.
-        """
-        # First, create an initial adversarial sample
-        initial_sample = self._init_sample(x, y, y_p, init_pred, adv_init, clip_min, clip_max)
-
-        # If an initial adversarial example is not found, then return the original image
-        if initial_sample is None:
-            return x
-
-        # If an initial adversarial example found, then go with HopSkipJump attack
-        x_adv = self._attack(initial_sample[0], x, initial_sample[1], clip_min, clip_max)
-
-        return x_adv
-
-    def _init_sample(
-        self, x: np.ndarray, y: int, y_p: int, init_pred: int, adv_init: np.ndarray, clip_min: float, clip_max: float,
-    ) -> Optional[Union[np.ndarray, Tuple[np.ndarray, int]]]:
+    def _init_samples(
+        self,
+        x: np.ndarray,
+        y: Optional[np.ndarray],
+        y_p: np.ndarray,
+        init_pred: Optional[np.ndarray],
+        adv_init: Optional[np.ndarray],
+        clip_min: float,
+        clip_max: float,
+        pool: Optional[Dict[int, np.ndarray]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
-        Find initial adversarial example for the attack.
+        Find initial adversarial examples for the attack.
 
-        :param x: An array with 1 original input to be attacked.
-        :param y: If `self.targeted` is true, then `y` represents the target label.
-        :param y_p: The predicted label of x.
-        :param init_pred: The predicted label of the initial image.
-        :param adv_init: Initial array to act as an initial adversarial example.
+        :param x: An array with the original inputs to be attacked.
+        :param y: If `self.targeted` is true, then `y` represents the target labels.
+        :param y_p: The predicted labels of x.
+        :param init_pred: The predicted labels of the initial images.
+        :param adv_init: Initial array to act as initial adversarial examples.
         :param clip_min: Minimum value of an example.
         :param clip_max: Maximum value of an example.
-        :return: An adversarial example.
+        :param pool: Correctly classified images by class to try before random images.
+        :return: A tuple of the initial adversarial examples, the labels to attack with and a boolean array showing for
+                 which samples one has been found.
         """
-        nprd = np.random.RandomState()
-        initial_sample = None
+        initial_samples = x.copy()
 
         if self.targeted:
-            # Attack satisfied
-            if y == y_p:
-                return None
+            targets = np.array(y, dtype=int)
 
-            # Attack unsatisfied yet and the initial image satisfied
-            if adv_init is not None and init_pred == y:
-                return adv_init.astype(ART_NUMPY_DTYPE), init_pred
-
-            # Attack unsatisfied yet and the initial image unsatisfied
-            for _ in range(self.init_size):
-                random_img = nprd.uniform(clip_min, clip_max, size=x.shape).astype(x.dtype)
-                random_class = np.argmax(
-                    self.estimator.predict(np.array([random_img]), batch_size=self.batch_size), axis=1,
-                )[0]
-
-                if random_class == y:
-                    # Binary search to reduce the l2 distance to the original image
-                    random_img = self._binary_search(
-                        current_sample=random_img,
-                        original_sample=x,
-                        target=y,
-                        norm=2,
-                        clip_min=clip_min,
-                        clip_max=clip_max,
-                        threshold=0.001,
-                    )
-                    initial_sample = random_img, random_class
-
-                    logger.info("Found initial adversarial image for targeted attack.")
-                    break
-            else:
-                logger.warning("Failed to draw a random image that is adversarial, attack failed.")
+            # Attack unsatisfied yet
+            pending = y != y_p
 
+            # Attack unsatisfied yet and the initial image satisfied
+            satisfied = pending & (init_pred == y) if adv_init is not None else np.zeros_like(pending)
         else:
+            targets = np.array(y_p, dtype=int)
+            pending = np.ones(x.shape[0], dtype=bool)
+
             # The initial image satisfied
-            if adv_init is not None and init_pred != y_p:
-                return adv_init.astype(ART_NUMPY_DTYPE), y_p
-
-            # The initial image unsatisfied
-            for _ in range(self.init_size):
-                random_img = nprd.uniform(clip_min, clip_max, size=x.shape).astype(x.dtype)
-                random_class = np.argmax(
-                    self.estimator.predict(np.array([random_img]), batch_size=self.batch_size), axis=1,
-                )[0]
-
-                if random_class != y_p:
-                    # Binary search to reduce the l2 distance to the original image
-                    random_img = self._binary_search(
-                        current_sample=random_img,
-                        original_sample=x,
-                        target=y_p,
-                        norm=2,
-                        clip_min=clip_min,
-                        clip_max=clip_max,
-                        threshold=0.001,
-                    )
-                    initial_sample = random_img, y_p
-
-                    logger.info("Found initial adversarial image for untargeted attack.")
-                    break
-            else:
-                logger.warning("Failed to draw a random image that is adversarial, attack failed.")
+            satisfied = init_pred != y_p if adv_init is not None else np.zeros_like(pending)
+
+        if np.any(satisfied):
+            initial_samples[satisfied] = adv_init[satisfied]
+        found = satisfied.copy()
+
+        # The initial image unsatisfied
+        search = np.where(pending & ~satisfied)[0]
+        if search.size > 0:
+            random_samples, _, random_found = find_initial_adversarial(
+                classifier=self.estimator,
+                x=x[search],
+                y=y[search] if self.targeted else None,
+                y_p=y_p[search],
+                targeted=self.targeted,
+                clip_min=clip_min,
+                clip_max=clip_max,
+                max_trials=self.init_size,
+                block_size=self.init_block_size,
+                batch_size=self.batch_size,
+                pool=pool,
+            )
+            search = search[random_found]
+
+            # Binary search to reduce the l2 distance to the original images
+            if search.size > 0:
+                initial_samples[search] = self._binary_search_batch(
+                    current_sample=random_samples[random_found],
+                    original_sample=x[search],
+                    target=targets[search],
+                    norm=2,
+                    clip_min=clip_min,
+                    clip_max=clip_max,
+                    threshold=0.001,
+                )
+                found[search] = True
+
+            logger.info("Found %d initial adversarial images.", np.sum(random_found))
+            if not np.all(random_found):
+                logger.warning(
+                    "Failed to draw a random image that is adversarial for %d samples, attack failed.",
+                    np.sum(~random_found),
+                )
 
-        return initial_sample
+        return initial_samples, targets, found
 
-    def _attack(
-        self, initial_sample: np.ndarray, original_sample: np.ndarray, target: int, clip_min: float, clip_max: float,
+    def _attack_batch(
+        self,
+        initial_sample: np.ndarray,
+        original_sample: np.ndarray,
+        target: np.ndarray,
+        clip_min: float,
+        clip_max: float,
     ) -> np.ndarray:
         """
-        Main function for the boundary attack.
+        Main function for the boundary attack on a group of examples, which perform their iterations together.
 
-        :param initial_sample: An initial adversarial example.
-        :param original_sample: The original input.
-        :param target: The target label.
+        :param initial_sample: Initial adversarial examples.
+        :param original_sample: The original inputs.
+        :param target: The target labels.
         :param clip_min: Minimum value of an example.
         :param clip_max: Maximum value of an example.
-        :return: an adversarial example.
+        :return: The adversarial examples.
         """
-        # Set current perturbed image to the initial image
+        # Set current perturbed images to the initial images
         current_sample = initial_sample
+        axis = tuple(range(1, current_sample.ndim))
 
         # Main loop to wander around the boundary
         for _ in range(self.max_iter):
             # First compute delta
-            delta = self._compute_delta(
+            delta = self._compute_delta_batch(
                 current_sample=current_sample, original_sample=original_sample, clip_min=clip_min, clip_max=clip_max,
             )
 
             # Then run binary search
-            current_sample = self._binary_search(
+            current_sample = self._binary_search_batch(
                 current_sample=current_sample,
                 original_sample=original_sample,
                 norm=self.norm,
@@ -330,7 +345,7 @@ class HopSkipJump(EvasionAttack):
 
             # Next compute the number of evaluations and compute the update
             num_eval = min(int(self.init_eval * np.sqrt(self.curr_iter + 1)), self.max_eval)
-            update = self._compute_update(
+            update = self._compute_update_batch(
                 current_sample=current_sample,
                 num_eval=num_eval,
                 delta=delta,
@@ -341,21 +356,27 @@ class HopSkipJump(EvasionAttack):
 
             # Finally run step size search by first computing epsilon
             if self.norm == 2:
-                dist = np.linalg.norm(original_sample - current_sample)
+                dist = np.sqrt(np.sum((original_sample - current_sample) ** 2, axis=axis))
             else:
-                dist = np.max(abs(original_sample - current_sample))
+                dist = np.max(abs(original_sample - current_sample), axis=axis)
 
             epsilon = 2.0 * dist / np.sqrt(self.curr_iter + 1)
-            success = False
-
-            while not success:
-                epsilon /= 2.0
-                potential_sample = current_sample + epsilon * update
+            potential_sample = current_sample.copy()
+
+            # Halve the step size of the samples whose step has not been successful yet
+            active = np.ones(current_sample.shape[0], dtype=bool)
+            while np.any(active):
+                epsilon[active] /= 2.0
+                potential_sample[active] = (
+                    current_sample[active]
+                    + epsilon[active].reshape((-1,) + (1,) * len(axis)).astype(ART_NUMPY_DTYPE) * update[active]
+                )
                 success = self._adversarial_satisfactory(
-                    samples=potential_sample[None], target=target, clip_min=clip_min, clip_max=clip_max,
+                    samples=potential_sample[active], target=target[active], clip_min=clip_min, clip_max=clip_max,
                 )
+                active[active] = ~success
 
-            # Update current sample
+            # Update current samples
             current_sample = np.clip(potential_sample, clip_min, clip_max)
 
             # Update current iteration
@@ -363,151 +384,188 @@ class HopSkipJump(EvasionAttack):
 
         return current_sample
 
-    def _binary_search(
+    def _binary_search_batch(
         self,
         current_sample: np.ndarray,
         original_sample: np.ndarray,
-        target: int,
+        target: np.ndarray,
         norm: Union[int, float, str],
         clip_min: float,
         clip_max: float,
         threshold: Optional[float] = None,
     ) -> np.ndarray:
         """
-        Binary search to approach the boundary.
+        Binary search to approach the boundary for a group of examples. The bisections of all examples are vectorized
+        and examples are removed from the search once their interval is smaller than the threshold.
 
-        :param current_sample: Current adversarial example.
-        :param original_sample: The original input.
-        :param target: The target label.
+        :param current_sample: Current adversarial examples.
+        :param original_sample: The original inputs.
+        :param target: The target labels.
         :param norm: Order of the norm. Possible values: "inf", np.inf or 2.
         :param clip_min: Minimum value of an example.
         :param clip_max: Maximum value of an example.
         :param threshold: The upper threshold in binary search.
-        :return: an adversarial example.
+        :return: The adversarial examples.
         """
-        # First set upper and lower bounds as well as the threshold for the binary search
+        shape = (-1,) + (1,) * (current_sample.ndim - 1)
+
+        # First set upper and lower bounds as well as the thresholds for the binary search
+        lower_bound = np.zeros(current_sample.shape[0])
         if norm == 2:
-            (upper_bound, lower_bound) = (1, 0)
+            upper_bound = np.ones(current_sample.shape[0])
 
             if threshold is None:
                 threshold = self.theta
 
+            thresholds = np.full(current_sample.shape[0], threshold)
+
         else:
-            (upper_bound, lower_bound) = (
-                np.max(abs(original_sample - current_sample)),
-                0,
-            )
+            upper_bound = np.max(
+                abs(original_sample - current_sample), axis=tuple(range(1, current_sample.ndim))
+            ).astype(np.float64)
 
             if threshold is None:
-                threshold = np.minimum(upper_bound * self.theta, self.theta)
+                thresholds = np.minimum(upper_bound * self.theta, self.theta)
+            else:
+                thresholds = np.full(current_sample.shape[0], threshold)
 
         # Then start the binary search
-        while (upper_bound - lower_bound) > threshold:
-            # Interpolation point
-            alpha = (upper_bound + lower_bound) / 2.0
+        active = (upper_bound - lower_bound) > thresholds
+        while np.any(active):
+            # Interpolation points
+            alpha = (upper_bound[active] + lower_bound[active]) / 2.0
             interpolated_sample = self._interpolate(
-                current_sample=current_sample, original_sample=original_sample, alpha=alpha, norm=norm,
+                current_sample=current_sample[active],
+                original_sample=original_sample[active],
+                alpha=alpha.reshape(shape).astype(current_sample.dtype),
+                norm=norm,
             )
 
             # Update upper_bound and lower_bound
             satisfied = self._adversarial_satisfactory(
-                samples=interpolated_sample[None], target=target, clip_min=clip_min, clip_max=clip_max,
-            )[0]
-            lower_bound = np.where(satisfied == 0, alpha, lower_bound)
-            upper_bound = np.where(satisfied == 1, alpha, upper_bound)
+                samples=interpolated_sample, target=target[active], clip_min=clip_min, clip_max=clip_max,
+            )
+            lower_bound[active] = np.where(satisfied == 0, alpha, lower_bound[active])
+            upper_bound[active] = np.where(satisfied == 1, alpha, upper_bound[active])
+
+            active = (upper_bound - lower_bound) > thresholds
 
         result = self._interpolate(
-            current_sample=current_sample, original_sample=original_sample, alpha=upper_bound, norm=norm,
+            current_sample=current_sample,
+            original_sample=original_sample,
+            alpha=upper_bound.reshape(shape).astype(current_sample.dtype),
+            norm=norm,
         )
 
         return result
 
-    def _compute_delta(
+    def _compute_delta_batch(
         self, current_sample: np.ndarray, original_sample: np.ndarray, clip_min: float, clip_max: float,
-    ) -> float:
+    ) -> np.ndarray:
         """
-        Compute the delta parameter.
+        Compute the delta parameters of a group of examples.
 
-        :param current_sample: Current adversarial example.
-        :param original_sample: The original input.
+        :param current_sample: Current adversarial examples.
+        :param original_sample: The original inputs.
         :param clip_min: Minimum value of an example.
         :param clip_max: Maximum value of an example.
-        :return: Delta value.
+        :return: Delta values.
         """
-        # Note: This is a bit different from the original paper, instead we keep those that are
-        # implemented in the original source code of the authors
         if self.curr_iter == 0:
-            return 0.1 * (clip_max - clip_min)
+            return np.full(current_sample.shape[0], 0.1 * (clip_max - clip_min))
 
+        axis = tuple(range(1, current_sample.ndim))
         if self.norm == 2:
-            dist = np.linalg.norm(original_sample - current_sample)
+            dist = np.sqrt(np.sum((original_sample - current_sample) ** 2, axis=axis))
             delta = np.sqrt(np.prod(self.estimator.input_shape)) * self.theta * dist
         else:
-            dist = np.max(abs(original_sample - current_sample))
+            dist = np.max(abs(original_sample - current_sample), axis=axis)
             delta = np.prod(self.estimator.input_shape) * self.theta * dist
 
         return delta
 
-    def _compute_update(
-        self, current_sample: np.ndarray, num_eval: int, delta: float, target: int, clip_min: float, clip_max: float,
+    def _compute_update_batch(
+        self,
+        current_sample: np.ndarray,
+        num_eval: int,
+        delta: np.ndarray,
+        target: np.ndarray,
+        clip_min: float,
+        clip_max: float,
     ) -> np.ndarray:
         """
-        Compute the update in Eq.(14).
+        Compute the update in Eq.(14) for a group of examples. The random probes of all examples are drawn and
+        classified together, in chunks of about `batch_size` probes.
 
-        :param current_sample: Current adversarial example.
-        :param num_eval: The number of evaluations for estimating gradient.
-        :param delta: The size of random perturbation.
-        :param target: The target label.
+        :param current_sample: Current adversarial examples.
+        :param num_eval: The number of evaluations for estimating each gradient.
+        :param delta: The sizes of random perturbation.
+        :param target: The target labels.
         :param clip_min: Minimum value of an example.
         :param clip_max: Maximum value of an example.
-        :return: an updated perturbation.
+        :return: The updated perturbations.
         """
-        # Generate random noise
-        rnd_noise_shape = [num_eval] + list(self.estimator.input_shape)
-        if self.norm == 2:
-            rnd_noise = np.random.randn(*rnd_noise_shape).astype(ART_NUMPY_DTYPE)
-        else:
-            rnd_noise = np.random.uniform(low=-1, high=1, size=rnd_noise_shape).astype(ART_NUMPY_DTYPE)
+        nb_samples = current_sample.shape[0]
+        input_dims = len(self.estimator.input_shape)
+        delta = delta.reshape((-1, 1) + (1,) * input_dims).astype(ART_NUMPY_DTYPE)
 
-        # Normalize random noise to fit into the range of input data
-        rnd_noise = rnd_noise / np.sqrt(
-            np.sum(rnd_noise ** 2, axis=tuple(range(len(rnd_noise_shape)))[1:], keepdims=True,)
-        )
-        eval_samples = np.clip(current_sample + delta * rnd_noise, clip_min, clip_max)
-        rnd_noise = (eval_samples - current_sample) / delta
+        # Sums over the probes of each example of the outcomes, the noise and the noise weighted by the outcomes
+        sum_f_val = np.zeros((nb_samples,) + (1,) * input_dims, dtype=ART_NUMPY_DTYPE)
+        sum_noise = np.zeros(current_sample.shape, dtype=ART_NUMPY_DTYPE)
+        sum_f_noise = np.zeros(current_sample.shape, dtype=ART_NUMPY_DTYPE)
 
-        # Compute gradient: This is a bit different from the original paper, instead we keep those that are
-        # implemented in the original source code of the authors
-        satisfied = self._adversarial_satisfactory(
-            samples=eval_samples, target=target, clip_min=clip_min, clip_max=clip_max
-        )
-        f_val = 2 * satisfied.reshape([num_eval] + [1] * len(self.estimator.input_shape)) - 1.0
-        f_val = f_val.astype(ART_NUMPY_DTYPE)
+        nb_eval_chunk = max(1, self.batch_size // nb_samples)
+        for begin in range(0, num_eval, nb_eval_chunk):
+            nb_eval = min(nb_eval_chunk, num_eval - begin)
 
-        if np.mean(f_val) == 1.0:
-            grad = np.mean(rnd_noise, axis=0)
-        elif np.mean(f_val) == -1.0:
-            grad = -np.mean(rnd_noise, axis=0)
-        else:
-            f_val -= np.mean(f_val)
-            grad = np.mean(f_val * rnd_noise, axis=0)
+            # Generate random noise
+            rnd_noise_shape = [nb_samples, nb_eval] + list(self.estimator.input_shape)
+            if self.norm == 2:
+                rnd_noise = np.random.randn(*rnd_noise_shape).astype(ART_NUMPY_DTYPE)
+            else:
+                rnd_noise = np.random.uniform(low=-1, high=1, size=rnd_noise_shape).astype(ART_NUMPY_DTYPE)
+
+            # Normalize random noise to fit into the range of input data
+            rnd_noise /= np.sqrt(np.sum(rnd_noise ** 2, axis=tuple(range(2, len(rnd_noise_shape))), keepdims=True))
+            eval_samples = np.clip(current_sample[:, None] + delta * rnd_noise, clip_min, clip_max)
+            rnd_noise = (eval_samples - current_sample[:, None]) / delta
+
+            satisfied = self._adversarial_satisfactory(
+                samples=eval_samples.reshape([-1] + list(self.estimator.input_shape)),
+                target=np.repeat(target, nb_eval),
+                clip_min=clip_min,
+                clip_max=clip_max,
+            )
+            f_val = 2 * satisfied.reshape([nb_samples, nb_eval] + [1] * input_dims) - 1.0
+            f_val = f_val.astype(ART_NUMPY_DTYPE)
 
-        # Compute update
+            sum_f_val += np.sum(f_val, axis=1)
+            sum_noise += np.sum(rnd_noise, axis=1)
+            sum_f_noise += np.sum(f_val * rnd_noise, axis=1)
+
+        # Compute gradients: This is a bit different from the original paper, instead we keep those that are
+        # implemented in the original source code of the authors. If all probes of an example agree, its gradient is
+        # the mean of the noise with the sign of the probes, otherwise the outcomes are centered on their mean
+        f_mean = sum_f_val / num_eval
+        f_mean[np.abs(f_mean) == 1.0] = 0.0
+        grad = (sum_f_noise - f_mean * sum_noise) / num_eval
+
+        # Compute updates
         if self.norm == 2:
-            result = grad / np.linalg.norm(grad)
+            result = grad / np.sqrt(np.sum(grad ** 2, axis=tuple(range(1, grad.ndim)), keepdims=True))
         else:
             result = np.sign(grad)
 
         return result
 
     def _adversarial_satisfactory(
-        self, samples: np.ndarray, target: int, clip_min: float, clip_max: float
+        self, samples: np.ndarray, target: Union[int, np.ndarray], clip_min: float, clip_max: float
     ) -> np.ndarray:
         """
         Check whether an image is adversarial.
 
         :param samples: A batch of examples.
-        :param target: The target label.
+        :param target: The target label, or an array of target labels with one label per example.
         :param clip_min: Minimum value of an example.
         :param clip_max: Maximum value of an example.
         :return: An array of 0/1.
@@ -524,14 +582,17 @@ class HopSkipJump(EvasionAttack):
 
     @staticmethod
     def _interpolate(
-        current_sample: np.ndarray, original_sample: np.ndarray, alpha: float, norm: Union[int, float, str]
+        current_sample: np.ndarray,
+        original_sample: np.ndarray,
+        alpha: Union[float, np.ndarray],
+        norm: Union[int, float, str],
     ) -> np.ndarray:
         """
         Interpolate a new sample based on the original and the current samples.
 
         :param current_sample: Current adversarial example.
         :param original_sample: The original input.
-        :param alpha: The coefficient of interpolation.
+        :param alpha: The coefficient of interpolation, or coefficients broadcastable to the examples.
         :param norm: Order of the norm. Possible values: "inf", np.inf or 2.
         :return: An adversarial example.
         """
@@ -561,3 +622,12 @@ class HopSkipJump(EvasionAttack):
 
         if not isinstance(self.init_size, (int, np.int)) or self.init_size <= 0:
             raise ValueError("The number of initial trials must be a positive integer.")
+
+        if not isinstance(self.init_block_size, (int, np.int)) or self.init_block_size <= 0:
+            raise ValueError("The block size `init_block_size` has to be a positive integer.")
+
+        if not isinstance(self.batch_size, (int, np.int)) or self.batch_size <= 0:
+            raise ValueError("The batch size `batch_size` has to be a positive integer.")
+
+        if not isinstance(self.nb_parallel_samples, (int, np.int)) or self.nb_parallel_samples <= 0:
+            raise ValueError("The number of parallel samples `nb_parallel_samples` has to be a positive integer.")
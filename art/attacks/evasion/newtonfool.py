@@ -26,13 +26,13 @@ import logging
 from typing import Optional, TYPE_CHECKING
 
 import numpy as np
-from tqdm import trange
+from tqdm import tqdm
 
 from art.attacks.attack import EvasionAttack
 from art.config import ART_NUMPY_DTYPE
 from art.estimators.estimator import BaseEstimator
 from art.estimators.classification.classifier import ClassGradientsMixin
-from art.utils import to_categorical, compute_success
+from art.utils import ActiveSet, to_categorical, compute_success
 
 if TYPE_CHECKING:
     from art.utils import CLASSIFIER_CLASS_LOSS_GRADIENTS_TYPE
@@ -47,7 +47,7 @@ class NewtonFool(EvasionAttack):
     | Paper link: http://doi.acm.org/10.1145/3134600.3134635
     """
 
-    attack_params = EvasionAttack.attack_params + ["max_iter", "eta", "batch_size"]
+    attack_params = EvasionAttack.attack_params + ["max_iter", "eta", "batch_size", "early_stop"]
     _estimator_requirements = (BaseEstimator, ClassGradientsMixin)
 
     def __init__(
@@ -56,6 +56,7 @@ class NewtonFool(EvasionAttack):
         max_iter: int = 100,
         eta: float = 0.01,
         batch_size: int = 1,
+        early_stop: bool = False,
     ) -> None:
         """
         Create a NewtonFool attack instance.
@@ -64,11 +65,15 @@ class NewtonFool(EvasionAttack):
         :param max_iter: The maximum number of iterations.
         :param eta: The eta coefficient.
         :param batch_size: Size of the batch on which adversarial samples are generated.
+        :param early_stop: Stop iterating on a sample as soon as it is misclassified and refill the batch with pending
+                           samples. The samples are then clipped after every iteration, so that they remain adversarial
+                           after clipping.
         """
         super().__init__(estimator=classifier)
         self.max_iter = max_iter
         self.eta = eta
         self.batch_size = batch_size
+        self.early_stop = early_stop
         self._check_params()
 
     def generate(self, x: np.ndarray, y: Optional[np.ndarray] = None, **kwargs) -> np.ndarray:
@@ -84,43 +89,53 @@ class NewtonFool(EvasionAttack):
         # Initialize variables
         y_pred = self.estimator.predict(x, batch_size=self.batch_size)
         pred_class = np.argmax(y_pred, axis=1)
-
-        # Compute perturbation with implicit batching
-        for batch_id in trange(int(np.ceil(x_adv.shape[0] / float(self.batch_size))), desc="NewtonFool"):
-            batch_index_1, batch_index_2 = batch_id * self.batch_size, (batch_id + 1) * self.batch_size
-            batch = x_adv[batch_index_1:batch_index_2]
-
-            # Main algorithm for each batch
-            norm_batch = np.linalg.norm(np.reshape(batch, (batch.shape[0], -1)), axis=1)
-            l_batch = pred_class[batch_index_1:batch_index_2]
+        norm_x = np.linalg.norm(np.reshape(x_adv, (x_adv.shape[0], -1)), axis=1)
+        nb_iter = np.zeros(x_adv.shape[0], dtype=int)
+
+        # Main loop of the algorithm on an active set of samples which is refilled as soon as samples reached `max_iter`
+        # iterations, or are misclassified if `early_stop` is true
+        active_set = ActiveSet(x_adv.shape[0], self.batch_size)
+        pbar = tqdm(total=x_adv.shape[0], desc="NewtonFool")
+        while len(active_set) > 0:
+            active_indices = active_set.indices
+            batch = x_adv[active_indices]
+            l_batch = pred_class[active_indices]
             l_b = to_categorical(l_batch, self.estimator.nb_classes).astype(bool)
 
-            # Main loop of the algorithm
-            for _ in range(self.max_iter):
-                # Compute score
-                score = self.estimator.predict(batch)[l_b]
+            # Compute score and the gradients of the attacked class in one pass
+            y_pred_batch, grads = self.estimator.predict_and_weighted_class_gradient(
+                batch, l_b.astype(ART_NUMPY_DTYPE), batch_size=self.batch_size
+            )
+            score = y_pred_batch[l_b]
+            if self.early_stop:
+                fooled = np.argmax(y_pred_batch, axis=1) != l_batch
+            else:
+                fooled = np.zeros(batch.shape[0], dtype=bool)
+            norm_grad = np.linalg.norm(np.reshape(grads, (batch.shape[0], -1)), axis=1)
+
+            # Theta
+            theta = self._compute_theta(norm_x[active_indices], score, norm_grad)
 
-                # Compute the gradients and norm
-                grads = self.estimator.class_gradient(batch, label=l_batch)
-                if grads.shape[1] == 1:
-                    grads = np.squeeze(grads, axis=1)
-                norm_grad = np.linalg.norm(np.reshape(grads, (batch.shape[0], -1)), axis=1)
+            # Perturbation
+            di_batch = self._compute_pert(theta, grads, norm_grad)
 
-                # Theta
-                theta = self._compute_theta(norm_batch, score, norm_grad)
+            # Update xi and perturbation of the samples which are still classified as their original class
+            x_adv[active_indices[~fooled]] = batch[~fooled] + di_batch[~fooled]
+            if self.early_stop and self.estimator.clip_values is not None:
+                clip_min, clip_max = self.estimator.clip_values
+                x_adv[active_indices[~fooled]] = np.clip(x_adv[active_indices[~fooled]], clip_min, clip_max)
+            nb_iter[active_indices[~fooled]] += 1
 
-                # Perturbation
-                di_batch = self._compute_pert(theta, grads, norm_grad)
+            finished = fooled | (nb_iter[active_indices] >= self.max_iter)
+            active_set.update(finished)
+            pbar.update(int(np.sum(finished)))
 
-                # Update xi and perturbation
-                batch += di_batch
+        pbar.close()
 
-            # Apply clip
-            if self.estimator.clip_values is not None:
-                clip_min, clip_max = self.estimator.clip_values
-                x_adv[batch_index_1:batch_index_2] = np.clip(batch, clip_min, clip_max)
-            else:
-                x_adv[batch_index_1:batch_index_2] = batch
+        # Apply clip
+        if self.estimator.clip_values is not None:
+            clip_min, clip_max = self.estimator.clip_values
+            x_adv = np.clip(x_adv, clip_min, clip_max)
 
         logger.info(
             "Success rate of NewtonFool attack: %.2f%%",
@@ -138,6 +153,9 @@ class NewtonFool(EvasionAttack):
         if self.batch_size <= 0:
             raise ValueError("The batch size `batch_size` has to be positive.")
 
+        if not isinstance(self.early_stop, bool):
+            raise ValueError("The flag `early_stop` has to be of type bool.")
+
     def _compute_theta(self, norm_batch: np.ndarray, score: np.ndarray, norm_grad: np.ndarray) -> np.ndarray:
         """
         Function to compute the theta at each step.
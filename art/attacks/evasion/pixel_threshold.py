@@ -29,7 +29,7 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 import logging
 from itertools import product
-from typing import List, Optional, Tuple, Union, TYPE_CHECKING
+from typing import List, Optional, Tuple, TYPE_CHECKING
 
 import numpy as np
 
@@ -67,11 +67,17 @@ class PixelThreshold(EvasionAttack):
         https://arxiv.org/abs/1906.06026
     """
 
-    attack_params = EvasionAttack.attack_params + ["th", "es", "targeted", "verbose"]
+    attack_params = EvasionAttack.attack_params + ["th", "es", "targeted", "verbose", "nb_parallel_samples"]
     _estimator_requirements = (BaseEstimator, NeuralNetworkMixin, ClassifierMixin)
 
     def __init__(
-        self, classifier: "CLASSIFIER_NEURALNETWORK_TYPE", th: Optional[int], es: int, targeted: bool, verbose: bool,
+        self,
+        classifier: "CLASSIFIER_NEURALNETWORK_TYPE",
+        th: Optional[int],
+        es: int,
+        targeted: bool,
+        verbose: bool,
+        nb_parallel_samples: int = 1,
     ) -> None:
         """
         Create a :class:`.PixelThreshold` instance.
@@ -81,6 +87,9 @@ class PixelThreshold(EvasionAttack):
         :param es: Indicates whether the attack uses CMAES (0) or DE (1) as Evolutionary Strategy.
         :param targeted: Indicates whether the attack is targeted (True) or untargeted (False).
         :param verbose: Indicates whether to print verbose messages of ES used.
+        :param nb_parallel_samples: Number of images attacked together with DE. If larger than 1, the populations of
+               the images of a group are evolved together and the candidates of all of them are passed to the
+               classifier together in each generation.
         """
         super().__init__(estimator=classifier)
 
@@ -90,6 +99,7 @@ class PixelThreshold(EvasionAttack):
         self.es = es
         self._targeted = targeted
         self.verbose = verbose
+        self.nb_parallel_samples = nb_parallel_samples
         PixelThreshold._check_params(self)
 
         if self.estimator.channels_first:
@@ -111,6 +121,8 @@ class PixelThreshold(EvasionAttack):
             raise ValueError("The flag `targeted` has to be of type bool.")
         if not isinstance(self.verbose, bool):
             raise ValueError("The flag `verbose` has to be of type bool.")
+        if not isinstance(self.nb_parallel_samples, (int, np.int)) or self.nb_parallel_samples <= 0:
+            raise ValueError("The number of parallel samples `nb_parallel_samples` has to be a positive integer.")
 
     def generate(self, x: np.ndarray, y: Optional[np.ndarray] = None, max_iter: int = 100, **kwargs) -> np.ndarray:
         """
@@ -141,30 +153,45 @@ class PixelThreshold(EvasionAttack):
             x = x * 255.0
 
         adv_x_best = []
-        for image, target_class in tqdm(zip(x, y), desc="Pixel threshold"):
-            if self.th is None:
-                self.min_th = 127
-                start, end = 1, 127
-                while True:
-                    image_result: Union[List[np.ndarray], np.ndarray] = []
-                    threshold = (start + end) // 2
-                    success, trial_image_result = self._attack(image, target_class, threshold, max_iter)
-                    if image_result or success:
-                        image_result = trial_image_result
-                    if success:
-                        end = threshold - 1
-                    else:
-                        start = threshold + 1
-                    if success:
-                        self.min_th = threshold
-                    if end < start:
-                        if isinstance(image_result, list) and not image_result:
-                            # success = False
-                            image_result = image
-                        break
-            else:
-                success, image_result = self._attack(image, target_class, self.th, max_iter)
-            adv_x_best += [image_result]
+        if self.es == 1:
+            # Each image uses its own random number generator, so that the result does not depend on the group of
+            # images it is attacked with
+            seeds = np.random.randint(np.iinfo(np.int32).max, size=x.shape[0])
+            random_states = [np.random.RandomState(seed) for seed in seeds]
+            nb_batches = int(np.ceil(x.shape[0] / float(self.nb_parallel_samples)))
+            for batch_id in tqdm(range(nb_batches), desc="Pixel threshold"):
+                batch_index_1, batch_index_2 = (
+                    batch_id * self.nb_parallel_samples,
+                    (batch_id + 1) * self.nb_parallel_samples,
+                )
+                adv_x_best += list(
+                    self._generate_batch(
+                        x[batch_index_1:batch_index_2],
+                        y[batch_index_1:batch_index_2],
+                        max_iter,
+                        random_states[batch_index_1:batch_index_2],
+                    )
+                )
+        else:
+            for image, target_class in tqdm(zip(x, y), desc="Pixel threshold"):
+                if self.th is None:
+                    self.min_th = 127
+                    start, end = 1, 127
+                    image_result = image
+                    while start <= end:
+                        threshold = (start + end) // 2
+                        success, trial_image_result = self._attack(image, target_class, threshold, max_iter)
+
+                        # Keep the result of the smallest successful threshold
+                        if success:
+                            image_result = trial_image_result
+                            self.min_th = threshold
+                            end = threshold - 1
+                        else:
+                            start = threshold + 1
+                else:
+                    success, image_result = self._attack(image, target_class, self.th, max_iter)
+                adv_x_best += [image_result]
 
         adv_x_best = np.array(adv_x_best)
 
@@ -224,7 +251,7 @@ class PixelThreshold(EvasionAttack):
     ) -> Tuple[bool, np.ndarray]:
         """
         Attack the given image `image` with the threshold `limit` for the `target_class` which is true label for
-        untargeted attack and targeted label for targeted attack.
+        untargeted attack and targeted label for targeted attack with CMAES.
         """
         bounds, initial = self._get_bounds(image, limit)
 
@@ -233,64 +260,167 @@ class PixelThreshold(EvasionAttack):
             return predictions if not self.targeted else 1 - predictions
 
         def callback_fn(x, convergence=None):
-            if self.es == 0:
-                if self._attack_success(x.result[0], image, target_class):
-                    raise Exception("Attack Completed :) Earlier than expected")
-            else:
-                return self._attack_success(x, image, target_class)
+            if self._attack_success(x.result[0], image, target_class):
+                raise Exception("Attack Completed :) Earlier than expected")
 
-        if self.es == 0:
-            from cma import CMAOptions
+        from cma import CMAOptions
 
-            opts = CMAOptions()
-            if not self.verbose:
-                opts.set("verbose", -9)
-                opts.set("verb_disp", 40000)
-                opts.set("verb_log", 40000)
-                opts.set("verb_time", False)
+        opts = CMAOptions()
+        if not self.verbose:
+            opts.set("verbose", -9)
+            opts.set("verb_disp", 40000)
+            opts.set("verb_log", 40000)
+            opts.set("verb_time", False)
 
-            opts.set("bounds", bounds)
+        opts.set("bounds", bounds)
 
-            if self.type_attack == 0:
-                std = 63
-            else:
-                std = limit
+        if self.type_attack == 0:
+            std = 63
+        else:
+            std = limit
 
-            from cma import CMAEvolutionStrategy
+        from cma import CMAEvolutionStrategy
 
-            strategy = CMAEvolutionStrategy(initial, std / 4, opts)
+        strategy = CMAEvolutionStrategy(initial, std / 4, opts)
 
-            try:
-                strategy.optimize(
-                    predict_fn,
-                    maxfun=max(1, 400 // len(bounds)) * len(bounds) * 100,
-                    callback=callback_fn,
-                    iterations=1,
-                )
-            except Exception as exception:
-                if self.verbose:
-                    print(exception)
-
-            adv_x = strategy.result[0]
-        else:
-            strategy = differential_evolution(
+        try:
+            strategy.optimize(
                 predict_fn,
-                bounds,
-                disp=self.verbose,
-                maxiter=max_iter,
-                popsize=max(1, 400 // len(bounds)),
-                recombination=1,
-                atol=-1,
+                maxfun=max(1, 400 // len(bounds)) * len(bounds) * 100,
                 callback=callback_fn,
-                polish=False,
+                iterations=1,
             )
-            adv_x = strategy.x
+        except Exception as exception:
+            if self.verbose:
+                print(exception)
+
+        adv_x = strategy.result[0]
 
         if self._attack_success(adv_x, image, target_class):
             return True, self._perturb_image(adv_x, image)[0]
         else:
             return False, image
 
+    def _generate_batch(
+        self, x: np.ndarray, y: np.ndarray, max_iter: int, random_states: List[np.random.RandomState]
+    ) -> np.ndarray:
+        """
+        Attack a group of images together with DE, searching the minimum thresholds of all images together if
+        `self.th` is None.
+
+        :param x: An array with the original images.
+        :param y: An array with the target classes, the true labels for untargeted attack and the targeted labels for
+                  targeted attack.
+        :param max_iter: Maximum number of generations of DE.
+        :param random_states: The random number generators of the images.
+        :return: An array holding the adversarial images, or the original images where the attack failed.
+        """
+        if self.th is not None:
+            _, adv_x = self._attack_batch(x, y, np.full(x.shape[0], self.th), max_iter, random_states)
+            return adv_x
+
+        adv_x = x.copy()
+        start, end = np.ones(x.shape[0], dtype=int), np.full(x.shape[0], 127)
+        while True:
+            active = np.where(start <= end)[0]
+            if active.size == 0:
+                break
+            threshold = (start[active] + end[active]) // 2
+            success, trial_adv_x = self._attack_batch(
+                x[active], y[active], threshold, max_iter, [random_states[ind] for ind in active]
+            )
+
+            # Keep the result of the smallest successful threshold
+            adv_x[active[success]] = trial_adv_x[success]
+            end[active[success]] = threshold[success] - 1
+            start[active[~success]] = threshold[~success] + 1
+
+        return adv_x
+
+    def _attack_batch(
+        self,
+        images: np.ndarray,
+        target_classes: np.ndarray,
+        limits: np.ndarray,
+        max_iter: int,
+        random_states: List[np.random.RandomState],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Attack the given images `images` with the thresholds `limits` for the `target_classes` with DE. The
+        populations of all images are evolved together and the candidates of each generation of all images are
+        passed to the classifier in one call to `predict`.
+
+        :param images: An array with the original images.
+        :param target_classes: An array with the target classes, the true labels for untargeted attack and the
+                               targeted labels for targeted attack.
+        :param limits: An array with the threshold of each image.
+        :param max_iter: Maximum number of generations of DE.
+        :param random_states: The random number generators of the images.
+        :return: A tuple holding a boolean array showing which attacks succeeded and an array with the adversarial
+                 images, or the original images where the attack failed.
+        """
+        solvers = []
+        for image, limit, random_state in zip(images, limits, random_states):
+            bounds, _ = self._get_bounds(image, int(limit))
+            solvers.append(
+                DifferentialEvolutionSolver(
+                    None,
+                    bounds,
+                    maxiter=max_iter,
+                    popsize=max(1, 400 // len(bounds)),
+                    recombination=1,
+                    atol=-1,
+                    seed=random_state,
+                    polish=False,
+                )
+            )
+
+        def predict_fn(candidates: List[np.ndarray], indices: np.ndarray) -> List[np.ndarray]:
+            perturbed = np.concatenate(
+                [self._perturb_image(candidate, images[ind]) for candidate, ind in zip(candidates, indices)]
+            )
+            predictions = self.estimator.predict(perturbed)
+            sections = np.cumsum([len(candidate) for candidate in candidates])[:-1]
+            return np.split(predictions, sections)
+
+        def success_fn(indices: np.ndarray) -> np.ndarray:
+            predictions = predict_fn([solvers[ind].x[np.newaxis] for ind in indices], indices)
+            predicted_classes = np.argmax(np.concatenate(predictions), axis=1)
+            if self.targeted:
+                return predicted_classes == target_classes[indices]
+            return predicted_classes != target_classes[indices]
+
+        def energies(predictions: np.ndarray, target_class: int) -> np.ndarray:
+            probabilities = predictions[:, target_class]
+            return probabilities if not self.targeted else 1 - probabilities
+
+        # Calculate the initial energies of all populations
+        indices = np.arange(len(solvers))
+        predictions = predict_fn([solvers[ind]._scale_parameters(solvers[ind].population) for ind in indices], indices)
+        for ind, prediction in zip(indices, predictions):
+            solvers[ind]._set_population_energies(energies(prediction, target_classes[ind]))
+
+        for _ in range(max_iter):
+            # Evolve the populations of all active images by a generation
+            trials = [solvers[ind]._next_trials() for ind in indices]
+            predictions = predict_fn(
+                [solvers[ind]._scale_parameters(trial) for ind, trial in zip(indices, trials)], indices
+            )
+            for ind, trial, prediction in zip(indices, trials, predictions):
+                solvers[ind]._update_population(trial, energies(prediction, target_classes[ind]))
+
+            # Stop evolving the images whose best solution is adversarial
+            indices = indices[~success_fn(indices)]
+            if indices.size == 0:
+                break
+
+        success = success_fn(np.arange(len(solvers)))
+        adv_x = images.copy()
+        for ind in np.where(success)[0]:
+            adv_x[ind] = self._perturb_image(solvers[ind].x, images[ind])[0]
+
+        return success, adv_x
+
 
 class PixelAttack(PixelThreshold):
     """
@@ -311,6 +441,7 @@ class PixelAttack(PixelThreshold):
         es: int = 0,
         targeted: bool = False,
         verbose: bool = False,
+        nb_parallel_samples: int = 1,
     ) -> None:
         """
         Create a :class:`.PixelAttack` instance.
@@ -320,8 +451,11 @@ class PixelAttack(PixelThreshold):
         :param es: Indicates whether the attack uses CMAES (0) or DE (1) as Evolutionary Strategy.
         :param targeted: Indicates whether the attack is targeted (True) or untargeted (False).
         :param verbose: Indicates whether to print verbose messages of ES used.
+        :param nb_parallel_samples: Number of images attacked together with DE. If larger than 1, the populations of
+               the images of a group are evolved together and the candidates of all of them are passed to the
+               classifier together in each generation.
         """
-        super().__init__(classifier, th, es, targeted, verbose)
+        super().__init__(classifier, th, es, targeted, verbose, nb_parallel_samples)
         self.type_attack = 0
 
     def _perturb_image(self, x: np.ndarray, img: np.ndarray) -> np.ndarray:
@@ -331,14 +465,14 @@ class PixelAttack(PixelThreshold):
         if x.ndim < 2:
             x = np.array([x])
         imgs = np.tile(img, [len(x)] + [1] * (x.ndim + 1))
-        x = x.astype(int)
-        for adv, image in zip(x, imgs):
-            for pixel in np.split(adv, len(adv) // (2 + self.img_channels)):
-                x_pos, y_pos, *rgb = pixel
-                if not self.estimator.channels_first:
-                    image[x_pos % self.img_rows, y_pos % self.img_cols] = rgb
-                else:
-                    image[:, x_pos % self.img_rows, y_pos % self.img_cols] = rgb
+        x = x.astype(int).reshape((len(x), -1, 2 + self.img_channels))
+        x_pos = x[:, :, 0] % self.img_rows
+        y_pos = x[:, :, 1] % self.img_cols
+        index = np.arange(len(x))[:, np.newaxis]
+        if not self.estimator.channels_first:
+            imgs[index, x_pos, y_pos] = x[:, :, 2:]
+        else:
+            imgs[index, :, x_pos, y_pos] = x[:, :, 2:]
         return imgs
 
     def _get_bounds(self, img: np.ndarray, limit) -> Tuple[List[list], list]:
@@ -392,6 +526,7 @@ class ThresholdAttack(PixelThreshold):
         es: int = 0,
         targeted: bool = False,
         verbose: bool = False,
+        nb_parallel_samples: int = 1,
     ) -> None:
         """
         Create a :class:`.PixelThreshold` instance.
@@ -401,8 +536,11 @@ class ThresholdAttack(PixelThreshold):
         :param es: Indicates whether the attack uses CMAES (0) or DE (1) as Evolutionary Strategy.
         :param targeted: Indicates whether the attack is targeted (True) or untargeted (False).
         :param verbose: Indicates whether to print verbose messages of ES used.
+        :param nb_parallel_samples: Number of images attacked together with DE. If larger than 1, the populations of
+               the images of a group are evolved together and the candidates of all of them are passed to the
+               classifier together in each generation.
         """
-        super().__init__(classifier, th, es, targeted, verbose)
+        super().__init__(classifier, th, es, targeted, verbose, nb_parallel_samples)
         self.type_attack = 1
 
     def _perturb_image(self, x: np.ndarray, img: np.ndarray) -> np.ndarray:
@@ -411,13 +549,7 @@ class ThresholdAttack(PixelThreshold):
         """
         if x.ndim < 2:
             x = x[None, ...]
-        imgs = np.tile(img, [len(x)] + [1] * (x.ndim + 1))
-        x = x.astype(int)
-        for adv, image in zip(x, imgs):
-            for count, (i, j, k) in enumerate(
-                product(range(image.shape[-3]), range(image.shape[-2]), range(image.shape[-1]),)
-            ):
-                image[i, j, k] = adv[count]
+        imgs = x.astype(int).reshape((len(x),) + img.shape).astype(img.dtype)
         return imgs
 
 
@@ -1197,24 +1329,20 @@ class DifferentialEvolutionSolver:
         # CHANGES: self.func operates on the entire parameters array
         ##############
         itersize = max(0, min(len(self.population), self.maxfun - self._nfev + 1))
-        candidates = self.population[:itersize]
-        parameters = np.array([self._scale_parameters(c) for c in candidates])  # TODO: can be vectorized
+        parameters = self._scale_parameters(self.population[:itersize])
         energies = self.func(parameters, *self.args)
-        self.population_energies = energies
-        self._nfev += itersize
-
-        # for index, candidate in enumerate(self.population):
-        #     if self._nfev > self.maxfun:
-        #         break
-
-        #     parameters = self._scale_parameters(candidate)
-        #     self.population_energies[index] = self.func(parameters,
-        #                                                 *self.args)
-        #     self._nfev += 1
-
+        self._set_population_energies(energies)
         ##############
         ##############
 
+    def _set_population_energies(self, energies):
+        """
+        Set the energies of the population members, evaluated by the caller on
+        the scaled population, and put the best member in first place.
+        """
+        self.population_energies = energies
+        self._nfev += len(energies)
+
         minval = np.argmin(self.population_energies)
 
         # put the lowest energy into the best solution position.
@@ -1242,68 +1370,52 @@ class DifferentialEvolutionSolver:
         if np.all(np.isinf(self.population_energies)):
             self._calculate_population_energies()
 
-        if self.dither is not None:
-            self.scale = self.random_number_generator.rand() * (self.dither[1] - self.dither[0]) + self.dither[0]
-
         ##############
         # CHANGES: self.func operates on the entire parameters array
         ##############
-
-        itersize = max(0, min(self.num_population_members, self.maxfun - self._nfev + 1))
-        trials = np.array([self._mutate(c) for c in range(itersize)])  # TODO:can be vectorized
-        for trial in trials:
-            self._ensure_constraint(trial)
-        parameters = np.array([self._scale_parameters(trial) for trial in trials])
-        energies = self.func(parameters, *self.args)
-        self._nfev += itersize
-
-        for candidate, (energy, trial) in enumerate(zip(energies, trials)):
-            # if the energy of the trial candidate is lower than the
-            # original population member then replace it
-            if energy < self.population_energies[candidate]:
-                self.population[candidate] = trial
-                self.population_energies[candidate] = energy
-
-                # if the trial candidate also has a lower energy than the
-                # best solution then replace that as well
-                if energy < self.population_energies[0]:
-                    self.population_energies[0] = energy
-                    self.population[0] = trial
-
-        # for candidate in range(self.num_population_members):
-        #     if self._nfev > self.maxfun:
-        #         raise StopIteration
-
-        #     # create a trial solution
-        #     trial = self._mutate(candidate)
-
-        #     # ensuring that it's in the range [0, 1)
-        #     self._ensure_constraint(trial)
-
-        #     # scale from [0, 1) to the actual parameter value
-        #     parameters = self._scale_parameters(trial)
-
-        #     # determine the energy of the objective function
-        #     energy = self.func(parameters, *self.args)
-        #     self._nfev += 1
-
-        #     # if the energy of the trial candidate is lower than the
-        #     # original population member then replace it
-        #     if energy < self.population_energies[candidate]:
-        #         self.population[candidate] = trial
-        #         self.population_energies[candidate] = energy
-
-        #         # if the trial candidate also has a lower energy than the
-        #         # best solution then replace that as well
-        #         if energy < self.population_energies[0]:
-        #             self.population_energies[0] = energy
-        #             self.population[0] = trial
-
+        trials = self._next_trials()
+        energies = self.func(self._scale_parameters(trials), *self.args)
+        self._update_population(trials, energies)
         ##############
         ##############
 
         return self.x, self.population_energies[0]
 
+    def _next_trials(self):
+        """
+        Create the trial vectors of a generation, one for each population
+        member, scaled to [0, 1). Their energies are passed back to
+        `_update_population`.
+        """
+        if self.dither is not None:
+            self.scale = self.random_number_generator.rand() * (self.dither[1] - self.dither[0]) + self.dither[0]
+
+        itersize = max(0, min(self.num_population_members, self.maxfun - self._nfev + 1))
+        trials = self._mutate(np.arange(itersize))
+        self._ensure_constraint(trials)
+        return trials
+
+    def _update_population(self, trials, energies):
+        """
+        Replace the population members by their trial vectors where these have
+        a lower energy, and the best solution by the best of these.
+        """
+        self._nfev += len(trials)
+
+        # if the energy of the trial candidate is lower than the
+        # original population member then replace it
+        improved = np.where(energies < self.population_energies[: len(trials)])[0]
+        self.population[improved] = trials[improved]
+        self.population_energies[improved] = energies[improved]
+
+        # if the best trial candidate also has a lower energy than the
+        # best solution then replace that as well
+        if improved.size > 0:
+            best = improved[np.argmin(energies[improved])]
+            if energies[best] < self.population_energies[0]:
+                self.population_energies[0] = energies[best]
+                self.population[0] = trials[best]
+
     def next(self):
         """
         Evolve the population by a single generation
@@ -1329,79 +1441,87 @@ class DifferentialEvolutionSolver:
         """
         return (parameters - self.__scale_arg1) / self.__scale_arg2 + 0.5
 
-    def _ensure_constraint(self, trial):
+    def _ensure_constraint(self, trials):
         """
         make sure the parameters lie between the limits
         """
-        for index in np.where((trial < 0) | (trial > 1))[0]:
-            trial[index] = self.random_number_generator.rand()
+        mask = (trials < 0) | (trials > 1)
+        trials[mask] = self.random_number_generator.rand(np.count_nonzero(mask))
 
-    def _mutate(self, candidate):
+    def _mutate(self, candidates):
         """
-        create a trial vector based on a mutation strategy
+        create trial vectors based on a mutation strategy, one for each of the
+        population members `candidates`
         """
-        trial = np.copy(self.population[candidate])
+        trials = np.copy(self.population[candidates])
+        nb_trials = len(candidates)
 
         rng = self.random_number_generator
 
-        fill_point = rng.randint(0, self.parameter_count)
+        fill_points = rng.randint(0, self.parameter_count, size=nb_trials)
 
         if self.strategy in ["currenttobest1exp", "currenttobest1bin"]:
-            bprime = self.mutation_func(candidate, self._select_samples(candidate, 5))
+            bprime = self.mutation_func(candidates, self._select_samples(candidates, 5))
         else:
-            bprime = self.mutation_func(self._select_samples(candidate, 5))
+            bprime = self.mutation_func(self._select_samples(candidates, 5))
 
         if self.strategy in self._binomial:
-            crossovers = rng.rand(self.parameter_count)
+            crossovers = rng.rand(nb_trials, self.parameter_count)
             crossovers = crossovers < self.cross_over_probability
             # the last one is always from the bprime vector for binomial
             # If you fill in modulo with a loop you have to set the last one to
             # true. If you don't use a loop then you can have any random entry
             # be True.
-            crossovers[fill_point] = True
-            trial = np.where(crossovers, bprime, trial)
-            return trial
+            crossovers[np.arange(nb_trials), fill_points] = True
+            trials = np.where(crossovers, bprime, trials)
+            return trials
 
         elif self.strategy in self._exponential:
-            i = 0
-            while i < self.parameter_count and rng.rand() < self.cross_over_probability:
-                trial[fill_point] = bprime[fill_point]
-                fill_point = (fill_point + 1) % self.parameter_count
-                i += 1
-
-            return trial
+            # the parameters are filled in modulo from the fill point for as
+            # long as the random numbers are below the crossover probability
+            below = rng.rand(nb_trials, self.parameter_count) < self.cross_over_probability
+            lengths = np.where(np.all(below, axis=1), self.parameter_count, np.argmin(below, axis=1))
+            steps = np.arange(self.parameter_count)
+            positions = (fill_points[:, np.newaxis] + steps) % self.parameter_count
+            crossovers = np.zeros((nb_trials, self.parameter_count), dtype=bool)
+            rows = np.broadcast_to(np.arange(nb_trials)[:, np.newaxis], positions.shape)
+            filled = steps < lengths[:, np.newaxis]
+            crossovers[rows[filled], positions[filled]] = True
+            trials = np.where(crossovers, bprime, trials)
+
+            return trials
 
     def _best1(self, samples):
         """
         best1bin, best1exp
         """
-        r_0, r_1 = samples[:2]
+        r_0, r_1 = samples[:, 0], samples[:, 1]
         return self.population[0] + self.scale * (self.population[r_0] - self.population[r_1])
 
     def _rand1(self, samples):
         """
         rand1bin, rand1exp
         """
-        r_0, r_1, r_2 = samples[:3]
+        r_0, r_1, r_2 = samples[:, 0], samples[:, 1], samples[:, 2]
         return self.population[r_0] + self.scale * (self.population[r_1] - self.population[r_2])
 
     def _randtobest1(self, samples):
         """
         randtobest1bin, randtobest1exp
         """
-        r_0, r_1, r_2 = samples[:3]
+        r_0, r_1, r_2 = samples[:, 0], samples[:, 1], samples[:, 2]
         bprime = np.copy(self.population[r_0])
         bprime += self.scale * (self.population[0] - bprime)
         bprime += self.scale * (self.population[r_1] - self.population[r_2])
         return bprime
 
-    def _currenttobest1(self, candidate, samples):
+    def _currenttobest1(self, candidates, samples):
         """
         currenttobest1bin, currenttobest1exp
         """
-        r_0, r_1 = samples[:2]
-        bprime = self.population[candidate] + self.scale * (
-            self.population[0] - self.population[candidate] + self.population[r_0] - self.population[r_1]
+        r_0, r_1 = samples[:, 0], samples[:, 1]
+        bprime = self.population[candidates] + self.scale * (
+            self.population[0] - self.population[candidates] + self.population[r_0] - self.population[r_1]
         )
         return bprime
 
@@ -1409,7 +1529,7 @@ class DifferentialEvolutionSolver:
         """
         best2bin, best2exp
         """
-        r_0, r_1, r_2, r_3 = samples[:4]
+        r_0, r_1, r_2, r_3 = samples[:, 0], samples[:, 1], samples[:, 2], samples[:, 3]
         bprime = self.population[0] + self.scale * (
             self.population[r_0] + self.population[r_1] - self.population[r_2] - self.population[r_3]
         )
@@ -1420,20 +1540,20 @@ class DifferentialEvolutionSolver:
         """
         rand2bin, rand2exp
         """
-        r_0, r_1, r_2, r_3, r_4 = samples
+        r_0, r_1, r_2, r_3, r_4 = samples[:, 0], samples[:, 1], samples[:, 2], samples[:, 3], samples[:, 4]
         bprime = self.population[r_0] + self.scale * (
             self.population[r_1] + self.population[r_2] - self.population[r_3] - self.population[r_4]
         )
 
         return bprime
 
-    def _select_samples(self, candidate, number_samples):
+    def _select_samples(self, candidates, number_samples):
         """
         obtain random integers from range(self.num_population_members),
-        without replacement.  You can't have the original candidate either.
+        without replacement, for each of the `candidates`.  You can't have the
+        original candidate either.
         """
-        idxs = list(range(self.num_population_members))
-        idxs.remove(candidate)
-        self.random_number_generator.shuffle(idxs)
-        idxs = idxs[:number_samples]
+        keys = self.random_number_generator.random_sample((len(candidates), self.num_population_members))
+        keys[np.arange(len(candidates)), candidates] = np.inf
+        idxs = np.argsort(keys, axis=1)[:, :number_samples]
         return idxs
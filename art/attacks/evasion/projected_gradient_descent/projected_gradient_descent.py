@@ -30,6 +30,7 @@ from typing import Optional, Union, TYPE_CHECKING
 
 import numpy as np
 
+from art.defences.preprocessor.preprocessor import PreprocessorPyTorch, PreprocessorTensorFlowV2
 from art.estimators.classification.pytorch import PyTorchClassifier
 from art.estimators.classification.tensorflow import TensorFlowV2Classifier
 from art.estimators.estimator import BaseEstimator, LossGradientsMixin
@@ -70,6 +71,8 @@ class ProjectedGradientDescent(EvasionAttack):
         "max_iter",
         "random_eps",
         "verbose",
+        "early_stop",
+        "nb_parallel_restarts",
     ]
 
     _estimator_requirements = (BaseEstimator, LossGradientsMixin)
@@ -86,6 +89,8 @@ class ProjectedGradientDescent(EvasionAttack):
         batch_size: int = 32,
         random_eps: bool = False,
         verbose: bool = True,
+        early_stop: bool = False,
+        nb_parallel_restarts: int = 1,
     ):
         """
         Create a :class:`.ProjectedGradientDescent` instance.
@@ -104,6 +109,13 @@ class ProjectedGradientDescent(EvasionAttack):
                                 at the original input.
         :param batch_size: Size of the batch on which adversarial samples are generated.
         :param verbose: Show progress bars.
+        :param early_stop: Stop iterating on a sample as soon as it is adversarial and refill the batch with pending
+                           samples. Only supported by the NumPy implementation, which is used for all estimators if
+                           true.
+        :param nb_parallel_restarts: Number of random initialisations stacked along the batch axis so that one
+                                     gradient computation advances all of them, using batches of up to
+                                     `batch_size * nb_parallel_restarts` samples. If larger than 1, the best random
+                                     initialisation is selected for each sample instead of for the whole dataset.
         """
         super().__init__(estimator=estimator)
 
@@ -116,17 +128,24 @@ class ProjectedGradientDescent(EvasionAttack):
         self.batch_size = batch_size
         self.random_eps = random_eps
         self.verbose = verbose
+        self.early_stop = early_stop
+        self.nb_parallel_restarts = nb_parallel_restarts
         ProjectedGradientDescent._check_params(self)
 
-        no_preprocessing = self.estimator.preprocessing is None or (
-            np.all(self.estimator.preprocessing[0] == 0) and np.all(self.estimator.preprocessing[1] == 1)
-        )
-        no_defences = not self.estimator.preprocessing_defences and not self.estimator.postprocessing_defences
+        # Standardisation and framework-specific preprocessing defences are applied as tensor operations by the
+        # framework-specific implementations
+        defences = self.estimator.preprocessing_defences or []
+        pytorch_defences = all(isinstance(defence, PreprocessorPyTorch) for defence in defences)
+        tensorflow_defences = all(isinstance(defence, PreprocessorTensorFlowV2) for defence in defences)
+        no_postprocessing = not self.estimator.postprocessing_defences
+
+        # The framework-specific implementations do not support early stopping
+        use_framework = no_postprocessing and not early_stop
 
         self._attack: Union[
             ProjectedGradientDescentPyTorch, ProjectedGradientDescentTensorFlowV2, ProjectedGradientDescentNumpy
         ]
-        if isinstance(self.estimator, PyTorchClassifier) and no_preprocessing and no_defences:
+        if isinstance(self.estimator, PyTorchClassifier) and pytorch_defences and use_framework:
             self._attack = ProjectedGradientDescentPyTorch(
                 estimator=estimator,  # type: ignore
                 norm=norm,
@@ -138,9 +157,10 @@ class ProjectedGradientDescent(EvasionAttack):
                 batch_size=batch_size,
                 random_eps=random_eps,
                 verbose=verbose,
+                nb_parallel_restarts=nb_parallel_restarts,
             )
 
-        elif isinstance(self.estimator, TensorFlowV2Classifier) and no_preprocessing and no_defences:
+        elif isinstance(self.estimator, TensorFlowV2Classifier) and tensorflow_defences and use_framework:
             self._attack = ProjectedGradientDescentTensorFlowV2(
                 estimator=estimator,  # type: ignore
                 norm=norm,
@@ -152,6 +172,7 @@ class ProjectedGradientDescent(EvasionAttack):
                 batch_size=batch_size,
                 random_eps=random_eps,
                 verbose=verbose,
+                nb_parallel_restarts=nb_parallel_restarts,
             )
 
         else:
@@ -166,6 +187,8 @@ class ProjectedGradientDescent(EvasionAttack):
                 batch_size=batch_size,
                 random_eps=random_eps,
                 verbose=verbose,
+                early_stop=early_stop,
+                nb_parallel_restarts=nb_parallel_restarts,
             )
 
     def generate(self, x: np.ndarray, y: Optional[np.ndarray] = None, **kwargs) -> np.ndarray:
@@ -217,3 +240,9 @@ class ProjectedGradientDescent(EvasionAttack):
 
         if not isinstance(self.verbose, bool):
             raise ValueError("The verbose has to be a Boolean.")
+
+        if not isinstance(self.early_stop, bool):
+            raise ValueError("The flag `early_stop` has to be of type bool.")
+
+        if not isinstance(self.nb_parallel_restarts, (int, np.int)) or self.nb_parallel_restarts <= 0:
+            raise ValueError("The number of parallel restarts `nb_parallel_restarts` has to be a positive integer.")
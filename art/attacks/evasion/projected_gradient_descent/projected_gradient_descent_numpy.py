@@ -30,13 +30,14 @@ from typing import Optional, Union, TYPE_CHECKING
 
 import numpy as np
 from scipy.stats import truncnorm
-from tqdm import trange
+from tqdm import tqdm, trange
 
 from art.attacks.evasion.fast_gradient import FastGradientMethod
 from art.config import ART_NUMPY_DTYPE
 from art.estimators.classification.classifier import ClassifierMixin
 from art.estimators.estimator import BaseEstimator, LossGradientsMixin
 from art.utils import (
+    ActiveSet,
     compute_success,
     get_labels_np_array,
     check_and_transform_label_format,
@@ -58,7 +59,7 @@ class ProjectedGradientDescentCommon(FastGradientMethod):
     | Paper link: https://arxiv.org/abs/1706.06083
     """
 
-    attack_params = FastGradientMethod.attack_params + ["max_iter", "random_eps", "verbose"]
+    attack_params = FastGradientMethod.attack_params + ["max_iter", "random_eps", "verbose", "nb_parallel_restarts"]
     _estimator_requirements = (BaseEstimator, LossGradientsMixin)
 
     def __init__(
@@ -73,6 +74,7 @@ class ProjectedGradientDescentCommon(FastGradientMethod):
         batch_size: int = 32,
         random_eps: bool = False,
         verbose: bool = True,
+        nb_parallel_restarts: int = 1,
     ) -> None:
         """
         Create a :class:`.ProjectedGradientDescentCommon` instance.
@@ -91,6 +93,10 @@ class ProjectedGradientDescentCommon(FastGradientMethod):
             starting at the original input.
         :param batch_size: Size of the batch on which adversarial samples are generated.
         :param verbose: Show progress bars.
+        :param nb_parallel_restarts: Number of random initialisations stacked along the batch axis so that one
+            gradient computation advances all of them, using batches of up to `batch_size * nb_parallel_restarts`
+            samples. If larger than 1, the best random initialisation is selected for each sample instead of for the
+            whole dataset.
         """
         super().__init__(
             estimator=estimator,  # type: ignore
@@ -105,6 +111,7 @@ class ProjectedGradientDescentCommon(FastGradientMethod):
         self.max_iter = max_iter
         self.random_eps = random_eps
         self.verbose = verbose
+        self.nb_parallel_restarts = nb_parallel_restarts
         ProjectedGradientDescentCommon._check_params(self)
 
         if self.random_eps:
@@ -178,6 +185,45 @@ class ProjectedGradientDescentCommon(FastGradientMethod):
 
         return mask
 
+    def _merge_restarts(
+        self,
+        adv_x_best: np.ndarray,
+        success_best: np.ndarray,
+        adv_x_restarts: np.ndarray,
+        targets: np.ndarray,
+        first: bool,
+    ) -> None:
+        """
+        Update the running best adversarial examples of a batch of samples in place with the results of random
+        initialisations stacked along the batch axis. The first adversarial result of each sample is kept.
+
+        :param adv_x_best: The running best adversarial examples of shape `(nb_samples, ...)`.
+        :param success_best: Boolean array of shape `(nb_samples,)` showing which of `adv_x_best` are adversarial.
+        :param adv_x_restarts: The adversarial examples of all stacked random initialisations, the results of the
+                               first initialisation for all samples followed by the results of the second one, etc.
+        :param targets: The target labels one-hot-encoded of shape `(nb_samples, nb_classes)`.
+        :param first: Whether these are the first random initialisations, which initialise the running best.
+        """
+        nb_samples = adv_x_best.shape[0]
+        nb_restarts = adv_x_restarts.shape[0] // nb_samples
+
+        adv_preds = self.estimator.predict(adv_x_restarts, batch_size=self.batch_size)
+        adv_preds = np.argmax(adv_preds, axis=1).reshape(nb_restarts, nb_samples)
+        adv_x_restarts = adv_x_restarts.reshape((nb_restarts,) + adv_x_best.shape)
+        if self.targeted:
+            success = adv_preds == np.argmax(targets, axis=1)
+        else:
+            success = adv_preds != np.argmax(targets, axis=1)
+
+        if first:
+            adv_x_best[:] = adv_x_restarts[0]
+            success_best[:] = success[0]
+
+        for i_restart in range(nb_restarts):
+            improved = success[i_restart] & ~success_best
+            adv_x_best[improved] = adv_x_restarts[i_restart][improved]
+            success_best |= improved
+
     def _check_params(self) -> None:
         super(ProjectedGradientDescentCommon, self)._check_params()
 
@@ -187,6 +233,9 @@ class ProjectedGradientDescentCommon(FastGradientMethod):
         if self.max_iter <= 0:
             raise ValueError("The number of iterations `max_iter` has to be a positive integer.")
 
+        if not isinstance(self.nb_parallel_restarts, (int, np.int)) or self.nb_parallel_restarts <= 0:
+            raise ValueError("The number of parallel restarts `nb_parallel_restarts` has to be a positive integer.")
+
 
 class ProjectedGradientDescentNumpy(ProjectedGradientDescentCommon):
     """
@@ -197,6 +246,8 @@ class ProjectedGradientDescentNumpy(ProjectedGradientDescentCommon):
     | Paper link: https://arxiv.org/abs/1706.06083
     """
 
+    attack_params = ProjectedGradientDescentCommon.attack_params + ["early_stop"]
+
     def __init__(
         self,
         estimator: Union["CLASSIFIER_LOSS_GRADIENTS_TYPE", "OBJECT_DETECTOR_TYPE"],
@@ -209,6 +260,8 @@ class ProjectedGradientDescentNumpy(ProjectedGradientDescentCommon):
         batch_size: int = 32,
         random_eps: bool = False,
         verbose: bool = True,
+        early_stop: bool = False,
+        nb_parallel_restarts: int = 1,
     ) -> None:
         """
         Create a :class:`.ProjectedGradientDescentNumpy` instance.
@@ -227,6 +280,14 @@ class ProjectedGradientDescentNumpy(ProjectedGradientDescentCommon):
                                 at the original input.
         :param batch_size: Size of the batch on which adversarial samples are generated.
         :param verbose: Show progress bars.
+        :param early_stop: Stop iterating on a sample of a classifier as soon as it is classified as the target class
+                           (targeted) or as another class than its label (untargeted) and refill the batch with
+                           pending samples. This saves gradient computations at the cost of one prediction per
+                           iteration, but returns less confidently misclassified adversarial examples.
+        :param nb_parallel_restarts: Number of random initialisations stacked along the batch axis so that one
+                                     gradient computation advances all of them, using batches of up to
+                                     `batch_size * nb_parallel_restarts` samples. If larger than 1, the best random
+                                     initialisation is selected for each sample instead of for the whole dataset.
         """
         super().__init__(
             estimator=estimator,
@@ -239,9 +300,12 @@ class ProjectedGradientDescentNumpy(ProjectedGradientDescentCommon):
             batch_size=batch_size,
             random_eps=random_eps,
             verbose=verbose,
+            nb_parallel_restarts=nb_parallel_restarts,
         )
 
+        self.early_stop = early_stop
         self._project = True
+        ProjectedGradientDescentNumpy._check_params(self)
 
     def generate(self, x: np.ndarray, y: Optional[np.ndarray] = None, **kwargs) -> np.ndarray:
         """
@@ -273,32 +337,23 @@ class ProjectedGradientDescentNumpy(ProjectedGradientDescentCommon):
             adv_x_best = None
             rate_best = None
 
-            for _ in trange(
-                max(1, self.num_random_init), desc="PGD - Random Initializations", disable=not self.verbose
-            ):
-                adv_x = x.astype(ART_NUMPY_DTYPE)
-
-                for i_max_iter in trange(self.max_iter, desc="PGD - Iterations", leave=False, disable=not self.verbose):
-                    adv_x = self._compute(
-                        adv_x,
-                        x,
-                        targets,
-                        mask,
-                        self.eps,
-                        self.eps_step,
-                        self._project,
-                        self.num_random_init > 0 and i_max_iter == 0,
-                    )
-
-                if self.num_random_init > 1:
-                    rate = 100 * compute_success(
-                        self.estimator, x, targets, adv_x, self.targeted, batch_size=self.batch_size,  # type: ignore
-                    )
-                    if rate_best is None or rate > rate_best or adv_x_best is None:
-                        rate_best = rate
+            if self.nb_parallel_restarts > 1 and self.num_random_init > 1:
+                adv_x_best = self._iterate_restarts(x, targets, mask)
+            else:
+                for _ in trange(
+                    max(1, self.num_random_init), desc="PGD - Random Initializations", disable=not self.verbose
+                ):
+                    adv_x = self._iterate(x, targets, mask)
+
+                    if self.num_random_init > 1:
+                        rate = 100 * compute_success(
+                            self.estimator, x, targets, adv_x, self.targeted, batch_size=self.batch_size,  # type: ignore
+                        )
+                        if rate_best is None or rate > rate_best or adv_x_best is None:
+                            rate_best = rate
+                            adv_x_best = adv_x
+                    else:
                         adv_x_best = adv_x
-                else:
-                    adv_x_best = adv_x
 
             logger.info(
                 "Success rate of attack: %.2f%%",
@@ -337,3 +392,125 @@ class ProjectedGradientDescentNumpy(ProjectedGradientDescentCommon):
             adv_x_best = adv_x
 
         return adv_x_best
+
+    def _iterate(
+        self, x: np.ndarray, targets: np.ndarray, mask: Optional[np.ndarray], batch_size: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Run the iterations of one random initialisation on the samples of a classifier. The samples are attacked in an
+        active set of `batch_size` samples from which samples are dropped after `max_iter` iterations, or as soon as
+        they are adversarial if `early_stop` is true, and which is then refilled with pending samples.
+
+        :param x: An array with the original inputs.
+        :param targets: The target labels one-hot-encoded of shape `(nb_samples, nb_classes)`.
+        :param mask: An array with a mask broadcastable to the shape of `x`.
+        :param batch_size: Size of the active set, `batch_size` of the attack if `None`.
+        :return: An array holding the adversarial examples.
+        """
+        if batch_size is None:
+            batch_size = self.batch_size
+
+        if self.num_random_init > 0:
+            adv_x = self._random_init(x, mask, self.eps)
+        else:
+            adv_x = x.astype(ART_NUMPY_DTYPE)
+
+        nb_iter = np.zeros(x.shape[0], dtype=int)
+        active_set = ActiveSet(x.shape[0], batch_size)
+
+        pbar = tqdm(total=x.shape[0], desc="PGD - Samples", leave=False, disable=not self.verbose)
+        while len(active_set) > 0:
+            active_indices = active_set.indices
+
+            mask_batch = mask
+            if mask is not None:
+                # Here we need to make a distinction: if the masks are different for each input, we need to index
+                # those for the current batch. Otherwise (i.e. mask is meant to be broadcasted), keep it as it is.
+                if len(mask.shape) == len(x.shape):
+                    mask_batch = mask[active_indices]
+
+            adv_x[active_indices] = self._compute(
+                adv_x[active_indices],
+                x[active_indices],
+                targets[active_indices],
+                mask_batch,
+                self.eps,
+                self.eps_step,
+                self._project,
+                False,
+                batch_size=batch_size,
+            )
+            nb_iter[active_indices] += 1
+            finished = nb_iter[active_indices] >= self.max_iter
+
+            if self.early_stop:
+                adv_preds = self.estimator.predict(adv_x[active_indices], batch_size=batch_size)
+                adv_preds = np.argmax(adv_preds, axis=1)
+                if self.targeted:
+                    finished |= adv_preds == np.argmax(targets[active_indices], axis=1)
+                else:
+                    finished |= adv_preds != np.argmax(targets[active_indices], axis=1)
+
+            active_set.update(finished)
+            pbar.update(int(np.sum(finished)))
+
+        pbar.close()
+
+        return adv_x
+
+    def _iterate_restarts(self, x: np.ndarray, targets: np.ndarray, mask: Optional[np.ndarray]) -> np.ndarray:
+        """
+        Run all random initialisations on the samples of a classifier with `nb_parallel_restarts` random
+        initialisations of each batch of samples stacked along the batch axis, and select the best random
+        initialisation for each sample.
+
+        :param x: An array with the original inputs.
+        :param targets: The target labels one-hot-encoded of shape `(nb_samples, nb_classes)`.
+        :param mask: An array with a mask broadcastable to the shape of `x`.
+        :return: An array holding the adversarial examples.
+        """
+        adv_x_best = x.astype(ART_NUMPY_DTYPE)
+        success_best = np.zeros(x.shape[0], dtype=bool)
+
+        for i_restart in trange(
+            0,
+            self.num_random_init,
+            self.nb_parallel_restarts,
+            desc="PGD - Parallel Random Initializations",
+            disable=not self.verbose,
+        ):
+            nb_restarts = min(self.nb_parallel_restarts, self.num_random_init - i_restart)
+
+            for batch_index_1 in range(0, x.shape[0], self.batch_size):
+                batch_index_2 = batch_index_1 + self.batch_size
+                reps = (nb_restarts,) + (1,) * (len(x.shape) - 1)
+                batch = np.tile(x[batch_index_1:batch_index_2], reps)
+
+                mask_batch = mask
+                if mask is not None:
+                    # Here we need to make a distinction: if the masks are different for each input, we need to index
+                    # those for the current batch. Otherwise (i.e. mask is meant to be broadcasted), keep it as it is.
+                    if len(mask.shape) == len(x.shape):
+                        mask_batch = np.tile(mask[batch_index_1:batch_index_2], reps)
+
+                adv_x_restarts = self._iterate(
+                    batch,
+                    np.tile(targets[batch_index_1:batch_index_2], (nb_restarts, 1)),
+                    mask_batch,
+                    batch_size=batch.shape[0],
+                )
+                self._merge_restarts(
+                    adv_x_best[batch_index_1:batch_index_2],
+                    success_best[batch_index_1:batch_index_2],
+                    adv_x_restarts,
+                    targets[batch_index_1:batch_index_2],
+                    first=i_restart == 0,
+                )
+
+        return adv_x_best
+
+    def _check_params(self) -> None:
+        super(ProjectedGradientDescentNumpy, self)._check_params()
+
+        if not isinstance(self.early_stop, bool):
+            raise ValueError("The flag `early_stop` has to be of type bool.")
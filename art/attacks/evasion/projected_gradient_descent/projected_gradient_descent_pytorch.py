@@ -35,6 +35,7 @@ from art.config import ART_NUMPY_DTYPE
 from art.attacks.evasion.projected_gradient_descent.projected_gradient_descent_numpy import (
     ProjectedGradientDescentCommon,
 )
+from art.defences.preprocessor.preprocessor import PreprocessorPyTorch
 from art.utils import compute_success, random_sphere
 
 if TYPE_CHECKING:
@@ -66,6 +67,7 @@ class ProjectedGradientDescentPyTorch(ProjectedGradientDescentCommon):
         batch_size: int = 32,
         random_eps: bool = False,
         verbose: bool = True,
+        nb_parallel_restarts: int = 1,
     ):
         """
         Create a :class:`.ProjectedGradientDescentPytorch` instance.
@@ -84,18 +86,18 @@ class ProjectedGradientDescentPyTorch(ProjectedGradientDescentCommon):
                                 at the original input.
         :param batch_size: Size of the batch on which adversarial samples are generated.
         :param verbose: Show progress bars.
+        :param nb_parallel_restarts: Number of random initialisations stacked along the batch axis so that one
+                                     gradient computation advances all of them, using batches of up to
+                                     `batch_size * nb_parallel_restarts` samples. If larger than 1, the best random
+                                     initialisation is selected for each sample instead of for the whole dataset.
         """
-        if (
-            hasattr(estimator, "preprocessing")
-            and (estimator.preprocessing is not None and estimator.preprocessing != (0, 1))
-        ) or (
-            hasattr(estimator, "preprocessing_defences")
-            and (estimator.preprocessing_defences is not None and estimator.preprocessing_defences != [])
-        ):
-            raise NotImplementedError(
-                "The framework-specific implementation currently does not apply preprocessing and "
-                "preprocessing defences."
-            )
+        if hasattr(estimator, "preprocessing_defences") and estimator.preprocessing_defences is not None:
+            for defence in estimator.preprocessing_defences:
+                if not isinstance(defence, PreprocessorPyTorch):
+                    raise NotImplementedError(
+                        "The framework-specific implementation only supports preprocessing defences implemented in "
+                        "PyTorch, {} is not.".format(defence.__class__)
+                    )
 
         super(ProjectedGradientDescentPyTorch, self).__init__(
             estimator=estimator,
@@ -108,6 +110,7 @@ class ProjectedGradientDescentPyTorch(ProjectedGradientDescentCommon):
             batch_size=batch_size,
             random_eps=random_eps,
             verbose=verbose,
+            nb_parallel_restarts=nb_parallel_restarts,
         )
 
     def generate(self, x: np.ndarray, y: Optional[np.ndarray] = None, **kwargs) -> np.ndarray:
@@ -167,6 +170,44 @@ class ProjectedGradientDescentPyTorch(ProjectedGradientDescentCommon):
         adv_x_best = None
         rate_best = None
 
+        if self.nb_parallel_restarts > 1 and self.num_random_init > 1:
+            adv_x_best = x.astype(ART_NUMPY_DTYPE)
+            success_best = np.zeros(x.shape[0], dtype=bool)
+
+            for i_restart in trange(
+                0,
+                self.num_random_init,
+                self.nb_parallel_restarts,
+                desc="PGD - Parallel Random Initializations",
+                disable=not self.verbose,
+            ):
+                nb_restarts = min(self.nb_parallel_restarts, self.num_random_init - i_restart)
+
+                # Stack the random initialisations of each batch along the batch axis
+                for (batch_id, batch_all) in enumerate(
+                    tqdm(data_loader, desc="PGD - Batches", leave=False, disable=not self.verbose)
+                ):
+                    reps = (nb_restarts,) + (1,) * (len(x.shape) - 1)
+                    batch = batch_all[0].repeat(*reps)
+                    batch_labels = batch_all[1].repeat(nb_restarts, 1)
+                    mask_batch = batch_all[2].repeat(*reps) if mask is not None else None
+
+                    batch_index_1, batch_index_2 = batch_id * self.batch_size, (batch_id + 1) * self.batch_size
+                    self._merge_restarts(
+                        adv_x_best[batch_index_1:batch_index_2],
+                        success_best[batch_index_1:batch_index_2],
+                        self._generate_batch(batch, batch_labels, mask_batch),
+                        targets[batch_index_1:batch_index_2],
+                        first=i_restart == 0,
+                    )
+
+            logger.info(
+                "Success rate of attack: %.2f%%",
+                100 * compute_success(self.estimator, x, y, adv_x_best, self.targeted, batch_size=self.batch_size),
+            )
+
+            return adv_x_best
+
         for _ in trange(max(1, self.num_random_init), desc="PGD - Random Initializations", disable=not self.verbose):
             adv_x = x.astype(ART_NUMPY_DTYPE)
 
@@ -35,6 +35,7 @@ from art.config import ART_NUMPY_DTYPE
 from art.attacks.evasion.projected_gradient_descent.projected_gradient_descent_numpy import (
     ProjectedGradientDescentCommon,
 )
+from art.defences.preprocessor.preprocessor import PreprocessorTensorFlowV2
 from art.utils import compute_success, random_sphere
 
 if TYPE_CHECKING:
@@ -65,6 +66,7 @@ class ProjectedGradientDescentTensorFlowV2(ProjectedGradientDescentCommon):
         batch_size: int = 32,
         random_eps: bool = False,
         verbose: bool = True,
+        nb_parallel_restarts: int = 1,
     ):
         """
         Create a :class:`.ProjectedGradientDescentTensorFlowV2` instance.
@@ -83,18 +85,18 @@ class ProjectedGradientDescentTensorFlowV2(ProjectedGradientDescentCommon):
                                 at the original input.
         :param batch_size: Size of the batch on which adversarial samples are generated.
         :param verbose: Show progress bars.
+        :param nb_parallel_restarts: Number of random initialisations stacked along the batch axis so that one
+                                     gradient computation advances all of them, using batches of up to
+                                     `batch_size * nb_parallel_restarts` samples. If larger than 1, the best random
+                                     initialisation is selected for each sample instead of for the whole dataset.
         """
-        if (
-            hasattr(estimator, "preprocessing")
-            and (estimator.preprocessing is not None and estimator.preprocessing != (0, 1))
-        ) or (
-            hasattr(estimator, "preprocessing_defences")
-            and (estimator.preprocessing_defences is not None and estimator.preprocessing_defences != [])
-        ):
-            raise NotImplementedError(
-                "The framework-specific implementation currently does not apply preprocessing and "
-                "preprocessing defences."
-            )
+        if hasattr(estimator, "preprocessing_defences") and estimator.preprocessing_defences is not None:
+            for defence in estimator.preprocessing_defences:
+                if not isinstance(defence, PreprocessorTensorFlowV2):
+                    raise NotImplementedError(
+                        "The framework-specific implementation only supports preprocessing defences implemented in "
+                        "TensorFlow, {} is not.".format(defence.__class__)
+                    )
 
         super().__init__(
             estimator=estimator,
@@ -107,6 +109,7 @@ class ProjectedGradientDescentTensorFlowV2(ProjectedGradientDescentCommon):
             batch_size=batch_size,
             random_eps=random_eps,
             verbose=verbose,
+            nb_parallel_restarts=nb_parallel_restarts,
         )
 
     def generate(self, x: np.ndarray, y: Optional[np.ndarray] = None, **kwargs) -> np.ndarray:
@@ -162,6 +165,45 @@ class ProjectedGradientDescentTensorFlowV2(ProjectedGradientDescentCommon):
         adv_x_best = None
         rate_best = None
 
+        if self.nb_parallel_restarts > 1 and self.num_random_init > 1:
+            adv_x_best = x.astype(ART_NUMPY_DTYPE)
+            success_best = np.zeros(x.shape[0], dtype=bool)
+
+            for i_restart in trange(
+                0,
+                self.num_random_init,
+                self.nb_parallel_restarts,
+                desc="PGD - Parallel Random Initializations",
+                disable=not self.verbose,
+            ):
+                nb_restarts = min(self.nb_parallel_restarts, self.num_random_init - i_restart)
+                data_loader = iter(dataset)
+
+                # Stack the random initialisations of each batch along the batch axis
+                for (batch_id, batch_all) in enumerate(
+                    tqdm(data_loader, desc="PGD - Batches", leave=False, disable=not self.verbose)
+                ):
+                    reps = (nb_restarts,) + (1,) * (len(x.shape) - 1)
+                    batch = tf.tile(batch_all[0], reps)
+                    batch_labels = tf.tile(batch_all[1], (nb_restarts, 1))
+                    mask_batch = tf.tile(batch_all[2], reps) if mask is not None else None
+
+                    batch_index_1, batch_index_2 = batch_id * self.batch_size, (batch_id + 1) * self.batch_size
+                    self._merge_restarts(
+                        adv_x_best[batch_index_1:batch_index_2],
+                        success_best[batch_index_1:batch_index_2],
+                        self._generate_batch(batch, batch_labels, mask_batch).numpy(),
+                        targets[batch_index_1:batch_index_2],
+                        first=i_restart == 0,
+                    )
+
+            logger.info(
+                "Success rate of attack: %.2f%%",
+                100 * compute_success(self.estimator, x, y, adv_x_best, self.targeted, batch_size=self.batch_size),
+            )
+
+            return adv_x_best
+
         for _ in trange(max(1, self.num_random_init), desc="PGD - Random Initializations", disable=not self.verbose):
             adv_x = x.astype(ART_NUMPY_DTYPE)
             data_loader = iter(dataset)
@@ -148,7 +148,9 @@ class ShadowAttack(EvasionAttack):
 
         for _ in trange(self.nb_steps, desc="Shadow attack"):
             gradients_ce = np.mean(
-                self.estimator.loss_gradient(x=x_batch + perturbation, y=y_batch, sampling=False)
+                self.estimator.loss_gradient(
+                    x=x_batch + perturbation, y=y_batch, sampling=False, batch_size=self.batch_size
+                )
                 * (1 - 2 * int(self.targeted)),
                 axis=0,
                 keepdims=True,
@@ -32,6 +32,7 @@ from art.attacks.attack import EvasionAttack
 from art.estimators.estimator import BaseEstimator
 from art.estimators.classification.classifier import ClassifierMixin
 from art.config import ART_NUMPY_DTYPE
+from art.utils import check_and_transform_label_format
 
 if TYPE_CHECKING:
     from art.utils import CLASSIFIER_TYPE
@@ -63,7 +64,7 @@ class SimBA(EvasionAttack):
         freq_dim: int = 4,
         stride: int = 1,
         targeted: bool = False,
-        batch_size: int = 1,
+        batch_size: int = 64,
     ):
         """
         Create a SimBA (dct) attack instance.
@@ -76,7 +77,8 @@ class SimBA(EvasionAttack):
         :param freq_dim: dimensionality of 2D frequency space (DCT).
         :param stride: stride for block order (DCT).
         :param targeted: perform targeted attack
-        :param batch_size: Batch size (but, batch process unavailable in this implementation)
+        :param batch_size: Batch size for predictions of the classifier. The left and right perturbations of all
+                           images which are not adversarial yet are evaluated together in each iteration.
         """
         super().__init__(estimator=classifier)
 
@@ -109,149 +111,137 @@ class SimBA(EvasionAttack):
                 logger.info("Using the model prediction as the correct label for SimBA.")
                 y_i = np.argmax(preds, axis=1)
         else:
-            y_i = np.argmax(y, axis=1)
+            y_i = check_and_transform_label_format(y, self.estimator.nb_classes, return_one_hot=False)
 
-        desired_label = y_i[0]
-        current_label = np.argmax(preds, axis=1)[0]
-        last_prob = preds.reshape(-1)[desired_label]
+        nb_samples = x.shape[0]
+        desired_label = y_i
+        current_label = np.argmax(preds, axis=1)
+        last_prob = preds[np.arange(nb_samples), desired_label]
 
         if self.estimator.channels_first:
             nb_channels = x.shape[1]
         else:
             nb_channels = x.shape[3]
 
-        n_dims = np.prod(x.shape)
+        n_dims = np.prod(x.shape[1:])
 
-        if self.attack == "px":
-            if self.order == "diag":
-                indices = self.diagonal_order(x.shape[2], nb_channels)[: self.max_iter]
-            elif self.order == "random":
-                indices = np.random.permutation(n_dims)[: self.max_iter]
-            indices_size = len(indices)
-            while indices_size < self.max_iter:
-                if self.order == "diag":
-                    tmp_indices = self.diagonal_order(x.shape[2], nb_channels)
-                elif self.order == "random":
-                    tmp_indices = np.random.permutation(n_dims)
-                indices = np.hstack((indices, tmp_indices))[: self.max_iter]
-                indices_size = len(indices)
-        elif self.attack == "dct":
-            indices = self._block_order(x.shape[2], nb_channels, initial_size=self.freq_dim, stride=self.stride)[
-                : self.max_iter
-            ]
-            indices_size = len(indices)
-            while indices_size < self.max_iter:
-                tmp_indices = self._block_order(x.shape[2], nb_channels, initial_size=self.freq_dim, stride=self.stride)
-                indices = np.hstack((indices, tmp_indices))[: self.max_iter]
-                indices_size = len(indices)
+        # Coordinate or DCT basis order of each image
+        indices = np.zeros((nb_samples, self.max_iter), dtype=int)
+        for i in range(nb_samples):
+            if self.attack == "px" and self.order == "diag" and i > 0:
+                indices[i] = indices[0]
+            else:
+                indices[i] = self._indices(x.shape[2], nb_channels, n_dims)
 
-            def trans(z):
-                return self._block_idct(z, block_size=x.shape[2])
+        if self.attack == "dct":
+            # The inverse DCT of a basis vector is the outer product of two columns of the IDCT matrix
+            idct_matrix = idct(np.eye(x.shape[2]), axis=0, norm="ortho").astype(ART_NUMPY_DTYPE)
 
         clip_min = -np.inf
         clip_max = np.inf
         if self.estimator.clip_values is not None:
             clip_min, clip_max = self.estimator.clip_values
 
-        term_flag = 1
         if self.targeted:
-            if desired_label != current_label:
-                term_flag = 0
+            term_flag = desired_label == current_label
         else:
-            if desired_label == current_label:
-                term_flag = 0
+            term_flag = desired_label != current_label
 
-        nb_iter = 0
-        while term_flag == 0 and nb_iter < self.max_iter:
-            diff = np.zeros(n_dims).astype(ART_NUMPY_DTYPE)
-            diff[indices[nb_iter]] = self.epsilon
+        # Direction in which the probability of the desired label has to change
+        sign = 1 if self.targeted else -1
 
-            if self.attack == "dct":
-                left_preds = self.estimator.predict(
-                    np.clip(x - trans(diff.reshape(x.shape)), clip_min, clip_max), batch_size=self.batch_size
-                )
-            elif self.attack == "px":
-                left_preds = self.estimator.predict(
-                    np.clip(x - diff.reshape(x.shape), clip_min, clip_max), batch_size=self.batch_size
-                )
-            left_prob = left_preds.reshape(-1)[desired_label]
+        nb_iter = 0
+        while not np.all(term_flag) and nb_iter < self.max_iter:
+            active = np.where(~term_flag)[0]
 
             if self.attack == "dct":
-                right_preds = self.estimator.predict(
-                    np.clip(x + trans(diff.reshape(x.shape)), clip_min, clip_max), batch_size=self.batch_size
-                )
-            elif self.attack == "px":
-                right_preds = self.estimator.predict(
-                    np.clip(x + diff.reshape(x.shape), clip_min, clip_max), batch_size=self.batch_size
-                )
-            right_prob = right_preds.reshape(-1)[desired_label]
-
-            # Use (2 * int(self.targeted) - 1) to shorten code?
-            if self.targeted:
-                if left_prob > last_prob:
-                    if left_prob > right_prob:
-                        if self.attack == "dct":
-                            x = np.clip(x - trans(diff.reshape(x.shape)), clip_min, clip_max)
-                        elif self.attack == "px":
-                            x = np.clip(x - diff.reshape(x.shape), clip_min, clip_max)
-                        last_prob = left_prob
-                        current_label = np.argmax(left_preds, axis=1)[0]
-                    else:
-                        if self.attack == "dct":
-                            x = np.clip(x + trans(diff.reshape(x.shape)), clip_min, clip_max)
-                        elif self.attack == "px":
-                            x = np.clip(x + diff.reshape(x.shape), clip_min, clip_max)
-                        last_prob = right_prob
-                        current_label = np.argmax(right_preds, axis=1)[0]
+                coordinates = np.unravel_index(indices[active, nb_iter], x.shape[1:])
+                if self.estimator.channels_first:
+                    channel, row, col = coordinates
                 else:
-                    if right_prob > last_prob:
-                        if self.attack == "dct":
-                            x = np.clip(x + trans(diff.reshape(x.shape)), clip_min, clip_max)
-                        elif self.attack == "px":
-                            x = np.clip(x + diff.reshape(x.shape), clip_min, clip_max)
-                        last_prob = right_prob
-                        current_label = np.argmax(right_preds, axis=1)[0]
+                    row, col, channel = coordinates
+                diff = np.zeros((active.size, nb_channels) + idct_matrix.shape, dtype=ART_NUMPY_DTYPE)
+                diff[np.arange(active.size), channel] = self.epsilon * np.einsum(
+                    "ia,ja->aij", idct_matrix[:, row], idct_matrix[:, col]
+                )
+                if not self.estimator.channels_first:
+                    diff = diff.transpose((0, 2, 3, 1))
             else:
-                if left_prob < last_prob:
-                    if left_prob < right_prob:
-                        if self.attack == "dct":
-                            x = np.clip(x - trans(diff.reshape(x.shape)), clip_min, clip_max)
-                        elif self.attack == "px":
-                            x = np.clip(x - diff.reshape(x.shape), clip_min, clip_max)
-                        last_prob = left_prob
-                        current_label = np.argmax(left_preds, axis=1)[0]
-                    else:
-                        if self.attack == "dct":
-                            x = np.clip(x + trans(diff.reshape(x.shape)), clip_min, clip_max)
-                        elif self.attack == "px":
-                            x = np.clip(x + diff.reshape(x.shape), clip_min, clip_max)
-                        last_prob = right_prob
-                        current_label = np.argmax(right_preds, axis=1)[0]
-                else:
-                    if right_prob < last_prob:
-                        if self.attack == "dct":
-                            x = np.clip(x + trans(diff.reshape(x.shape)), clip_min, clip_max)
-                        elif self.attack == "px":
-                            x = np.clip(x + diff.reshape(x.shape), clip_min, clip_max)
-                        last_prob = right_prob
-                        current_label = np.argmax(right_preds, axis=1)[0]
+                diff = np.zeros((active.size, n_dims), dtype=ART_NUMPY_DTYPE)
+                diff[np.arange(active.size), indices[active, nb_iter]] = self.epsilon
+                diff = diff.reshape((active.size,) + x.shape[1:])
+
+            # Evaluate the left and right perturbations of all active images together
+            left_x = np.clip(x[active] - diff, clip_min, clip_max)
+            right_x = np.clip(x[active] + diff, clip_min, clip_max)
+            step_preds = self.estimator.predict(np.concatenate([left_x, right_x]), batch_size=self.batch_size)
+            left_preds, right_preds = step_preds[: active.size], step_preds[active.size :]
+            left_prob = left_preds[np.arange(active.size), desired_label[active]]
+            right_prob = right_preds[np.arange(active.size), desired_label[active]]
+
+            left_improves = sign * left_prob > sign * last_prob[active]
+            take_left = left_improves & (sign * left_prob > sign * right_prob)
+            take_right = ~take_left & (left_improves | (sign * right_prob > sign * last_prob[active]))
+
+            x[active[take_left]] = left_x[take_left]
+            last_prob[active[take_left]] = left_prob[take_left]
+            current_label[active[take_left]] = np.argmax(left_preds[take_left], axis=1)
+
+            x[active[take_right]] = right_x[take_right]
+            last_prob[active[take_right]] = right_prob[take_right]
+            current_label[active[take_right]] = np.argmax(right_preds[take_right], axis=1)
 
             if self.targeted:
-                if desired_label == current_label:
-                    term_flag = 1
+                term_flag = desired_label == current_label
             else:
-                if desired_label != current_label:
-                    term_flag = 1
+                term_flag = desired_label != current_label
 
             nb_iter = nb_iter + 1
 
-        if nb_iter < self.max_iter:
-            logger.info("SimBA (%s) %s attack succeed", self.attack, ["non-targeted", "targeted"][int(self.targeted)])
-        else:
-            logger.info("SimBA (%s) %s attack failed", self.attack, ["non-targeted", "targeted"][int(self.targeted)])
+        logger.info(
+            "SimBA (%s) %s attack succeeded for %d of %d images",
+            self.attack,
+            ["non-targeted", "targeted"][int(self.targeted)],
+            np.sum(term_flag),
+            nb_samples,
+        )
 
         return x
 
+    def _indices(self, image_size: int, nb_channels: int, n_dims: int) -> np.ndarray:
+        """
+        Order of the coordinates (pixel attacks) or DCT basis vectors (DCT attacks) perturbed by one image.
+
+        :param image_size: image size (i.e., width or height).
+        :param nb_channels: the number of channels.
+        :param n_dims: the number of dimensions of an image.
+        :return: An array holding `max_iter` indices.
+        """
+        if self.attack == "px":
+            if self.order == "diag":
+                indices = self.diagonal_order(image_size, nb_channels)[: self.max_iter]
+            elif self.order == "random":
+                indices = np.random.permutation(n_dims)[: self.max_iter]
+            indices_size = len(indices)
+            while indices_size < self.max_iter:
+                if self.order == "diag":
+                    tmp_indices = self.diagonal_order(image_size, nb_channels)
+                elif self.order == "random":
+                    tmp_indices = np.random.permutation(n_dims)
+                indices = np.hstack((indices, tmp_indices))[: self.max_iter]
+                indices_size = len(indices)
+        elif self.attack == "dct":
+            indices = self._block_order(image_size, nb_channels, initial_size=self.freq_dim, stride=self.stride)[
+                : self.max_iter
+            ]
+            indices_size = len(indices)
+            while indices_size < self.max_iter:
+                tmp_indices = self._block_order(image_size, nb_channels, initial_size=self.freq_dim, stride=self.stride)
+                indices = np.hstack((indices, tmp_indices))[: self.max_iter]
+                indices_size = len(indices)
+
+        return indices
+
     def _check_params(self) -> None:
 
         if not isinstance(self.max_iter, (int, np.int)) or self.max_iter <= 0:
@@ -260,8 +250,8 @@ class SimBA(EvasionAttack):
         if self.epsilon < 0:
             raise ValueError("The overshoot parameter must not be negative.")
 
-        if self.batch_size != 1:
-            raise ValueError("The batch size `batch_size` has to be 1 in this implementation.")
+        if not isinstance(self.batch_size, (int, np.int)) or self.batch_size <= 0:
+            raise ValueError("The batch size `batch_size` has to be a positive integer.")
 
         if not isinstance(self.stride, (int, np.int)) or self.stride <= 0:
             raise ValueError("The `stride` value must be a positive integer.")
@@ -54,6 +54,7 @@ class SpatialTransformation(EvasionAttack):
         "num_translations",
         "max_rotation",
         "num_rotations",
+        "batch_size",
     ]
     _estimator_requirements = (BaseEstimator, NeuralNetworkMixin)
 
@@ -64,6 +65,7 @@ class SpatialTransformation(EvasionAttack):
         num_translations: int = 1,
         max_rotation: float = 0.0,
         num_rotations: int = 1,
+        batch_size: int = 128,
     ) -> None:
         """
         :param classifier: A trained classifier.
@@ -73,12 +75,14 @@ class SpatialTransformation(EvasionAttack):
         :param max_rotation: The maximum rotation in either direction in degrees. The value is expected to be in the
                range `[0, 180]`.
         :param num_rotations: The number of rotations to search on grid spacing.
+        :param batch_size: Batch size for the classifier predictions of the transformed inputs.
         """
         super().__init__(estimator=classifier)
         self.max_translation = max_translation
         self.num_translations = num_translations
         self.max_rotation = max_rotation
         self.num_rotations = num_rotations
+        self.batch_size = batch_size
         self._check_params()
 
         self.fooling_rate: Optional[float] = None
@@ -103,7 +107,7 @@ class SpatialTransformation(EvasionAttack):
 
         if self.attack_trans_x is None or self.attack_trans_y is None or self.attack_rot is None:
 
-            y_pred = self.estimator.predict(x, batch_size=1)
+            y_pred = self.estimator.predict(x, batch_size=self.batch_size)
             y_pred_max = np.argmax(y_pred, axis=1)
 
             nb_instances = len(x)
@@ -131,36 +135,68 @@ class SpatialTransformation(EvasionAttack):
             grid_trans_y.sort()
             grid_rot.sort()
 
-            # Search for worst case
-            fooling_rate = 0.0
-            x_adv = np.copy(x)
+            # Search for worst case, evaluating several grid points together in each prediction batch
+            grid = [
+                (trans_x_i, trans_y_i, rot_i)
+                for trans_x_i in grid_trans_x
+                for trans_y_i in grid_trans_y
+                for rot_i in grid_rot
+            ]
+            nb_points = max(1, self.batch_size // nb_instances)
+            nb_samples = int(np.ceil(self.batch_size / nb_points))
+
+            nb_fooled = 0
             trans_x = 0
             trans_y = 0
             rot = 0.0
 
             # Initialize progress bar
-            pbar = tqdm(len(grid_trans_x) * len(grid_trans_y) * len(grid_rot), desc="Spatial transformation")
-
-            for trans_x_i in grid_trans_x:
-                for trans_y_i in grid_trans_y:
-                    for rot_i in grid_rot:
-
-                        # Generate the adversarial examples
-                        x_adv_i = self._perturb(x, trans_x_i, trans_y_i, rot_i)
-
-                        # Compute the error rate
-                        y_adv_i = np.argmax(self.estimator.predict(x_adv_i, batch_size=1), axis=1)
-                        fooling_rate_i = np.sum(y_pred_max != y_adv_i) / nb_instances
-
-                        if fooling_rate_i > fooling_rate:
-                            fooling_rate = fooling_rate_i
-                            trans_x = trans_x_i
-                            trans_y = trans_y_i
-                            rot = rot_i
-                            x_adv = np.copy(x_adv_i)
-                        pbar.update(1)
+            pbar = tqdm(total=len(grid), desc="Spatial transformation")
+
+            for point_start in range(0, len(grid), nb_points):
+                points = grid[point_start : point_start + nb_points]
+                nb_fooled_points = np.zeros(len(points), dtype=int)
+                active = np.arange(len(points))
+
+                for sample_start in range(0, nb_instances, nb_samples):
+                    sample_end = min(sample_start + nb_samples, nb_instances)
+
+                    # Generate the adversarial examples of the grid points which can still beat the best one
+                    x_adv_batch = np.concatenate(
+                        [self._perturb(x[sample_start:sample_end], *points[i]) for i in active]
+                    )
+
+                    # Count the fooled samples
+                    y_adv_batch = np.argmax(self.estimator.predict(x_adv_batch, batch_size=self.batch_size), axis=1)
+                    fooled = (y_adv_batch != np.tile(y_pred_max[sample_start:sample_end], len(active))).reshape(
+                        len(active), -1
+                    )
+                    nb_fooled_points[active] += np.sum(fooled, axis=1)
+
+                    # Skip the remaining samples for grid points which can no longer exceed the best fooling rate
+                    active = active[nb_fooled_points[active] + nb_instances - sample_end > nb_fooled]
+                    if active.size == 0:
+                        break
+
+                for i, (trans_x_i, trans_y_i, rot_i) in enumerate(points):
+                    if nb_fooled_points[i] > nb_fooled:
+                        nb_fooled = nb_fooled_points[i]
+                        trans_x = trans_x_i
+                        trans_y = trans_y_i
+                        rot = rot_i
+                pbar.update(len(points))
+
+                # No grid point can exceed a fooling rate of 100%
+                if nb_fooled == nb_instances:
+                    break
             pbar.close()
 
+            fooling_rate = nb_fooled / nb_instances
+            if nb_fooled > 0:
+                x_adv = self._perturb(x, trans_x, trans_y, rot)
+            else:
+                x_adv = np.copy(x)
+
             self.fooling_rate = fooling_rate
             self.attack_trans_x = trans_x
             self.attack_trans_y = trans_y
@@ -180,14 +216,31 @@ class SpatialTransformation(EvasionAttack):
 
     def _perturb(self, x: np.ndarray, trans_x: int, trans_y: int, rot: float) -> np.ndarray:
         if not self.estimator.channels_first:
-            x_adv = shift(x, [0, trans_x, trans_y, 0])
-            x_adv = rotate(x_adv, angle=rot, axes=(1, 2), reshape=False)
+            axes = (1, 2)
         elif self.estimator.channels_first:
-            x_adv = shift(x, [0, 0, trans_x, trans_y])
-            x_adv = rotate(x_adv, angle=rot, axes=(2, 3), reshape=False)
+            axes = (2, 3)
         else:
             raise ValueError("Unsupported channel_first value.")
 
+        if trans_x == int(trans_x) and trans_y == int(trans_y):
+            # Integer translations are exact shifts of the pixels, filled with zeros
+            x_adv = np.zeros_like(x)
+            slices_src = [slice(None)] * x.ndim
+            slices_dst = [slice(None)] * x.ndim
+            for axis, trans in zip(axes, (int(trans_x), int(trans_y))):
+                size = x.shape[axis]
+                slices_src[axis] = slice(min(max(0, -trans), size), max(size - max(0, trans), 0))
+                slices_dst[axis] = slice(min(max(0, trans), size), max(size - max(0, -trans), 0))
+            x_adv[tuple(slices_dst)] = x[tuple(slices_src)]
+        else:
+            shifts = [0] * x.ndim
+            shifts[axes[0]] = trans_x
+            shifts[axes[1]] = trans_y
+            x_adv = shift(x, shifts)
+
+        if rot != 0:
+            x_adv = rotate(x_adv, angle=rot, axes=axes, reshape=False)
+
         if self.estimator.clip_values is not None:
             np.clip(
                 x_adv, self.estimator.clip_values[0], self.estimator.clip_values[1], out=x_adv,
@@ -207,3 +260,6 @@ class SpatialTransformation(EvasionAttack):
 
         if not isinstance(self.num_rotations, int) or self.num_rotations <= 0:
             raise ValueError("The number of rotations must be a positive integer.")
+
+        if not isinstance(self.batch_size, int) or self.batch_size <= 0:
+            raise ValueError("The batch size must be a positive integer.")
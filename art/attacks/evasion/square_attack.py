@@ -23,7 +23,6 @@ This module implements the `SquareAttack` attack.
 import bisect
 import logging
 import math
-import random
 from typing import Optional, Union, TYPE_CHECKING
 
 import numpy as np
@@ -49,6 +48,7 @@ class SquareAttack(EvasionAttack):
         "eps",
         "p_init",
         "nb_restarts",
+        "batch_size",
     ]
 
     _estimator_requirements = (BaseEstimator, ClassifierMixin)
@@ -61,6 +61,7 @@ class SquareAttack(EvasionAttack):
         eps: float = 0.3,
         p_init: float = 0.8,
         nb_restarts: int = 1,
+        batch_size: int = 128,
     ):
         """
         Create a :class:`.SquareAttack` instance.
@@ -71,6 +72,7 @@ class SquareAttack(EvasionAttack):
         :param eps: Maximum perturbation that the attacker can introduce.
         :param p_init: Initial fraction of elements.
         :param nb_restarts: Number of restarts.
+        :param batch_size: Batch size for estimator evaluations.
         """
         super().__init__(estimator=estimator)
 
@@ -79,11 +81,11 @@ class SquareAttack(EvasionAttack):
         self.eps = eps
         self.p_init = p_init
         self.nb_restarts = nb_restarts
+        self.batch_size = batch_size
         self._check_params()
 
-    def _get_logits_diff(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
-        y_pred = self.estimator.predict(x)
-
+    @staticmethod
+    def _get_logits_diff(y_pred: np.ndarray, y: np.ndarray) -> np.ndarray:
         logit_correct = np.take_along_axis(y_pred, np.expand_dims(np.argmax(y, axis=1), axis=1), axis=1)
         logit_highest_incorrect = np.take_along_axis(
             y_pred, np.expand_dims(np.argsort(y_pred, axis=1)[:, -2], axis=1), axis=1
@@ -131,11 +133,13 @@ class SquareAttack(EvasionAttack):
             width = x.shape[2]
             channels = x.shape[3]
 
+        # Predictions of the current adversarial examples, only updated for the samples which are still robust
+        y_pred_adv = self.estimator.predict(x_adv, batch_size=self.batch_size)
+
         for _ in trange(self.nb_restarts, desc="SquareAttack - restarts"):
 
             # Determine correctly predicted samples
-            y_pred = self.estimator.predict(x_adv)
-            sample_is_robust = np.argmax(y_pred, axis=1) == np.argmax(y, axis=1)
+            sample_is_robust = np.argmax(y_pred_adv, axis=1) == np.argmax(y, axis=1)
 
             if np.sum(sample_is_robust) == 0:
                 break
@@ -143,7 +147,8 @@ class SquareAttack(EvasionAttack):
             # x_robust = x_adv[sample_is_robust]
             x_robust = x[sample_is_robust]
             y_robust = y[sample_is_robust]
-            sample_logits_diff_init = self._get_logits_diff(x_robust, y_robust)
+            y_pred_robust = self.estimator.predict(x_robust, batch_size=self.batch_size)
+            sample_logits_diff_init = self._get_logits_diff(y_pred_robust, y_robust)
 
             if self.norm in [np.inf, "inf"]:
 
@@ -159,20 +164,22 @@ class SquareAttack(EvasionAttack):
                     a_max=self.estimator.clip_values[1],
                 ).astype(ART_NUMPY_DTYPE)
 
-                sample_logits_diff_new = self._get_logits_diff(x_robust_new, y_robust)
+                y_pred_robust_new = self.estimator.predict(x_robust_new, batch_size=self.batch_size)
+                sample_logits_diff_new = self._get_logits_diff(y_pred_robust_new, y_robust)
                 logits_diff_improved = (sample_logits_diff_new - sample_logits_diff_init) < 0.0
 
                 x_robust[logits_diff_improved] = x_robust_new[logits_diff_improved]
+                y_pred_robust[logits_diff_improved] = y_pred_robust_new[logits_diff_improved]
 
                 x_adv[sample_is_robust] = x_robust
+                y_pred_adv[sample_is_robust] = y_pred_robust
 
                 for i_iter in trange(self.max_iter, desc="SquareAttack - iterations", leave=False):
 
                     percentage_of_elements = self._get_percentage_of_elements(i_iter)
 
                     # Determine correctly predicted samples
-                    y_pred = self.estimator.predict(x_adv)
-                    sample_is_robust = np.argmax(y_pred, axis=1) == np.argmax(y, axis=1)
+                    sample_is_robust = np.argmax(y_pred_adv, axis=1) == np.argmax(y, axis=1)
 
                     if np.sum(sample_is_robust) == 0:
                         break
@@ -180,8 +187,9 @@ class SquareAttack(EvasionAttack):
                     x_robust = x_adv[sample_is_robust]
                     x_init = x[sample_is_robust]
                     y_robust = y[sample_is_robust]
+                    y_pred_robust = y_pred_adv[sample_is_robust]
 
-                    sample_logits_diff_init = self._get_logits_diff(x_robust, y_robust)
+                    sample_logits_diff_init = self._get_logits_diff(y_pred_robust, y_robust)
 
                     height_tile = max(int(round(math.sqrt(percentage_of_elements * height * width))), 1)
 
@@ -207,12 +215,15 @@ class SquareAttack(EvasionAttack):
                         x_robust_new, a_min=self.estimator.clip_values[0], a_max=self.estimator.clip_values[1]
                     ).astype(ART_NUMPY_DTYPE)
 
-                    sample_logits_diff_new = self._get_logits_diff(x_robust_new, y_robust)
+                    y_pred_robust_new = self.estimator.predict(x_robust_new, batch_size=self.batch_size)
+                    sample_logits_diff_new = self._get_logits_diff(y_pred_robust_new, y_robust)
                     logits_diff_improved = (sample_logits_diff_new - sample_logits_diff_init) < 0.0
 
                     x_robust[logits_diff_improved] = x_robust_new[logits_diff_improved]
+                    y_pred_robust[logits_diff_improved] = y_pred_robust_new[logits_diff_improved]
 
                     x_adv[sample_is_robust] = x_robust
+                    y_pred_adv[sample_is_robust] = y_pred_robust
 
             elif self.norm == 2:
 
@@ -220,19 +231,14 @@ class SquareAttack(EvasionAttack):
 
                 height_tile = height // n_tiles
 
-                def _get_perturbation(h):
+                def _get_perturbation(h, size=()):
                     delta = np.zeros([h, h])
-                    gaussian_perturbation = np.zeros([h // 2, h])
-
-                    x_c = h // 4
-                    y_c = h // 2
 
-                    for i_y in range(y_c):
-                        gaussian_perturbation[
-                            max(x_c, 0) : min(x_c + (2 * i_y + 1), h // 2), max(0, y_c) : min(y_c + (2 * i_y + 1), h)
-                        ] += 1.0 / ((i_y + 1) ** 2)
-                        x_c -= 1
-                        y_c -= 1
+                    # Each element sums the weights of the growing squares around the centre which contain it
+                    rows = np.abs(np.arange(h // 2) - h // 4)[:, np.newaxis]
+                    cols = np.abs(np.arange(h) - h // 2)[np.newaxis, :]
+                    weights = np.append(np.cumsum(1.0 / np.arange(h // 2, 0, -1) ** 2)[::-1], 0.0)
+                    gaussian_perturbation = weights[np.minimum(np.maximum(rows, cols), h // 2)]
 
                     gaussian_perturbation /= np.sqrt(np.sum(gaussian_perturbation ** 2))
 
@@ -241,41 +247,28 @@ class SquareAttack(EvasionAttack):
 
                     delta /= np.sqrt(np.sum(delta ** 2))
 
-                    if random.random() > 0.5:
-                        delta = np.transpose(delta)
-
-                    if random.random() > 0.5:
-                        delta = -delta
+                    # Independent random transpositions and signs for each perturbation of shape `size`
+                    delta = np.where(np.random.rand(*size, 1, 1) > 0.5, np.transpose(delta), delta)
+                    delta = np.where(np.random.rand(*size, 1, 1) > 0.5, -delta, delta)
 
                     return delta
 
                 delta_init = np.zeros(x_robust.shape)
 
-                height_start = 0
-                for _ in range(n_tiles):
-                    width_start = 0
-                    for _ in range(n_tiles):
-                        if self.estimator.channels_first:
-                            perturbation_size = (1, 1, height_tile, height_tile)
-                            random_size = (x_robust.shape[0], channels, 1, 1)
-                        else:
-                            perturbation_size = (1, height_tile, height_tile, 1)
-                            random_size = (x_robust.shape[0], 1, 1, channels)
-
-                        perturbation = _get_perturbation(height_tile).reshape(perturbation_size) * np.random.choice(
-                            [-1, 1], size=random_size
-                        )
+                # Tile the perturbations over a grid of `n_tiles` x `n_tiles` squares with random signs per channel
+                grid_size = n_tiles * height_tile
+                perturbation = (
+                    _get_perturbation(height_tile, (n_tiles, n_tiles)).transpose(0, 2, 1, 3).reshape(grid_size, -1)
+                )
 
-                        if self.estimator.channels_first:
-                            delta_init[
-                                :, :, height_start : height_start + height_tile, width_start : width_start + height_tile
-                            ] += perturbation
-                        else:
-                            delta_init[
-                                :, height_start : height_start + height_tile, width_start : width_start + height_tile, :
-                            ] += perturbation
-                        width_start += height_tile
-                    height_start += height_tile
+                if self.estimator.channels_first:
+                    random_size = (x_robust.shape[0], channels, n_tiles, n_tiles)
+                    signs = np.random.choice([-1, 1], size=random_size).repeat(height_tile, 2).repeat(height_tile, 3)
+                    delta_init[:, :, :grid_size, :grid_size] += perturbation * signs
+                else:
+                    random_size = (x_robust.shape[0], n_tiles, n_tiles, channels)
+                    signs = np.random.choice([-1, 1], size=random_size).repeat(height_tile, 1).repeat(height_tile, 2)
+                    delta_init[:, :grid_size, :grid_size, :] += perturbation[:, :, np.newaxis] * signs
 
                 x_robust_new = np.clip(
                     x_robust + delta_init / np.sqrt(np.sum(delta_init ** 2, axis=(1, 2, 3), keepdims=True)) * self.eps,
@@ -283,20 +276,22 @@ class SquareAttack(EvasionAttack):
                     self.estimator.clip_values[1],
                 )
 
-                sample_logits_diff_new = self._get_logits_diff(x_robust_new, y_robust)
+                y_pred_robust_new = self.estimator.predict(x_robust_new, batch_size=self.batch_size)
+                sample_logits_diff_new = self._get_logits_diff(y_pred_robust_new, y_robust)
                 logits_diff_improved = (sample_logits_diff_new - sample_logits_diff_init) < 0.0
 
                 x_robust[logits_diff_improved] = x_robust_new[logits_diff_improved]
+                y_pred_robust[logits_diff_improved] = y_pred_robust_new[logits_diff_improved]
 
                 x_adv[sample_is_robust] = x_robust
+                y_pred_adv[sample_is_robust] = y_pred_robust
 
                 for i_iter in trange(self.max_iter, desc="SquareAttack - iterations", leave=False):
 
                     percentage_of_elements = self._get_percentage_of_elements(i_iter)
 
                     # Determine correctly predicted samples
-                    y_pred = self.estimator.predict(x_adv)
-                    sample_is_robust = np.argmax(y_pred, axis=1) == np.argmax(y, axis=1)
+                    sample_is_robust = np.argmax(y_pred_adv, axis=1) == np.argmax(y, axis=1)
 
                     if np.sum(sample_is_robust) == 0:
                         break
@@ -304,8 +299,9 @@ class SquareAttack(EvasionAttack):
                     x_robust = x_adv[sample_is_robust]
                     x_init = x[sample_is_robust]
                     y_robust = y[sample_is_robust]
+                    y_pred_robust = y_pred_adv[sample_is_robust]
 
-                    sample_logits_diff_init = self._get_logits_diff(x_robust, y_robust)
+                    sample_logits_diff_init = self._get_logits_diff(y_pred_robust, y_robust)
 
                     delta_x_robust_init = x_robust - x_init
 
@@ -445,12 +441,15 @@ class SquareAttack(EvasionAttack):
                         self.estimator.clip_values[1],
                     )
 
-                    sample_logits_diff_new = self._get_logits_diff(x_robust_new, y_robust)
+                    y_pred_robust_new = self.estimator.predict(x_robust_new, batch_size=self.batch_size)
+                    sample_logits_diff_new = self._get_logits_diff(y_pred_robust_new, y_robust)
                     logits_diff_improved = (sample_logits_diff_new - sample_logits_diff_init) < 0.0
 
                     x_robust[logits_diff_improved] = x_robust_new[logits_diff_improved]
+                    y_pred_robust[logits_diff_improved] = y_pred_robust_new[logits_diff_improved]
 
                     x_adv[sample_is_robust] = x_robust
+                    y_pred_adv[sample_is_robust] = y_pred_robust
 
         return x_adv
 
@@ -469,3 +468,6 @@ class SquareAttack(EvasionAttack):
 
         if not isinstance(self.nb_restarts, int) or self.nb_restarts <= 0:
             raise ValueError("The argument nb_restarts has to be of type int and larger than zero.")
+
+        if not isinstance(self.batch_size, int) or self.batch_size <= 0:
+            raise ValueError("The argument batch_size has to be of type int and larger than zero.")
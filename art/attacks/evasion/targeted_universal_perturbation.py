@@ -52,7 +52,16 @@ class TargetedUniversalPerturbation(EvasionAttack):
         "fgsm": "art.attacks.evasion.fast_gradient.FastGradientMethod",
         "simba": "art.attacks.evasion.simba.SimBA",
     }
-    attack_params = EvasionAttack.attack_params + ["attacker", "attacker_params", "delta", "max_iter", "eps", "norm"]
+    attack_params = EvasionAttack.attack_params + [
+        "attacker",
+        "attacker_params",
+        "delta",
+        "max_iter",
+        "eps",
+        "norm",
+        "batch_size",
+        "nb_parallel_samples",
+    ]
 
     _estimator_requirements = (BaseEstimator, ClassifierMixin)
 
@@ -65,6 +74,8 @@ class TargetedUniversalPerturbation(EvasionAttack):
         max_iter: int = 20,
         eps: float = 10.0,
         norm: Union[int, float, str] = np.inf,
+        batch_size: int = 32,
+        nb_parallel_samples: int = 1,
     ):
         """
         :param classifier: A trained classifier.
@@ -75,6 +86,10 @@ class TargetedUniversalPerturbation(EvasionAttack):
         :param max_iter: The maximum number of iterations for computing universal perturbation.
         :param eps: Attack step size (input variation)
         :param norm: The norm of the adversarial perturbation. Possible values: "inf", np.inf, 2
+        :param batch_size: Batch size for model evaluations in TargetedUniversalPerturbation.
+        :param nb_parallel_samples: Number of examples attacked together, whose perturbation increments are summed
+                                    before the projection. The default of 1 updates the perturbation sequentially after
+                                    each example.
         """
         super().__init__(estimator=classifier)
 
@@ -84,6 +99,8 @@ class TargetedUniversalPerturbation(EvasionAttack):
         self.max_iter = max_iter
         self.eps = eps
         self.norm = norm
+        self.batch_size = batch_size
+        self.nb_parallel_samples = nb_parallel_samples
         self._targeted = True
         self._check_params()
 
@@ -108,7 +125,7 @@ class TargetedUniversalPerturbation(EvasionAttack):
 
         # Instantiate the middle attacker and get the predicted labels
         attacker = self._get_attack(self.attacker, self.attacker_params)
-        pred_y = self.estimator.predict(x, batch_size=1)
+        pred_y = self.estimator.predict(x, batch_size=self.batch_size)
         pred_y_max = np.argmax(pred_y, axis=1)
 
         # Start to generate the adversarial examples
@@ -117,23 +134,26 @@ class TargetedUniversalPerturbation(EvasionAttack):
             # Go through all the examples randomly
             rnd_idx = random.sample(range(nb_instances), nb_instances)
 
-            # Go through the data set and compute the perturbation increments sequentially
-            for _, (e_x, e_y) in enumerate(zip(x[rnd_idx], y[rnd_idx])):
-                x_i = e_x[None, ...]
-                y_i = e_y[None, ...]
+            # Go through the data set and compute the perturbation increments sequentially, by blocks of examples
+            for block_start in range(0, nb_instances, self.nb_parallel_samples):
+                block_idx = rnd_idx[block_start : block_start + self.nb_parallel_samples]
+                x_block = x[block_idx] + noise
+                y_block = y[block_idx]
 
-                current_label = np.argmax(self.estimator.predict(x_i + noise)[0])
-                target_label = np.argmax(y_i)
+                current_labels = np.argmax(self.estimator.predict(x_block, batch_size=self.batch_size), axis=1)
+                target_labels = np.argmax(y_block, axis=1)
+                not_fooled = current_labels != target_labels
 
-                if current_label != target_label:
+                if np.any(not_fooled):
                     # Compute adversarial perturbation
-                    adv_xi = attacker.generate(x_i + noise, y=y_i)
+                    adv_x = attacker.generate(x_block[not_fooled], y=y_block[not_fooled])
 
-                    new_label = np.argmax(self.estimator.predict(adv_xi)[0])
+                    new_labels = np.argmax(self.estimator.predict(adv_x, batch_size=self.batch_size), axis=1)
 
                     # If the class has changed, update v
-                    if new_label == target_label:
-                        noise = adv_xi - x_i
+                    changed = new_labels == target_labels[not_fooled]
+                    if np.any(changed):
+                        noise = noise + np.sum(adv_x[changed] - x_block[not_fooled][changed], axis=0, keepdims=True)
 
                         # Project on L_p ball
                         noise = projection(noise, self.eps, self.norm)
@@ -146,7 +166,7 @@ class TargetedUniversalPerturbation(EvasionAttack):
                 x_adv = np.clip(x_adv, clip_min, clip_max)
 
             # Compute the error rate
-            y_adv = np.argmax(self.estimator.predict(x_adv, batch_size=1), axis=1)
+            y_adv = np.argmax(self.estimator.predict(x_adv, batch_size=self.batch_size), axis=1)
             fooling_rate = np.sum(pred_y_max != y_adv) / nb_instances
             targeted_success_rate = np.sum(y_adv == np.argmax(y, axis=1)) / nb_instances
 
@@ -170,6 +190,12 @@ class TargetedUniversalPerturbation(EvasionAttack):
         if not isinstance(self.eps, (float, int)) or self.eps <= 0:
             raise ValueError("The eps coefficient must be a positive float.")
 
+        if not isinstance(self.batch_size, (int, np.int)) or self.batch_size <= 0:
+            raise ValueError("The batch_size must be a positive integer.")
+
+        if not isinstance(self.nb_parallel_samples, (int, np.int)) or self.nb_parallel_samples <= 0:
+            raise ValueError("The number of parallel samples must be a positive integer.")
+
     def _get_attack(self, a_name: str, params: Optional[Dict[str, Any]] = None) -> EvasionAttack:
         """
         Get an attack object from its name.
@@ -71,6 +71,7 @@ class UniversalPerturbation(EvasionAttack):
         "eps",
         "norm",
         "batch_size",
+        "nb_parallel_samples",
     ]
     _estimator_requirements = (BaseEstimator, ClassifierMixin)
 
@@ -84,6 +85,7 @@ class UniversalPerturbation(EvasionAttack):
         eps: float = 10.0,
         norm: Union[int, float, str] = np.inf,
         batch_size: int = 32,
+        nb_parallel_samples: int = 1,
     ) -> None:
         """
         :param classifier: A trained classifier.
@@ -96,6 +98,9 @@ class UniversalPerturbation(EvasionAttack):
         :param eps: Attack step size (input variation).
         :param norm: The norm of the adversarial perturbation. Possible values: "inf", np.inf, 2.
         :param batch_size: Batch size for model evaluations in UniversalPerturbation.
+        :param nb_parallel_samples: Number of examples attacked together, whose perturbation increments are summed
+                                    before the projection. The default of 1 updates the perturbation sequentially after
+                                    each example.
         """
         super().__init__(estimator=classifier)
         self.attacker = attacker
@@ -105,6 +110,7 @@ class UniversalPerturbation(EvasionAttack):
         self.eps = eps
         self.norm = norm
         self.batch_size = batch_size
+        self.nb_parallel_samples = nb_parallel_samples
         self._check_params()
 
     def generate(self, x: np.ndarray, y: Optional[np.ndarray] = None, **kwargs) -> np.ndarray:
@@ -142,21 +148,23 @@ class UniversalPerturbation(EvasionAttack):
             # Go through all the examples randomly
             rnd_idx = random.sample(range(nb_instances), nb_instances)
 
-            # Go through the data set and compute the perturbation increments sequentially
-            for j, ex in enumerate(x[rnd_idx]):
-                x_i = ex[None, ...]
+            # Go through the data set and compute the perturbation increments sequentially, by blocks of examples
+            for block_start in range(0, nb_instances, self.nb_parallel_samples):
+                block_idx = rnd_idx[block_start : block_start + self.nb_parallel_samples]
+                x_block = x[block_idx] + noise
 
-                current_label = np.argmax(self.estimator.predict(x_i + noise)[0])
-                original_label = y_index[rnd_idx][j]
+                current_labels = np.argmax(self.estimator.predict(x_block, batch_size=self.batch_size), axis=1)
+                not_fooled = current_labels == y_index[block_idx]
 
-                if current_label == original_label:
+                if np.any(not_fooled):
                     # Compute adversarial perturbation
-                    adv_xi = attacker.generate(x_i + noise, y=y[rnd_idx][[j]])
-                    new_label = np.argmax(self.estimator.predict(adv_xi)[0])
+                    adv_x = attacker.generate(x_block[not_fooled], y=y[block_idx][not_fooled])
+                    new_labels = np.argmax(self.estimator.predict(adv_x, batch_size=self.batch_size), axis=1)
 
                     # If the class has changed, update v
-                    if current_label != new_label:
-                        noise = adv_xi - x_i
+                    changed = current_labels[not_fooled] != new_labels
+                    if np.any(changed):
+                        noise = noise + np.sum(adv_x[changed] - x_block[not_fooled][changed], axis=0, keepdims=True)
 
                         # Project on L_p ball
                         noise = projection(noise, self.eps, self.norm)
@@ -170,7 +178,7 @@ class UniversalPerturbation(EvasionAttack):
                 x_adv = np.clip(x_adv, clip_min, clip_max)
 
             # Compute the error rate
-            y_adv = np.argmax(self.estimator.predict(x_adv, batch_size=1), axis=1)
+            y_adv = np.argmax(self.estimator.predict(x_adv, batch_size=self.batch_size), axis=1)
             fooling_rate = np.sum(y_index != y_adv) / nb_instances
 
         pbar.close()
@@ -194,6 +202,9 @@ class UniversalPerturbation(EvasionAttack):
         if not isinstance(self.batch_size, (int, np.int)) or self.batch_size <= 0:
             raise ValueError("The batch_size must be a positive integer.")
 
+        if not isinstance(self.nb_parallel_samples, (int, np.int)) or self.nb_parallel_samples <= 0:
+            raise ValueError("The number of parallel samples must be a positive integer.")
+
     def _get_attack(self, a_name: str, params: Optional[Dict[str, Any]] = None) -> EvasionAttack:
         """
         Get an attack object from its name.
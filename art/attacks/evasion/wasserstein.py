@@ -268,7 +268,7 @@ class Wasserstein(EvasionAttack):
         tol = 10e-8
 
         # Get gradient wrt loss; invert it if attack is targeted
-        grad = self.estimator.loss_gradient(x, y) * (1 - 2 * int(self.targeted))
+        grad = self.estimator.loss_gradient(x, y, batch_size=self.batch_size) * (1 - 2 * int(self.targeted))
 
         # Apply norm bound
         if self.norm == "inf":
@@ -25,7 +25,7 @@ gradients.
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import logging
-from typing import Optional, Tuple, TYPE_CHECKING
+from typing import Dict, Optional, Tuple, TYPE_CHECKING
 
 import numpy as np
 from scipy.ndimage import zoom
@@ -164,6 +164,9 @@ class ZooAttack(EvasionAttack):
         self.adam_var = None
         self.adam_epochs = None
 
+        # Interpolation matrices of `zoom` along one axis, by pair of sizes
+        self._zoom_matrices: Dict[Tuple[int, int], np.ndarray] = {}
+
     def _loss(
         self, x: np.ndarray, x_adv: np.ndarray, target: np.ndarray, c_weight: np.ndarray
     ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
@@ -177,10 +180,8 @@ class ZooAttack(EvasionAttack):
         :return: A tuple holding the current logits, `L_2` distortion and overall loss.
         """
         l2dist = np.sum(np.square(x - x_adv).reshape(x_adv.shape[0], -1), axis=1)
-        ratios = [1.0] + [
-            int(new_size) / int(old_size) for new_size, old_size in zip(self.estimator.input_shape, x.shape[1:])
-        ]
-        preds = self.estimator.predict(np.array(zoom(x_adv, zoom=ratios)), batch_size=self.batch_size)
+        x_adv_zoom = self._zoom(x_adv, (x_adv.shape[0],) + tuple(int(size) for size in self.estimator.input_shape))
+        preds = self.estimator.predict(x_adv_zoom, batch_size=self.batch_size)
         z_target = np.sum(preds * target, axis=1)
         z_other = np.max(preds * (1 - target) + (np.min(preds, axis=1) - 1)[:, np.newaxis] * target, axis=1,)
 
@@ -355,26 +356,10 @@ class ZooAttack(EvasionAttack):
             if self.use_resize:
                 if iter_ == 2000:
                     x_adv = self._resize_image(x_adv, 64, 64)
-                    x_orig = zoom(
-                        x_orig,
-                        [
-                            1,
-                            x_adv.shape[1] / x_orig.shape[1],
-                            x_adv.shape[2] / x_orig.shape[2],
-                            x_adv.shape[3] / x_orig.shape[3],
-                        ],
-                    )
+                    x_orig = self._zoom(x_orig, x_adv.shape)
                 elif iter_ == 10000:
                     x_adv = self._resize_image(x_adv, 128, 128)
-                    x_orig = zoom(
-                        x_orig,
-                        [
-                            1,
-                            x_adv.shape[1] / x_orig.shape[1],
-                            x_adv.shape[2] / x_orig.shape[2],
-                            x_adv.shape[3] / x_orig.shape[3],
-                        ],
-                    )
+                    x_orig = self._zoom(x_orig, x_adv.shape)
 
             # Compute adversarial examples and loss
             x_adv = self._optimizer(x_adv, y_batch, c_batch)
@@ -406,15 +391,10 @@ class ZooAttack(EvasionAttack):
         best_attack = np.array(best_attack)
         if self.use_resize:
             if not self.estimator.channels_first:
-                best_attack = zoom(
-                    best_attack,
-                    [1, int(x_batch.shape[1]) / best_attack.shape[1], int(x_batch.shape[2]) / best_attack.shape[2], 1,],
-                )
+                shape = best_attack.shape[:1] + x_batch.shape[1:3] + best_attack.shape[3:]
             else:
-                best_attack = zoom(
-                    best_attack,
-                    [1, 1, int(x_batch.shape[2]) / best_attack.shape[2], int(x_batch.shape[2]) / best_attack.shape[3],],
-                )
+                shape = best_attack.shape[:2] + (x_batch.shape[2], x_batch.shape[2])
+            best_attack = self._zoom(best_attack, shape)
 
         return best_dist, best_label, best_attack
 
@@ -424,28 +404,20 @@ class ZooAttack(EvasionAttack):
         coord_batch = coord_batch.reshape(2 * self.nb_parallel * self._current_noise.shape[0], -1)
 
         # Sample indices to prioritize for optimization
-        if self.use_importance and np.unique(self._sample_prob).size != 1:
-            indices = (
-                np.random.choice(
-                    coord_batch.shape[-1] * x.shape[0],
-                    self.nb_parallel * self._current_noise.shape[0],
-                    replace=False,
-                    p=self._sample_prob.flatten(),
-                )
-                % coord_batch.shape[-1]
-            )
+        nb_indices = self.nb_parallel * self._current_noise.shape[0]
+        nb_coordinates = coord_batch.shape[-1] * x.shape[0]
+        if self.use_importance and np.any(self._sample_prob != self._sample_prob.flat[0]):
+            # Sampling without replacement by the smallest exponential keys scaled by the probabilities
+            with np.errstate(divide="ignore"):
+                keys = np.random.exponential(size=nb_coordinates) / self._sample_prob.flatten()
+            indices = np.argpartition(keys, nb_indices - 1)[:nb_indices] % coord_batch.shape[-1]
         else:
-            indices = (
-                np.random.choice(
-                    coord_batch.shape[-1] * x.shape[0], self.nb_parallel * self._current_noise.shape[0], replace=False,
-                )
-                % coord_batch.shape[-1]
-            )
+            indices = np.random.choice(nb_coordinates, nb_indices, replace=False) % coord_batch.shape[-1]
 
         # Create the batch of modifications to run
-        for i in range(self.nb_parallel * self._current_noise.shape[0]):
-            coord_batch[2 * i, indices[i]] += self.variable_h
-            coord_batch[2 * i + 1, indices[i]] -= self.variable_h
+        rows = 2 * np.arange(nb_indices)
+        coord_batch[rows, indices] += self.variable_h
+        coord_batch[rows + 1, indices] -= self.variable_h
 
         # Compute loss for all samples and coordinates, then optimize
         expanded_x = np.repeat(x, 2 * self.nb_parallel, axis=0).reshape((-1,) + x.shape[1:])
@@ -487,7 +459,7 @@ class ZooAttack(EvasionAttack):
         beta1, beta2 = 0.9, 0.999
 
         # Estimate grads from loss variation (constant `h` from the paper is fixed to .0001)
-        grads = np.array([(losses[i] - losses[i + 1]) / (2 * self.variable_h) for i in range(0, len(losses), 2)])
+        grads = (losses[0::2] - losses[1::2]) / (2 * self.variable_h)
 
         # ADAM update
         mean[index] = beta1 * mean[index] + (1 - beta1) * grads
@@ -535,12 +507,12 @@ class ZooAttack(EvasionAttack):
                 resized_x = x
                 self._current_noise.fill(0)
             else:
-                resized_x = zoom(x, (1, dims[1] / x.shape[1], dims[2] / x.shape[2], dims[3] / x.shape[3],),)
+                resized_x = self._zoom(x, dims)
                 self._current_noise = np.zeros(dims, dtype=ART_NUMPY_DTYPE)
             self._sample_prob = np.ones(nb_vars, dtype=ART_NUMPY_DTYPE) / nb_vars
         else:
             # Rescale variables and reset values
-            resized_x = zoom(x, (1, dims[1] / x.shape[1], dims[2] / x.shape[2], dims[3] / x.shape[3]))
+            resized_x = self._zoom(x, dims)
             self._sample_prob = self._get_prob(self._current_noise, double=True).flatten()
             self._current_noise = np.zeros(dims, dtype=ART_NUMPY_DTYPE)
 
@@ -557,38 +529,51 @@ class ZooAttack(EvasionAttack):
         if double:
             dims = [2 * size if i not in [0, channel_index] else size for i, size in enumerate(dims)]
 
-        prob = np.empty(shape=dims, dtype=np.float32)
-        image = np.abs(prev_noise)
+        # Pool all channels together, with the channels moved next to the batch axis
+        image = np.abs(np.moveaxis(prev_noise, channel_index, 1))
+        kernel_size = dims[2] // 8 if self.estimator.channels_first else dims[1] // 8
+        image_pool = self._max_pooling(image.reshape((-1,) + image.shape[2:]), kernel_size).reshape(image.shape)
 
-        for channel in range(prev_noise.shape[channel_index]):
-            if not self.estimator.channels_first:
-                image_pool = self._max_pooling(image[:, :, :, channel], dims[1] // 8)
-                if double:
-                    prob[:, :, :, channel] = np.abs(zoom(image_pool, [1, 2, 2]))
-                else:
-                    prob[:, :, :, channel] = image_pool
-            elif self.estimator.channels_first:
-                image_pool = self._max_pooling(image[:, channel, :, :], dims[2] // 8)
-                if double:
-                    prob[:, channel, :, :] = np.abs(zoom(image_pool, [1, 2, 2]))
-                else:
-                    prob[:, channel, :, :] = image_pool
+        if double:
+            image_pool = np.abs(self._zoom(image_pool, image_pool.shape[:2] + (2 * image.shape[2], 2 * image.shape[3])))
 
+        prob = np.moveaxis(image_pool, 1, channel_index).astype(np.float32)
         prob /= np.sum(prob)
 
         return prob
 
     @staticmethod
     def _max_pooling(image: np.ndarray, kernel_size: int) -> np.ndarray:
-        img_pool = np.copy(image)
-        for i in range(0, image.shape[1], kernel_size):
-            for j in range(0, image.shape[2], kernel_size):
-                img_pool[:, i : i + kernel_size, j : j + kernel_size] = np.max(
-                    image[:, i : i + kernel_size, j : j + kernel_size], axis=(1, 2), keepdims=True,
-                )
+        nb_images, height, width = image.shape
+        nb_rows, nb_cols = -(-height // kernel_size), -(-width // kernel_size)
+
+        # Pad the images to whole tiles, pool each tile and broadcast its maximum back over the tile
+        padded = np.full((nb_images, nb_rows * kernel_size, nb_cols * kernel_size), -np.inf, dtype=image.dtype)
+        padded[:, :height, :width] = image
+        pooled = np.max(padded.reshape(nb_images, nb_rows, kernel_size, nb_cols, kernel_size), axis=(2, 4))
+        img_pool = np.repeat(np.repeat(pooled, kernel_size, axis=1), kernel_size, axis=2)[:, :height, :width]
 
         return img_pool
 
+    def _zoom(self, x: np.ndarray, shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        Resize `x` to `shape` like `scipy.ndimage.zoom`. The spline interpolation along each axis is a linear map whose
+        matrix is computed once per pair of sizes and cached.
+
+        :param x: An array to resize.
+        :param shape: The shape of the resized array.
+        :return: The resized array.
+        """
+        x_zoom = x
+        for axis, (old_size, new_size) in enumerate(zip(x.shape, shape)):
+            if old_size != new_size:
+                if (old_size, new_size) not in self._zoom_matrices:
+                    self._zoom_matrices[(old_size, new_size)] = zoom(np.eye(old_size), (new_size / old_size, 1))
+                matrix = self._zoom_matrices[(old_size, new_size)]
+                x_zoom = np.moveaxis(np.tensordot(matrix, x_zoom, axes=(1, axis)), 0, axis)
+
+        return x_zoom.astype(x.dtype, copy=False)
+
     def _check_params(self) -> None:
         if not isinstance(self.binary_search_steps, (int, np.int)) or self.binary_search_steps < 0:
             raise ValueError("The number of binary search steps must be a non-negative integer.")
@@ -86,14 +86,18 @@ class FeatureSqueezing(Preprocessor):
         :param y: Labels of the sample `x`. This function does not affect them in any way.
         :return: Squeezed sample.
         """
-        x_normalized = x - self.clip_values[0]
-        x_normalized = x_normalized / (self.clip_values[1] - self.clip_values[0])
+        # Normalise, quantise and rescale in a single new array
+        dtype = np.result_type(x, self.clip_values[0], self.clip_values[1], np.float32)
+        res = np.subtract(x, self.clip_values[0], dtype=dtype)
+        res /= self.clip_values[1] - self.clip_values[0]
 
         max_value = np.rint(2 ** self.bit_depth - 1)
-        res = np.rint(x_normalized * max_value) / max_value
+        res *= max_value
+        np.rint(res, out=res)
+        res /= max_value
 
-        res = res * (self.clip_values[1] - self.clip_values[0])
-        res = res + self.clip_values[0]
+        res *= self.clip_values[1] - self.clip_values[0]
+        res += self.clip_values[0]
 
         return res, y
 
@@ -110,9 +110,11 @@ class ThermometerEncoding(Preprocessor):
         :param y: Labels of the sample `x`. This function does not affect them in any way.
         :return: Encoded sample with shape `(batch_size, width, height, depth x num_space)`.
         """
-        # First normalize the input to be in [0, 1]:
-        np.clip(x, self.clip_values[0], self.clip_values[1], out=x)
-        x = (x - self.clip_values[0]) / (self.clip_values[1] - self.clip_values[0])
+        # First normalize the input to be in [0, 1] in a single new array, leaving the input unchanged:
+        x = np.clip(x, self.clip_values[0], self.clip_values[1])
+        x = x.astype(np.result_type(x, ART_NUMPY_DTYPE), copy=False)
+        x -= self.clip_values[0]
+        x /= self.clip_values[1] - self.clip_values[0]
 
         # Now apply the encoding:
         channel_index = 1 if self.channels_first else x.ndim - 1
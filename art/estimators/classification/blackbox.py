@@ -20,12 +20,17 @@ This module implements the classifier `BlackBoxClassifier` for black-box classif
 """
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+from concurrent.futures import ThreadPoolExecutor
 import logging
-from typing import Callable, List, Optional, Tuple, Union, TYPE_CHECKING
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Union, TYPE_CHECKING
 
 import numpy as np
 
+from art.config import ART_NUMPY_DTYPE
 from art.estimators.classification.classifier import Classifier
+from art.utils import ArrayLRUCache, array_fingerprint
 
 if TYPE_CHECKING:
     from art.utils import CLIP_VALUES_TYPE, PREPROCESSING_TYPE
@@ -49,6 +54,11 @@ class BlackBoxClassifier(Classifier):
         preprocessing_defences: Union["Preprocessor", List["Preprocessor"], None] = None,
         postprocessing_defences: Union["Postprocessor", List["Postprocessor"], None] = None,
         preprocessing: "PREPROCESSING_TYPE" = (0, 1),
+        cache_size: Optional[int] = None,
+        nb_parallel_queries: int = 1,
+        max_queries_per_second: Optional[float] = None,
+        nb_retries: int = 0,
+        retry_delay: float = 1.0,
     ):
         """
         Create a `Classifier` instance for a black-box model.
@@ -65,6 +75,13 @@ class BlackBoxClassifier(Classifier):
         :param preprocessing: Tuple of the form `(subtrahend, divisor)` of floats or `np.ndarray` of values to be
                used for data preprocessing. The first value will be subtracted from the input. The input will then
                be divided by the second one.
+        :param cache_size: Maximum number of predictions of single samples to cache. If set, only samples that are not
+               in the least recently used cache, which is keyed by a hash of the bytes of each preprocessed sample, are
+               passed to `predict`. Disabled by default.
+        :param nb_parallel_queries: Maximum number of batches passed concurrently to `predict` from a thread pool.
+        :param max_queries_per_second: Maximum number of calls of `predict` per second. No limit if `None`.
+        :param nb_retries: Number of times a batch is passed again to `predict` after `predict` raised an exception.
+        :param retry_delay: Delay in seconds before the first retry of a batch, doubled after each further retry.
         """
         super().__init__(
             clip_values=clip_values,
@@ -77,6 +94,58 @@ class BlackBoxClassifier(Classifier):
         self._input_shape = input_shape
         self._nb_classes = nb_classes
 
+        self._prediction_cache: Optional[ArrayLRUCache] = None
+        if cache_size is not None:
+            if cache_size <= 0:
+                raise ValueError("The size of the prediction cache `cache_size` has to be positive.")
+            self._prediction_cache = ArrayLRUCache(
+                max_bytes=cache_size * nb_classes * np.dtype(ART_NUMPY_DTYPE).itemsize
+            )
+
+        self._nb_parallel_queries = nb_parallel_queries
+        self._max_queries_per_second = max_queries_per_second
+        self._nb_retries = nb_retries
+        self._retry_delay = retry_delay
+        self._next_query_time = 0.0
+        self._rate_lock = threading.Lock()
+
+        if not isinstance(nb_parallel_queries, int) or nb_parallel_queries <= 0:
+            raise ValueError("The number of parallel queries `nb_parallel_queries` has to be a positive integer.")
+        if max_queries_per_second is not None and max_queries_per_second <= 0:
+            raise ValueError("The maximum number of queries per second `max_queries_per_second` has to be positive.")
+        if not isinstance(nb_retries, int) or nb_retries < 0:
+            raise ValueError("The number of retries `nb_retries` has to be a non-negative integer.")
+        if retry_delay < 0:
+            raise ValueError("The retry delay `retry_delay` has to be non-negative.")
+
+    @property
+    def prediction_cache(self) -> Optional[ArrayLRUCache]:
+        """
+        Return the cache of predictions, which counts its `hits` and `misses`.
+
+        :return: The prediction cache or `None` if caching is disabled.
+        """
+        return self._prediction_cache
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """
+        Use to ensure `BlackBoxClassifier` can be pickled, without its lock.
+
+        :return: State dictionary with instance parameters.
+        """
+        state = self.__dict__.copy()
+        del state["_rate_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        """
+        Use to ensure `BlackBoxClassifier` can be unpickled, with a new lock.
+
+        :param state: State dictionary with instance parameters to restore.
+        """
+        self.__dict__.update(state)
+        self._rate_lock = threading.Lock()
+
     # pylint: disable=W0221
     def predict(self, x: np.ndarray, batch_size: int = 128, **kwargs) -> np.ndarray:
         """
@@ -86,25 +155,112 @@ class BlackBoxClassifier(Classifier):
         :param batch_size: Size of batches.
         :return: Array of predictions of shape `(nb_inputs, nb_classes)`.
         """
-        from art.config import ART_NUMPY_DTYPE
-
         # Apply preprocessing
         x_preprocessed, _ = self._apply_preprocessing(x, y=None, fit=False)
 
-        # Run predictions with batching
-        predictions = np.zeros((x_preprocessed.shape[0], self.nb_classes), dtype=ART_NUMPY_DTYPE)
-        for batch_index in range(int(np.ceil(x_preprocessed.shape[0] / float(batch_size)))):
-            begin, end = (
-                batch_index * batch_size,
-                min((batch_index + 1) * batch_size, x_preprocessed.shape[0]),
-            )
-            predictions[begin:end] = self._predictions(x_preprocessed[begin:end])
+        if self._prediction_cache is None:
+            predictions = self._predict_batches(x_preprocessed, batch_size=batch_size)
+        else:
+            predictions = self._predict_cached(x_preprocessed, batch_size=batch_size)
 
         # Apply postprocessing
         predictions = self._apply_postprocessing(preds=predictions, fit=False)
 
         return predictions
 
+    def _predict_batches(self, x_preprocessed: np.ndarray, batch_size: int) -> np.ndarray:
+        """
+        Query the black-box model for preprocessed samples in batches.
+
+        :param x_preprocessed: Preprocessed samples.
+        :param batch_size: Size of batches.
+        :return: Array of predictions of shape `(nb_inputs, nb_classes)`.
+        """
+        batches = [
+            (batch_index * batch_size, min((batch_index + 1) * batch_size, x_preprocessed.shape[0]))
+            for batch_index in range(int(np.ceil(x_preprocessed.shape[0] / float(batch_size))))
+        ]
+        predictions = np.zeros((x_preprocessed.shape[0], self.nb_classes), dtype=ART_NUMPY_DTYPE)
+
+        if self._nb_parallel_queries == 1 or len(batches) == 1:
+            for begin, end in batches:
+                predictions[begin:end] = self._query(x_preprocessed[begin:end])
+        else:
+            # Results are written back by batch index, which keeps the order of the inputs
+            with ThreadPoolExecutor(max_workers=self._nb_parallel_queries) as executor:
+                futures = [executor.submit(self._query, x_preprocessed[begin:end]) for begin, end in batches]
+                for (begin, end), future in zip(batches, futures):
+                    predictions[begin:end] = future.result()
+
+        return predictions
+
+    def _query(self, x_batch: np.ndarray) -> np.ndarray:
+        """
+        Pass a batch of samples to the black-box model, respecting the limit of queries per second and retrying failed
+        queries with exponential backoff.
+
+        :param x_batch: Batch of preprocessed samples.
+        :return: Predictions for the batch.
+        """
+        retry = 0
+        while True:
+            if self._max_queries_per_second is not None:
+                with self._rate_lock:
+                    now = time.monotonic()
+                    wait = self._next_query_time - now
+                    self._next_query_time = max(now, self._next_query_time) + 1.0 / self._max_queries_per_second
+                if wait > 0:
+                    time.sleep(wait)
+
+            try:
+                return self._predictions(x_batch)
+            except Exception as exception:  # pylint: disable=W0703
+                if retry >= self._nb_retries:
+                    raise
+                delay = self._retry_delay * 2 ** retry
+                logger.warning("Query of the black-box model failed (%s), retrying in %.2f seconds.", exception, delay)
+                time.sleep(delay)
+                retry += 1
+
+    def _predict_cached(self, x_preprocessed: np.ndarray, batch_size: int) -> np.ndarray:
+        """
+        Look up the predictions of preprocessed samples in the prediction cache and query the black-box model only
+        once for each distinct sample that is not cached.
+
+        :param x_preprocessed: Preprocessed samples.
+        :param batch_size: Size of batches.
+        :return: Array of predictions of shape `(nb_inputs, nb_classes)`.
+        """
+        cache = self._prediction_cache
+        assert cache is not None
+
+        predictions = np.zeros((x_preprocessed.shape[0], self.nb_classes), dtype=ART_NUMPY_DTYPE)
+
+        # Rows of the samples missing from the cache, grouped by sample
+        missing: Dict[Hashable, List[int]] = {}
+        for i, x_i in enumerate(x_preprocessed):
+            key = array_fingerprint(x_i)
+            if key in missing:
+                # Duplicate of a sample that is queried in this call
+                missing[key].append(i)
+                cache.hits += 1
+                continue
+
+            prediction = cache.get(key)
+            if prediction is None:
+                missing[key] = [i]
+            else:
+                predictions[i] = prediction
+
+        if missing:
+            rows = list(missing.values())
+            predictions_missing = self._predict_batches(x_preprocessed[[row[0] for row in rows]], batch_size)
+            for key, row, prediction in zip(missing.keys(), rows, predictions_missing):
+                predictions[row] = prediction
+                cache.put(key, prediction.copy())
+
+        return predictions
+
     def fit(self, x: np.ndarray, y: np.ndarray, **kwargs) -> None:
         """
         Fit the classifier on the training set `(x, y)`.
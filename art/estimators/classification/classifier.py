@@ -19,7 +19,7 @@
 This module implements mixin abstract base classes defining properties for all classifiers in ART.
 """
 from abc import ABC, ABCMeta, abstractmethod
-from typing import List, Optional, Union
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
 import numpy as np
 
@@ -40,7 +40,9 @@ class InputFilter(ABCMeta):
         """
         This function overrides any existing generate or extract methods with a new method that
         ensures the input is an ndarray. There is an assumption that the input object has implemented
-        __array__ with np.array calls.
+        __array__ with np.array calls. Estimators declaring a `_framework_tensor_module` receive tensors of their
+        own framework unchanged in `predict` and `loss_gradient`. Calls are recorded by the profiler of the estimator,
+        if one is attached.
         """
 
         def make_replacement(fdict, func_name, has_y):
@@ -52,23 +54,39 @@ class InputFilter(ABCMeta):
                 if len(args) > 0:
                     lst = list(args)
 
+                tensor_module = None
+                if func_name in ["predict", "loss_gradient"]:
+                    tensor_module = getattr(self, "_framework_tensor_module", None)
+
+                def is_array(value) -> bool:
+                    return isinstance(value, np.ndarray) or (
+                        tensor_module is not None and type(value).__module__.split(".")[0] == tensor_module
+                    )
+
                 if "x" in kwargs:
-                    if not isinstance(kwargs["x"], np.ndarray):
+                    if not is_array(kwargs["x"]):
                         kwargs["x"] = np.array(kwargs["x"])
                 else:
-                    if not isinstance(args[0], np.ndarray):
+                    if not is_array(args[0]):
                         lst[0] = np.array(args[0])
 
                 if "y" in kwargs:
-                    if kwargs["y"] is not None and not isinstance(kwargs["y"], np.ndarray):
+                    if kwargs["y"] is not None and not is_array(kwargs["y"]):
                         kwargs["y"] = np.array(kwargs["y"])
                 elif has_y:
-                    if not isinstance(args[1], np.ndarray):
+                    if not is_array(args[1]):
                         lst[1] = np.array(args[1])
 
                 if len(args) > 0:
                     args = tuple(lst)
-                return fdict[func_name](self, *args, **kwargs)
+
+                profiler = getattr(self, "_profiler", None)
+                if profiler is None:
+                    return fdict[func_name](self, *args, **kwargs)
+
+                x = kwargs["x"] if "x" in kwargs else args[0]
+                with profiler.span(func_name, len(x)):
+                    return fdict[func_name](self, *args, **kwargs)
 
             replacement_function.__doc__ = fdict[func_name].__doc__
             replacement_function.__name__ = "new_" + func_name
@@ -105,6 +123,58 @@ class ClassifierMixin(ABC, metaclass=InputFilter):
         """
         return self._nb_classes  # type: ignore
 
+    def predict_stream(
+        self, x: Union[np.ndarray, Iterable[np.ndarray]], batch_size: int = 128, **kwargs
+    ) -> Iterator[np.ndarray]:
+        """
+        Perform prediction chunk by chunk without materialising all inputs or predictions. Preprocessing is applied
+        to each chunk by `predict`, therefore the peak memory is bounded by the size of a chunk instead of the number
+        of samples.
+
+        :param x: Test set, either an array, e.g. a `np.memmap`, which is read in chunks of `batch_size` samples, or
+                  an iterable of batches of samples.
+        :param batch_size: Size of batches.
+        :return: Iterator over the predictions of each chunk.
+        """
+        if isinstance(x, np.ndarray):
+            chunks: Iterable[np.ndarray] = (x[begin : begin + batch_size] for begin in range(0, x.shape[0], batch_size))
+        else:
+            chunks = x
+
+        for x_chunk in chunks:
+            yield self.predict(np.asarray(x_chunk), batch_size=batch_size, **kwargs)  # type: ignore
+
+    def predict_into(
+        self, x: Union[np.ndarray, Iterable[np.ndarray]], out: np.ndarray, batch_size: int = 128, **kwargs
+    ) -> np.ndarray:
+        """
+        Perform prediction chunk by chunk with `predict_stream` and write the predictions into `out`, e.g. a
+        `np.memmap` opened in mode `w+`, without materialising all inputs or predictions.
+
+        :param x: Test set, either an array, e.g. a `np.memmap`, or an iterable of batches of samples.
+        :param out: Array of shape `(nb_inputs, nb_classes)` receiving the predictions.
+        :param batch_size: Size of batches.
+        :return: The array `out`.
+        :raises `ValueError`: If the number of predictions does not match the length of `out`.
+        """
+        begin = 0
+        for predictions in self.predict_stream(x, batch_size=batch_size, **kwargs):
+            end = begin + predictions.shape[0]
+            if end > out.shape[0]:
+                raise ValueError("The output array `out` is shorter than the number of samples in `x`.")
+            out[begin:end] = predictions
+            begin = end
+
+        if begin != out.shape[0]:
+            raise ValueError(
+                "The output array `out` has length {} but `x` contains {} samples.".format(out.shape[0], begin)
+            )
+
+        if isinstance(out, np.memmap):
+            out.flush()
+
+        return out
+
 
 class ClassGradientsMixin(ABC):
     """
@@ -130,6 +200,64 @@ class ClassGradientsMixin(ABC):
         """
         raise NotImplementedError
 
+    def predict_and_class_gradient(
+        self, x: np.ndarray, labels: Optional[Sequence[int]] = None, batch_size: int = 128, **kwargs
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the predictions and the per-class derivatives w.r.t. `x` for a set of classes. This implementation calls
+        `predict` and `class_gradient`, classifiers which can obtain both from the same forward pass override it.
+
+        :param x: Samples.
+        :param labels: Indices of the classes whose derivatives are computed for every sample. If `None`, the
+                       derivatives of all classes are computed.
+        :param batch_size: Size of batches.
+        :return: A tuple of the predictions of shape `(nb_samples, nb_classes)` and the gradients of shape
+                 `(nb_samples, len(labels), input_shape)`, or `(nb_samples, nb_classes, input_shape)` if `labels` is
+                 `None`.
+        """
+        predictions = self.predict(x, batch_size=batch_size, **kwargs)  # type: ignore
+        if labels is None:
+            gradients = self.class_gradient(x, **kwargs)
+        else:
+            gradients = np.concatenate([self.class_gradient(x, label=int(label), **kwargs) for label in labels], axis=1)
+
+        return predictions, gradients
+
+    def predict_and_weighted_class_gradient(
+        self,
+        x: np.ndarray,
+        weights: Union[np.ndarray, Callable[[np.ndarray, np.ndarray], np.ndarray]],
+        batch_size: int = 128,
+        **kwargs
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the predictions and the derivatives w.r.t. `x` of a weighted sum of the class outputs of each sample,
+        for example `z[i_add] - z[i_sub]` for margin losses. This implementation calls `predict` and `class_gradient`
+        once per non-zero weight of a sample, classifiers which can back-propagate the weighted sums from the same
+        forward pass override it.
+
+        :param x: Samples.
+        :param weights: Weights of the class outputs of shape `(nb_samples, nb_classes)`, or a function of the
+                        predictions of a batch of samples and of the indices of these samples in `x` returning their
+                        weights.
+        :param batch_size: Size of batches.
+        :return: A tuple of the predictions of shape `(nb_samples, nb_classes)` and the gradients of the weighted sums
+                 of shape `(nb_samples, input_shape)`.
+        """
+        predictions = self.predict(x, batch_size=batch_size, **kwargs)  # type: ignore
+        if callable(weights):
+            weights = weights(predictions, np.arange(x.shape[0]))
+
+        # Back-propagate the k-th class with non-zero weight of all samples together
+        classes = np.argsort(weights == 0, axis=1, kind="stable")
+        gradients = np.zeros(x.shape, dtype=np.float32)
+        for k in range(int(np.max(np.sum(weights != 0, axis=1), initial=0))):
+            label = classes[:, k]
+            weight = weights[np.arange(x.shape[0]), label].reshape((-1,) + (1,) * (len(x.shape) - 1))
+            gradients += weight * self.class_gradient(x, label=label, **kwargs).reshape(x.shape)
+
+        return predictions, gradients
+
 
 class Classifier(ClassifierMixin, BaseEstimator, ABC):
     """
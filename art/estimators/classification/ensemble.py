@@ -20,11 +20,13 @@ This module implements the classifier `EnsembleClassifier` for ensembles of mult
 """
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 import logging
-from typing import List, Optional, Union, TYPE_CHECKING
+from typing import Any, Callable, Dict, List, Optional, Union, TYPE_CHECKING
 
 import numpy as np
 
+from art.config import ART_NUMPY_DTYPE
 from art.estimators.classification.classifier import ClassifierNeuralNetwork
 from art.estimators.estimator import NeuralNetworkMixin
 from art.utils import Deprecated, deprecated_keyword_arg
@@ -37,6 +39,30 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+# Replicas of the ensemble members held by each worker process of the process backend
+_MEMBER_REPLICAS: List[ClassifierNeuralNetwork] = []
+
+
+def _init_member_replicas(classifiers: List[ClassifierNeuralNetwork]) -> None:
+    """
+    Store the replicas of the ensemble members in a worker process of the process backend.
+
+    :param classifiers: Members of the ensemble, unpickled once per worker process.
+    """
+    global _MEMBER_REPLICAS  # pylint: disable=W0603
+    _MEMBER_REPLICAS = classifiers
+
+
+def _call_member_replica(index: int, method: str, *args, **kwargs) -> np.ndarray:
+    """
+    Call a method of a replica of an ensemble member in a worker process of the process backend.
+
+    :param index: Index of the member in the ensemble.
+    :param method: Name of the method to call.
+    :return: Output of the method.
+    """
+    return getattr(_MEMBER_REPLICAS[index], method)(*args, **kwargs)
+
 
 class EnsembleClassifier(ClassifierNeuralNetwork):
     """
@@ -55,6 +81,8 @@ class EnsembleClassifier(ClassifierNeuralNetwork):
         preprocessing_defences: Union["Preprocessor", List["Preprocessor"], None] = None,
         postprocessing_defences: Union["Postprocessor", List["Postprocessor"], None] = None,
         preprocessing: "PREPROCESSING_TYPE" = (0, 1),
+        nb_parallel_members: int = 1,
+        parallel_backend: str = "thread",
     ) -> None:
         """
         Initialize a :class:`.EnsembleClassifier` object. The data range values and colour channel index have to
@@ -76,10 +104,23 @@ class EnsembleClassifier(ClassifierNeuralNetwork):
         :param preprocessing: Tuple of the form `(subtrahend, divisor)` of floats or `np.ndarray` of values to be
                used for data preprocessing. The first value will be subtracted from the input. The input will then
                be divided by the second one. Not applicable in this classifier.
+        :param nb_parallel_members: Maximum number of members evaluated concurrently. Members are evaluated
+               sequentially if set to 1.
+        :param parallel_backend: Pool used to evaluate members concurrently, either `thread` for a thread pool, which
+               is efficient for frameworks releasing the GIL such as PyTorch, or `process` for a process pool in which
+               every worker holds a replica of the members. The replicas are created on first use and recreated after
+               `set_learning_phase`, `close` has to be called after other changes of the members, e.g. of their weights,
+               to discard outdated replicas. Graph-mode TensorFlow and Keras members are bound to the thread that
+               created their graph and should be evaluated sequentially.
         """
         if preprocessing_defences is not None:
             raise NotImplementedError("Preprocessing is not applicable in this classifier.")
 
+        if not isinstance(nb_parallel_members, int) or nb_parallel_members <= 0:
+            raise ValueError("The number of parallel members `nb_parallel_members` has to be a positive integer.")
+        if parallel_backend not in ["thread", "process"]:
+            raise ValueError("The parallel backend `parallel_backend` has to be either `thread` or `process`.")
+
         # Remove in 1.5.0
         if channel_index == 3:
             channels_first = False
@@ -141,6 +182,98 @@ class EnsembleClassifier(ClassifierNeuralNetwork):
         self._classifiers = classifiers
         self._learning_phase: Optional[bool] = None
 
+        self._nb_parallel_members = nb_parallel_members
+        self._parallel_backend = parallel_backend
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        """
+        Return the pool evaluating the members, which is created on first use and reused by subsequent calls.
+
+        :return: The thread or process pool.
+        """
+        if self._executor is None:
+            if self._parallel_backend == "thread":
+                self._executor = ThreadPoolExecutor(max_workers=self._nb_parallel_members)
+            else:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._nb_parallel_members,
+                    initializer=_init_member_replicas,
+                    initargs=(self._classifiers,),
+                )
+        return self._executor
+
+    def close(self) -> None:
+        """
+        Shut down the pool evaluating the members and discard the replicas of the members held by the process backend.
+        A new pool, with new replicas of the current members, is created by the next parallel evaluation.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __del__(self) -> None:
+        if getattr(self, "_executor", None) is not None:
+            self._executor.shutdown(wait=False)
+
+    def _evaluate_members(self, method: str, raw: bool, *args, **kwargs) -> np.ndarray:
+        """
+        Evaluate a method on all members and aggregate their outputs weighted by `classifier_weights`. The weighted
+        outputs are accumulated in place, in the order of the members, into a single array.
+
+        :param method: Name of the method of the members, e.g. `predict`.
+        :param raw: Return the individual weighted outputs of the members stacked along a new first axis.
+        :return: Sum of the weighted outputs or stack of the weighted outputs if `raw=True`.
+        """
+        outputs: List[Callable[[], np.ndarray]]
+        if self._nb_parallel_members == 1 or self._nb_classifiers == 1:
+            outputs = [
+                lambda i=i: getattr(self._classifiers[i], method)(*args, **kwargs)  # type: ignore
+                for i in range(self._nb_classifiers)
+            ]
+        else:
+            executor = self._get_executor()
+            if self._parallel_backend == "thread":
+                futures = [
+                    executor.submit(getattr(classifier, method), *args, **kwargs) for classifier in self._classifiers
+                ]
+            else:
+                futures = [
+                    executor.submit(_call_member_replica, i, method, *args, **kwargs)
+                    for i in range(self._nb_classifiers)
+                ]
+            outputs = [future.result for future in futures]
+
+        result: Optional[np.ndarray] = None
+        for i, output in enumerate(outputs):
+            # Members return new arrays, which can be weighted in place once integer or boolean outputs are cast
+            weighted = np.asarray(output())
+            if not np.issubdtype(weighted.dtype, np.floating):
+                weighted = weighted.astype(ART_NUMPY_DTYPE)
+            np.multiply(weighted, self._classifier_weights[i], out=weighted)
+
+            if raw:
+                if result is None:
+                    result = np.empty((self._nb_classifiers,) + weighted.shape, dtype=weighted.dtype)
+                result[i] = weighted
+            elif result is None:
+                result = weighted
+            else:
+                result += weighted
+
+        assert result is not None
+        return result
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """
+        Use to ensure `EnsembleClassifier` can be pickled, without its pool.
+
+        :return: State dictionary with instance parameters.
+        """
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        return state
+
     def predict(self, x: np.ndarray, batch_size: int = 128, raw: bool = False, **kwargs) -> np.ndarray:
         """
         Perform prediction for a batch of inputs. Predictions from classifiers should only be aggregated if they all
@@ -154,14 +287,11 @@ class EnsembleClassifier(ClassifierNeuralNetwork):
         :return: Array of predictions of shape `(nb_inputs, nb_classes)`, or of shape
                  `(nb_classifiers, nb_inputs, nb_classes)` if `raw=True`.
         """
-        preds = np.array(
-            [self._classifier_weights[i] * self._classifiers[i].predict(x) for i in range(self._nb_classifiers)]
-        )
         if raw:
-            return preds
+            return self._evaluate_members("predict", True, x)
 
         # Aggregate predictions only at probabilities level, as logits are not comparable between models
-        var_z = np.sum(preds, axis=0)
+        var_z = self._evaluate_members("predict", False, x)
 
         # Apply postprocessing
         predictions = self._apply_postprocessing(preds=var_z, fit=False)
@@ -236,16 +366,7 @@ class EnsembleClassifier(ClassifierNeuralNetwork):
                  `(batch_size, 1, input_shape)` when `label` parameter is specified. If `raw=True`, an additional
                  dimension is added at the beginning of the array, indexing the different classifiers.
         """
-        grads = np.array(
-            [
-                self._classifier_weights[i] * self._classifiers[i].class_gradient(x, label)
-                for i in range(self._nb_classifiers)
-            ]
-        )
-        if raw:
-            return grads
-
-        return np.sum(grads, axis=0)
+        return self._evaluate_members("class_gradient", raw, x, label)
 
     def loss_gradient(self, x: np.ndarray, y: np.ndarray, raw: bool = False, **kwargs) -> np.ndarray:
         """
@@ -257,16 +378,7 @@ class EnsembleClassifier(ClassifierNeuralNetwork):
         :param raw: Return the individual classifier raw outputs (not aggregated).
         :return: Array of gradients of the same shape as `x`. If `raw=True`, shape becomes `[nb_classifiers, x.shape]`.
         """
-        grads = np.array(
-            [
-                self._classifier_weights[i] * self._classifiers[i].loss_gradient(x, y)
-                for i in range(self._nb_classifiers)
-            ]
-        )
-        if raw:
-            return grads
-
-        return np.sum(grads, axis=0)
+        return self._evaluate_members("loss_gradient", raw, x, y)
 
     def set_learning_phase(self, train: bool) -> None:
         """
@@ -279,6 +391,10 @@ class EnsembleClassifier(ClassifierNeuralNetwork):
                 classifier.set_learning_phase(train)
             self._learning_phase = train
 
+            # Replicas of the process backend hold the previous learning phase
+            if self._parallel_backend == "process":
+                self.close()
+
     def __repr__(self):
         repr_ = (
             "%s(classifiers=%r, classifier_weights=%r, channel_index=%r, channels_first=%r, clip_values=%r, "
@@ -300,7 +300,7 @@ class KerasClassifier(ClassGradientsMixin, ClassifierMixin, KerasEstimator):
         # Get the internal layer
         self._layer_names = self._get_layers()
 
-    def loss(self, x: np.ndarray, y: np.ndarray, **kwargs) -> np.ndarray:
+    def loss(self, x: np.ndarray, y: np.ndarray, batch_size: int = 128, **kwargs) -> np.ndarray:
         """
         Compute the loss of the neural network for samples `x`.
 
@@ -308,6 +308,7 @@ class KerasClassifier(ClassGradientsMixin, ClassifierMixin, KerasEstimator):
                   nb_channels) or (nb_samples, nb_channels, nb_pixels_1, nb_pixels_2).
         :param y: Target values (class labels) one-hot-encoded of shape `(nb_samples, nb_classes)` or indices
                   of shape `(nb_samples,)`.
+        :param batch_size: Size of batches.
         :return: Loss values.
         :rtype: Format as expected by the `model`
         """
@@ -331,32 +332,46 @@ class KerasClassifier(ClassGradientsMixin, ClassifierMixin, KerasEstimator):
         if self._reduce_labels:
             y_preprocessed = np.argmax(y_preprocessed, axis=1)
 
-        predictions = self._model.predict(x_preprocessed)
-
-        if self._orig_loss and hasattr(self._orig_loss, "reduction"):
-            prev_reduction = self._orig_loss.reduction
-            self._orig_loss.reduction = self._losses.Reduction.NONE
-            loss = self._orig_loss(y_preprocessed, predictions)
-            self._orig_loss.reduction = prev_reduction
-        else:
-            prev_reduction = []
-            predictions = k.constant(predictions)
-            for loss_function in self._model.loss_functions:
-                prev_reduction.append(loss_function.reduction)
-                loss_function.reduction = self._losses.Reduction.NONE
-            loss = self._loss_function(y_preprocessed, predictions)
-            for i, loss_function in enumerate(self._model.loss_functions):
-                loss_function.reduction = prev_reduction[i]
-
-        return k.eval(loss)
+        # Compute the loss with batch processing
+        results = None
+        for batch_index in range(int(np.ceil(x_preprocessed.shape[0] / float(batch_size)))):
+            begin, end = (
+                batch_index * batch_size,
+                min((batch_index + 1) * batch_size, x_preprocessed.shape[0]),
+            )
+            predictions = self._model.predict(x_preprocessed[begin:end])
 
-    def loss_gradient(self, x: np.ndarray, y: np.ndarray, **kwargs) -> np.ndarray:
+            if self._orig_loss and hasattr(self._orig_loss, "reduction"):
+                prev_reduction = self._orig_loss.reduction
+                self._orig_loss.reduction = self._losses.Reduction.NONE
+                loss = self._orig_loss(y_preprocessed[begin:end], predictions)
+                self._orig_loss.reduction = prev_reduction
+            else:
+                prev_reduction = []
+                predictions = k.constant(predictions)
+                for loss_function in self._model.loss_functions:
+                    prev_reduction.append(loss_function.reduction)
+                    loss_function.reduction = self._losses.Reduction.NONE
+                loss = self._loss_function(y_preprocessed[begin:end], predictions)
+                for i, loss_function in enumerate(self._model.loss_functions):
+                    loss_function.reduction = prev_reduction[i]
+
+            batch_loss = k.eval(loss)
+            if results is None:
+                results = np.zeros((x_preprocessed.shape[0],) + batch_loss.shape[1:], dtype=batch_loss.dtype)
+            results[begin:end] = batch_loss
+
+        return results
+
+    def loss_gradient(self, x: np.ndarray, y: np.ndarray, batch_size: int = 128, **kwargs) -> np.ndarray:
         """
-        Compute the gradient of the loss function w.r.t. `x`.
+        Compute the gradient of the loss function w.r.t. `x`. The gradients of batches of a loss averaged over samples
+        are rescaled to the average over all samples of `x`, so that they do not depend on `batch_size`.
 
         :param x: Sample input with shape as expected by the model.
         :param y: Target values (class labels) one-hot-encoded of shape (nb_samples, nb_classes) or indices of shape
                   (nb_samples,).
+        :param batch_size: Size of batches.
         :return: Array of gradients of the same shape as `x`.
         """
         # Check shape of preprocessed `x` because of custom function for `_loss_gradients`
@@ -373,15 +388,30 @@ class KerasClassifier(ClassGradientsMixin, ClassifierMixin, KerasEstimator):
         if self._reduce_labels:
             y_preprocessed = np.argmax(y_preprocessed, axis=1)
 
-        # Compute gradients
-        gradients = self._loss_gradients([x_preprocessed, y_preprocessed])[0]
-        assert gradients.shape == x_preprocessed.shape
+        # Rescale the gradients of scalar losses not reduced by a sum from the average over a batch to the average
+        # over all samples
+        mean_reduction = len(self._loss.shape) == 0 and getattr(self._loss_function, "reduction", None) != "sum"
+
+        # Compute gradients with batch processing
+        gradients = np.zeros(x_preprocessed.shape, dtype=x_preprocessed.dtype)
+        num_batch = int(np.ceil(x_preprocessed.shape[0] / float(batch_size)))
+        for batch_index in range(num_batch):
+            begin, end = (
+                batch_index * batch_size,
+                min((batch_index + 1) * batch_size, x_preprocessed.shape[0]),
+            )
+            gradients[begin:end] = self._loss_gradients([x_preprocessed[begin:end], y_preprocessed[begin:end]])[0]
+            if mean_reduction and num_batch > 1:
+                gradients[begin:end] *= (end - begin) / x_preprocessed.shape[0]
+
         gradients = self._apply_preprocessing_gradient(x, gradients)
         assert gradients.shape == x.shape
 
         return gradients
 
-    def class_gradient(self, x: np.ndarray, label: Optional[Union[int, List[int]]] = None, **kwargs) -> np.ndarray:
+    def class_gradient(
+        self, x: np.ndarray, label: Optional[Union[int, List[int]]] = None, batch_size: int = 128, **kwargs
+    ) -> np.ndarray:
         """
         Compute per-class derivatives w.r.t. `x`.
 
@@ -390,6 +420,7 @@ class KerasClassifier(ClassGradientsMixin, ClassifierMixin, KerasEstimator):
                       output is computed for all samples. If multiple values are provided, the first dimension should
                       match the batch size of `x`, and each value will be used as target for its corresponding sample in
                       `x`. If `None`, then gradients for all classes will be computed for each sample.
+        :param batch_size: Size of batches.
         :return: Array of gradients of input features w.r.t. each class in the form
                  `(batch_size, nb_classes, input_shape)` when computing for all classes, otherwise shape becomes
                  `(batch_size, 1, input_shape)` when `label` parameter is specified.
@@ -419,27 +450,102 @@ class KerasClassifier(ClassGradientsMixin, ClassifierMixin, KerasEstimator):
 
         self._init_class_gradients(label=label)
 
-        if label is None:
-            # Compute the gradients w.r.t. all classes
-            gradients = np.swapaxes(np.array(self._class_gradients([x_preprocessed])), 0, 1)
+        # Compute the gradients with batch processing
+        nb_gradients = self.nb_classes if label is None else 1
+        gradients = np.zeros(
+            (x_preprocessed.shape[0], nb_gradients) + x_preprocessed.shape[1:], dtype=x_preprocessed.dtype
+        )
+        for batch_index in range(int(np.ceil(x_preprocessed.shape[0] / float(batch_size)))):
+            begin, end = (
+                batch_index * batch_size,
+                min((batch_index + 1) * batch_size, x_preprocessed.shape[0]),
+            )
+            x_batch = x_preprocessed[begin:end]
 
-        elif isinstance(label, (int, np.integer)):
-            # Compute the gradients only w.r.t. the provided label
-            gradients = np.swapaxes(np.array(self._class_gradients_idx[label]([x_preprocessed])), 0, 1)  # type: ignore
-            assert gradients.shape == (x_preprocessed.shape[0], 1) + x_preprocessed.shape[1:]
+            if label is None:
+                # Compute the gradients w.r.t. all classes
+                gradients[begin:end] = np.swapaxes(np.array(self._class_gradients([x_batch])), 0, 1)
 
-        else:
-            # For each sample, compute the gradients w.r.t. the indicated target class (possibly distinct)
-            unique_label = list(np.unique(label))
-            gradients = np.array([self._class_gradients_idx[l]([x_preprocessed]) for l in unique_label])
-            gradients = np.swapaxes(np.squeeze(gradients, axis=1), 0, 1)
-            lst = [unique_label.index(i) for i in label]
-            gradients = np.expand_dims(gradients[np.arange(len(gradients)), lst], axis=1)
+            elif isinstance(label, (int, np.integer)):
+                # Compute the gradients only w.r.t. the provided label
+                gradients[begin:end] = np.swapaxes(
+                    np.array(self._class_gradients_idx[label]([x_batch])), 0, 1  # type: ignore
+                )
+
+            else:
+                # For each sample, compute the gradients w.r.t. the indicated target class (possibly distinct)
+                label_batch = label[begin:end]
+                unique_label = list(np.unique(label_batch))
+                batch_gradients = np.array([self._class_gradients_idx[l]([x_batch]) for l in unique_label])
+                batch_gradients = np.swapaxes(np.squeeze(batch_gradients, axis=1), 0, 1)
+                lst = [unique_label.index(i) for i in label_batch]
+                gradients[begin:end, 0] = batch_gradients[np.arange(len(batch_gradients)), lst]
 
         gradients = self._apply_preprocessing_gradient(x, gradients)
 
         return gradients
 
+    def predict_and_weighted_class_gradient(
+        self,
+        x: np.ndarray,
+        weights: Union[np.ndarray, Callable[[np.ndarray, np.ndarray], np.ndarray]],
+        batch_size: int = 128,
+        **kwargs
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the predictions and the derivatives w.r.t. `x` of a weighted sum of the class outputs of each sample,
+        for example `z[i_add] - z[i_sub]` for margin losses, with one backward pass per batch. If `weights` are an
+        array, the predictions and the gradients are evaluated by the same backend function.
+
+        :param x: Sample input with shape as expected by the model.
+        :param weights: Weights of the class outputs of shape `(nb_samples, nb_classes)`, or a function of the
+                        predictions of a batch of samples and of the indices of these samples in `x` returning their
+                        weights.
+        :param batch_size: Size of batches.
+        :return: A tuple of the predictions of shape `(nb_samples, nb_classes)` and the gradients of the weighted sums
+                 of shape `(nb_samples, input_shape)`.
+        """
+        # pylint: disable=E0401
+        if self.is_tensorflow:
+            import tensorflow.keras.backend as k
+        else:
+            import keras.backend as k
+
+        # Construct the function evaluating the predictions and the gradients of the weighted class outputs
+        if not hasattr(self, "_weighted_class_gradients"):
+            weights_ph = k.placeholder(shape=k.int_shape(self._predictions_op))
+            weighted_gradients = k.gradients(k.sum(self._predictions_op * weights_ph), self._input)[0]
+            self._weighted_class_gradients = k.function(
+                [self._input, weights_ph], [self._predictions_op, weighted_gradients]
+            )
+
+        # Apply preprocessing
+        x_preprocessed, _ = self._apply_preprocessing(x, y=None, fit=False)
+
+        # Compute the predictions and gradients with batch processing
+        predictions = np.zeros((x_preprocessed.shape[0], self.nb_classes), dtype=np.float32)
+        gradients = np.zeros(x_preprocessed.shape, dtype=x_preprocessed.dtype)
+        for batch_index in range(int(np.ceil(x_preprocessed.shape[0] / float(batch_size)))):
+            begin, end = (
+                batch_index * batch_size,
+                min((batch_index + 1) * batch_size, x_preprocessed.shape[0]),
+            )
+            x_batch = x_preprocessed[begin:end]
+
+            if callable(weights):
+                # The weights depend on the predictions, which have to be evaluated first
+                predictions_batch = self._model.predict([x_batch])
+                predictions[begin:end] = self._apply_postprocessing(preds=predictions_batch, fit=False)
+                weights_batch = weights(predictions[begin:end], np.arange(begin, end))
+                _, gradients[begin:end] = self._weighted_class_gradients([x_batch, weights_batch])
+            else:
+                predictions_batch, gradients[begin:end] = self._weighted_class_gradients([x_batch, weights[begin:end]])
+                predictions[begin:end] = self._apply_postprocessing(preds=predictions_batch, fit=False)
+
+        gradients = self._apply_preprocessing_gradient(x, gradients)
+
+        return predictions, gradients
+
     def predict(self, x: np.ndarray, batch_size: int = 128, **kwargs) -> np.ndarray:
         """
         Perform prediction for a batch of inputs.
@@ -525,76 +631,119 @@ class KerasClassifier(ClassGradientsMixin, ClassifierMixin, KerasEstimator):
             super().fit_generator(generator, nb_epochs=nb_epochs, **kwargs)
 
     def get_activations(
-        self, x: np.ndarray, layer: Union[int, str], batch_size: int, framework: bool = False
-    ) -> np.ndarray:
+        self,
+        x: np.ndarray,
+        layer: Union[int, str, List[Union[int, str]]],
+        batch_size: int = 128,
+        framework: bool = False,
+    ) -> Union[np.ndarray, List[np.ndarray]]:
         """
         Return the output of the specified layer for input `x`. `layer` is specified by layer index (between 0 and
         `nb_layers - 1`) or by name. The number of layers can be determined by counting the results returned by
-        calling `layer_names`.
+        calling `layer_names`. If a list of layers is provided, the outputs of all layers are collected from a single
+        forward pass.
 
         :param x: Input for computing the activations.
-        :param layer: Layer for computing the activations.
+        :param layer: Layer or list of layers for computing the activations.
         :param batch_size: Size of batches.
         :param framework: If true, return the intermediate tensor representation of the activation.
-        :return: The output of `layer`, where the first dimension is the batch size corresponding to `x`.
+        :return: The output of `layer`, where the first dimension is the batch size corresponding to `x`, or the list
+                 of outputs if `layer` is a list.
         """
         # pylint: disable=E0401
         if self.is_tensorflow:
             import tensorflow.keras.backend as k
         else:
             import keras.backend as k
-        from art.config import ART_NUMPY_DTYPE
 
-        if isinstance(layer, six.string_types):
-            if layer not in self._layer_names:
-                raise ValueError("Layer name %s is not part of the graph." % layer)
-            layer_name = layer
-        elif isinstance(layer, int):
-            if layer < 0 or layer >= len(self._layer_names):
-                raise ValueError(
-                    "Layer index %d is outside of range (0 to %d included)." % (layer, len(self._layer_names) - 1)
-                )
-            layer_name = self._layer_names[layer]
-        else:
-            raise TypeError("Layer must be of type `str` or `int`.")
+        layer_names = []
+        for layer_ in layer if isinstance(layer, list) else [layer]:
+            if isinstance(layer_, six.string_types):
+                if layer_ not in self._layer_names:
+                    raise ValueError("Layer name %s is not part of the graph." % layer_)
+                layer_names.append(layer_)
+            elif isinstance(layer_, int):
+                if layer_ < 0 or layer_ >= len(self._layer_names):
+                    raise ValueError(
+                        "Layer index %d is outside of range (0 to %d included)." % (layer_, len(self._layer_names) - 1)
+                    )
+                layer_names.append(self._layer_names[layer_])
+            else:
+                raise TypeError("Layer must be of type `str` or `int`.")
+
+        if framework:
+            if isinstance(layer, list):
+                raise ValueError("The intermediate tensor representation is only available for a single layer.")
+            placeholder = k.placeholder(shape=x.shape)
+            return placeholder, self._model.get_layer(layer_names[0])(placeholder)
 
         if x.shape == self.input_shape:
             x_expanded = np.expand_dims(x, 0)
         else:
             x_expanded = x
 
-        # Apply preprocessing
-        x_preprocessed, _ = self._apply_preprocessing(x=x_expanded, y=None, fit=False)
+        activations = self._get_cached_activations(
+            x_expanded, layer_names, lambda names: self._compute_activations(x_expanded, names, batch_size)
+        )
 
-        if not hasattr(self, "_activations_func"):
-            self._activations_func: Dict[str, Callable] = {}
+        if isinstance(layer, list):
+            return activations
+        return activations[0]
 
-        keras_layer = self._model.get_layer(layer_name)
-        if layer_name not in self._activations_func:
-            num_inbound_nodes = len(getattr(keras_layer, "_inbound_nodes", []))
-            if num_inbound_nodes > 1:
-                layer_output = keras_layer.get_output_at(0)
-            else:
-                layer_output = keras_layer.output
-            self._activations_func[layer_name] = k.function([self._input], [layer_output])
+    def _compute_activations(self, x: np.ndarray, layer_names: List[str], batch_size: int) -> List[np.ndarray]:
+        """
+        Compute the outputs of several layers for input `x` with one forward pass per batch.
 
-        # Determine shape of expected output and prepare array
-        output_shape = self._activations_func[layer_name]([x_preprocessed[0][None, ...]])[0].shape
-        activations = np.zeros((x_preprocessed.shape[0],) + output_shape[1:], dtype=ART_NUMPY_DTYPE)
+        :param x: Input for computing the activations.
+        :param layer_names: Names of the layers.
+        :param batch_size: Size of batches.
+        :return: List of the outputs of the layers.
+        """
+        # pylint: disable=E0401
+        if self.is_tensorflow:
+            import tensorflow.keras.backend as k
+        else:
+            import keras.backend as k
+        from art.config import ART_NUMPY_DTYPE
+
+        # Apply preprocessing
+        x_preprocessed, _ = self._apply_preprocessing(x=x, y=None, fit=False)
+
+        if not hasattr(self, "_activations_func"):
+            self._activations_func: Dict[Tuple[str, ...], Callable] = {}
+
+        key = tuple(layer_names)
+        if key not in self._activations_func:
+            layer_outputs = []
+            for layer_name in layer_names:
+                keras_layer = self._model.get_layer(layer_name)
+                num_inbound_nodes = len(getattr(keras_layer, "_inbound_nodes", []))
+                if num_inbound_nodes > 1:
+                    layer_outputs.append(keras_layer.get_output_at(0))
+                else:
+                    layer_outputs.append(keras_layer.output)
+            self._activations_func[key] = k.function([self._input], layer_outputs)
 
         # Get activations with batching
+        activations: List[np.ndarray] = []
         for batch_index in range(int(np.ceil(x_preprocessed.shape[0] / float(batch_size)))):
             begin, end = (
                 batch_index * batch_size,
                 min((batch_index + 1) * batch_size, x_preprocessed.shape[0]),
             )
-            activations[begin:end] = self._activations_func[layer_name]([x_preprocessed[begin:end]])[0]
+            layer_outputs = self._activations_func[key]([x_preprocessed[begin:end]])
 
-        if framework:
-            placeholder = k.placeholder(shape=x.shape)
-            return placeholder, keras_layer(placeholder)
-        else:
-            return activations
+            # Prepare arrays for the activations of all layers using the output shapes of the first batch
+            if not activations:
+                activations = [
+                    np.zeros((x_preprocessed.shape[0],) + layer_output.shape[1:], dtype=ART_NUMPY_DTYPE)
+                    for layer_output in layer_outputs
+                ]
+
+            for activation, layer_output in zip(activations, layer_outputs):
+                activation[begin:end] = layer_output
+
+        return activations
 
     def custom_loss_gradient(self, nn_function, tensors, input_values, name="default"):
         """
@@ -736,6 +885,9 @@ class KerasClassifier(ClassGradientsMixin, ClassifierMixin, KerasEstimator):
         if "_class_gradients_idx" in state:
             del state["_class_gradients_idx"]
 
+        if "_weighted_class_gradients" in state:
+            del state["_weighted_class_gradients"]
+
         if "_activations_func" in state:
             del state["_activations_func"]
 
@@ -393,21 +393,29 @@ class MXClassifier(ClassGradientsMixin, ClassifierMixin, MXEstimator):  # lgtm [
         return self._layer_names
 
     def get_activations(
-        self, x: np.ndarray, layer: Union[int, str], batch_size: int = 128, framework: bool = False
-    ) -> np.ndarray:
+        self,
+        x: np.ndarray,
+        layer: Union[int, str, List[Union[int, str]]],
+        batch_size: int = 128,
+        framework: bool = False,
+    ) -> Union[np.ndarray, List[np.ndarray]]:
         """
         Return the output of the specified layer for input `x`. `layer` is specified by layer index (between 0 and
         `nb_layers - 1`) or by name. The number of layers can be determined by counting the results returned by
         calling `layer_names`.
 
         :param x: Input for computing the activations.
-        :param layer: Layer for computing the activations
+        :param layer: Layer or list of layers for computing the activations
         :param batch_size: Size of batches.
         :param framework: If true, return the intermediate tensor representation of the activation.
-        :return: The output of `layer`, where the first dimension is the batch size corresponding to `x`.
+        :return: The output of `layer`, where the first dimension is the batch size corresponding to `x`, or the list
+                 of outputs if `layer` is a list.
         """
         import mxnet as mx  # lgtm [py/repeated-import]
 
+        if isinstance(layer, list):
+            return [self.get_activations(x, layer_, batch_size=batch_size, framework=framework) for layer_ in layer]
+
         train_mode = self._learning_phase if hasattr(self, "_learning_phase") else False
 
         if isinstance(layer, six.string_types):
@@ -21,11 +21,12 @@ This module implements the classifier `PyTorchClassifier` for PyTorch models.
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import copy
+import inspect
 import logging
 import os
 import random
 import time
-from typing import Any, Dict, List, Optional, Tuple, Union, TYPE_CHECKING
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union, TYPE_CHECKING
 
 import numpy as np
 import six
@@ -130,6 +131,9 @@ class PyTorchClassifier(ClassGradientsMixin, ClassifierMixin, PyTorchEstimator):
         # Index of layer at which the class gradients should be calculated
         self._layer_idx_gradients = -1
 
+        # Use a single vectorized backward pass for the Jacobian if supported by the installed version of PyTorch
+        self._batched_jacobian = "is_grads_batched" in inspect.signature(torch.autograd.grad).parameters
+
         if isinstance(self._loss, (torch.nn.CrossEntropyLoss, torch.nn.NLLLoss, torch.nn.MultiMarginLoss),):
             self._reduce_labels = True
             self._int_labels = True
@@ -169,22 +173,42 @@ class PyTorchClassifier(ClassGradientsMixin, ClassifierMixin, PyTorchEstimator):
         if self._reduce_labels and self._int_labels:
             return torch.argmax(y, dim=1)
         elif self._reduce_labels:  # float labels
-            return torch.argmax(y, dim=1).type("torch.FloatTensor")
+            return torch.argmax(y, dim=1).float()
         else:
             return y
 
-    def predict(self, x: np.ndarray, batch_size: int = 128, **kwargs) -> np.ndarray:
+    def predict(
+        self, x: Union[np.ndarray, "torch.Tensor"], batch_size: int = 128, **kwargs
+    ) -> Union[np.ndarray, "torch.Tensor"]:
         """
         Perform prediction for a batch of inputs.
 
-        :param x: Test set.
+        :param x: Test set. A PyTorch tensor is preprocessed and predicted on the device of the model without copies
+                  to host memory.
         :param batch_size: Size of batches.
-        :return: Array of predictions of shape `(nb_inputs, nb_classes)`.
+        :return: Array of predictions of shape `(nb_inputs, nb_classes)`, or a tensor on the device of `x` if `x` is a
+                 PyTorch tensor.
         """
         import torch  # lgtm [py/repeated-import]
 
         self._model.eval()
 
+        if isinstance(x, torch.Tensor):
+            # Run prediction with batch processing on the device of the model
+            with torch.no_grad():
+                results_t = torch.cat(
+                    [
+                        self._predict_framework(x[begin : begin + batch_size].to(self._device))
+                        for begin in range(0, x.shape[0], batch_size)
+                    ]
+                )
+
+            if self.postprocessing_defences:
+                # Postprocessing defences operate on arrays
+                results_t = torch.from_numpy(self._apply_postprocessing(preds=results_t.cpu().numpy(), fit=False))
+
+            return results_t.to(x.device)
+
         # Apply preprocessing
         x_preprocessed, _ = self._apply_preprocessing(x, y=None, fit=False)
 
@@ -208,6 +232,18 @@ class PyTorchClassifier(ClassGradientsMixin, ClassifierMixin, PyTorchEstimator):
 
         return predictions
 
+    def _predict_framework(self, x: "torch.Tensor") -> "torch.Tensor":
+        """
+        Perform prediction for a batch of inputs as differentiable tensor operations.
+
+        :param x: Test set.
+        :return: Tensor of predictions of shape `(nb_inputs, nb_classes)` before postprocessing.
+        """
+        # Apply preprocessing
+        x_preprocessed, _ = self._apply_preprocessing(x, y=None, fit=False)
+
+        return self._model(x_preprocessed)[-1]
+
     def fit(self, x: np.ndarray, y: np.ndarray, batch_size: int = 128, nb_epochs: int = 10, **kwargs) -> None:
         """
         Fit the classifier on the training set `(x, y)`.
@@ -308,7 +344,9 @@ class PyTorchClassifier(ClassGradientsMixin, ClassifierMixin, PyTorchEstimator):
             # Fit a generic data generator through the API
             super().fit_generator(generator, nb_epochs=nb_epochs)
 
-    def class_gradient(self, x: np.ndarray, label: Union[int, List[int], None] = None, **kwargs) -> np.ndarray:
+    def class_gradient(
+        self, x: np.ndarray, label: Union[int, List[int], None] = None, batch_size: int = 128, **kwargs
+    ) -> np.ndarray:
         """
         Compute per-class derivatives w.r.t. `x`.
 
@@ -317,6 +355,7 @@ class PyTorchClassifier(ClassGradientsMixin, ClassifierMixin, PyTorchEstimator):
                       output is computed for all samples. If multiple values as provided, the first dimension should
                       match the batch size of `x`, and each value will be used as target for its corresponding sample in
                       `x`. If `None`, then gradients for all classes will be computed for each sample.
+        :param batch_size: Size of batches.
         :return: Array of gradients of input features w.r.t. each class in the form
                  `(batch_size, nb_classes, input_shape)` when computing for all classes, otherwise shape becomes
                  `(batch_size, 1, input_shape)` when `label` parameter is specified.
@@ -337,72 +376,237 @@ class PyTorchClassifier(ClassGradientsMixin, ClassifierMixin, PyTorchEstimator):
 
         # Apply preprocessing
         x_preprocessed, _ = self._apply_preprocessing(x, y=None, fit=False)
-        x_preprocessed = torch.from_numpy(x_preprocessed).to(self._device)
 
-        # Compute gradients
-        if self._layer_idx_gradients < 0:
-            x_preprocessed.requires_grad = True
+        # Compute the gradients with batch processing
+        grads = None
+        num_batch = int(np.ceil(len(x_preprocessed) / float(batch_size)))
+        for m in range(num_batch):
+            # Batch indexes
+            begin, end = (
+                m * batch_size,
+                min((m + 1) * batch_size, x_preprocessed.shape[0]),
+            )
 
-        # Run prediction
-        model_outputs = self._model(x_preprocessed)
+            x_batch = torch.from_numpy(x_preprocessed[begin:end]).to(self._device)
 
-        # Set where to get gradient
-        if self._layer_idx_gradients >= 0:
-            input_grad = model_outputs[self._layer_idx_gradients]
-        else:
-            input_grad = x_preprocessed
+            # Compute gradients
+            if self._layer_idx_gradients < 0:
+                x_batch.requires_grad = True
 
-        # Set where to get gradient from
-        preds = model_outputs[-1]
+            # Run prediction
+            model_outputs = self._model(x_batch)
 
-        # Compute the gradient
-        grads = []
+            # Set where to get gradient
+            if self._layer_idx_gradients >= 0:
+                input_grad = model_outputs[self._layer_idx_gradients]
+            else:
+                input_grad = x_batch
 
-        def save_grad():
-            def hook(grad):
-                grads.append(grad.cpu().numpy().copy())
-                grad.data.zero_()
+            # Set where to get gradient from
+            preds = model_outputs[-1]
 
-            return hook
+            # Compute the gradient
+            if label is None:
+                batch_grads = self._jacobian(preds, input_grad)
 
-        input_grad.register_hook(save_grad())
+            elif isinstance(label, (int, np.integer)):
+                (batch_grads,) = torch.autograd.grad(torch.sum(preds[:, label]), input_grad)
+                batch_grads = batch_grads[:, None, ...]
 
-        self._model.zero_grad()
-        if label is None:
-            for i in range(self.nb_classes):
-                torch.autograd.backward(
-                    preds[:, i], torch.tensor([1.0] * len(preds[:, 0])).to(self._device), retain_graph=True,
-                )
+            else:
+                # Select the target class of each sample and compute all gradients with a single backward pass
+                label_t = torch.from_numpy(np.asarray(label[begin:end], dtype=np.int64)).to(self._device)
+                (batch_grads,) = torch.autograd.grad(torch.sum(torch.gather(preds, 1, label_t[:, None])), input_grad)
+                batch_grads = batch_grads[:, None, ...]
+
+            batch_grads = batch_grads.detach().cpu().numpy()
+            if grads is None:
+                grads = np.zeros((x_preprocessed.shape[0],) + batch_grads.shape[1:], dtype=batch_grads.dtype)
+            grads[begin:end] = batch_grads
+
+        grads = self._apply_preprocessing_gradient(x, grads)
+
+        return grads
+
+    def predict_and_class_gradient(
+        self, x: np.ndarray, labels: Optional[Sequence[int]] = None, batch_size: int = 128, **kwargs
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the predictions and the per-class derivatives w.r.t. `x` for a set of classes from the same forward
+        pass.
+
+        :param x: Sample input with shape as expected by the model.
+        :param labels: Indices of the classes whose derivatives are computed for every sample. If `None`, the
+                       derivatives of all classes are computed.
+        :param batch_size: Size of batches.
+        :return: A tuple of the predictions of shape `(nb_samples, nb_classes)` and the gradients of shape
+                 `(nb_samples, len(labels), input_shape)`, or `(nb_samples, nb_classes, input_shape)` if `labels` is
+                 `None`.
+        """
+        import torch  # lgtm [py/repeated-import]
+
+        if labels is not None and not all(label in range(self._nb_classes) for label in labels):
+            raise ValueError("Labels %s are out of range." % labels)
+
+        self._model.eval()
+
+        # Apply preprocessing
+        x_preprocessed, _ = self._apply_preprocessing(x, y=None, fit=False)
+
+        # Compute the predictions and gradients with batch processing
+        results = np.zeros((x_preprocessed.shape[0], self.nb_classes), dtype=np.float32)
+        grads = None
+        num_batch = int(np.ceil(len(x_preprocessed) / float(batch_size)))
+        for m in range(num_batch):
+            # Batch indexes
+            begin, end = (
+                m * batch_size,
+                min((m + 1) * batch_size, x_preprocessed.shape[0]),
+            )
+
+            x_batch = torch.from_numpy(x_preprocessed[begin:end]).to(self._device)
+
+            # Compute gradients
+            if self._layer_idx_gradients < 0:
+                x_batch.requires_grad = True
+
+            # Run prediction
+            model_outputs = self._model(x_batch)
+
+            # Set where to get gradient
+            if self._layer_idx_gradients >= 0:
+                input_grad = model_outputs[self._layer_idx_gradients]
+            else:
+                input_grad = x_batch
+
+            preds = model_outputs[-1]
+            batch_grads = self._jacobian(preds, input_grad, labels=labels).detach().cpu().numpy()
+
+            results[begin:end] = preds.detach().cpu().numpy()
+            if grads is None:
+                grads = np.zeros((x_preprocessed.shape[0],) + batch_grads.shape[1:], dtype=batch_grads.dtype)
+            grads[begin:end] = batch_grads
+
+        grads = self._apply_preprocessing_gradient(x, grads)
+
+        # Apply postprocessing
+        predictions = self._apply_postprocessing(preds=results, fit=False)
+
+        return predictions, grads
+
+    def predict_and_weighted_class_gradient(
+        self,
+        x: np.ndarray,
+        weights: Union[np.ndarray, Callable[[np.ndarray, np.ndarray], np.ndarray]],
+        batch_size: int = 128,
+        **kwargs
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the predictions and the derivatives w.r.t. `x` of a weighted sum of the class outputs of each sample,
+        for example `z[i_add] - z[i_sub]` for margin losses, with one forward and one backward pass per batch.
+
+        :param x: Sample input with shape as expected by the model.
+        :param weights: Weights of the class outputs of shape `(nb_samples, nb_classes)`, or a function of the
+                        predictions of a batch of samples and of the indices of these samples in `x` returning their
+                        weights.
+        :param batch_size: Size of batches.
+        :return: A tuple of the predictions of shape `(nb_samples, nb_classes)` and the gradients of the weighted sums
+                 of shape `(nb_samples, input_shape)`.
+        """
+        import torch  # lgtm [py/repeated-import]
+
+        self._model.eval()
 
-        elif isinstance(label, (int, np.integer)):
-            torch.autograd.backward(
-                preds[:, label], torch.tensor([1.0] * len(preds[:, 0])).to(self._device), retain_graph=True,
+        # Apply preprocessing
+        x_preprocessed, _ = self._apply_preprocessing(x, y=None, fit=False)
+
+        # Compute the predictions and gradients with batch processing
+        predictions = np.zeros((x_preprocessed.shape[0], self.nb_classes), dtype=np.float32)
+        grads = None
+        num_batch = int(np.ceil(len(x_preprocessed) / float(batch_size)))
+        for m in range(num_batch):
+            # Batch indexes
+            begin, end = (
+                m * batch_size,
+                min((m + 1) * batch_size, x_preprocessed.shape[0]),
             )
-        else:
-            unique_label = list(np.unique(label))
-            for i in unique_label:
-                torch.autograd.backward(
-                    preds[:, i], torch.tensor([1.0] * len(preds[:, 0])).to(self._device), retain_graph=True,
-                )
 
-            grads = np.swapaxes(np.array(grads), 0, 1)
-            lst = [unique_label.index(i) for i in label]
-            grads = grads[np.arange(len(grads)), lst]
+            x_batch = torch.from_numpy(x_preprocessed[begin:end]).to(self._device)
+
+            # Compute gradients
+            if self._layer_idx_gradients < 0:
+                x_batch.requires_grad = True
+
+            # Run prediction
+            model_outputs = self._model(x_batch)
+
+            # Set where to get gradient
+            if self._layer_idx_gradients >= 0:
+                input_grad = model_outputs[self._layer_idx_gradients]
+            else:
+                input_grad = x_batch
+
+            preds = model_outputs[-1]
+            predictions[begin:end] = self._apply_postprocessing(preds=preds.detach().cpu().numpy(), fit=False)
+
+            # Back-propagate the weighted sum of the class outputs
+            if callable(weights):
+                weights_batch = weights(predictions[begin:end], np.arange(begin, end))
+            else:
+                weights_batch = weights[begin:end]
+            weights_t = torch.from_numpy(np.asarray(weights_batch)).to(device=self._device, dtype=preds.dtype)
+            (batch_grads,) = torch.autograd.grad(torch.sum(preds * weights_t), input_grad)
 
-            grads = grads[None, ...]
+            batch_grads = batch_grads.detach().cpu().numpy()
+            if grads is None:
+                grads = np.zeros((x_preprocessed.shape[0],) + batch_grads.shape[1:], dtype=batch_grads.dtype)
+            grads[begin:end] = batch_grads
 
-        grads = np.swapaxes(np.array(grads), 0, 1)
         grads = self._apply_preprocessing_gradient(x, grads)
 
-        return grads
+        return predictions, grads
 
-    def loss(self, x: np.ndarray, y: np.ndarray, **kwargs) -> np.ndarray:
+    def _jacobian(
+        self, preds: "torch.Tensor", input_grad: "torch.Tensor", labels: Optional[Sequence[int]] = None
+    ) -> "torch.Tensor":
+        """
+        Compute the gradients of the class outputs `preds` w.r.t. `input_grad`. If supported by the installed version
+        of PyTorch, all classes are back-propagated together in one vectorized backward pass, otherwise one backward
+        pass is run per class while keeping the gradients on the device.
+
+        :param preds: Class outputs of shape `(nb_samples, nb_classes)`.
+        :param input_grad: Tensor w.r.t. which the gradients are computed.
+        :param labels: Indices of the classes to back-propagate. If `None`, all classes are back-propagated.
+        :return: Gradients of shape `(nb_samples, nb_classes, input_shape)`, or `(nb_samples, len(labels),
+                 input_shape)` if `labels` is provided.
+        """
+        import torch  # lgtm [py/repeated-import]
+
+        labels = list(range(self.nb_classes)) if labels is None else [int(label) for label in labels]
+
+        if self._batched_jacobian:
+            grad_outputs = torch.eye(self.nb_classes, device=self._device, dtype=preds.dtype)[labels][:, None, :]
+            grad_outputs = grad_outputs.expand(len(labels), preds.shape[0], self.nb_classes)
+            try:
+                (grads,) = torch.autograd.grad(
+                    preds, input_grad, grad_outputs=grad_outputs, retain_graph=True, is_grads_batched=True
+                )
+                return torch.transpose(grads, 0, 1)
+            except RuntimeError:
+                logger.info("Vectorized Jacobian not supported by the model, using one backward pass per class.")
+                self._batched_jacobian = False
+
+        grads = [torch.autograd.grad(torch.sum(preds[:, i]), input_grad, retain_graph=True)[0] for i in labels]
+        return torch.stack(grads, dim=1)
+
+    def loss(self, x: np.ndarray, y: np.ndarray, batch_size: int = 128, **kwargs) -> np.ndarray:
         """
         Compute the loss function w.r.t. `x`.
 
         :param x: Sample input with shape as expected by the model.
         :param y: Target values (class labels) one-hot-encoded of shape `(nb_samples, nb_classes)` or indices
                   of shape `(nb_samples,)`.
+        :param batch_size: Size of batches.
         :return: Array of losses of the same shape as `x`.
         """
         import torch  # lgtm [py/repeated-import]
@@ -413,63 +617,174 @@ class PyTorchClassifier(ClassGradientsMixin, ClassifierMixin, PyTorchEstimator):
         # Check label shape
         y_preprocessed = self.reduce_labels(y_preprocessed)
 
-        # Convert the inputs to Tensors
-        inputs_t = torch.from_numpy(x_preprocessed).to(self._device)
-
-        # Convert the labels to Tensors
-        labels_t = torch.from_numpy(y_preprocessed).to(self._device)
-
-        # Compute the loss and return
-        model_outputs = self._model(inputs_t)
-        prev_reduction = self._loss.reduction
         # return individual loss values
+        prev_reduction = self._loss.reduction
         self._loss.reduction = "none"
-        loss = self._loss(model_outputs[-1], labels_t)
+
+        # Compute the loss with batch processing
+        results = None
+        num_batch = int(np.ceil(len(x_preprocessed) / float(batch_size)))
+        for m in range(num_batch):
+            # Batch indexes
+            begin, end = (
+                m * batch_size,
+                min((m + 1) * batch_size, x_preprocessed.shape[0]),
+            )
+
+            # Convert the inputs and labels to Tensors
+            inputs_t = torch.from_numpy(x_preprocessed[begin:end]).to(self._device)
+            labels_t = torch.from_numpy(y_preprocessed[begin:end]).to(self._device)
+
+            with torch.no_grad():
+                model_outputs = self._model(inputs_t)
+                loss = self._loss(model_outputs[-1], labels_t)
+            batch_loss = loss.detach().cpu().numpy()
+            if results is None:
+                results = np.zeros((x_preprocessed.shape[0],) + batch_loss.shape[1:], dtype=batch_loss.dtype)
+            results[begin:end] = batch_loss
+
         self._loss.reduction = prev_reduction
-        return loss.detach().numpy()
+        return results
 
-    def loss_gradient(self, x: np.ndarray, y: np.ndarray, **kwargs) -> np.ndarray:
+    def loss_gradient(
+        self,
+        x: Union[np.ndarray, "torch.Tensor"],
+        y: Union[np.ndarray, "torch.Tensor"],
+        batch_size: int = 128,
+        **kwargs
+    ) -> Union[np.ndarray, "torch.Tensor"]:
         """
-        Compute the gradient of the loss function w.r.t. `x`.
+        Compute the gradient of the loss function w.r.t. `x`. The gradients of batches of a loss averaged over samples
+        are rescaled to the average over all samples of `x`, so that they do not depend on `batch_size`.
 
-        :param x: Sample input with shape as expected by the model.
+        :param x: Sample input with shape as expected by the model. If `x` is a PyTorch tensor, the gradients are
+                  computed with `loss_gradient_framework` without copies to host memory.
         :param y: Target values (class labels) one-hot-encoded of shape `(nb_samples, nb_classes)` or indices of shape
                   `(nb_samples,)`.
-        :return: Array of gradients of the same shape as `x`.
+        :param batch_size: Size of batches.
+        :return: Array of gradients of the same shape as `x`, or a tensor if `x` is a PyTorch tensor.
         """
         import torch  # lgtm [py/repeated-import]
 
+        # Rescale the gradients of scalar losses not reduced by a sum from the average over a batch to the average
+        # over all samples
+        mean_reduction = getattr(self._loss, "reduction", "mean") not in ("sum", "none")
+
+        if isinstance(x, torch.Tensor):
+            y_t = y if isinstance(y, torch.Tensor) else torch.from_numpy(np.asarray(y))
+            grads_t = []
+            for begin in range(0, x.shape[0], batch_size):
+                end = min(begin + batch_size, x.shape[0])
+                grads_batch = self.loss_gradient_framework(x[begin:end], y_t[begin:end])
+                if mean_reduction and batch_size < x.shape[0]:
+                    grads_batch = grads_batch * ((end - begin) / x.shape[0])
+                grads_t.append(grads_batch)
+            return torch.cat(grads_t)
+
         # Apply preprocessing
         x_preprocessed, y_preprocessed = self._apply_preprocessing(x, y, fit=False)
 
         # Check label shape
         y_preprocessed = self.reduce_labels(y_preprocessed)
 
-        # Convert the inputs to Tensors
-        inputs_t = torch.from_numpy(x_preprocessed).to(self._device)
-        inputs_t.requires_grad = True
+        # Compute the gradients with batch processing
+        grads = np.zeros(x_preprocessed.shape, dtype=x_preprocessed.dtype)
+        num_batch = int(np.ceil(len(x_preprocessed) / float(batch_size)))
+        for m in range(num_batch):
+            # Batch indexes
+            begin, end = (
+                m * batch_size,
+                min((m + 1) * batch_size, x_preprocessed.shape[0]),
+            )
 
-        # Convert the labels to Tensors
-        labels_t = torch.from_numpy(y_preprocessed).to(self._device)
+            # Convert the inputs to Tensors
+            inputs_t = torch.from_numpy(x_preprocessed[begin:end]).to(self._device)
+            inputs_t.requires_grad = True
 
-        # Compute the gradient and return
-        model_outputs = self._model(inputs_t)
-        loss = self._loss(model_outputs[-1], labels_t)
+            # Convert the labels to Tensors
+            labels_t = torch.from_numpy(y_preprocessed[begin:end]).to(self._device)
 
-        # Clean gradients
-        self._model.zero_grad()
+            # Compute the gradient
+            model_outputs = self._model(inputs_t)
+            loss = self._loss(model_outputs[-1], labels_t)
+
+            # Clean gradients
+            self._model.zero_grad()
+
+            # Compute gradients
+            loss.backward()
+            grads[begin:end] = inputs_t.grad.cpu().numpy()  # type: ignore
+            if mean_reduction and loss.dim() == 0 and num_batch > 1:
+                grads[begin:end] *= (end - begin) / x_preprocessed.shape[0]
 
-        # Compute gradients
-        loss.backward()
-        grads = inputs_t.grad.cpu().numpy().copy()  # type: ignore
         grads = self._apply_preprocessing_gradient(x, grads)
         assert grads.shape == x.shape
 
         return grads
 
+    def loss_and_gradient(
+        self, x: np.ndarray, y: np.ndarray, batch_size: int = 128, **kwargs
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the loss value of each sample and the gradient of the loss of each sample w.r.t. that sample from the
+        same forward pass. The loss function has to support `reduction="none"`.
+
+        :param x: Sample input with shape as expected by the model.
+        :param y: Target values (class labels) one-hot-encoded of shape `(nb_samples, nb_classes)` or indices of shape
+                  `(nb_samples,)`.
+        :param batch_size: Size of batches.
+        :return: A tuple of the loss values of shape `(nb_samples,)` and the gradients of the same shape as `x`.
+        """
+        import torch  # lgtm [py/repeated-import]
+
+        # Apply preprocessing
+        x_preprocessed, y_preprocessed = self._apply_preprocessing(x, y, fit=False)
+
+        # Check label shape
+        y_preprocessed = self.reduce_labels(y_preprocessed)
+
+        # return individual loss values
+        prev_reduction = self._loss.reduction
+        self._loss.reduction = "none"
+
+        # Compute the losses and gradients with batch processing
+        losses = np.zeros(x_preprocessed.shape[0], dtype=np.float32)
+        grads = np.zeros(x_preprocessed.shape, dtype=x_preprocessed.dtype)
+        num_batch = int(np.ceil(len(x_preprocessed) / float(batch_size)))
+        for m in range(num_batch):
+            # Batch indexes
+            begin, end = (
+                m * batch_size,
+                min((m + 1) * batch_size, x_preprocessed.shape[0]),
+            )
+
+            # Convert the inputs and labels to Tensors
+            inputs_t = torch.from_numpy(x_preprocessed[begin:end]).to(self._device)
+            inputs_t.requires_grad = True
+            labels_t = torch.from_numpy(y_preprocessed[begin:end]).to(self._device)
+
+            model_outputs = self._model(inputs_t)
+            loss = self._loss(model_outputs[-1], labels_t)
+
+            # Clean gradients
+            self._model.zero_grad()
+
+            # The gradient of the sum w.r.t. each sample is the gradient of the loss of that sample
+            torch.sum(loss).backward()
+            losses[begin:end] = loss.detach().cpu().numpy().reshape(-1)
+            grads[begin:end] = inputs_t.grad.cpu().numpy()  # type: ignore
+
+        self._loss.reduction = prev_reduction
+
+        grads = self._apply_preprocessing_gradient(x, grads)
+        assert grads.shape == x.shape
+
+        return losses, grads
+
     def loss_gradient_framework(self, x: "torch.Tensor", y: "torch.Tensor", **kwargs) -> "torch.Tensor":
         """
-        Compute the gradient of the loss function w.r.t. `x`.
+        Compute the gradient of the loss function w.r.t. `x`. Preprocessing defences, which have to be implemented in
+        PyTorch, and standardisation are applied as tensor operations.
 
         :param x: Input with shape as expected by the model.
         :param y: Target values (class labels) one-hot-encoded of shape (nb_samples, nb_classes) or indices of shape
@@ -479,13 +794,16 @@ class PyTorchClassifier(ClassGradientsMixin, ClassifierMixin, PyTorchEstimator):
         import torch  # lgtm [py/repeated-import]
 
         # Check label shape
-        y = self.reduce_labels_framework(y)
+        y = self.reduce_labels_framework(y.to(self._device))
 
         # Convert the inputs to Variable
-        x = torch.autograd.Variable(x, requires_grad=True)
+        x_grad = torch.autograd.Variable(x.to(self._device), requires_grad=True)
+
+        # Apply preprocessing
+        x_preprocessed, _ = self._apply_preprocessing(x_grad, y=None, fit=False)
 
         # Compute the gradient and return
-        model_outputs = self._model(x)
+        model_outputs = self._model(x_preprocessed)
         loss = self._loss(model_outputs[-1], y)
 
         # Clean gradients
@@ -493,47 +811,75 @@ class PyTorchClassifier(ClassGradientsMixin, ClassifierMixin, PyTorchEstimator):
 
         # Compute gradients
         loss.backward()
-        grads = x.grad
+        grads = x_grad.grad.to(x.device)
         assert grads.shape == x.shape  # type: ignore
 
         return grads  # type: ignore
 
     def get_activations(
-        self, x: np.ndarray, layer: Union[int, str], batch_size: int = 128, framework: bool = False
-    ) -> np.ndarray:
+        self,
+        x: np.ndarray,
+        layer: Union[int, str, List[Union[int, str]]],
+        batch_size: int = 128,
+        framework: bool = False,
+    ) -> Union[np.ndarray, List[np.ndarray]]:
         """
         Return the output of the specified layer for input `x`. `layer` is specified by layer index (between 0 and
         `nb_layers - 1`) or by name. The number of layers can be determined by counting the results returned by
-        calling `layer_names`.
+        calling `layer_names`. If a list of layers is provided, the outputs of all layers are collected from a single
+        forward pass.
 
         :param x: Input for computing the activations.
-        :param layer: Layer for computing the activations
+        :param layer: Layer or list of layers for computing the activations
         :param batch_size: Size of batches.
         :param framework: If true, return the intermediate tensor representation of the activation.
-        :return: The output of `layer`, where the first dimension is the batch size corresponding to `x`.
+        :return: The output of `layer`, where the first dimension is the batch size corresponding to `x`, or the list
+                 of outputs if `layer` is a list.
         """
         import torch  # lgtm [py/repeated-import]
 
-        # Apply defences
-        x_preprocessed, _ = self._apply_preprocessing(x=x, y=None, fit=False)
+        # Get index of the extracted layers
+        layer_indices = []
+        for layer_ in layer if isinstance(layer, list) else [layer]:
+            if isinstance(layer_, six.string_types):
+                if layer_ not in self._layer_names:
+                    raise ValueError("Layer name %s not supported" % layer_)
+                layer_indices.append(self._layer_names.index(layer_))
 
-        # Get index of the extracted layer
-        if isinstance(layer, six.string_types):
-            if layer not in self._layer_names:
-                raise ValueError("Layer name %s not supported" % layer)
-            layer_index = self._layer_names.index(layer)
+            elif isinstance(layer_, (int, np.integer)):
+                layer_indices.append(int(layer_) % len(self._layer_names))
 
-        elif isinstance(layer, (int, np.integer)):
-            layer_index = layer
+            else:
+                raise TypeError("Layer must be of type str or int")
 
+        if framework:
+            model_outputs = self._model(torch.from_numpy(x).to(self._device))
+            activations = [model_outputs[layer_index] for layer_index in layer_indices]
         else:
-            raise TypeError("Layer must be of type str or int")
+            activations = self._get_cached_activations(
+                x, layer_indices, lambda indices: self._compute_activations(x, indices, batch_size)
+            )
 
-        if framework:
-            return self._model(torch.from_numpy(x).to(self._device))[layer_index]
+        if isinstance(layer, list):
+            return activations
+        return activations[0]
+
+    def _compute_activations(self, x: np.ndarray, layer_indices: List[int], batch_size: int) -> List[np.ndarray]:
+        """
+        Compute the outputs of several layers for input `x` with one forward pass per batch.
+
+        :param x: Input for computing the activations.
+        :param layer_indices: Indices of the layers.
+        :param batch_size: Size of batches.
+        :return: List of the outputs of the layers.
+        """
+        import torch  # lgtm [py/repeated-import]
+
+        # Apply defences
+        x_preprocessed, _ = self._apply_preprocessing(x=x, y=None, fit=False)
 
         # Run prediction with batch processing
-        results = []
+        results: List[List[np.ndarray]] = [[] for _ in layer_indices]
         num_batch = int(np.ceil(len(x_preprocessed) / float(batch_size)))
 
         for m in range(num_batch):
@@ -544,11 +890,12 @@ class PyTorchClassifier(ClassGradientsMixin, ClassifierMixin, PyTorchEstimator):
             )
 
             # Run prediction for the current batch
-            layer_output = self._model(torch.from_numpy(x_preprocessed[begin:end]).to(self._device))[layer_index]
-            results.append(layer_output.detach().cpu().numpy())
+            with torch.no_grad():
+                model_outputs = self._model(torch.from_numpy(x_preprocessed[begin:end]).to(self._device))
+            for i, layer_index in enumerate(layer_indices):
+                results[i].append(model_outputs[layer_index].detach().cpu().numpy())
 
-        results = np.concatenate(results)
-        return results
+        return [np.concatenate(result) for result in results]
 
     def set_learning_phase(self, train: bool) -> None:
         """
@@ -25,7 +25,7 @@ import os
 import random
 import shutil
 import time
-from typing import Any, Callable, Dict, List, Optional, Tuple, Union, TYPE_CHECKING
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union, TYPE_CHECKING
 
 import numpy as np
 import six
@@ -262,7 +262,9 @@ class TensorFlowClassifier(ClassGradientsMixin, ClassifierMixin, TensorFlowEstim
         else:
             super().fit_generator(generator, nb_epochs=nb_epochs, **kwargs)
 
-    def class_gradient(self, x: np.ndarray, label: Union[int, List[int], None] = None, **kwargs) -> np.ndarray:
+    def class_gradient(
+        self, x: np.ndarray, label: Union[int, List[int], None] = None, batch_size: int = 128, **kwargs
+    ) -> np.ndarray:
         """
         Compute per-class derivatives w.r.t. `x`.
 
@@ -271,6 +273,7 @@ class TensorFlowClassifier(ClassGradientsMixin, ClassifierMixin, TensorFlowEstim
                       output is computed for all samples. If multiple values as provided, the first dimension should
                       match the batch size of `x`, and each value will be used as target for its corresponding sample in
                       `x`. If `None`, then gradients for all classes will be computed for each sample.
+        :param batch_size: Size of batches.
         :return: Array of gradients of input features w.r.t. each class in the form
                  `(batch_size, nb_classes, input_shape)` when computing for all classes, otherwise shape becomes
                  `(batch_size, 1, input_shape)` when `label` parameter is specified.
@@ -293,41 +296,118 @@ class TensorFlowClassifier(ClassGradientsMixin, ClassifierMixin, TensorFlowEstim
         # Apply preprocessing
         x_preprocessed, _ = self._apply_preprocessing(x, y=None, fit=False)
 
-        # Create feed_dict
-        feed_dict = {self._input_ph: x_preprocessed}
-        feed_dict.update(self._feed_dict)
+        # Compute the gradients with batch processing
+        nb_grads = self.nb_classes if label is None else 1
+        grads = np.zeros((x_preprocessed.shape[0], nb_grads) + x_preprocessed.shape[1:], dtype=np.float32)
+        num_batch = int(np.ceil(len(x_preprocessed) / float(batch_size)))
+        for m in range(num_batch):
+            # Batch indexes
+            begin, end = (
+                m * batch_size,
+                min((m + 1) * batch_size, x_preprocessed.shape[0]),
+            )
 
-        # Compute the gradient and return
-        if label is None:
-            # Compute the gradients w.r.t. all classes
-            grads = self._sess.run(self._class_grads, feed_dict=feed_dict)
-            grads = np.swapaxes(np.array(grads), 0, 1)
+            # Create feed_dict
+            feed_dict = {self._input_ph: x_preprocessed[begin:end]}
+            feed_dict.update(self._feed_dict)
 
-        elif isinstance(label, (int, np.integer)):
-            # Compute the gradients only w.r.t. the provided label
-            grads = self._sess.run(self._class_grads[label], feed_dict=feed_dict)
-            grads = grads[None, ...]
-            grads = np.swapaxes(np.array(grads), 0, 1)
+            if label is None:
+                # Compute the gradients w.r.t. all classes
+                batch_grads = self._sess.run(self._class_grads, feed_dict=feed_dict)
+                grads[begin:end] = np.swapaxes(np.array(batch_grads), 0, 1)
 
-        else:
-            # For each sample, compute the gradients w.r.t. the indicated target class (possibly distinct)
-            unique_label = list(np.unique(label))
-            grads = self._sess.run([self._class_grads[l] for l in unique_label], feed_dict=feed_dict)
-            grads = np.swapaxes(np.array(grads), 0, 1)
-            lst = [unique_label.index(i) for i in label]
-            grads = np.expand_dims(grads[np.arange(len(grads)), lst], axis=1)
+            elif isinstance(label, (int, np.integer)):
+                # Compute the gradients only w.r.t. the provided label
+                grads[begin:end, 0] = self._sess.run(self._class_grads[label], feed_dict=feed_dict)
+
+            else:
+                # For each sample, compute the gradients w.r.t. the indicated target class (possibly distinct)
+                label_batch = label[begin:end]
+                unique_label = list(np.unique(label_batch))
+                batch_grads = self._sess.run([self._class_grads[l] for l in unique_label], feed_dict=feed_dict)
+                batch_grads = np.swapaxes(np.array(batch_grads), 0, 1)
+                lst = [unique_label.index(i) for i in label_batch]
+                grads[begin:end, 0] = batch_grads[np.arange(len(batch_grads)), lst]
 
         grads = self._apply_preprocessing_gradient(x, grads)
 
         return grads
 
-    def loss_gradient(self, x: np.ndarray, y: np.ndarray, **kwargs) -> np.ndarray:
+    def predict_and_weighted_class_gradient(
+        self,
+        x: np.ndarray,
+        weights: Union[np.ndarray, Callable[[np.ndarray, np.ndarray], np.ndarray]],
+        batch_size: int = 128,
+        **kwargs
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the predictions and the derivatives w.r.t. `x` of a weighted sum of the class outputs of each sample,
+        for example `z[i_add] - z[i_sub]` for margin losses, with one backward pass per batch. If `weights` are an
+        array, the predictions and the gradients are evaluated by the same session run.
+
+        :param x: Sample input with shape as expected by the model.
+        :param weights: Weights of the class outputs of shape `(nb_samples, nb_classes)`, or a function of the
+                        predictions of a batch of samples and of the indices of these samples in `x` returning their
+                        weights.
+        :param batch_size: Size of batches.
+        :return: A tuple of the predictions of shape `(nb_samples, nb_classes)` and the gradients of the weighted sums
+                 of shape `(nb_samples, input_shape)`.
+        """
+        import tensorflow as tf  # lgtm [py/repeated-import]
+
+        # Construct the graph of the gradients of the weighted class outputs
+        if not hasattr(self, "_weighted_class_grads"):
+            weights_ph = tf.placeholder(self._output.dtype, shape=self._output.shape)
+            self._weighted_class_grads = (
+                weights_ph,
+                tf.gradients(tf.reduce_sum(self._output * weights_ph), self._input_ph)[0],
+            )
+        weights_ph, weighted_class_grads = self._weighted_class_grads
+
+        # Apply preprocessing
+        x_preprocessed, _ = self._apply_preprocessing(x, y=None, fit=False)
+
+        # Compute the predictions and gradients with batch processing
+        predictions = np.zeros((x_preprocessed.shape[0], self.nb_classes), dtype=np.float32)
+        grads = np.zeros(x_preprocessed.shape, dtype=np.float32)
+        num_batch = int(np.ceil(len(x_preprocessed) / float(batch_size)))
+        for m in range(num_batch):
+            # Batch indexes
+            begin, end = (
+                m * batch_size,
+                min((m + 1) * batch_size, x_preprocessed.shape[0]),
+            )
+
+            # Create feed_dict
+            feed_dict = {self._input_ph: x_preprocessed[begin:end]}
+            feed_dict.update(self._feed_dict)
+
+            if callable(weights):
+                # The weights depend on the predictions, which have to be evaluated first
+                predictions_batch = self._sess.run(self._output, feed_dict=feed_dict)
+                predictions[begin:end] = self._apply_postprocessing(preds=predictions_batch, fit=False)
+                feed_dict[weights_ph] = weights(predictions[begin:end], np.arange(begin, end))
+                grads[begin:end] = self._sess.run(weighted_class_grads, feed_dict=feed_dict)
+            else:
+                feed_dict[weights_ph] = weights[begin:end]
+                predictions_batch, grads[begin:end] = self._sess.run(
+                    [self._output, weighted_class_grads], feed_dict=feed_dict
+                )
+                predictions[begin:end] = self._apply_postprocessing(preds=predictions_batch, fit=False)
+
+        grads = self._apply_preprocessing_gradient(x, grads)
+
+        return predictions, grads
+
+    def loss_gradient(self, x: np.ndarray, y: np.ndarray, batch_size: int = 128, **kwargs) -> np.ndarray:
         """
-        Compute the gradient of the loss function w.r.t. `x`.
+        Compute the gradient of the loss function w.r.t. `x`. The gradients of batches of a loss averaged over samples
+        are rescaled to the average over all samples of `x`, so that they do not depend on `batch_size`.
 
         :param x: Sample input with shape as expected by the model.
         :param y: Target values (class labels) one-hot-encoded of shape `(nb_samples, nb_classes)` or indices of shape
                   `(nb_samples,)`.
+        :param batch_size: Size of batches.
         :return: Array of gradients of the same shape as `x`.
         """
         # Apply preprocessing
@@ -341,18 +421,86 @@ class TensorFlowClassifier(ClassGradientsMixin, ClassifierMixin, TensorFlowEstim
         if self._reduce_labels:
             y_preprocessed = np.argmax(y_preprocessed, axis=1)
 
-        # Create feed_dict
-        feed_dict = {self._input_ph: x_preprocessed, self._labels_ph: y_preprocessed}
-        feed_dict.update(self._feed_dict)
+        # Rescale the gradients of scalar losses not reduced by a sum from the average over a batch to the average
+        # over all samples
+        mean_reduction = len(self._loss.shape) == 0 and self._loss.op.type != "Sum"
+
+        # Compute gradients with batch processing
+        grads = np.zeros(x_preprocessed.shape, dtype=np.float32)
+        num_batch = int(np.ceil(len(x_preprocessed) / float(batch_size)))
+        for m in range(num_batch):
+            # Batch indexes
+            begin, end = (
+                m * batch_size,
+                min((m + 1) * batch_size, x_preprocessed.shape[0]),
+            )
+
+            # Create feed_dict
+            feed_dict = {self._input_ph: x_preprocessed[begin:end], self._labels_ph: y_preprocessed[begin:end]}
+            feed_dict.update(self._feed_dict)
+
+            grads[begin:end] = self._sess.run(self._loss_grads, feed_dict=feed_dict)
+            if mean_reduction and num_batch > 1:
+                grads[begin:end] *= (end - begin) / x_preprocessed.shape[0]
 
-        # Compute gradients
-        grads = self._sess.run(self._loss_grads, feed_dict=feed_dict)
         grads = self._apply_preprocessing_gradient(x, grads)
         assert grads.shape == x_preprocessed.shape
 
         return grads
 
-    def loss(self, x: np.ndarray, y: np.ndarray, **kwargs) -> np.ndarray:
+    def loss_and_gradient(
+        self, x: np.ndarray, y: np.ndarray, batch_size: int = 128, **kwargs
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the loss value of each sample and the gradient of the loss of each sample w.r.t. that sample from the
+        same run of the graph. If the loss tensor of the classifier is reduced to a scalar instead of holding the loss
+        of each sample, the graph is run on one sample at a time.
+
+        :param x: Sample input with shape as expected by the model.
+        :param y: Target values (class labels) one-hot-encoded of shape `(nb_samples, nb_classes)` or indices of shape
+                  `(nb_samples,)`.
+        :param batch_size: Size of batches.
+        :return: A tuple of the loss values of shape `(nb_samples,)` and the gradients of the same shape as `x`.
+        """
+        # Apply preprocessing
+        x_preprocessed, y_preprocessed = self._apply_preprocessing(x, y, fit=False)
+
+        # Check if loss available
+        if not hasattr(self, "_loss_grads") or self._loss_grads is None or self._labels_ph is None:
+            raise ValueError("Need the loss function and the labels placeholder to compute the loss gradient.")
+
+        # A reduced loss is the loss of the sample for batches of one sample
+        if len(self._loss.shape) != 1:
+            batch_size = 1
+
+        # Check label shape
+        if self._reduce_labels:
+            y_preprocessed = np.argmax(y_preprocessed, axis=1)
+
+        # Compute losses and gradients with batch processing
+        losses = np.zeros(x_preprocessed.shape[0], dtype=np.float32)
+        grads = np.zeros(x_preprocessed.shape, dtype=np.float32)
+        num_batch = int(np.ceil(len(x_preprocessed) / float(batch_size)))
+        for m in range(num_batch):
+            # Batch indexes
+            begin, end = (
+                m * batch_size,
+                min((m + 1) * batch_size, x_preprocessed.shape[0]),
+            )
+
+            # Create feed_dict
+            feed_dict = {self._input_ph: x_preprocessed[begin:end], self._labels_ph: y_preprocessed[begin:end]}
+            feed_dict.update(self._feed_dict)
+
+            loss_batch, grads[begin:end] = self._sess.run([self._loss, self._loss_grads], feed_dict=feed_dict)
+            losses[begin:end] = np.reshape(loss_batch, (end - begin,))
+
+        grads = self._apply_preprocessing_gradient(x, grads)
+        assert grads.shape == x_preprocessed.shape
+
+        return losses, grads
+
+    def loss(self, x: np.ndarray, y: np.ndarray, batch_size: int = 128, **kwargs) -> np.ndarray:
         """
         Compute the loss of the neural network for samples `x`.
 
@@ -360,6 +508,7 @@ class TensorFlowClassifier(ClassGradientsMixin, ClassifierMixin, TensorFlowEstim
                   nb_channels) or (nb_samples, nb_channels, nb_pixels_1, nb_pixels_2).
         :param y: Target values (class labels) one-hot-encoded of shape `(nb_samples, nb_classes)` or indices
                   of shape `(nb_samples,)`.
+        :param batch_size: Size of batches.
         :return: Loss values.
         :rtype: Format as expected by the `model`
         """
@@ -431,18 +580,24 @@ class TensorFlowClassifier(ClassGradientsMixin, ClassifierMixin, TensorFlowEstim
         return result
 
     def get_activations(
-        self, x: np.ndarray, layer: Union[int, str], batch_size: int = 128, framework: bool = False
-    ) -> np.ndarray:
+        self,
+        x: np.ndarray,
+        layer: Union[int, str, List[Union[int, str]]],
+        batch_size: int = 128,
+        framework: bool = False,
+    ) -> Union[np.ndarray, List[np.ndarray]]:
         """
         Return the output of the specified layer for input `x`. `layer` is specified by layer index (between 0 and
         `nb_layers - 1`) or by name. The number of layers can be determined by counting the results returned by
-        calling `layer_names`.
+        calling `layer_names`. If a list of layers is provided, the outputs of all layers are collected from a single
+        forward pass.
 
         :param x: Input for computing the activations.
-        :param layer: Layer for computing the activations.
+        :param layer: Layer or list of layers for computing the activations.
         :param batch_size: Size of batches.
         :param framework: If true, return the intermediate tensor representation of the activation.
-        :return: The output of `layer`, where the first dimension is the batch size corresponding to `x`.
+        :return: The output of `layer`, where the first dimension is the batch size corresponding to `x`, or the list
+                 of outputs if `layer` is a list.
         """
         # pylint: disable=E0401
         import tensorflow as tf  # lgtm [py/repeated-import]
@@ -451,25 +606,49 @@ class TensorFlowClassifier(ClassGradientsMixin, ClassifierMixin, TensorFlowEstim
         with self._sess.graph.as_default():
             graph = tf.get_default_graph()
 
-        if isinstance(layer, six.string_types):  # basestring for Python 2 (str, unicode) support
-            if layer not in self._layer_names:
-                raise ValueError("Layer name %s is not part of the graph." % layer)
-            layer_tensor = graph.get_tensor_by_name(layer)
+        layer_names = []
+        for layer_ in layer if isinstance(layer, list) else [layer]:
+            if isinstance(layer_, six.string_types):  # basestring for Python 2 (str, unicode) support
+                if layer_ not in self._layer_names:
+                    raise ValueError("Layer name %s is not part of the graph." % layer_)
+                layer_names.append(layer_)
 
-        elif isinstance(layer, (int, np.integer)):
-            layer_tensor = graph.get_tensor_by_name(self._layer_names[layer])
+            elif isinstance(layer_, (int, np.integer)):
+                layer_names.append(self._layer_names[layer_])
 
-        else:
-            raise TypeError("Layer must be of type `str` or `int`. Received %s." % layer)
+            else:
+                raise TypeError("Layer must be of type `str` or `int`. Received %s." % layer_)
 
         if framework:
-            return layer_tensor
+            layer_tensors = [graph.get_tensor_by_name(layer_name) for layer_name in layer_names]
+            if isinstance(layer, list):
+                return layer_tensors
+            return layer_tensors[0]
 
+        activations = self._get_cached_activations(
+            x, layer_names, lambda names: self._compute_activations(x, names, batch_size)
+        )
+
+        if isinstance(layer, list):
+            return activations
+        return activations[0]
+
+    def _compute_activations(self, x: np.ndarray, layer_names: List[str], batch_size: int) -> List[np.ndarray]:
+        """
+        Compute the outputs of several layers for input `x` with one run of the graph per batch.
+
+        :param x: Input for computing the activations.
+        :param layer_names: Names of the layer tensors.
+        :param batch_size: Size of batches.
+        :return: List of the outputs of the layers.
+        """
         # Apply preprocessing
         x_preprocessed, _ = self._apply_preprocessing(x, y=None, fit=False)
 
+        layer_tensors = [self._sess.graph.get_tensor_by_name(layer_name) for layer_name in layer_names]
+
         # Run prediction with batch processing
-        results = []
+        results: List[List[np.ndarray]] = [[] for _ in layer_names]
         num_batch = int(np.ceil(len(x_preprocessed) / float(batch_size)))
         for m in range(num_batch):
             # Batch indexes
@@ -483,12 +662,11 @@ class TensorFlowClassifier(ClassGradientsMixin, ClassifierMixin, TensorFlowEstim
             feed_dict.update(self._feed_dict)
 
             # Run prediction for the current batch
-            layer_output = self._sess.run(layer_tensor, feed_dict=feed_dict)
-            results.append(layer_output)
+            layer_outputs = self._sess.run(layer_tensors, feed_dict=feed_dict)
+            for result, layer_output in zip(results, layer_outputs):
+                result.append(layer_output)
 
-        results = np.concatenate(results)
-
-        return results
+        return [np.concatenate(result) for result in results]
 
     def set_learning_phase(self, train: bool) -> None:
         """
@@ -567,6 +745,9 @@ class TensorFlowClassifier(ClassGradientsMixin, ClassifierMixin, TensorFlowEstim
         else:
             state["_class_grads"] = False
 
+        if "_weighted_class_grads" in state:
+            del state["_weighted_class_grads"]
+
         model_name = str(time.time())
         state["model_name"] = model_name
         self.save(model_name)
@@ -737,14 +918,32 @@ class TensorFlowV2Classifier(ClassGradientsMixin, ClassifierMixin, TensorFlowV2E
         else:
             self._reduce_labels = False
 
-    def predict(self, x: np.ndarray, batch_size: int = 128, **kwargs) -> np.ndarray:
+    def predict(
+        self, x: Union[np.ndarray, "tf.Tensor"], batch_size: int = 128, **kwargs
+    ) -> Union[np.ndarray, "tf.Tensor"]:
         """
         Perform prediction for a batch of inputs.
 
-        :param x: Test set.
+        :param x: Test set. A TensorFlow tensor is preprocessed and predicted with tensor operations without copies to
+                  host memory.
         :param batch_size: Size of batches.
-        :return: Array of predictions of shape `(nb_inputs, nb_classes)`.
+        :return: Array of predictions of shape `(nb_inputs, nb_classes)`, or a tensor if `x` is a TensorFlow tensor.
         """
+        import tensorflow as tf  # lgtm [py/repeated-import]
+
+        if tf.is_tensor(x):
+            # Run prediction with batch processing
+            results_tf = tf.concat(
+                [self._predict_framework(x[begin : begin + batch_size]) for begin in range(0, x.shape[0], batch_size)],
+                axis=0,
+            )
+
+            if self.postprocessing_defences:
+                # Postprocessing defences operate on arrays
+                results_tf = tf.convert_to_tensor(self._apply_postprocessing(preds=results_tf.numpy(), fit=False))
+
+            return results_tf
+
         # Apply preprocessing
         x_preprocessed, _ = self._apply_preprocessing(x, y=None, fit=False)
 
@@ -765,16 +964,12 @@ class TensorFlowV2Classifier(ClassGradientsMixin, ClassifierMixin, TensorFlowV2E
         predictions = self._apply_postprocessing(preds=results, fit=False)
         return predictions
 
-    def _predict_framework(self, x, **kwargs):
+    def _predict_framework(self, x: "tf.Tensor", **kwargs) -> "tf.Tensor":
         """
-        Perform prediction for a batch of inputs.
+        Perform prediction for a batch of inputs as differentiable tensor operations.
 
         :param x: Test set.
-        :type x: `np.ndarray`
-        :param batch_size: Size of batches.
-        :type batch_size: `int`
-        :return: Array of predictions of shape `(nb_inputs, nb_classes)`.
-        :rtype: `np.ndarray`
+        :return: Tensor of predictions of shape `(nb_inputs, nb_classes)` before postprocessing.
         """
         # Apply preprocessing
         x_preprocessed, _ = self._apply_preprocessing(x, y=None, fit=False)
@@ -848,7 +1043,9 @@ class TensorFlowV2Classifier(ClassGradientsMixin, ClassifierMixin, TensorFlowV2E
             # Fit a generic data generator through the API
             super().fit_generator(generator, nb_epochs=nb_epochs)
 
-    def class_gradient(self, x: np.ndarray, label: Union[int, List[int], None] = None, **kwargs) -> np.ndarray:
+    def class_gradient(
+        self, x: np.ndarray, label: Union[int, List[int], None] = None, batch_size: int = 128, **kwargs
+    ) -> np.ndarray:
         """
         Compute per-class derivatives w.r.t. `x`.
 
@@ -857,54 +1054,63 @@ class TensorFlowV2Classifier(ClassGradientsMixin, ClassifierMixin, TensorFlowV2E
                       output is computed for all samples. If multiple values as provided, the first dimension should
                       match the batch size of `x`, and each value will be used as target for its corresponding sample in
                       `x`. If `None`, then gradients for all classes will be computed for each sample.
+        :param batch_size: Size of batches.
         :return: Array of gradients of input features w.r.t. each class in the form
                  `(batch_size, nb_classes, input_shape)` when computing for all classes, otherwise shape becomes
                  `(batch_size, 1, input_shape)` when `label` parameter is specified.
         """
         import tensorflow as tf  # lgtm [py/repeated-import]
 
+        if not tf.executing_eagerly():
+            raise NotImplementedError("Expecting eager execution.")
+
         # Apply preprocessing
         x_preprocessed, _ = self._apply_preprocessing(x, y=None, fit=False)
 
-        # Compute the gradients
-        if tf.executing_eagerly():
+        # Compute the gradients with batch processing
+        nb_gradients = self.nb_classes if label is None else 1
+        gradients = np.zeros((x_preprocessed.shape[0], nb_gradients) + x_preprocessed.shape[1:], dtype=np.float32)
+        num_batch = int(np.ceil(len(x_preprocessed) / float(batch_size)))
+        for m in range(num_batch):
+            # Batch indexes
+            begin, end = (
+                m * batch_size,
+                min((m + 1) * batch_size, x_preprocessed.shape[0]),
+            )
+            x_batch = x_preprocessed[begin:end]
+
             if label is None:
                 # Compute the gradients w.r.t. all classes
-                class_gradients = list()
-
                 for i in range(self.nb_classes):
                     with tf.GradientTape() as tape:
-                        x_preprocessed_tf = tf.convert_to_tensor(x_preprocessed)
+                        x_preprocessed_tf = tf.convert_to_tensor(x_batch)
                         tape.watch(x_preprocessed_tf)
                         predictions = self._model(x_preprocessed_tf)
                         prediction = predictions[:, i]
                         tape.watch(prediction)
 
-                    class_gradient = tape.gradient(prediction, x_preprocessed_tf).numpy()
-                    class_gradients.append(class_gradient)
-
-                gradients = np.swapaxes(np.array(class_gradients), 0, 1)
+                    gradients[begin:end, i] = tape.gradient(prediction, x_preprocessed_tf).numpy()
 
             elif isinstance(label, (int, np.integer)):
                 # Compute the gradients only w.r.t. the provided label
                 with tf.GradientTape() as tape:
-                    x_preprocessed_tf = tf.convert_to_tensor(x_preprocessed)
+                    x_preprocessed_tf = tf.convert_to_tensor(x_batch)
                     tape.watch(x_preprocessed_tf)
                     predictions = self._model(x_preprocessed_tf)
                     prediction = predictions[:, label]
                     tape.watch(prediction)
 
-                class_gradient = tape.gradient(prediction, x_preprocessed_tf).numpy()
-                gradients = np.expand_dims(class_gradient, axis=1)
+                gradients[begin:end, 0] = tape.gradient(prediction, x_preprocessed_tf).numpy()
 
             else:
                 # For each sample, compute the gradients w.r.t. the indicated target class (possibly distinct)
                 class_gradients = list()
-                unique_labels = list(np.unique(label))
+                label_batch = label[begin:end]
+                unique_labels = list(np.unique(label_batch))
 
                 for unique_label in unique_labels:
                     with tf.GradientTape() as tape:
-                        x_preprocessed_tf = tf.convert_to_tensor(x_preprocessed)
+                        x_preprocessed_tf = tf.convert_to_tensor(x_batch)
                         tape.watch(x_preprocessed_tf)
                         predictions = self._model(x_preprocessed_tf)
                         prediction = predictions[:, unique_label]
@@ -913,22 +1119,130 @@ class TensorFlowV2Classifier(ClassGradientsMixin, ClassifierMixin, TensorFlowV2E
                     class_gradient = tape.gradient(prediction, x_preprocessed_tf).numpy()
                     class_gradients.append(class_gradient)
 
-                gradients = np.swapaxes(np.array(class_gradients), 0, 1)
-                lst = [unique_labels.index(i) for i in label]
-                gradients = np.expand_dims(gradients[np.arange(len(gradients)), lst], axis=1)
+                class_gradients = np.swapaxes(np.array(class_gradients), 0, 1)
+                lst = [unique_labels.index(i) for i in label_batch]
+                gradients[begin:end, 0] = class_gradients[np.arange(len(class_gradients)), lst]
 
-        else:
+        return gradients
+
+    def predict_and_class_gradient(
+        self, x: np.ndarray, labels: Optional[Sequence[int]] = None, batch_size: int = 128, **kwargs
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the predictions and the per-class derivatives w.r.t. `x` for a set of classes from the same forward
+        pass.
+
+        :param x: Sample input with shape as expected by the model.
+        :param labels: Indices of the classes whose derivatives are computed for every sample. If `None`, the
+                       derivatives of all classes are computed.
+        :param batch_size: Size of batches.
+        :return: A tuple of the predictions of shape `(nb_samples, nb_classes)` and the gradients of shape
+                 `(nb_samples, len(labels), input_shape)`, or `(nb_samples, nb_classes, input_shape)` if `labels` is
+                 `None`.
+        """
+        import tensorflow as tf  # lgtm [py/repeated-import]
+
+        if not tf.executing_eagerly():
             raise NotImplementedError("Expecting eager execution.")
 
-        return gradients
+        labels = list(range(self.nb_classes)) if labels is None else [int(label) for label in labels]
+
+        # Apply preprocessing
+        x_preprocessed, _ = self._apply_preprocessing(x, y=None, fit=False)
+
+        # Compute the predictions and gradients with batch processing
+        results = np.zeros((x_preprocessed.shape[0], self.nb_classes), dtype=np.float32)
+        gradients = np.zeros((x_preprocessed.shape[0], len(labels)) + x_preprocessed.shape[1:], dtype=np.float32)
+        num_batch = int(np.ceil(len(x_preprocessed) / float(batch_size)))
+        for m in range(num_batch):
+            # Batch indexes
+            begin, end = (
+                m * batch_size,
+                min((m + 1) * batch_size, x_preprocessed.shape[0]),
+            )
+
+            # Run one forward pass and back-propagate each class from the same tape
+            with tf.GradientTape(persistent=True) as tape:
+                x_preprocessed_tf = tf.convert_to_tensor(x_preprocessed[begin:end])
+                tape.watch(x_preprocessed_tf)
+                predictions = self._model(x_preprocessed_tf)
+                class_predictions = [predictions[:, label] for label in labels]
+
+            for i, prediction in enumerate(class_predictions):
+                gradients[begin:end, i] = tape.gradient(prediction, x_preprocessed_tf).numpy()
+            del tape
+
+            results[begin:end] = predictions.numpy()
+
+        # Apply postprocessing
+        predictions = self._apply_postprocessing(preds=results, fit=False)
+
+        return predictions, gradients
+
+    def predict_and_weighted_class_gradient(
+        self,
+        x: np.ndarray,
+        weights: Union[np.ndarray, Callable[[np.ndarray, np.ndarray], np.ndarray]],
+        batch_size: int = 128,
+        **kwargs
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the predictions and the derivatives w.r.t. `x` of a weighted sum of the class outputs of each sample,
+        for example `z[i_add] - z[i_sub]` for margin losses, with one forward and one backward pass per batch.
+
+        :param x: Sample input with shape as expected by the model.
+        :param weights: Weights of the class outputs of shape `(nb_samples, nb_classes)`, or a function of the
+                        predictions of a batch of samples and of the indices of these samples in `x` returning their
+                        weights.
+        :param batch_size: Size of batches.
+        :return: A tuple of the predictions of shape `(nb_samples, nb_classes)` and the gradients of the weighted sums
+                 of shape `(nb_samples, input_shape)`.
+        """
+        import tensorflow as tf  # lgtm [py/repeated-import]
+
+        if not tf.executing_eagerly():
+            raise NotImplementedError("Expecting eager execution.")
+
+        # Apply preprocessing
+        x_preprocessed, _ = self._apply_preprocessing(x, y=None, fit=False)
+
+        # Compute the predictions and gradients with batch processing
+        predictions = np.zeros((x_preprocessed.shape[0], self.nb_classes), dtype=np.float32)
+        gradients = np.zeros(x_preprocessed.shape, dtype=np.float32)
+        num_batch = int(np.ceil(len(x_preprocessed) / float(batch_size)))
+        for m in range(num_batch):
+            # Batch indexes
+            begin, end = (
+                m * batch_size,
+                min((m + 1) * batch_size, x_preprocessed.shape[0]),
+            )
+
+            with tf.GradientTape() as tape:
+                x_preprocessed_tf = tf.convert_to_tensor(x_preprocessed[begin:end])
+                tape.watch(x_preprocessed_tf)
+                predictions_tf = self._model(x_preprocessed_tf)
+                predictions[begin:end] = self._apply_postprocessing(preds=predictions_tf.numpy(), fit=False)
+
+                if callable(weights):
+                    weights_batch = weights(predictions[begin:end], np.arange(begin, end))
+                else:
+                    weights_batch = weights[begin:end]
+                weighted_sum = tf.reduce_sum(predictions_tf * tf.cast(weights_batch, predictions_tf.dtype))
 
-    def loss(self, x: np.ndarray, y: np.ndarray, **kwargs) -> np.ndarray:
+            gradients[begin:end] = tape.gradient(weighted_sum, x_preprocessed_tf).numpy()
+
+        gradients = self._apply_preprocessing_gradient(x, gradients)
+
+        return predictions, gradients
+
+    def loss(self, x: np.ndarray, y: np.ndarray, batch_size: int = 128, **kwargs) -> np.ndarray:
         """
         Compute the loss function w.r.t. `x`.
 
         :param x: Sample input with shape as expected by the model.
         :param y: Target values (class labels) one-hot-encoded of shape `(nb_samples, nb_classes)` or indices
                   of shape `(nb_samples,)`.
+        :param batch_size: Size of batches.
         :return: Array of losses of the same shape as `x`.
         """
         import tensorflow as tf  # lgtm [py/repeated-import]
@@ -937,28 +1251,45 @@ class TensorFlowV2Classifier(ClassGradientsMixin, ClassifierMixin, TensorFlowV2E
             raise TypeError(
                 "The loss function `loss_object` is required for computing losses, but it has not been " "defined."
             )
+
+        if not tf.executing_eagerly():
+            raise NotImplementedError("Expecting eager execution.")
+
         prev_reduction = self._loss_object.reduction
         self._loss_object.reduction = tf.keras.losses.Reduction.NONE
 
         # Apply preprocessing
         x_preprocessed, _ = self._apply_preprocessing(x, y, fit=False)
 
-        if tf.executing_eagerly():
-            x_preprocessed_tf = tf.convert_to_tensor(x_preprocessed)
+        # Compute the loss with batch processing
+        results = None
+        num_batch = int(np.ceil(len(x_preprocessed) / float(batch_size)))
+        for m in range(num_batch):
+            # Batch indexes
+            begin, end = (
+                m * batch_size,
+                min((m + 1) * batch_size, x_preprocessed.shape[0]),
+            )
+
+            x_preprocessed_tf = tf.convert_to_tensor(x_preprocessed[begin:end])
             predictions = self._model(x_preprocessed_tf)
             if self._reduce_labels:
-                loss = self._loss_object(np.argmax(y, axis=1), predictions)
+                loss = self._loss_object(np.argmax(y[begin:end], axis=1), predictions)
             else:
-                loss = self._loss_object(y, predictions)
-        else:
-            raise NotImplementedError("Expecting eager execution.")
+                loss = self._loss_object(y[begin:end], predictions)
+
+            batch_loss = loss.numpy()
+            if results is None:
+                results = np.zeros((x_preprocessed.shape[0],) + batch_loss.shape[1:], dtype=batch_loss.dtype)
+            results[begin:end] = batch_loss
 
         self._loss_object.reduction = prev_reduction
-        return loss.numpy()
+        return results
 
     def loss_gradient_framework(self, x: "tf.Tensor", y: "tf.Tensor", **kwargs) -> "tf.Tensor":
         """
-        Compute the gradient of the loss function w.r.t. `x`.
+        Compute the gradient of the loss function w.r.t. `x`. Preprocessing defences, which have to be implemented in
+        TensorFlow, and standardisation are applied as tensor operations.
 
         :param x: Input with shape as expected by the model.
         :param y: Target values (class labels) one-hot-encoded of shape (nb_samples, nb_classes) or indices of shape
@@ -973,7 +1304,7 @@ class TensorFlowV2Classifier(ClassGradientsMixin, ClassifierMixin, TensorFlowV2E
         if tf.executing_eagerly():
             with tf.GradientTape() as tape:
                 tape.watch(x)
-                predictions = self._model(x)
+                predictions = self._predict_framework(x)
 
                 if self._reduce_labels:
                     loss = self._loss_object(tf.argmax(y, axis=1), predictions)
@@ -987,13 +1318,22 @@ class TensorFlowV2Classifier(ClassGradientsMixin, ClassifierMixin, TensorFlowV2E
 
         return loss_grads
 
-    def loss_gradient(self, x: np.ndarray, y: np.ndarray, **kwargs) -> np.ndarray:
+    def loss_gradient(
+        self,
+        x: Union[np.ndarray, "tf.Tensor"],
+        y: Union[np.ndarray, "tf.Tensor"],
+        batch_size: int = 128,
+        **kwargs
+    ) -> Union[np.ndarray, "tf.Tensor"]:
         """
-        Compute the gradient of the loss function w.r.t. `x`.
+        Compute the gradient of the loss function w.r.t. `x`. The gradients of batches of a loss averaged over samples
+        are rescaled to the average over all samples of `x`, so that they do not depend on `batch_size`.
 
-        :param x: Sample input with shape as expected by the model.
+        :param x: Sample input with shape as expected by the model. If `x` is a TensorFlow tensor, the gradients are
+                  computed with `loss_gradient_framework` without copies to host memory.
         :param y: Correct labels, one-vs-rest encoding.
-        :return: Array of gradients of the same shape as `x`.
+        :param batch_size: Size of batches.
+        :return: Array of gradients of the same shape as `x`, or a tensor if `x` is a TensorFlow tensor.
         """
         import tensorflow as tf  # lgtm [py/repeated-import]
 
@@ -1003,27 +1343,111 @@ class TensorFlowV2Classifier(ClassGradientsMixin, ClassifierMixin, TensorFlowV2E
                 "defined."
             )
 
+        # Rescale the gradients of scalar losses not reduced by a sum from the average over a batch to the average
+        # over all samples
+        mean_reduction = getattr(self._loss_object, "reduction", "auto") not in ("sum", "none")
+
+        if tf.is_tensor(x):
+            gradients_t = []
+            for begin in range(0, x.shape[0], batch_size):
+                end = min(begin + batch_size, x.shape[0])
+                gradients_batch = self.loss_gradient_framework(x[begin:end], y[begin:end])
+                if mean_reduction and batch_size < x.shape[0]:
+                    gradients_batch = gradients_batch * ((end - begin) / x.shape[0])
+                gradients_t.append(gradients_batch)
+            return tf.concat(gradients_t, axis=0)
+
         # Apply preprocessing
         x_preprocessed, _ = self._apply_preprocessing(x, y, fit=False)
 
-        if tf.executing_eagerly():
+        if not tf.executing_eagerly():
+            raise NotImplementedError("Expecting eager execution.")
+
+        # Compute the gradients with batch processing
+        gradients = np.zeros(x_preprocessed.shape, dtype=np.float32)
+        num_batch = int(np.ceil(len(x_preprocessed) / float(batch_size)))
+        for m in range(num_batch):
+            # Batch indexes
+            begin, end = (
+                m * batch_size,
+                min((m + 1) * batch_size, x_preprocessed.shape[0]),
+            )
+
             with tf.GradientTape() as tape:
-                x_preprocessed_tf = tf.convert_to_tensor(x_preprocessed)
+                x_preprocessed_tf = tf.convert_to_tensor(x_preprocessed[begin:end])
                 tape.watch(x_preprocessed_tf)
                 predictions = self._model(x_preprocessed_tf)
                 if self._reduce_labels:
-                    loss = self._loss_object(np.argmax(y, axis=1), predictions)
+                    loss = self._loss_object(np.argmax(y[begin:end], axis=1), predictions)
                 else:
-                    loss = self._loss_object(y, predictions)
+                    loss = self._loss_object(y[begin:end], predictions)
 
-            gradients = tape.gradient(loss, x_preprocessed_tf).numpy()
+            gradients[begin:end] = tape.gradient(loss, x_preprocessed_tf).numpy()
+            if mean_reduction and loss.shape.rank == 0 and num_batch > 1:
+                gradients[begin:end] *= (end - begin) / x_preprocessed.shape[0]
 
-        else:
+        # Apply preprocessing gradients
+        gradients = self._apply_preprocessing_gradient(x, gradients)
+        return gradients
+
+    def loss_and_gradient(
+        self, x: np.ndarray, y: np.ndarray, batch_size: int = 128, **kwargs
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the loss value of each sample and the gradient of the loss of each sample w.r.t. that sample from the
+        same forward pass. The loss object has to support the reduction `tf.keras.losses.Reduction.NONE`.
+
+        :param x: Sample input with shape as expected by the model.
+        :param y: Correct labels, one-vs-rest encoding.
+        :param batch_size: Size of batches.
+        :return: A tuple of the loss values of shape `(nb_samples,)` and the gradients of the same shape as `x`.
+        """
+        import tensorflow as tf  # lgtm [py/repeated-import]
+
+        if self._loss_object is None:
+            raise TypeError(
+                "The loss function `loss_object` is required for computing loss gradients, but it has not been "
+                "defined."
+            )
+
+        if not tf.executing_eagerly():
             raise NotImplementedError("Expecting eager execution.")
 
+        prev_reduction = self._loss_object.reduction
+        self._loss_object.reduction = tf.keras.losses.Reduction.NONE
+
+        # Apply preprocessing
+        x_preprocessed, _ = self._apply_preprocessing(x, y, fit=False)
+
+        # Compute the losses and gradients with batch processing
+        losses = np.zeros(x_preprocessed.shape[0], dtype=np.float32)
+        gradients = np.zeros(x_preprocessed.shape, dtype=np.float32)
+        num_batch = int(np.ceil(len(x_preprocessed) / float(batch_size)))
+        for m in range(num_batch):
+            # Batch indexes
+            begin, end = (
+                m * batch_size,
+                min((m + 1) * batch_size, x_preprocessed.shape[0]),
+            )
+
+            with tf.GradientTape() as tape:
+                x_preprocessed_tf = tf.convert_to_tensor(x_preprocessed[begin:end])
+                tape.watch(x_preprocessed_tf)
+                predictions = self._model(x_preprocessed_tf)
+                if self._reduce_labels:
+                    loss = self._loss_object(np.argmax(y[begin:end], axis=1), predictions)
+                else:
+                    loss = self._loss_object(y[begin:end], predictions)
+
+            # The gradient of a non-scalar target is the gradient of its sum, i.e. of the loss of each sample
+            gradients[begin:end] = tape.gradient(loss, x_preprocessed_tf).numpy()
+            losses[begin:end] = np.reshape(loss.numpy(), -1)
+
+        self._loss_object.reduction = prev_reduction
+
         # Apply preprocessing gradients
         gradients = self._apply_preprocessing_gradient(x, gradients)
-        return gradients
+        return losses, gradients
 
     def _get_layers(self) -> list:
         """
@@ -1053,62 +1477,96 @@ class TensorFlowV2Classifier(ClassGradientsMixin, ClassifierMixin, TensorFlowV2E
         return None  # type: ignore
 
     def get_activations(
-        self, x: np.ndarray, layer: Union[int, str], batch_size: int = 128, framework: bool = False
-    ) -> Optional[np.ndarray]:
+        self,
+        x: np.ndarray,
+        layer: Union[int, str, List[Union[int, str]]],
+        batch_size: int = 128,
+        framework: bool = False,
+    ) -> Optional[Union[np.ndarray, List[np.ndarray]]]:
         """
         Return the output of the specified layer for input `x`. `layer` is specified by layer index (between 0 and
         `nb_layers - 1`) or by name. The number of layers can be determined by counting the results returned by
-        calling `layer_names`.
+        calling `layer_names`. If a list of layers is provided, the outputs of all layers are collected from a single
+        forward pass.
 
         :param x: Input for computing the activations.
-        :param layer: Layer for computing the activations.
+        :param layer: Layer or list of layers for computing the activations.
         :param batch_size: Batch size.
-        :return: The output of `layer`, where the first dimension is the batch size corresponding to `x`.
+        :return: The output of `layer`, where the first dimension is the batch size corresponding to `x`, or the list
+                 of outputs if `layer` is a list.
         """
         import tensorflow as tf  # lgtm [py/repeated-import]
-        from art.config import ART_NUMPY_DTYPE
 
         if isinstance(self._model, tf.keras.models.Sequential):
-            i_layer = None
             if self.layer_names is None:
                 raise ValueError("No layer names identified.")
 
-            if isinstance(layer, six.string_types):
-                if layer not in self.layer_names:
-                    raise ValueError("Layer name %s is not part of the graph." % layer)
-                for i_name, name in enumerate(self.layer_names):
-                    if name == layer:
-                        i_layer = i_name
-                        break
-            elif isinstance(layer, int):
-                if layer < 0 or layer >= len(self.layer_names):
-                    raise ValueError(
-                        "Layer index %d is outside of range (0 to %d included)." % (layer, len(self.layer_names) - 1)
-                    )
-                i_layer = layer
-            else:
-                raise TypeError("Layer must be of type `str` or `int`.")
+            layer_indices = []
+            for layer_ in layer if isinstance(layer, list) else [layer]:
+                if isinstance(layer_, six.string_types):
+                    if layer_ not in self.layer_names:
+                        raise ValueError("Layer name %s is not part of the graph." % layer_)
+                    layer_indices.append(self.layer_names.index(layer_))
+                elif isinstance(layer_, int):
+                    if layer_ < 0 or layer_ >= len(self.layer_names):
+                        raise ValueError(
+                            "Layer index %d is outside of range (0 to %d included)."
+                            % (layer_, len(self.layer_names) - 1)
+                        )
+                    layer_indices.append(layer_)
+                else:
+                    raise TypeError("Layer must be of type `str` or `int`.")
+
+            activations = self._get_cached_activations(
+                x, layer_indices, lambda indices: self._compute_activations(x, indices, batch_size)
+            )
 
-            activation_model = tf.keras.Model(self._model.layers[0].input, self._model.layers[i_layer].output)
+            if isinstance(layer, list):
+                return activations
+            return activations[0]
 
-            # Apply preprocessing
-            x_preprocessed, _ = self._apply_preprocessing(x=x, y=None, fit=False)
+        return None
 
-            # Determine shape of expected output and prepare array
-            output_shape = self._model.layers[i_layer].output_shape
-            activations = np.zeros((x_preprocessed.shape[0],) + output_shape[1:], dtype=ART_NUMPY_DTYPE)
+    def _compute_activations(self, x: np.ndarray, layer_indices: List[int], batch_size: int) -> List[np.ndarray]:
+        """
+        Compute the outputs of several layers for input `x` with one forward pass per batch.
 
-            # Get activations with batching
-            for batch_index in range(int(np.ceil(x_preprocessed.shape[0] / float(batch_size)))):
-                begin, end = (
-                    batch_index * batch_size,
-                    min((batch_index + 1) * batch_size, x_preprocessed.shape[0]),
-                )
-                activations[begin:end] = activation_model([x_preprocessed[begin:end]]).numpy()
+        :param x: Input for computing the activations.
+        :param layer_indices: Indices of the layers.
+        :param batch_size: Batch size.
+        :return: List of the outputs of the layers.
+        """
+        import tensorflow as tf  # lgtm [py/repeated-import]
+        from art.config import ART_NUMPY_DTYPE
 
-            return activations
+        activation_model = tf.keras.Model(
+            self._model.layers[0].input, [self._model.layers[i_layer].output for i_layer in layer_indices]
+        )
 
-        return None
+        # Apply preprocessing
+        x_preprocessed, _ = self._apply_preprocessing(x=x, y=None, fit=False)
+
+        # Determine shape of expected outputs and prepare arrays
+        activations = [
+            np.zeros(
+                (x_preprocessed.shape[0],) + self._model.layers[i_layer].output_shape[1:], dtype=ART_NUMPY_DTYPE
+            )
+            for i_layer in layer_indices
+        ]
+
+        # Get activations with batching
+        for batch_index in range(int(np.ceil(x_preprocessed.shape[0] / float(batch_size)))):
+            begin, end = (
+                batch_index * batch_size,
+                min((batch_index + 1) * batch_size, x_preprocessed.shape[0]),
+            )
+            layer_outputs = activation_model([x_preprocessed[begin:end]])
+            if len(layer_indices) == 1:
+                layer_outputs = [layer_outputs]
+            for activation, layer_output in zip(activations, layer_outputs):
+                activation[begin:end] = layer_output.numpy()
+
+        return activations
 
     def set_learning_phase(self, train: bool) -> None:
         """
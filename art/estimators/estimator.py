@@ -19,13 +19,21 @@
 This module implements abstract base and mixin classes for estimators in ART.
 """
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Tuple, Union, TYPE_CHECKING
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union, TYPE_CHECKING
 
 import numpy as np
 from tqdm import trange
 
 from art.config import ART_NUMPY_DTYPE
-from art.utils import Deprecated, deprecated, deprecated_keyword_arg
+from art.utils import (
+    ArrayLRUCache,
+    Deprecated,
+    EstimatorProfiler,
+    array_fingerprint,
+    deprecated,
+    deprecated_keyword_arg,
+)
 
 if TYPE_CHECKING:
     # pylint: disable=R0401
@@ -50,6 +58,9 @@ class BaseEstimator(ABC):
         "preprocessing",
     ]
 
+    # Profiler recording the calls of the estimator, disabled by default
+    _profiler: Optional[EstimatorProfiler] = None
+
     def __init__(
         self,
         model=None,
@@ -222,6 +233,38 @@ class BaseEstimator(ABC):
         """
         return self._clip_values
 
+    def set_profiler(self, profiler: Optional[EstimatorProfiler]) -> None:
+        """
+        Attach a profiler recording the number of calls, the number of samples and the wall time of the methods and
+        preprocessing defences of the estimator.
+
+        :param profiler: The profiler or `None` to disable profiling.
+        """
+        self._profiler = profiler
+
+    @property
+    def profiler(self) -> Optional[EstimatorProfiler]:
+        """
+        Return the profiler attached to the estimator.
+
+        :return: The profiler or `None` if profiling is disabled.
+        """
+        return self._profiler
+
+    @contextmanager
+    def _profile(self, name: str, nb_samples: int = 0) -> Iterator[None]:
+        """
+        Record the wall time of the body as one call of the span `name` if a profiler is attached.
+
+        :param name: Name of the span.
+        :param nb_samples: Number of samples processed in the body.
+        """
+        if self._profiler is None:
+            yield
+        else:
+            with self._profiler.span(name, nb_samples):
+                yield
+
     def _apply_preprocessing(self, x, y, fit: bool) -> Tuple[Any, Any]:
         """
         Apply all defences and preprocessing operations on the inputs `x` and `y`. This function has to be applied to
@@ -237,7 +280,8 @@ class BaseEstimator(ABC):
         """
         # y = check_and_transform_label_format(y, self.nb_classes)
         x_preprocessed, y_preprocessed = self._apply_preprocessing_defences(x, y, fit=fit)
-        x_preprocessed = self._apply_preprocessing_standardisation(x_preprocessed)
+        with self._profile("preprocessing_standardisation", len(x_preprocessed)):
+            x_preprocessed = self._apply_preprocessing_standardisation(x_preprocessed)
         return x_preprocessed, y_preprocessed
 
     def _apply_preprocessing_defences(self, x, y, fit: bool = False) -> Tuple[Any, Any]:
@@ -258,10 +302,12 @@ class BaseEstimator(ABC):
             for defence in self.preprocessing_defences:
                 if fit:
                     if defence.apply_fit:
-                        x, y = defence(x, y)
+                        with self._profile("preprocessing_defence:" + defence.__class__.__name__, len(x)):
+                            x, y = defence(x, y)
                 else:
                     if defence.apply_predict:
-                        x, y = defence(x, y)
+                        with self._profile("preprocessing_defence:" + defence.__class__.__name__, len(x)):
+                            x, y = defence(x, y)
 
         return x, y
 
@@ -282,18 +328,30 @@ class BaseEstimator(ABC):
                 "np.float32.".format(x.dtype)
             )
 
-        if self.preprocessing is not None:
-            sub, div = self.preprocessing
+        if self.preprocessing is None:
+            return x
 
-            if isinstance(x, np.ndarray):
-                sub = np.asarray(sub, dtype=x.dtype)
-                div = np.asarray(div, dtype=x.dtype)
+        sub, div = self.preprocessing
 
-            res = x - sub
-            res = res / div
+        if isinstance(x, np.ndarray):
+            # Standardise in the floating point type of `x - sub` and `/ div`, keeping python scalars weakly typed
+            dtype = np.result_type(
+                x, *[value if np.isscalar(value) else np.asarray(value) for value in (sub, div)], np.float32
+            )
+            sub = np.asarray(sub, dtype=dtype)
+            div = np.asarray(div, dtype=dtype)
+
+            # Skip identity standardisation, e.g. the default `(0, 1)`, of inputs already in the floating point type
+            if x.dtype == dtype and not np.any(sub) and np.all(div == 1):
+                return x
+
+            # Subtract into a single new array and divide it in place
+            res = np.subtract(x, sub, dtype=dtype)
+            np.divide(res, div, out=res)
 
         else:
-            res = x
+            res = x - sub
+            res = res / div
 
         return res
 
@@ -306,15 +364,18 @@ class BaseEstimator(ABC):
         :param fit: `True` if the defences are applied during training.
         :return: Post-processed model predictions.
         """
-        post_preds = preds.copy()
+        # Postprocessing defences return new arrays and leave `preds` unchanged
+        post_preds = preds
         if self.postprocessing_defences is not None:
             for defence in self.postprocessing_defences:
                 if fit:
                     if defence.apply_fit:
-                        post_preds = defence(post_preds)
+                        with self._profile("postprocessing_defence:" + defence.__class__.__name__, len(preds)):
+                            post_preds = defence(post_preds)
                 else:
                     if defence.apply_predict:
-                        post_preds = defence(post_preds)
+                        with self._profile("postprocessing_defence:" + defence.__class__.__name__, len(preds)):
+                            post_preds = defence(post_preds)
 
         return post_preds
 
@@ -350,6 +411,24 @@ class LossGradientsMixin(ABC):
         """
         raise NotImplementedError
 
+    def loss_and_gradient(
+        self, x: np.ndarray, y: np.ndarray, batch_size: int = 128, **kwargs
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the loss value of each sample and the gradient of the loss of each sample w.r.t. that sample. This
+        implementation calls `loss` and `loss_gradient`, estimators which can obtain both from the same forward pass
+        override it.
+
+        :param x: Samples.
+        :param y: Target values.
+        :param batch_size: Size of batches.
+        :return: A tuple of the loss values of shape `(nb_samples,)` and the gradients of the same shape as `x`.
+        """
+        loss = self.loss(x, y, batch_size=batch_size, **kwargs)  # type: ignore
+        gradients = self.loss_gradient(x, y, batch_size=batch_size, **kwargs)
+
+        return np.reshape(loss, (x.shape[0],)), gradients
+
     def _apply_preprocessing_gradient(self, x, gradients):
         """
         Apply the backward pass to the gradients through all normalization and preprocessing defences that have been
@@ -406,6 +485,11 @@ class LossGradientsMixin(ABC):
         if hasattr(self, "preprocessing") and self.preprocessing is not None:
             _, div = self.preprocessing
             div = np.asarray(div, dtype=gradients.dtype)
+
+            # Skip identity standardisation, e.g. the default `(0, 1)`
+            if np.all(div == 1):
+                return gradients
+
             res = gradients / div
         else:
             res = gradients
@@ -438,6 +522,7 @@ class NeuralNetworkMixin(ABC):
 
         self._channel_index = channel_index
         self._channels_first: Optional[bool] = channels_first
+        self._activations_cache: Optional[ArrayLRUCache] = None
         super().__init__(**kwargs)
 
     @abstractmethod
@@ -496,21 +581,73 @@ class NeuralNetworkMixin(ABC):
 
     @abstractmethod
     def get_activations(
-        self, x: np.ndarray, layer: Union[int, str], batch_size: int, framework: bool = False
-    ) -> np.ndarray:
+        self, x: np.ndarray, layer: Union[int, str, List[Union[int, str]]], batch_size: int, framework: bool = False
+    ) -> Union[np.ndarray, List[np.ndarray]]:
         """
         Return the output of a specific layer for samples `x` where `layer` is the index of the layer between 0 and
         `nb_layers - 1 or the name of the layer. The number of layers can be determined by counting the results
         returned by calling `layer_names`.
 
         :param x: Samples
-        :param layer: Index or name of the layer.
+        :param layer: Index or name of the layer, or a list of indices and names to compute the outputs of several
+                      layers in one pass over `x`.
         :param batch_size: Batch size.
         :param framework: If true, return the intermediate tensor representation of the activation.
-        :return: The output of `layer`, where the first dimension is the batch size corresponding to `x`.
+        :return: The output of `layer`, where the first dimension is the batch size corresponding to `x`, or the list
+                 of outputs if `layer` is a list.
         """
         raise NotImplementedError
 
+    def set_activations_cache(self, max_bytes: Optional[int]) -> None:
+        """
+        Enable caching of the activations returned by `get_activations`. The activations are cached per layer and per
+        input array, identified by a fingerprint of its content, and the least recently used activations are evicted
+        once the cached activations exceed `max_bytes`. Calling this method again replaces the cache with an empty one,
+        which is required after modifying the weights or the preprocessing of the model.
+
+        :param max_bytes: Maximum total size of the cached activations in bytes. If `None`, caching is disabled.
+        """
+        if max_bytes is None:
+            self._activations_cache = None
+        else:
+            self._activations_cache = ArrayLRUCache(max_bytes=max_bytes)
+
+    @property
+    def activations_cache(self) -> Optional[ArrayLRUCache]:
+        """
+        Return the cache of activations.
+
+        :return: The cache of activations or `None` if caching is disabled.
+        """
+        return self._activations_cache
+
+    def _get_cached_activations(
+        self, x: np.ndarray, layers: List[Any], compute: Callable[[List[Any]], List[np.ndarray]]
+    ) -> List[np.ndarray]:
+        """
+        Return the activations of `layers` for samples `x` from the activations cache and compute the missing ones with
+        a single call of `compute`.
+
+        :param x: Samples.
+        :param layers: Unique identifiers of the layers.
+        :param compute: Function returning the activations for `x` of a list of layers.
+        :return: List of activations for `layers`.
+        """
+        if self._activations_cache is None:
+            return compute(layers)
+
+        fingerprint = array_fingerprint(x)
+        activations = {layer: self._activations_cache.get((fingerprint, layer)) for layer in layers}
+
+        missing = [layer for layer, activation in activations.items() if activation is None]
+        if missing:
+            for layer, activation in zip(missing, compute(missing)):
+                self._activations_cache.put((fingerprint, layer), activation)
+                activations[layer] = activation
+
+        # Return copies to keep the cached activations unchanged
+        return [activations[layer].copy() for layer in layers]  # type: ignore
+
     @abstractmethod
     def set_learning_phase(self, train: bool) -> None:
         """
@@ -37,6 +37,9 @@ class PyTorchEstimator(NeuralNetworkMixin, LossGradientsMixin, BaseEstimator):
     Estimator class for PyTorch models.
     """
 
+    # `predict` and `loss_gradient` accept PyTorch tensors and return tensors on the same device
+    _framework_tensor_module = "torch"
+
     def __init__(self, device_type: str = "gpu", **kwargs) -> None:
         """
         Estimator class for PyTorch models.
@@ -111,7 +114,8 @@ class PyTorchEstimator(NeuralNetworkMixin, LossGradientsMixin, BaseEstimator):
         It requires all defenses to have a method `forward()`.
         It converts numpy arrays to PyTorch tensors first, then chains a series of defenses by calling
         defence.forward() which contains PyTorch operations. At the end, it converts PyTorch tensors
-        back to numpy arrays.
+        back to numpy arrays. If `x` is a PyTorch tensor, the defences are applied on its device and tensors are
+        returned; gradients w.r.t. such a tensor flow through `defence.estimate_forward()`.
 
         :param x: Samples.
         :type x: Format as expected by the `model`
@@ -132,10 +136,32 @@ class PyTorchEstimator(NeuralNetworkMixin, LossGradientsMixin, BaseEstimator):
         ):
             return x, y
 
+        if isinstance(x, torch.Tensor):
+            # Keep tensors on their device; only defences implemented in PyTorch can be applied.
+            for defence in self.preprocessing_defences:
+                if not isinstance(defence, PreprocessorPyTorch):
+                    raise NotImplementedError(f"{defence.__class__} is not PyTorch-specific.")
+
+            for defence in self.preprocessing_defences:
+                if (fit and defence.apply_fit) or (not fit and defence.apply_predict):
+                    with self._profile("preprocessing_defence:" + defence.__class__.__name__, len(x)):
+                        if torch.is_grad_enabled() and x.requires_grad:
+                            # Forward through the defence, backward through its differentiable estimate.
+                            x_estimate = defence.estimate_forward(x, y)
+                            with torch.no_grad():
+                                x_defence, y = defence.forward(x, y)
+                            x = x_estimate + (x_defence - x_estimate).detach()
+                        else:
+                            with torch.no_grad():
+                                x, y = defence.forward(x, y)
+
+            return x, y
+
         if len(self.preprocessing_defences) == 1:
             # Compatible with non-PyTorch defences if no chaining.
             defence = self.preprocessing_defences[0]
-            x, y = defence(x, y)
+            with self._profile("preprocessing_defence:" + defence.__class__.__name__, len(x)):
+                x, y = defence(x, y)
         else:
             # Check if all defences are implemented in PyTorch.
             for defence in self.preprocessing_defences:
@@ -151,10 +177,12 @@ class PyTorchEstimator(NeuralNetworkMixin, LossGradientsMixin, BaseEstimator):
                 for defence in self.preprocessing_defences:
                     if fit:
                         if defence.apply_fit:
-                            x, y = defence.forward(x, y)
+                            with self._profile("preprocessing_defence:" + defence.__class__.__name__, len(x)):
+                                x, y = defence.forward(x, y)
                     else:
                         if defence.apply_predict:
-                            x, y = defence.forward(x, y)
+                            with self._profile("preprocessing_defence:" + defence.__class__.__name__, len(x)):
+                                x, y = defence.forward(x, y)
 
             # Convert torch tensors back to np arrays.
             x = x.cpu().numpy()
@@ -163,6 +191,42 @@ class PyTorchEstimator(NeuralNetworkMixin, LossGradientsMixin, BaseEstimator):
 
         return x, y
 
+    def _apply_preprocessing_standardisation(self, x):
+        """
+        Apply standardisation to input data `x`. PyTorch tensors are standardised with tensor operations on their own
+        device, which keeps the operation differentiable.
+
+        :param x: Samples.
+        :type x: Format as expected by the `model`
+        :return: Standardized `x`.
+        :rtype: Format as expected by the `model`
+        :raises `TypeError`: If the input data type is unsigned.
+        """
+        import torch  # lgtm [py/repeated-import]
+
+        if not isinstance(x, torch.Tensor):
+            return super()._apply_preprocessing_standardisation(x)
+
+        if x.dtype == torch.uint8:
+            raise TypeError(
+                "The data type of input data `x` is {} and cannot represent negative values. Consider "
+                "changing the data type of the input data `x` to a type that supports negative values e.g. "
+                "torch.float32.".format(x.dtype)
+            )
+
+        if self.preprocessing is None:
+            return x
+
+        sub, div = self.preprocessing
+
+        # Skip identity standardisation, e.g. the default `(0, 1)`
+        if not np.any(sub) and np.all(np.asarray(div) == 1):
+            return x
+        sub = torch.as_tensor(np.asarray(sub), dtype=x.dtype, device=x.device)
+        div = torch.as_tensor(np.asarray(div), dtype=x.dtype, device=x.device)
+
+        return (x - sub) / div
+
     def _apply_preprocessing_defences_gradient(self, x, gradients, fit=False):
         """
         Apply the backward pass to the gradients through all preprocessing defences that have been applied to `x`
@@ -104,6 +104,9 @@ class TensorFlowV2Estimator(NeuralNetworkMixin, LossGradientsMixin, BaseEstimato
     Estimator class for TensorFlow v2 models.
     """
 
+    # `predict` and `loss_gradient` accept TensorFlow tensors and return tensors
+    _framework_tensor_module = "tensorflow"
+
     def __init__(self, **kwargs):
         """
         Estimator class for TensorFlow v2 models.
@@ -157,7 +160,8 @@ class TensorFlowV2Estimator(NeuralNetworkMixin, LossGradientsMixin, BaseEstimato
         It requires all defenses to have a method `forward()`.
         It converts numpy arrays to TensorFlow tensors first, then chains a series of defenses by calling
         defence.forward() which contains TensorFlow operations. At the end, it converts TensorFlow tensors
-        back to numpy arrays.
+        back to numpy arrays. If `x` is a TensorFlow tensor, the defences are applied as tensor operations and tensors
+        are returned; gradients w.r.t. such a tensor flow through `defence.estimate_forward()`.
 
         :param x: Samples.
         :type x: Format as expected by the `model`
@@ -178,10 +182,27 @@ class TensorFlowV2Estimator(NeuralNetworkMixin, LossGradientsMixin, BaseEstimato
         ):
             return x, y
 
+        if tf.is_tensor(x):
+            # Keep tensors in the graph; only defences implemented in TensorFlow can be applied.
+            for defence in self.preprocessing_defences:
+                if not isinstance(defence, PreprocessorTensorFlowV2):
+                    raise NotImplementedError(f"{defence.__class__} is not TensorFlow-specific.")
+
+            for defence in self.preprocessing_defences:
+                if (fit and defence.apply_fit) or (not fit and defence.apply_predict):
+                    with self._profile("preprocessing_defence:" + defence.__class__.__name__, len(x)):
+                        # Forward through the defence, backward through its differentiable estimate.
+                        x_estimate = defence.estimate_forward(x, y)
+                        x_defence, y = defence.forward(x, y)
+                        x = x_estimate + tf.stop_gradient(x_defence - x_estimate)
+
+            return x, y
+
         if len(self.preprocessing_defences) == 1:
             # Compatible with non-TensorFlow defences if no chaining.
             defence = self.preprocessing_defences[0]
-            x, y = defence(x, y)
+            with self._profile("preprocessing_defence:" + defence.__class__.__name__, len(x)):
+                x, y = defence(x, y)
         else:
             # Check if all defences are implemented in TensorFlow.
             for defence in self.preprocessing_defences:
@@ -196,10 +217,12 @@ class TensorFlowV2Estimator(NeuralNetworkMixin, LossGradientsMixin, BaseEstimato
             for defence in self.preprocessing_defences:
                 if fit:
                     if defence.apply_fit:
-                        x, y = defence.forward(x, y)
+                        with self._profile("preprocessing_defence:" + defence.__class__.__name__, len(x)):
+                            x, y = defence.forward(x, y)
                 else:
                     if defence.apply_predict:
-                        x, y = defence.forward(x, y)
+                        with self._profile("preprocessing_defence:" + defence.__class__.__name__, len(x)):
+                            x, y = defence.forward(x, y)
 
             # Convert torch tensors back to np arrays.
             x = x.numpy()
@@ -208,6 +231,42 @@ class TensorFlowV2Estimator(NeuralNetworkMixin, LossGradientsMixin, BaseEstimato
 
         return x, y
 
+    def _apply_preprocessing_standardisation(self, x):
+        """
+        Apply standardisation to input data `x`. TensorFlow tensors are standardised with tensor operations, which
+        keeps the operation differentiable.
+
+        :param x: Samples.
+        :type x: Format as expected by the `model`
+        :return: Standardized `x`.
+        :rtype: Format as expected by the `model`
+        :raises `TypeError`: If the input data type is unsigned.
+        """
+        import tensorflow as tf  # lgtm [py/repeated-import]
+
+        if not tf.is_tensor(x):
+            return super()._apply_preprocessing_standardisation(x)
+
+        if x.dtype.is_unsigned:
+            raise TypeError(
+                "The data type of input data `x` is {} and cannot represent negative values. Consider "
+                "changing the data type of the input data `x` to a type that supports negative values e.g. "
+                "tf.float32.".format(x.dtype)
+            )
+
+        if self.preprocessing is None:
+            return x
+
+        sub, div = self.preprocessing
+
+        # Skip identity standardisation, e.g. the default `(0, 1)`
+        if not np.any(sub) and np.all(np.asarray(div) == 1):
+            return x
+        sub = tf.constant(np.asarray(sub), dtype=x.dtype)
+        div = tf.constant(np.asarray(div), dtype=x.dtype)
+
+        return (x - sub) / div
+
     def _apply_preprocessing_defences_gradient(self, x, gradients, fit=False):
         """
         Apply the backward pass to the gradients through all preprocessing defences that have been applied to `x`
@@ -20,7 +20,10 @@ Module providing convenience functions.
 """
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+from collections import OrderedDict
+from contextlib import contextmanager
 from functools import wraps
+import hashlib
 from inspect import signature
 import logging
 import math
@@ -28,7 +31,8 @@ import os
 import shutil
 import sys
 import tarfile
-from typing import Callable, List, Optional, Tuple, Union, TYPE_CHECKING
+import time
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Tuple, Union, TYPE_CHECKING
 import warnings
 import zipfile
 
@@ -280,6 +284,215 @@ def deprecated_keyword_arg(identifier: str, end_version: str, *, reason: str = "
     return decorator
 
 
+# ------------------------------------------------------------------------------------------------------------- CACHING
+
+
+def array_fingerprint(x: np.ndarray) -> Tuple[bytes, Tuple[int, ...], str]:
+    """
+    Compute a fingerprint of the content, shape and data type of an array that can be used as key for caches.
+
+    :param x: Input array.
+    :return: Tuple of the digest of the bytes of `x`, its shape and its data type.
+    """
+    x = np.ascontiguousarray(x)
+    return hashlib.blake2b(x.data, digest_size=16).digest(), x.shape, x.dtype.str
+
+
+class ArrayLRUCache:
+    """
+    Least recently used cache for `np.ndarray` values bounded by the total number of bytes of the stored arrays.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        """
+        Create an empty cache.
+
+        :param max_bytes: Maximum total size in bytes of the stored arrays. Arrays larger than this size are not stored.
+        """
+        if max_bytes <= 0:
+            raise ValueError("The maximum size of the cache `max_bytes` has to be positive.")
+
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        """
+        Return the array stored for `key` and mark it as most recently used.
+
+        :param key: Key of the array.
+        :return: The stored array or `None` if `key` is not in the cache.
+        """
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: np.ndarray) -> None:
+        """
+        Store an array for `key` and evict the least recently used arrays until the cache fits into `max_bytes`.
+
+        :param key: Key of the array.
+        :param value: Array to store.
+        """
+        if value.nbytes > self.max_bytes:
+            return
+
+        if key in self._data:
+            self.nbytes -= self._data.pop(key).nbytes
+
+        self._data[key] = value
+        self.nbytes += value.nbytes
+
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._data.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+    def clear(self) -> None:
+        """
+        Remove all arrays from the cache and reset the hit and miss counters.
+        """
+        self._data.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# ----------------------------------------------------------------------------------------------------------- PROFILING
+
+
+class EstimatorProfiler:
+    """
+    Recorder of the number of calls, the number of samples and the wall time of named spans of estimator operations,
+    e.g. `predict`, `loss_gradient` or single preprocessing defences.
+    """
+
+    def __init__(self, parent: Optional["EstimatorProfiler"] = None) -> None:
+        """
+        Create an empty profiler.
+
+        :param parent: Profiler that receives all records of this profiler as well, e.g. of an enclosing attack.
+        """
+        self.parent = parent
+        self._records: Dict[str, List[float]] = OrderedDict()
+
+    def record(self, name: str, nb_samples: int, seconds: float) -> None:
+        """
+        Add one call of the span `name`.
+
+        :param name: Name of the span.
+        :param nb_samples: Number of samples processed by the call.
+        :param seconds: Wall time of the call in seconds.
+        """
+        record = self._records.setdefault(name, [0, 0, 0.0])
+        record[0] += 1
+        record[1] += nb_samples
+        record[2] += seconds
+
+        if self.parent is not None:
+            self.parent.record(name, nb_samples, seconds)
+
+    @contextmanager
+    def span(self, name: str, nb_samples: int = 0) -> Iterator[None]:
+        """
+        Context manager recording the wall time of its body as one call of the span `name`.
+
+        :param name: Name of the span.
+        :param nb_samples: Number of samples processed in the body.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, nb_samples, time.perf_counter() - start)
+
+    def report(self) -> Dict[str, Dict[str, Union[int, float]]]:
+        """
+        Return the records of all spans in the order in which their first call ended.
+
+        :return: Dictionary mapping the name of each span to its number of `calls`, number of `samples` and total wall
+                 `time` in seconds. Nested spans, e.g. preprocessing inside `predict`, are included in the time of the
+                 enclosing span.
+        """
+        return {
+            name: {"calls": int(calls), "samples": int(samples), "time": seconds}
+            for name, (calls, samples, seconds) in self._records.items()
+        }
+
+    def reset(self) -> None:
+        """
+        Remove all records.
+        """
+        self._records.clear()
+
+
+# ---------------------------------------------------------------------------------------------------- BATCH SCHEDULING
+
+
+class ActiveSet:
+    """
+    Scheduler of the samples processed by the iterations of iterative attacks. The active set holds the indices of at
+    most `batch_size` samples. After each iteration the finished samples are dropped and the active set is refilled
+    with pending samples in their original order, so that every iteration works on a full batch until the pending
+    samples are exhausted. Attacks keep their state in arrays over all samples and read and write it with `indices`.
+    """
+
+    def __init__(self, nb_samples: int, batch_size: int) -> None:
+        """
+        Create an active set holding the first `batch_size` samples.
+
+        :param nb_samples: Total number of samples.
+        :param batch_size: Maximum number of samples in the active set.
+        """
+        if batch_size <= 0:
+            raise ValueError("The batch size `batch_size` has to be positive.")
+
+        self.nb_samples = nb_samples
+        self.batch_size = batch_size
+        self.nb_finished = 0
+        self._next = min(batch_size, nb_samples)
+        self.indices = np.arange(self._next)
+
+    @property
+    def nb_pending(self) -> int:
+        """
+        :return: Number of samples which have not entered the active set yet.
+        """
+        return self.nb_samples - self._next
+
+    def update(self, finished: np.ndarray) -> np.ndarray:
+        """
+        Drop the finished samples from the active set and refill it with pending samples.
+
+        :param finished: Boolean array of shape `(len(self),)` marking the finished samples of `indices`.
+        :return: The indices of the samples which entered the active set.
+        """
+        finished = np.asarray(finished, dtype=bool)
+        self.nb_finished += int(np.sum(finished))
+        kept = self.indices[~finished]
+
+        nb_new = min(self.batch_size - kept.size, self.nb_pending)
+        new = np.arange(self._next, self._next + nb_new)
+        self._next += nb_new
+        self.indices = np.concatenate([kept, new])
+
+        return new
+
+    def __len__(self) -> int:
+        return self.indices.size
+
+
 # ----------------------------------------------------------------------------------------------------- MATH OPERATIONS
 
 
@@ -582,6 +795,131 @@ def compute_success(
     return np.sum(attack_success) / x_adv.shape[0]
 
 
+def correctly_classified_by_class(
+    classifier: "CLASSIFIER_TYPE", x: np.ndarray, y: np.ndarray, batch_size: int = 1
+) -> Dict[int, np.ndarray]:
+    """
+    Select the samples which are correctly classified by a classifier and index them by their class.
+
+    :param classifier: Classifier used for prediction.
+    :param x: Samples to select from.
+    :param y: Correct labels of `x`, one-hot-encoded of shape `(nb_samples, nb_classes)` or indices of shape
+              `(nb_samples,)`.
+    :param batch_size: Batch size.
+    :return: A dictionary mapping each class to the correctly classified samples of that class.
+    """
+    y = check_and_transform_label_format(y, classifier.nb_classes, return_one_hot=False)
+    preds = np.argmax(classifier.predict(x, batch_size=batch_size), axis=1)
+    correct = preds == y
+
+    return {int(label): x[correct & (y == label)] for label in np.unique(y[correct])}
+
+
+def find_initial_adversarial(
+    classifier: "CLASSIFIER_TYPE",
+    x: np.ndarray,
+    y: Optional[np.ndarray],
+    y_p: np.ndarray,
+    targeted: bool,
+    clip_min: float,
+    clip_max: float,
+    max_trials: int,
+    block_size: int = 10,
+    batch_size: int = 1,
+    pool: Optional[Dict[int, np.ndarray]] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Search initial adversarial examples for decision-based attacks. Candidates are drawn in blocks of `block_size` per
+    sample and each block of all samples without an adversarial example yet is classified with one call to `predict`.
+    Candidates are first taken from `pool`, from the images of the target class if `targeted` is true or of the
+    classes other than the predicted class otherwise, and then drawn uniformly at random between `clip_min` and
+    `clip_max`.
+
+    :param classifier: Classifier used for prediction.
+    :param x: Original inputs to be attacked.
+    :param y: Target labels as indices of shape `(nb_samples,)` if `targeted` is true, ignored otherwise.
+    :param y_p: The predicted labels of `x` as indices of shape `(nb_samples,)`.
+    :param targeted: `True` if the attack is targeted.
+    :param clip_min: Minimum value of an example.
+    :param clip_max: Maximum value of an example.
+    :param max_trials: Maximum number of candidates for each sample.
+    :param block_size: Number of candidates per sample and block.
+    :param batch_size: Batch size.
+    :param pool: Correctly classified images indexed by class, see `correctly_classified_by_class`.
+    :return: A tuple of the initial adversarial examples (the original inputs where none has been found), the labels
+             predicted for them and a boolean array showing for which samples one has been found.
+    """
+    if max_trials <= 0:
+        raise ValueError("The maximum number of trials `max_trials` has to be positive.")
+
+    nprd = np.random.RandomState()
+    nb_samples = x.shape[0]
+
+    x_init = x.copy()
+    y_init = np.array(y_p, dtype=int)
+    found = np.zeros(nb_samples, dtype=bool)
+    nb_trials = np.zeros(nb_samples, dtype=int)
+
+    # Candidates from the pool, in random order for each sample. The images of all classes are numbered consecutively
+    # and each sample only keeps a permutation of the numbers of its candidate images
+    pool_labels = list(pool.keys()) if pool else []
+    pool_offsets = np.cumsum([0] + [pool[label].shape[0] for label in pool_labels])
+    seeds: List[Optional[np.ndarray]] = [None] * nb_samples
+    for ind in range(nb_samples):
+        if targeted:
+            classes = [i for i, label in enumerate(pool_labels) if label == y[ind]]
+        else:
+            classes = [i for i, label in enumerate(pool_labels) if label != y_p[ind]]
+        if classes:
+            seeds[ind] = nprd.permutation(
+                np.concatenate([np.arange(pool_offsets[i], pool_offsets[i + 1]) for i in classes])
+            )
+    nb_seeds = np.array([0 if seed is None else seed.shape[0] for seed in seeds], dtype=int)
+
+    active = np.arange(nb_samples)
+    while active.size > 0:
+        # Draw the next block of candidates of all active samples
+        candidates = []
+        owners = []
+        for ind in active:
+            nb_candidates = min(block_size, max_trials - nb_trials[ind])
+            nb_seed = int(np.clip(nb_seeds[ind] - nb_trials[ind], 0, nb_candidates))
+            if nb_seed > 0:
+                seed_index = seeds[ind][nb_trials[ind] : nb_trials[ind] + nb_seed]
+                seed_class = np.searchsorted(pool_offsets, seed_index, side="right") - 1
+                candidates.append(
+                    np.stack(
+                        [pool[pool_labels[i]][j - pool_offsets[i]] for i, j in zip(seed_class, seed_index)]
+                    ).astype(x.dtype)
+                )
+            candidates.append(
+                nprd.uniform(clip_min, clip_max, size=(nb_candidates - nb_seed,) + x.shape[1:]).astype(x.dtype)
+            )
+            owners.append(np.full(nb_candidates, ind))
+            nb_trials[ind] += nb_candidates
+
+        candidates_array = np.concatenate(candidates)
+        owners_array = np.concatenate(owners)
+        preds = np.argmax(classifier.predict(candidates_array, batch_size=batch_size), axis=1)
+
+        if targeted:
+            hits = preds == y[owners_array]
+        else:
+            hits = preds != y_p[owners_array]
+
+        # Keep the first adversarial candidate of each sample
+        hit_index = np.where(hits)[0]
+        _, first_index = np.unique(owners_array[hit_index], return_index=True)
+        first_index = hit_index[first_index]
+        x_init[owners_array[first_index]] = candidates_array[first_index]
+        y_init[owners_array[first_index]] = preds[first_index]
+        found[owners_array[first_index]] = True
+
+        active = np.where(~found & (nb_trials < max_trials))[0]
+
+    return x_init, y_init, found
+
+
 def compute_accuracy(preds: np.ndarray, labels: np.ndarray, abstain: bool = True) -> Tuple[np.ndarray, int]:
     """
     Compute the accuracy rate and coverage rate of predictions
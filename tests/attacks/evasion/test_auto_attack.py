@@ -134,6 +134,42 @@ def test_generate_attacks_and_targeted(fix_get_mnist_subset):
     assert np.max(np.abs(x_train_mnist_adv - x_train_mnist)) == pytest.approx(eps, abs=0.005)
 
 
+@pytest.mark.only_with_platform("scikitlearn")
+def test_generate_parallel_jobs(get_iris_dataset):
+    from sklearn.linear_model import LogisticRegression
+
+    from art.attacks.evasion import FastGradientMethod, ProjectedGradientDescent
+    from art.estimators.classification.scikitlearn import SklearnClassifier
+
+    (x_train_iris, y_train_iris), (_, _) = get_iris_dataset
+    classifier = SklearnClassifier(model=LogisticRegression(solver="lbfgs", multi_class="auto"), clip_values=(0, 1))
+    classifier.fit(x=x_train_iris, y=y_train_iris)
+
+    for targeted in [False, True]:
+        x_adv = list()
+        for nb_parallel_jobs in [1, 2]:
+            attacks = [
+                FastGradientMethod(estimator=classifier, eps=0.1),
+                ProjectedGradientDescent(estimator=classifier, eps=0.2, eps_step=0.05, max_iter=10, verbose=False),
+            ]
+            attack = AutoAttack(
+                estimator=classifier,
+                eps=0.2,
+                attacks=attacks,
+                targeted=targeted,
+                nb_parallel_jobs=nb_parallel_jobs,
+                nb_shards=5,
+            )
+            x_adv.append(attack.generate(x=x_train_iris, y=y_train_iris))
+
+        # The attacks are deterministic and each sample runs the same sequence of attacks in both schedules
+        np.testing.assert_array_almost_equal(x_adv[0], x_adv[1], decimal=6)
+        assert np.max(np.abs(x_adv[1] - x_train_iris)) <= 0.2 + 1e-6
+
+    with pytest.raises(ValueError):
+        AutoAttack(estimator=classifier, nb_parallel_jobs=0, attacks=attacks)
+
+
 def test_classifier_type_check_fail():
     backend_test_classifier_type_check_fail(AutoAttack, [BaseEstimator, ClassifierMixin])
 
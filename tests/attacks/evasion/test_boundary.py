@@ -69,6 +69,44 @@ def test_images(fix_get_mnist_subset, image_dl_estimator_for_attack, framework,
             back_end_untargeted_images(attack, fix_get_mnist_subset, framework)
 
 
+@pytest.mark.parametrize("targeted", [True, False])
+def test_images_parallel_samples(fix_get_mnist_subset, image_dl_estimator_for_attack, framework, targeted):
+    classifier_list = image_dl_estimator_for_attack(BoundaryAttack)
+    if classifier_list is None:
+        logging.warning("Couldn't perform  this test because no classifier is defined")
+        return
+
+    for classifier in classifier_list:
+
+        attack = BoundaryAttack(estimator=classifier, targeted=targeted, max_iter=20, nb_parallel_samples=4)
+        if targeted:
+            backend_targeted_images(attack, fix_get_mnist_subset)
+        else:
+            back_end_untargeted_images(attack, fix_get_mnist_subset, framework)
+
+
+@pytest.mark.parametrize("targeted", [True, False])
+def test_tabular_parallel_samples(get_tabular_classifier_list, get_iris_dataset, targeted):
+    classifier_list = get_tabular_classifier_list(BoundaryAttack, clipped=True)
+    if classifier_list is None:
+        logging.warning("Couldn't perform  this test because no classifier is defined")
+        return
+
+    for classifier in classifier_list:
+
+        attack = BoundaryAttack(classifier, targeted=targeted, max_iter=10, nb_parallel_samples=8)
+        if targeted:
+            backend_targeted_tabular(attack, get_iris_dataset)
+        else:
+            backend_untargeted_tabular(attack, get_iris_dataset, clipped=True)
+
+        with pytest.raises(ValueError):
+            _ = BoundaryAttack(classifier, nb_parallel_samples=0)
+
+        with pytest.raises(ValueError):
+            _ = BoundaryAttack(classifier, init_block_size=0)
+
+
 def test_classifier_type_check_fail():
     backend_test_classifier_type_check_fail(BoundaryAttack, [BaseEstimator, ClassifierMixin])
 
@@ -56,6 +56,28 @@ def test_generate(fix_get_mnist_subset, image_dl_estimator_for_attack):
         assert np.max(np.abs(x_train_mnist_adv - x_train_mnist)) == pytest.approx(0.3, abs=0.05)
 
 
+@pytest.mark.only_with_platform("tensorflow")
+def test_generate_l2(fix_get_mnist_subset, image_dl_estimator_for_attack):
+    classifier_list = image_dl_estimator_for_attack(SquareAttack)
+
+    if classifier_list is None:
+        logging.warning("Couldn't perform this test because no classifier is defined")
+        return
+
+    for classifier in classifier_list:
+        attack = SquareAttack(
+            estimator=classifier, norm=2, max_iter=5, eps=1.0, p_init=0.8, nb_restarts=1, batch_size=16
+        )
+
+        (x_train_mnist, y_train_mnist, x_test_mnist, y_test_mnist) = fix_get_mnist_subset
+
+        x_train_mnist_adv = attack.generate(x=x_train_mnist, y=y_train_mnist)
+
+        l2_norms = np.sqrt(np.sum((x_train_mnist_adv - x_train_mnist) ** 2, axis=(1, 2, 3)))
+        assert np.max(l2_norms) <= 1.0 + 1e-5
+        assert np.max(l2_norms) > 0.0
+
+
 def test_classifier_type_check_fail():
     backend_test_classifier_type_check_fail(SquareAttack, [BaseEstimator, ClassifierMixin])
 
@@ -210,6 +210,21 @@ class TestCarlini(TestBase):
     def test_classifier_type_check_fail_L2(self):
         backend_test_classifier_type_check_fail(CarliniL2Method, [BaseEstimator, ClassGradientsMixin])
 
+    def test_scikitlearn_batch_size_L2(self):
+        from sklearn.linear_model import LogisticRegression
+
+        from art.estimators.classification.scikitlearn import ScikitlearnLogisticRegression
+
+        classifier = ScikitlearnLogisticRegression(model=LogisticRegression(), clip_values=(0, 1))
+        classifier.fit(x=self.x_train_iris, y=self.y_train_iris)
+
+        # The binary search steps of the samples of a batch are independent of each other
+        attack = CarliniL2Method(classifier, targeted=False, max_iter=20, binary_search_steps=5, batch_size=1)
+        x_test_adv = attack.generate(self.x_test_iris)
+        for batch_size in [7, 128]:
+            attack.set_params(batch_size=batch_size)
+            np.testing.assert_array_equal(attack.generate(self.x_test_iris), x_test_adv)
+
     # def test_keras_iris_clipped_L2(self):
     #     classifier = get_tabular_classifier_kr()
     #     attack = CarliniL2Method(classifier, targeted=False, max_iter=10)
@@ -255,6 +255,75 @@ class TestHopSkipJump(TestBase):
         # Check that x_test has not been modified by attack and classifier
         self.assertAlmostEqual(float(np.max(np.abs(x_test_original - x_test))), 0.0, delta=0.00001)
 
+    def test_pytorch_parallel_samples(self):
+        x_test = np.swapaxes(self.x_test_mnist, 1, 3).astype(np.float32)
+        x_test_original = x_test.copy()
+
+        # Build PyTorchClassifier
+        ptc = get_image_classifier_pt()
+
+        for norm in [2, np.inf]:
+            # Targeted attack
+            hsj = HopSkipJump(
+                classifier=ptc, targeted=True, max_iter=2, max_eval=100, init_eval=10, norm=norm, nb_parallel_samples=4
+            )
+            params = {"y": random_targets(self.y_test_mnist, ptc.nb_classes)}
+            x_test_adv = hsj.generate(x_test, **params)
+
+            self.assertFalse((x_test == x_test_adv).all())
+            self.assertTrue((x_test_adv <= 1.0001).all())
+            self.assertTrue((x_test_adv >= -0.0001).all())
+
+            target = np.argmax(params["y"], axis=1)
+            y_pred_adv = np.argmax(ptc.predict(x_test_adv), axis=1)
+            self.assertTrue((target == y_pred_adv).any())
+
+            # Untargeted attack
+            hsj = HopSkipJump(
+                classifier=ptc, targeted=False, max_iter=2, max_eval=100, init_eval=10, norm=norm, nb_parallel_samples=4
+            )
+            x_test_adv = hsj.generate(x_test)
+
+            self.assertFalse((x_test == x_test_adv).all())
+            self.assertTrue((x_test_adv <= 1.0001).all())
+            self.assertTrue((x_test_adv >= -0.0001).all())
+
+            y_pred = np.argmax(ptc.predict(x_test), axis=1)
+            y_pred_adv = np.argmax(ptc.predict(x_test_adv), axis=1)
+            self.assertTrue((y_pred != y_pred_adv).any())
+
+        # Check that x_test has not been modified by attack and classifier
+        self.assertAlmostEqual(float(np.max(np.abs(x_test_original - x_test))), 0.0, delta=0.00001)
+
+        with self.assertRaises(ValueError):
+            _ = HopSkipJump(classifier=ptc, nb_parallel_samples=0)
+
+        with self.assertRaises(ValueError):
+            _ = HopSkipJump(classifier=ptc, init_block_size=0)
+
+    def test_pytorch_init_pool(self):
+        x_test = np.swapaxes(self.x_test_mnist, 1, 3).astype(np.float32)
+        x_train = np.swapaxes(self.x_train_mnist, 1, 3).astype(np.float32)
+
+        # Build PyTorchClassifier
+        ptc = get_image_classifier_pt()
+
+        # Targeted attack starting from correctly classified training images
+        hsj = HopSkipJump(classifier=ptc, targeted=True, max_iter=2, max_eval=100, init_eval=10, init_size=1)
+        target = np.argmax(ptc.predict(x_train), axis=1)[np.arange(x_test.shape[0]) % x_train.shape[0]]
+        params = {"y": target, "x_init_pool": x_train, "y_init_pool": self.y_train_mnist}
+        x_test_adv = hsj.generate(x_test, **params)
+
+        self.assertTrue((x_test_adv <= 1.0001).all())
+        self.assertTrue((x_test_adv >= -0.0001).all())
+
+        # Each target class of a correctly classified pool image is reached with a single initial trial
+        correct = np.argmax(ptc.predict(x_train), axis=1) == np.argmax(self.y_train_mnist, axis=1)
+        reachable = np.isin(target, np.argmax(self.y_train_mnist[correct], axis=1))
+        y_pred_adv = np.argmax(ptc.predict(x_test_adv), axis=1)
+        y_pred = np.argmax(ptc.predict(x_test), axis=1)
+        self.assertTrue((y_pred_adv[reachable & (y_pred != target)] == target[reachable & (y_pred != target)]).all())
+
     def test_pytorch_resume(self):
         x_test = np.reshape(self.x_test_mnist, (self.x_test_mnist.shape[0], 1, 28, 28)).astype(np.float32)
 
@@ -220,6 +220,29 @@ class TestNewtonFool(TestBase):
             # Check that x_test has not been modified by attack and classifier
             self.assertAlmostEqual(float(np.max(np.abs(x_test_original - self.x_test_iris))), 0.0, delta=0.00001)
 
+    def test_scikitlearn_early_stop(self):
+        from sklearn.linear_model import LogisticRegression
+
+        from art.estimators.classification.scikitlearn import SklearnClassifier
+
+        classifier = SklearnClassifier(model=LogisticRegression(solver="lbfgs", multi_class="auto"), clip_values=(0, 1))
+        classifier.fit(x=self.x_test_iris, y=self.y_test_iris)
+        y_pred = np.argmax(classifier.predict(self.x_test_iris), axis=1)
+
+        # Without early stopping every sample runs all iterations, independently of the batch size
+        x_test_adv = NewtonFool(classifier, max_iter=20, batch_size=7).generate(self.x_test_iris)
+        x_test_adv_batch = NewtonFool(classifier, max_iter=20, batch_size=150).generate(self.x_test_iris)
+        np.testing.assert_array_almost_equal(x_test_adv, x_test_adv_batch, decimal=5)
+
+        # With early stopping the misclassified samples are frozen and remain misclassified after clipping
+        attack = NewtonFool(classifier, max_iter=20, batch_size=7, early_stop=True)
+        x_test_adv_early = attack.generate(self.x_test_iris)
+        self.assertTrue((x_test_adv_early <= 1).all())
+        self.assertTrue((x_test_adv_early >= 0).all())
+
+        fooled_early = np.argmax(classifier.predict(x_test_adv_early), axis=1) != y_pred
+        self.assertTrue(fooled_early.any())
+
     def test_classifier_type_check_fail(self):
         backend_test_classifier_type_check_fail(NewtonFool, [BaseEstimator, ClassGradientsMixin])
 
@@ -318,6 +318,54 @@ class TestPGD(TestBase):
             # Check that x_test has not been modified by attack and classifier
             self.assertAlmostEqual(float(np.max(np.abs(x_test_original - self.x_test_iris))), 0.0, delta=0.00001)
 
+    def test_scikitlearn_early_stop(self):
+        from sklearn.linear_model import LogisticRegression
+
+        from art.estimators.classification.scikitlearn import SklearnClassifier
+
+        classifier = SklearnClassifier(model=LogisticRegression(solver="lbfgs", multi_class="auto"), clip_values=(0, 1))
+        classifier.fit(x=self.x_test_iris, y=self.y_test_iris)
+        y_pred = np.argmax(classifier.predict(self.x_test_iris), axis=1)
+
+        attack = ProjectedGradientDescent(classifier, eps=1, eps_step=0.1, max_iter=5, batch_size=7, early_stop=True)
+        x_test_adv = attack.generate(self.x_test_iris)
+        self.assertTrue((x_test_adv <= 1).all())
+        self.assertTrue((x_test_adv >= 0).all())
+
+        # Samples are written back to their own index whatever the composition of the refilled batches
+        attack.set_params(batch_size=self.x_test_iris.shape[0])
+        np.testing.assert_array_almost_equal(attack.generate(self.x_test_iris), x_test_adv, decimal=6)
+
+        # Adversarial samples keep the first adversarial iterate, the others run all iterations
+        attack.set_params(early_stop=False)
+        x_test_adv_full = attack.generate(self.x_test_iris)
+        fooled = np.argmax(classifier.predict(x_test_adv), axis=1) != y_pred
+        fooled_full = np.argmax(classifier.predict(x_test_adv_full), axis=1) != y_pred
+        self.assertTrue(fooled.any())
+        self.assertTrue((fooled | ~fooled_full).all())
+        np.testing.assert_array_almost_equal(x_test_adv[~fooled], x_test_adv_full[~fooled], decimal=6)
+
+    def test_scikitlearn_parallel_restarts(self):
+        from sklearn.linear_model import LogisticRegression
+
+        from art.estimators.classification.scikitlearn import SklearnClassifier
+
+        classifier = SklearnClassifier(model=LogisticRegression(solver="lbfgs", multi_class="auto"), clip_values=(0, 1))
+        classifier.fit(x=self.x_test_iris, y=self.y_test_iris)
+        y_pred = np.argmax(classifier.predict(self.x_test_iris), axis=1)
+
+        attack = ProjectedGradientDescent(
+            classifier, eps=0.3, eps_step=0.1, max_iter=5, num_random_init=5, batch_size=16, nb_parallel_restarts=2
+        )
+        x_test_adv = attack.generate(self.x_test_iris)
+        self.assertTrue((x_test_adv <= 1).all())
+        self.assertTrue((x_test_adv >= 0).all())
+        self.assertLessEqual(np.max(np.abs(x_test_adv - self.x_test_iris)), 0.3 + 1e-6)
+        self.assertTrue((np.argmax(classifier.predict(x_test_adv), axis=1) != y_pred).any())
+
+        with self.assertRaises(ValueError):
+            ProjectedGradientDescent(classifier, nb_parallel_restarts=0)
+
     @unittest.skipIf(tf.__version__[0] != "2", "")
     def test_framework_tensorflow_v2_mnist(self):
         classifier, _ = get_image_classifier_tf()
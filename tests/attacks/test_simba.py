@@ -104,6 +104,54 @@ class TestSimBA(TestBase):
         classifier = get_image_classifier_pt()
         self._test_attack(classifier, x_test, self.y_test_mnist, True)
 
+    def test_keras_mnist_batch(self):
+        """
+        Test with the KerasClassifier on a batch of images. (Untargeted and Targeted Attack)
+        :return:
+        """
+        classifier = get_image_classifier_kr()
+        self._test_attack_batch(classifier, self.x_test_mnist, self.y_test_mnist, False, "dct")
+        self._test_attack_batch(classifier, self.x_test_mnist, self.y_test_mnist, True, "dct")
+        self._test_attack_batch(classifier, self.x_test_mnist, self.y_test_mnist, False, "px")
+
+    def test_pytorch_mnist_batch(self):
+        """
+        Test with the PyTorchClassifier on a batch of images. (Untargeted and Targeted Attack)
+        :return:
+        """
+        x_test = np.reshape(self.x_test_mnist, (self.x_test_mnist.shape[0], 1, 28, 28)).astype(np.float32)
+        classifier = get_image_classifier_pt()
+        self._test_attack_batch(classifier, x_test, self.y_test_mnist, False, "dct")
+        self._test_attack_batch(classifier, x_test, self.y_test_mnist, True, "dct")
+        self._test_attack_batch(classifier, x_test, self.y_test_mnist, False, "px")
+
+    def _test_attack_batch(self, classifier, x_test, y_test, targeted, attack):
+        """
+        Test with SimBA attacking all images together
+        :return:
+        """
+        x_test_original = x_test.copy()
+
+        df = SimBA(classifier, attack=attack, targeted=targeted)
+        if targeted:
+            y_target = np.zeros((len(x_test), 10))
+            y_target[:, 8] = 1.0
+            x_test_adv = df.generate(x_test, y=y_target)
+        else:
+            x_test_adv = df.generate(x_test)
+
+        self.assertEqual(x_test_adv.shape, x_test.shape)
+        self.assertFalse((x_test == x_test_adv).all())
+
+        y_pred = get_labels_np_array(classifier.predict(x_test_adv))
+        if targeted:
+            self.assertTrue((np.argmax(y_pred, axis=1) == 8).any())
+        else:
+            self.assertFalse((y_test == y_pred).all())
+
+        # Check that x_test has not been modified by attack and classifier
+        self.assertAlmostEqual(float(np.max(np.abs(x_test_original - x_test))), 0.0, delta=0.00001)
+
     def _test_attack(self, classifier, x_test, y_test, targeted):
         """
         Test with SimBA
@@ -160,6 +160,20 @@ class TestSpatialTransformation(TestBase):
 
         self.assertIn("Feature vectors detected.", str(context.exception))
 
+    def test_perturb_integer_translation(self):
+        from scipy.ndimage import shift
+
+        ptc = get_image_classifier_pt()
+        attack_st = SpatialTransformation(ptc, batch_size=32)
+
+        x_test = np.swapaxes(self.x_test_mnist, 1, 3).astype(np.float32)
+        for trans_x, trans_y in [(3, -2), (-28, 5), (0, 0)]:
+            np.testing.assert_array_almost_equal(
+                attack_st._perturb(x_test, trans_x, trans_y, 0.0),
+                np.clip(shift(x_test, [0, 0, trans_x, trans_y]), 0, 1),
+                decimal=5,
+            )
+
     def test_classifier_type_check_fail(self):
         backend_test_classifier_type_check_fail(SpatialTransformation, [BaseEstimator, NeuralNetworkMixin])
 
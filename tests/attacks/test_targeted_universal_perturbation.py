@@ -160,6 +160,30 @@ class TestTargetedUniversalPerturbation(TestBase):
         # Check that x_test has not been modified by attack and classifier
         self.assertAlmostEqual(float(np.max(np.abs(x_test_original - x_test_mnist))), 0.0, delta=0.00001)
 
+    def test_pytorch_mnist_parallel_samples(self):
+        x_train_mnist = np.swapaxes(self.x_train_mnist, 1, 3).astype(np.float32)
+
+        # Build PyTorchClassifier
+        ptc = get_image_classifier_pt()
+
+        # set target label
+        y_target = np.zeros([len(self.x_train_mnist), 10])
+        y_target[:, 0] = 1.0
+
+        # Attack
+        up = TargetedUniversalPerturbation(
+            ptc,
+            max_iter=1,
+            attacker="fgsm",
+            attacker_params={"eps": 0.3, "targeted": True},
+            batch_size=16,
+            nb_parallel_samples=10,
+        )
+        x_train_mnist_adv = up.generate(x_train_mnist, y=y_target)
+        self.assertTrue((up.fooling_rate >= 0.2) or not up.converged)
+        self.assertEqual(up.noise.shape, (1,) + x_train_mnist.shape[1:])
+        self.assertFalse((x_train_mnist == x_train_mnist_adv).all())
+
     def test_classifier_type_check_fail(self):
         backend_test_classifier_type_check_fail(TargetedUniversalPerturbation, (BaseEstimator, ClassifierMixin))
 
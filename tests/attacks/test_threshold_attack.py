@@ -108,6 +108,43 @@ class TestThresholdAttack(TestBase):
         classifier = get_image_classifier_pt()
         self._test_attack(classifier, x_test, self.y_test_mnist, True)
 
+    def test_keras_mnist_parallel_samples(self):
+        """
+        Test with the KerasClassifier, attacking the images together with DE. (Untargeted Attack)
+        :return:
+        """
+        classifier = get_image_classifier_kr()
+        self._test_attack_parallel_samples(classifier, self.x_test_mnist, self.y_test_mnist)
+
+    def test_pytorch_mnist_parallel_samples(self):
+        """
+        Test with the PyTorchClassifier, attacking the images together with DE. (Untargeted Attack)
+        :return:
+        """
+        x_test = np.reshape(self.x_test_mnist, (self.x_test_mnist.shape[0], 1, 28, 28)).astype(np.float32)
+        classifier = get_image_classifier_pt()
+        self._test_attack_parallel_samples(classifier, x_test, self.y_test_mnist)
+
+    def _test_attack_parallel_samples(self, classifier, x_test, y_test):
+        """
+        Test with the Threshold Attack attacking the images together with DE
+        :return:
+        """
+        x_test_original = x_test.copy()
+
+        for th in [64, None]:
+            df = ThresholdAttack(classifier, th=th, es=1, targeted=False, nb_parallel_samples=self.n_test)
+            x_test_adv = df.generate(x_test_original, y_test, max_iter=1)
+
+            self.assertEqual(x_test_adv.shape, x_test.shape)
+            self.assertFalse((0.0 == x_test_adv).all())
+
+        # Check that x_test has not been modified by attack and classifier
+        self.assertAlmostEqual(float(np.max(np.abs(x_test_original - x_test))), 0.0, delta=0.00001)
+
+        with self.assertRaises(ValueError):
+            _ = ThresholdAttack(classifier, nb_parallel_samples=0)
+
     def _test_attack(self, classifier, x_test, y_test, targeted):
         """
         Test with the Threshold Attack
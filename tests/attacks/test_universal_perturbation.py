@@ -136,6 +136,32 @@ class TestUniversalPerturbation(TestBase):
         # Check that x_test has not been modified by attack and classifier
         self.assertAlmostEqual(float(np.max(np.abs(x_test_original - x_test_mnist))), 0.0, delta=0.00001)
 
+    def test_pytorch_mnist_parallel_samples(self):
+        x_train_mnist = np.swapaxes(self.x_train_mnist, 1, 3).astype(np.float32)
+        x_train_original = x_train_mnist.copy()
+
+        # Build PyTorchClassifier
+        ptc = get_image_classifier_pt()
+
+        # Attack
+        up = UniversalPerturbation(
+            ptc,
+            max_iter=1,
+            attacker="newtonfool",
+            attacker_params={"max_iter": 5},
+            eps=0.3,
+            batch_size=16,
+            nb_parallel_samples=10,
+        )
+        x_train_mnist_adv = up.generate(x_train_mnist)
+        self.assertTrue((up.fooling_rate >= 0.2) or not up.converged)
+        self.assertEqual(up.noise.shape, (1,) + x_train_mnist.shape[1:])
+        self.assertLessEqual(np.max(np.abs(up.noise)), 0.3 + 1e-6)
+        self.assertFalse((x_train_mnist == x_train_mnist_adv).all())
+
+        # Check that x_train has not been modified by attack and classifier
+        self.assertAlmostEqual(float(np.max(np.abs(x_train_original - x_train_mnist))), 0.0, delta=0.00001)
+
     def test_keras_iris_clipped(self):
         classifier = get_tabular_classifier_kr()
 
@@ -221,6 +221,30 @@ class TestZooAttack(TestBase):
         # Check that x_test has not been modified by attack and classifier
         self.assertAlmostEqual(float(np.max(np.abs(x_test_original - x_test_mnist))), 0.0, delta=0.00001)
 
+    def test_zoom_and_max_pooling(self):
+        from scipy.ndimage import zoom
+
+        ptc = get_image_classifier_pt()
+        zoo = ZooAttack(classifier=ptc, max_iter=1, binary_search_steps=1)
+
+        x = np.random.rand(2, 1, 7, 9).astype(np.float32)
+        x_zoom = zoo._zoom(x, (2, 1, 14, 32))
+        self.assertEqual(x_zoom.dtype, np.float32)
+        np.testing.assert_array_almost_equal(x_zoom, zoom(x, (1, 1, 14 / 7, 32 / 9)), decimal=5)
+        self.assertIn((7, 14), zoo._zoom_matrices)
+
+        image = np.random.rand(3, 10, 7)
+        img_pool = zoo._max_pooling(image, 4)
+        for i in range(0, 10, 4):
+            for j in range(0, 7, 4):
+                np.testing.assert_array_equal(
+                    img_pool[:, i : i + 4, j : j + 4],
+                    np.broadcast_to(
+                        np.max(image[:, i : i + 4, j : j + 4], axis=(1, 2), keepdims=True),
+                        img_pool[:, i : i + 4, j : j + 4].shape,
+                    ),
+                )
+
     def test_classifier_type_check_fail(self):
         backend_test_classifier_type_check_fail(ZooAttack, [BaseEstimator, ClassifierMixin])
 
@@ -203,3 +203,60 @@ def test_fgsm_defences(fix_get_mnist_subset, image_dl_estimator, device_type):
 
     attack = FastGradientMethod(classifier, eps=1, batch_size=128)
     backend_test_defended_images(attack, fix_get_mnist_subset)
+
+
+@pytest.mark.only_with_platform("pytorch")
+def test_class_gradient_batched_jacobian(get_default_mnist_subset, image_dl_estimator):
+    (_, _), (x_test_mnist, _) = get_default_mnist_subset
+    x_test_mnist = x_test_mnist[:11]
+
+    classifier, _ = image_dl_estimator(one_classifier=True)
+
+    gradients = classifier.class_gradient(x_test_mnist)
+
+    # Compare against one backward pass per class
+    classifier._batched_jacobian = False
+    gradients_per_class = classifier.class_gradient(x_test_mnist)
+    np.testing.assert_array_almost_equal(gradients, gradients_per_class, decimal=5)
+
+    labels = np.random.randint(10, size=x_test_mnist.shape[0])
+    gradients_labels = classifier.class_gradient(x_test_mnist, label=labels)
+    assert gradients_labels.shape == (x_test_mnist.shape[0], 1) + x_test_mnist.shape[1:]
+    np.testing.assert_array_almost_equal(
+        gradients_labels[:, 0], gradients[np.arange(x_test_mnist.shape[0]), labels], decimal=5
+    )
+
+
+@pytest.mark.only_with_platform("pytorch")
+@pytest.mark.parametrize("device_type", ["cpu", "gpu"])
+def test_framework_tensors(get_default_mnist_subset, image_dl_estimator, device_type):
+    (_, _), (x_test_mnist, y_test_mnist) = get_default_mnist_subset
+    x_test_mnist, y_test_mnist = x_test_mnist[:11], y_test_mnist[:11]
+
+    classifier_, _ = image_dl_estimator(one_classifier=True)
+    smooth_3x3 = SpatialSmoothingPyTorch(window_size=3, channels_first=True, device_type=device_type)
+    classifier = PyTorchClassifier(
+        clip_values=(0, 1),
+        model=classifier_.model,
+        preprocessing_defences=[smooth_3x3],
+        preprocessing=(0.1, 0.9),
+        loss=nn.CrossEntropyLoss(),
+        input_shape=(1, 28, 28),
+        nb_classes=10,
+        device_type=device_type,
+    )
+
+    x_test_tensor = torch.from_numpy(x_test_mnist).to(classifier.device)
+    y_test_tensor = torch.from_numpy(y_test_mnist).to(classifier.device)
+
+    predictions = classifier.predict(x_test_tensor, batch_size=4)
+    assert isinstance(predictions, torch.Tensor)
+    np.testing.assert_array_almost_equal(
+        predictions.cpu().numpy(), classifier.predict(x_test_mnist, batch_size=4), decimal=4
+    )
+
+    gradients = classifier.loss_gradient(x_test_tensor, y_test_tensor, batch_size=4)
+    assert isinstance(gradients, torch.Tensor)
+    np.testing.assert_array_almost_equal(
+        gradients.cpu().numpy(), classifier.loss_gradient(x_test_mnist, y_test_mnist, batch_size=4), decimal=4
+    )
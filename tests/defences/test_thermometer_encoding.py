@@ -126,6 +126,13 @@ class TestThermometerEncoding(unittest.TestCase):
         # Check that x has not been modified by attack and classifier
         self.assertAlmostEqual(float(np.max(np.abs(x_original - x))), 0.0, delta=0.00001)
 
+    def test_input_unchanged(self):
+        x = 2 * np.random.rand(5, 28, 28, 1) - 0.5
+        x_original = x.copy()
+        encoder = ThermometerEncoding(clip_values=(0, 1), num_space=5)
+        encoder(x)
+        self.assertTrue((x == x_original).all())
+
 
 if __name__ == "__main__":
     unittest.main()
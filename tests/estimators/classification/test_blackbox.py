@@ -18,7 +18,9 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import logging
+import os
 import tempfile
+import time
 import unittest
 
 import numpy as np
@@ -83,6 +85,82 @@ class TestBlackBoxClassifier(TestBase):
 
         self.assertRaises(NotImplementedError, lambda: classifier.save(filename, path=path))
 
+    def test_prediction_cache(self):
+        from art.estimators.classification.blackbox import BlackBoxClassifier
+
+        queries = []
+
+        def predict(x):
+            queries.append(x.shape[0])
+            return np.eye(10)[np.argmax(x.reshape(x.shape[0], -1), axis=1) % 10]
+
+        classifier = BlackBoxClassifier(predict, (28, 28, 1), 10, clip_values=(0, 1), cache_size=100)
+        x_test = self.x_test_mnist[:5]
+        predictions = classifier.predict(np.concatenate([x_test, x_test[:2]]), batch_size=3)
+        self.assertEqual(queries, [3, 2])
+        self.assertEqual(classifier.prediction_cache.misses, 5)
+        self.assertEqual(classifier.prediction_cache.hits, 2)
+
+        predictions_cached = classifier.predict(x_test)
+        self.assertEqual(queries, [3, 2])
+        self.assertEqual(classifier.prediction_cache.hits, 7)
+        np.testing.assert_array_equal(predictions[:5], predictions_cached)
+        np.testing.assert_array_equal(predictions[5:], predictions_cached[:2])
+
+    def test_parallel_queries(self):
+        from art.estimators.classification.blackbox import BlackBoxClassifier
+
+        failures = [2]
+
+        def predict(x):
+            time.sleep(0.01 * np.random.rand())
+            if x[0, 0, 0, 0] == 0 and failures[0] > 0:
+                failures[0] -= 1
+                raise ConnectionError("Service unavailable.")
+            return np.eye(10)[np.argmax(x.reshape(x.shape[0], -1), axis=1) % 10]
+
+        x_test = np.random.rand(50, 28, 28, 1)
+        x_test[:, 0, 0, 0] = 0
+        predictions = np.eye(10)[np.argmax(x_test.reshape(50, -1), axis=1) % 10]
+
+        classifier = BlackBoxClassifier(
+            predict, (28, 28, 1), 10, nb_parallel_queries=4, max_queries_per_second=1000, nb_retries=2, retry_delay=0
+        )
+        np.testing.assert_array_equal(classifier.predict(x_test, batch_size=3), predictions)
+
+        classifier = BlackBoxClassifier(predict, (28, 28, 1), 10, nb_parallel_queries=4, nb_retries=0)
+        failures[0] = 1
+        self.assertRaises(ConnectionError, lambda: classifier.predict(x_test, batch_size=3))
+
+    def test_predict_stream(self):
+        from art.estimators.classification.blackbox import BlackBoxClassifier
+
+        def predict(x):
+            return np.eye(10)[np.argmax(x.reshape(x.shape[0], -1), axis=1) % 10]
+
+        classifier = BlackBoxClassifier(predict, (28, 28, 1), 10, clip_values=(0, 1), preprocessing=(0.5, 2))
+        predictions = classifier.predict(self.x_test_mnist)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            x_memmap = np.memmap(
+                os.path.join(tmp_dir, "x.dat"), dtype=self.x_test_mnist.dtype, mode="w+", shape=self.x_test_mnist.shape
+            )
+            x_memmap[:] = self.x_test_mnist
+            predictions_memmap = np.memmap(
+                os.path.join(tmp_dir, "predictions.dat"), dtype=np.float32, mode="w+", shape=predictions.shape
+            )
+
+            classifier.predict_into(x_memmap, predictions_memmap, batch_size=7)
+            np.testing.assert_array_equal(predictions_memmap, predictions)
+
+            batches = (self.x_test_mnist[i : i + 3] for i in range(0, self.x_test_mnist.shape[0], 3))
+            predictions_stream = list(classifier.predict_stream(batches))
+            self.assertEqual(len(predictions_stream), int(np.ceil(self.x_test_mnist.shape[0] / 3)))
+            np.testing.assert_array_equal(np.concatenate(predictions_stream), predictions)
+
+            self.assertRaises(ValueError, lambda: classifier.predict_into(x_memmap, np.zeros((5, 10)), batch_size=7))
+            del x_memmap, predictions_memmap
+
     def test_repr(self):
         classifier = get_classifier_bb()
         repr_ = repr(classifier)
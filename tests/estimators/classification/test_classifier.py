@@ -102,6 +102,22 @@ class TestClassifier(TestBase):
         x_new_expected = np.asarray([[0.19151945, 0.62210877, 0.43772774], [0.78535858, 0.77997581, 0.27259261]])
         np.testing.assert_array_almost_equal(x_new, x_new_expected)
 
+    def test_preprocessing_normalisation_integer_input(self):
+        classifier = ClassifierInstance()
+
+        classifier.set_params(preprocessing=(0.5, 1))
+        x_new = classifier._apply_preprocessing_standardisation(np.asarray([[1, 2]], dtype=np.int32))
+        np.testing.assert_array_almost_equal(x_new, np.asarray([[0.5, 1.5]]))
+
+        classifier.set_params(preprocessing=(127.5, 127.5))
+        x_new = classifier._apply_preprocessing_standardisation(np.asarray([[0, 255]], dtype=np.int64))
+        np.testing.assert_array_almost_equal(x_new, np.asarray([[-1.0, 1.0]]))
+
+        # Identity standardisation still returns floating point values for integer inputs
+        classifier.set_params(preprocessing=(0, 1))
+        x_new = classifier._apply_preprocessing_standardisation(np.asarray([[1, 2]], dtype=np.int32))
+        self.assertTrue(np.issubdtype(x_new.dtype, np.floating))
+
     def test_repr(self):
         classifier = ClassifierInstance()
 
@@ -41,6 +41,36 @@ def test_layers(get_default_mnist_subset, framework, is_tf_version_2, image_dl_e
         warnings.warn(UserWarning(e))
 
 
+def test_layers_multiple_and_cache(get_default_mnist_subset, framework, is_tf_version_2, image_dl_estimator):
+    try:
+        classifier, _ = image_dl_estimator(one_classifier=True, from_logits=True)
+        if classifier is not None:
+            (_, _), (x_test_mnist, _) = get_default_mnist_subset
+
+            if framework == "tensorflow" and is_tf_version_2:
+                raise NotImplementedError(
+                    "fw_agnostic_backend_test_layers not implemented for framework {0}".format(framework)
+                )
+
+            layers = list(range(len(classifier.layer_names)))
+            activations = classifier.get_activations(x_test_mnist, layers, batch_size=4)
+            assert len(activations) == len(layers)
+            for i, activation in zip(layers, activations):
+                np.testing.assert_array_equal(activation, classifier.get_activations(x_test_mnist, i, batch_size=4))
+
+            if framework != "mxnet":
+                classifier.set_activations_cache(max_bytes=2 ** 26)
+                activations_cached = classifier.get_activations(x_test_mnist, layers, batch_size=4)
+                classifier.get_activations(x_test_mnist, layers[0], batch_size=4)
+                assert classifier.activations_cache.misses == len(layers)
+                assert classifier.activations_cache.hits == 1
+                for activation, activation_cached in zip(activations, activations_cached):
+                    np.testing.assert_array_equal(activation, activation_cached)
+                classifier.set_activations_cache(None)
+    except NotImplementedError as e:
+        warnings.warn(UserWarning(e))
+
+
 def test_loss_gradient_with_wildcard(image_dl_estimator):
     classifier, _ = image_dl_estimator(one_classifier=True, wildcard=True)
     if classifier is not None:
@@ -321,6 +351,115 @@ def test_loss_gradient(
         )
 
 
+def test_gradients_batch_size(get_default_mnist_subset, image_dl_estimator):
+    try:
+        (_, _), (x_test_mnist, y_test_mnist) = get_default_mnist_subset
+        classifier, _ = image_dl_estimator(one_classifier=True, from_logits=True)
+
+        if classifier is not None:
+            x_test_mnist, y_test_mnist = x_test_mnist[:11], y_test_mnist[:11]
+
+            class_gradients = classifier.class_gradient(x_test_mnist)
+            class_gradients_batch = classifier.class_gradient(x_test_mnist, batch_size=4)
+            np.testing.assert_array_almost_equal(class_gradients, class_gradients_batch, decimal=4)
+
+            labels = np.argmax(y_test_mnist, axis=1)
+            class_gradients = classifier.class_gradient(x_test_mnist, label=labels)
+            class_gradients_batch = classifier.class_gradient(x_test_mnist, label=labels, batch_size=4)
+            np.testing.assert_array_almost_equal(class_gradients, class_gradients_batch, decimal=4)
+
+            loss_gradients = classifier.loss_gradient(x_test_mnist, y_test_mnist)
+            loss_gradients_batch = classifier.loss_gradient(x_test_mnist, y_test_mnist, batch_size=4)
+            np.testing.assert_array_almost_equal(loss_gradients, loss_gradients_batch, decimal=4)
+    except NotImplementedError as e:
+        warnings.warn(UserWarning(e))
+
+
+def test_predict_and_class_gradient(get_default_mnist_subset, image_dl_estimator):
+    try:
+        (_, _), (x_test_mnist, _) = get_default_mnist_subset
+        classifier, _ = image_dl_estimator(one_classifier=True, from_logits=True)
+
+        if classifier is not None:
+            x_test_mnist = x_test_mnist[:11]
+
+            predictions, class_gradients = classifier.predict_and_class_gradient(x_test_mnist, batch_size=4)
+            np.testing.assert_array_almost_equal(predictions, classifier.predict(x_test_mnist), decimal=4)
+            np.testing.assert_array_almost_equal(class_gradients, classifier.class_gradient(x_test_mnist), decimal=4)
+
+            labels = [2, 5, 7]
+            predictions, class_gradients = classifier.predict_and_class_gradient(x_test_mnist, labels=labels)
+            np.testing.assert_array_almost_equal(predictions, classifier.predict(x_test_mnist), decimal=4)
+            assert class_gradients.shape == (11, 3) + x_test_mnist.shape[1:]
+            for i, label in enumerate(labels):
+                np.testing.assert_array_almost_equal(
+                    class_gradients[:, i], classifier.class_gradient(x_test_mnist, label=label)[:, 0], decimal=4
+                )
+    except NotImplementedError as e:
+        warnings.warn(UserWarning(e))
+
+
+def test_predict_and_weighted_class_gradient(get_default_mnist_subset, image_dl_estimator):
+    try:
+        (_, _), (x_test_mnist, _) = get_default_mnist_subset
+        classifier, _ = image_dl_estimator(one_classifier=True, from_logits=True)
+
+        if classifier is not None:
+            x_test_mnist = x_test_mnist[:11]
+            i_add = np.arange(11) % 10
+            i_sub = (np.arange(11) + 3) % 10
+            weights = np.zeros((11, 10), dtype=np.float32)
+            weights[np.arange(11), i_add] = 1.0
+            weights[np.arange(11), i_sub] = -1.0
+
+            expected_gradients = classifier.class_gradient(x_test_mnist, label=i_add)
+            expected_gradients -= classifier.class_gradient(x_test_mnist, label=i_sub)
+            expected_gradients = expected_gradients.reshape(x_test_mnist.shape)
+
+            predictions, gradients = classifier.predict_and_weighted_class_gradient(x_test_mnist, weights, batch_size=4)
+            np.testing.assert_array_almost_equal(predictions, classifier.predict(x_test_mnist), decimal=4)
+            np.testing.assert_array_almost_equal(gradients, expected_gradients, decimal=4)
+
+            # Weights computed from the predictions of each batch
+            def weights_fn(predictions_batch, indices):
+                assert predictions_batch.shape == (len(indices), 10)
+                return weights[indices]
+
+            predictions, gradients = classifier.predict_and_weighted_class_gradient(
+                x_test_mnist, weights_fn, batch_size=4
+            )
+            np.testing.assert_array_almost_equal(predictions, classifier.predict(x_test_mnist), decimal=4)
+            np.testing.assert_array_almost_equal(gradients, expected_gradients, decimal=4)
+    except NotImplementedError as e:
+        warnings.warn(UserWarning(e))
+
+
+def test_loss_and_gradient(get_default_mnist_subset, image_dl_estimator):
+    try:
+        (_, _), (x_test_mnist, y_test_mnist) = get_default_mnist_subset
+        classifier, _ = image_dl_estimator(one_classifier=True, from_logits=True)
+
+        if classifier is not None:
+            x_test_mnist, y_test_mnist = x_test_mnist[:11], y_test_mnist[:11]
+
+            losses, gradients = classifier.loss_and_gradient(x_test_mnist, y_test_mnist, batch_size=4)
+            assert losses.shape == (11,)
+            assert gradients.shape == x_test_mnist.shape
+            np.testing.assert_array_almost_equal(
+                losses, classifier.loss(x_test_mnist, y_test_mnist).reshape(-1), decimal=4
+            )
+
+            # The gradient of each sample is the gradient of its own loss
+            for i in [0, 5, 10]:
+                np.testing.assert_array_almost_equal(
+                    gradients[i : i + 1],
+                    classifier.loss_gradient(x_test_mnist[i : i + 1], y_test_mnist[i : i + 1]),
+                    decimal=4,
+                )
+    except NotImplementedError as e:
+        warnings.warn(UserWarning(e))
+
+
 def test_nb_classes(image_dl_estimator):
     try:
         classifier, _ = image_dl_estimator(one_classifier=True, from_logits=True)
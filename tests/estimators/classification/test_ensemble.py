@@ -25,7 +25,7 @@ import numpy as np
 
 from art.estimators.classification.ensemble import EnsembleClassifier
 from art.utils import Deprecated
-from tests.utils import TestBase, get_image_classifier_kr
+from tests.utils import TestBase, get_image_classifier_kr, get_image_classifier_pt
 
 logger = logging.getLogger(__name__)
 
@@ -249,6 +249,61 @@ class TestEnsembleClassifier(TestBase):
         )
         np.testing.assert_array_almost_equal(gradients_2[0, 0, 5, 14, :, 0], expected_predictions_2, decimal=4)
 
+    def test_parallel_members(self):
+        # Graph-mode Keras models are bound to the thread that created their graph, use PyTorch members instead
+        classifiers = [get_image_classifier_pt(), get_image_classifier_pt()]
+        ensemble = EnsembleClassifier(classifiers=classifiers, channels_first=True, clip_values=(0, 1))
+        ensemble_parallel = EnsembleClassifier(
+            classifiers=classifiers, channels_first=True, clip_values=(0, 1), nb_parallel_members=2
+        )
+        x_test = np.transpose(self.x_test_mnist, (0, 3, 1, 2)).astype(np.float32)
+
+        for raw in [False, True]:
+            np.testing.assert_array_almost_equal(
+                ensemble_parallel.predict(x_test, raw=raw), ensemble.predict(x_test, raw=raw)
+            )
+            np.testing.assert_array_almost_equal(
+                ensemble_parallel.loss_gradient(x_test, self.y_test_mnist, raw=raw),
+                ensemble.loss_gradient(x_test, self.y_test_mnist, raw=raw),
+            )
+            np.testing.assert_array_almost_equal(
+                ensemble_parallel.class_gradient(x_test, label=3, raw=raw),
+                ensemble.class_gradient(x_test, label=3, raw=raw),
+            )
+
+        with self.assertRaises(ValueError):
+            EnsembleClassifier(classifiers=classifiers, channels_first=True, clip_values=(0, 1), nb_parallel_members=0)
+        with self.assertRaises(ValueError):
+            EnsembleClassifier(classifiers=classifiers, channels_first=True, clip_values=(0, 1), parallel_backend="gpu")
+
+    def test_parallel_members_process(self):
+        classifiers = [get_image_classifier_pt(), get_image_classifier_pt()]
+        ensemble = EnsembleClassifier(classifiers=classifiers, channels_first=True, clip_values=(0, 1))
+        ensemble_parallel = EnsembleClassifier(
+            classifiers=classifiers,
+            channels_first=True,
+            clip_values=(0, 1),
+            nb_parallel_members=2,
+            parallel_backend="process",
+        )
+        x_test = np.transpose(self.x_test_mnist, (0, 3, 1, 2)).astype(np.float32)
+
+        for raw in [False, True]:
+            np.testing.assert_array_almost_equal(
+                ensemble_parallel.predict(x_test, raw=raw), ensemble.predict(x_test, raw=raw)
+            )
+            np.testing.assert_array_almost_equal(
+                ensemble_parallel.loss_gradient(x_test, self.y_test_mnist, raw=raw),
+                ensemble.loss_gradient(x_test, self.y_test_mnist, raw=raw),
+            )
+
+        # Replicas created after closing the pool hold the updated weights of the members
+        for parameter in classifiers[0].model.parameters():
+            parameter.data.mul_(0.5)
+        ensemble_parallel.close()
+        np.testing.assert_array_almost_equal(ensemble_parallel.predict(x_test), ensemble.predict(x_test))
+        ensemble_parallel.close()
+
     def test_repr(self):
         repr_ = repr(self.ensemble)
         self.assertIn("art.estimators.classification.ensemble.EnsembleClassifier", repr_)
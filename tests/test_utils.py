@@ -27,8 +27,10 @@ from art.utils import projection, random_sphere, to_categorical, least_likely_cl
 from art.utils import load_iris, load_mnist
 from art.utils import second_most_likely_class, random_targets, get_label_conf, get_labels_np_array, preprocess
 from art.utils import compute_success_array, compute_success
+from art.utils import correctly_classified_by_class, find_initial_adversarial
 from art.utils import segment_by_class, performance_diff
 from art.utils import is_probability
+from art.utils import ActiveSet, EstimatorProfiler
 
 from tests.utils import master_seed
 
@@ -302,6 +304,57 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(attack_success_targeted, 1.0)
         self.assertEqual(attack_success_untargeted, 1.0)
 
+    def test_find_initial_adversarial(self):
+        class DummyClassifier:
+            nb_classes = 2
+            nb_calls = 0
+
+            def predict(self, x, batch_size):
+                self.nb_calls += 1
+                return x
+
+        classifier = DummyClassifier()
+        x = np.array([[0.9, 0.1], [0.8, 0.2]])
+        y_p = np.array([0, 0])
+
+        # Untargeted, from random candidates
+        x_init, y_init, found = find_initial_adversarial(
+            classifier, x, None, y_p, targeted=False, clip_min=0.0, clip_max=1.0, max_trials=100, block_size=10
+        )
+        self.assertTrue(found.all())
+        self.assertTrue((y_init == 1).all())
+        self.assertTrue((x_init[:, 1] > x_init[:, 0]).all())
+        self.assertLessEqual(classifier.nb_calls, 10)
+
+        # Targeted, from the correctly classified images of the pool
+        pool = correctly_classified_by_class(classifier, np.array([[0.2, 0.8], [0.7, 0.3]]), np.array([1, 1]))
+        self.assertEqual(list(pool.keys()), [1])
+        self.assertEqual(pool[1].shape, (1, 2))
+
+        classifier.nb_calls = 0
+        x_init, y_init, found = find_initial_adversarial(
+            classifier, x, np.array([1, 1]), y_p, targeted=True, clip_min=0.0, clip_max=1.0, max_trials=1, pool=pool
+        )
+        self.assertTrue(found.all())
+        self.assertTrue((y_init == 1).all())
+        self.assertTrue((x_init == np.array([[0.2, 0.8], [0.2, 0.8]])).all())
+        self.assertEqual(classifier.nb_calls, 1)
+
+        # Untargeted, from the images of the classes other than the predicted class
+        pool = {1: np.array([[0.1, 0.9]]), 0: np.array([[0.6, 0.4], [0.9, 0.1]])}
+        x_init, y_init, found = find_initial_adversarial(
+            classifier, x, None, np.array([0, 1]), targeted=False, clip_min=0.0, clip_max=1.0, max_trials=1, pool=pool
+        )
+        self.assertTrue(found.all())
+        self.assertTrue((y_init == np.array([1, 0])).all())
+        self.assertTrue((x_init[0] == pool[1][0]).all())
+        self.assertTrue((x_init[1] == pool[0]).all(axis=1).any())
+
+        with self.assertRaises(ValueError):
+            find_initial_adversarial(
+                classifier, x, None, y_p, targeted=False, clip_min=0.0, clip_max=1.0, max_trials=0, block_size=10
+            )
+
     def test_preprocess(self):
         (x, y), (_, _), _, _ = load_mnist()
 
@@ -405,6 +458,59 @@ class TestUtils(unittest.TestCase):
         not_probabilities = np.array([-1.1, 0.3, 0.7])
         self.assertFalse(is_probability(not_probabilities))
 
+    def test_active_set(self):
+        active_set = ActiveSet(7, 3)
+        self.assertEqual(active_set.indices.tolist(), [0, 1, 2])
+        self.assertEqual(active_set.nb_pending, 4)
+
+        # Finished samples are dropped and the pending samples fill the batch in their original order
+        new = active_set.update(np.array([False, True, False]))
+        self.assertEqual(new.tolist(), [3])
+        self.assertEqual(active_set.indices.tolist(), [0, 2, 3])
+
+        new = active_set.update(np.array([True, True, False]))
+        self.assertEqual(new.tolist(), [4, 5])
+        self.assertEqual(active_set.indices.tolist(), [3, 4, 5])
+
+        # Results are written back by index while the active set drains
+        results = np.zeros(7, dtype=int)
+        nb_iter = np.zeros(7, dtype=int)
+        while len(active_set) > 0:
+            nb_iter[active_set.indices] += 1
+            results[active_set.indices] = 10 * active_set.indices
+            active_set.update(nb_iter[active_set.indices] >= 2)
+
+        self.assertEqual(results[3:].tolist(), [30, 40, 50, 60])
+        self.assertEqual(active_set.nb_finished, 7)
+        self.assertEqual(active_set.nb_pending, 0)
+
+        self.assertEqual(len(ActiveSet(0, 3)), 0)
+        with self.assertRaises(ValueError):
+            ActiveSet(7, 0)
+
+    def test_estimator_profiler(self):
+        parent = EstimatorProfiler()
+        profiler = EstimatorProfiler(parent=parent)
+
+        with profiler.span("predict", 10):
+            with profiler.span("preprocessing_standardisation", 10):
+                pass
+        with profiler.span("predict", 5):
+            pass
+        profiler.record("loss_gradient", 3, 0.5)
+
+        report = profiler.report()
+        self.assertEqual(list(report.keys()), ["preprocessing_standardisation", "predict", "loss_gradient"])
+        self.assertEqual(report["predict"]["calls"], 2)
+        self.assertEqual(report["predict"]["samples"], 15)
+        self.assertGreaterEqual(report["predict"]["time"], report["preprocessing_standardisation"]["time"])
+        self.assertEqual(report["loss_gradient"]["time"], 0.5)
+        self.assertEqual(parent.report(), report)
+
+        profiler.reset()
+        self.assertEqual(profiler.report(), {})
+        self.assertEqual(len(parent.report()), 3)
+
 
 if __name__ == "__main__":
     unittest.main()